@@ -8,8 +8,11 @@ import os
 import sys
 import json
 import logging
+import time
+import random
 import datetime
-from typing import Dict, List, Any, Optional, Union, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable
 from enum import Enum
 
 # 配置日志
@@ -49,6 +52,52 @@ class TestPriority(Enum):
     MEDIUM = "medium"
     LOW = "low"
 
+# 没有历史执行时间时使用的预估耗时(秒)
+DEFAULT_TEST_DURATION_ESTIMATE = 1.0
+
+# 进程池工作进程内的框架实例
+_worker_framework = None
+
+
+def _init_test_worker(framework_class, project_root: str, config: Dict[str, Any]) -> None:
+    """
+    初始化测试工作进程，每个进程只创建一次框架实例
+    
+    Args:
+        framework_class: 框架类，子类可覆盖_run_test_case
+        project_root: 项目根目录
+        config: 主进程使用的配置
+    """
+    global _worker_framework
+    # fork出的进程共享父进程的随机状态，重新播种
+    random.seed()
+    framework = framework_class(project_root)
+    # 使用主进程的配置，而不是重新读取配置文件
+    framework.config = config
+    _worker_framework = framework
+
+
+def _run_test_case_in_worker(test_case: Dict[str, Any], runner: str) -> Dict[str, Any]:
+    """
+    在工作进程中执行单个测试用例，异常转换为ERROR结果
+    
+    Args:
+        test_case: 测试用例信息
+        runner: 测试运行器
+        
+    Returns:
+        测试结果，包含开始和完成时间
+    """
+    started_at = datetime.datetime.now().isoformat()
+    try:
+        result = _worker_framework._run_test_case(test_case, runner)
+    except Exception as e:
+        result = {"status": TestStatus.ERROR.value, "error": str(e)}
+    result["started_at"] = started_at
+    result["completed_at"] = datetime.datetime.now().isoformat()
+    return result
+
+
 class AutomatedTestingFramework:
     """
     自动化测试框架
@@ -80,6 +129,7 @@ class AutomatedTestingFramework:
         self.coverage_data = {}
         self.current_test_run = None
         self.test_history = []
+        self._impact_analyzer = None
         
         logger.info(f"自动化测试框架初始化完成，项目根目录: {self.project_root}")
     
@@ -131,6 +181,22 @@ class AutomatedTestingFramework:
                 "create_on_success": True,
                 "create_on_failure": False
             },
+            "parallel": {
+                "enabled": False,
+                "executor": "process",
+                "max_workers": None,
+                "type_concurrency": {
+                    "ui": 2,
+                    "performance": 1
+                },
+                "fail_fast": False
+            },
+            "impact_analysis": {
+                "enabled": False,
+                "cache_dir": ".test_impact",
+                "max_map_age_days": 7,
+                "ignore_patterns": None
+            },
             "max_history_records": 100
         }
         
@@ -150,13 +216,37 @@ class AutomatedTestingFramework:
         
         return default_config
     
-    def generate_test_plan(self, test_types: List[TestType] = None, priority: List[TestPriority] = None) -> Dict[str, Any]:
+    def get_impact_analyzer(self):
+        """
+        获取测试影响分析器，首次调用时创建
+        
+        Returns:
+            TestImpactAnalyzer实例
+        """
+        if self._impact_analyzer is None:
+            try:
+                from .impact_analysis import TestImpactAnalyzer
+            except ImportError:
+                from impact_analysis import TestImpactAnalyzer
+            
+            impact_config = self.config["impact_analysis"]
+            self._impact_analyzer = TestImpactAnalyzer(
+                self.project_root,
+                cache_dir=os.path.join(self.project_root, impact_config["cache_dir"]),
+                ignore_patterns=impact_config.get("ignore_patterns"),
+                max_map_age=impact_config["max_map_age_days"] * 24 * 3600
+            )
+        return self._impact_analyzer
+    
+    def generate_test_plan(self, test_types: List[TestType] = None, priority: List[TestPriority] = None,
+                           impact_analysis: Optional[bool] = None) -> Dict[str, Any]:
         """
         生成测试计划
         
         Args:
             test_types: 要包含的测试类型列表，如果为None则包含所有类型
             priority: 测试优先级列表，如果为None则包含所有优先级
+            impact_analysis: 是否只选择受变更影响的测试用例，如果为None则使用配置impact_analysis.enabled
             
         Returns:
             测试计划字典
@@ -183,6 +273,16 @@ class AutomatedTestingFramework:
                 test_cases = self._collect_test_cases(test_dir, test_type)
                 test_plan["test_cases"].extend(test_cases)
         
+        if impact_analysis is None:
+            impact_analysis = self.config["impact_analysis"]["enabled"]
+        if impact_analysis:
+            try:
+                selected, info = self.get_impact_analyzer().select_tests(test_plan["test_cases"])
+                test_plan["test_cases"] = selected
+                test_plan["impact_analysis"] = info
+            except Exception as e:
+                logger.error(f"测试影响分析失败，执行全量测试: {e}")
+        
         # 按优先级排序
         priority_map = {p.value: i for i, p in enumerate(priority)}
         test_plan["test_cases"].sort(key=lambda x: priority_map.get(x["priority"], 999))
@@ -245,12 +345,14 @@ class AutomatedTestingFramework:
         
         return test_cases
     
-    def execute_tests(self, test_plan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def execute_tests(self, test_plan: Optional[Dict[str, Any]] = None,
+                      parallel: Optional[bool] = None) -> Dict[str, Any]:
         """
         执行测试计划
         
         Args:
             test_plan: 测试计划，如果为None则使用当前测试计划
+            parallel: 是否并行执行，如果为None则使用配置parallel.enabled
             
         Returns:
             测试结果字典
@@ -260,6 +362,11 @@ class AutomatedTestingFramework:
                 self.generate_test_plan()
             test_plan = self.current_test_run
         
+        if parallel is None:
+            parallel = self.config["parallel"]["enabled"]
+        if parallel:
+            return self.execute_tests_parallel(test_plan)
+        
         logger.info(f"开始执行测试计划: {test_plan['id']}")
         test_plan["status"] = TestStatus.RUNNING.value
         test_plan["started_at"] = datetime.datetime.now().isoformat()
@@ -287,6 +394,174 @@ class AutomatedTestingFramework:
                 
                 test_case["completed_at"] = datetime.datetime.now().isoformat()
         
+        return self._finalize_test_plan(test_plan)
+    
+    def execute_tests_parallel(self, test_plan: Optional[Dict[str, Any]] = None,
+                               max_workers: Optional[int] = None,
+                               type_concurrency: Optional[Dict[str, int]] = None,
+                               fail_fast: Optional[bool] = None,
+                               on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        在进程池中并行执行测试计划
+        
+        按历史执行时间从长到短(LPT)派发测试用例，使总耗时接近总CPU时间除以核数；
+        每种测试类型的并发数受type_concurrency限制；每个用例完成后立即写回测试计划。
+        
+        Args:
+            test_plan: 测试计划，如果为None则使用当前测试计划
+            max_workers: 工作进程数，如果为None则使用配置或CPU核数
+            type_concurrency: 每种测试类型的最大并发数，如果为None则使用配置
+            fail_fast: 出现失败后是否跳过尚未开始的用例，如果为None则使用配置
+            on_result: 每个用例完成后的回调，参数为更新后的测试用例
+            
+        Returns:
+            测试结果字典
+            
+        Raises:
+            ValueError: 如果max_workers或type_concurrency中的并发数小于1
+        """
+        if test_plan is None:
+            if self.current_test_run is None:
+                self.generate_test_plan()
+            test_plan = self.current_test_run
+        
+        parallel_config = self.config["parallel"]
+        if max_workers is None:
+            max_workers = parallel_config.get("max_workers") or os.cpu_count() or 1
+        if type_concurrency is None:
+            type_concurrency = parallel_config.get("type_concurrency", {})
+        if fail_fast is None:
+            fail_fast = parallel_config.get("fail_fast", False)
+        if max_workers < 1:
+            raise ValueError(f"max_workers必须大于等于1: {max_workers}")
+        # 并发数为0的类型永远不会被派发，直接报错而不是静默遗漏这些用例
+        invalid = {test_type: limit for test_type, limit in type_concurrency.items()
+                   if limit is not None and limit < 1}
+        if invalid:
+            raise ValueError(f"type_concurrency中的并发数必须大于等于1: {invalid}")
+        
+        logger.info(f"开始并行执行测试计划: {test_plan['id']}, 工作进程数: {max_workers}")
+        test_plan["status"] = TestStatus.RUNNING.value
+        test_plan["started_at"] = datetime.datetime.now().isoformat()
+        
+        # LPT调度：预估耗时最长的用例最先派发
+        estimates = self._estimate_durations(test_plan["test_cases"])
+        pending = sorted(test_plan["test_cases"], key=lambda tc: estimates[tc["id"]], reverse=True)
+        total = len(pending)
+        test_plan["progress"] = {"completed": 0, "total": total}
+        
+        running_by_type: Dict[str, int] = {}
+        in_flight = {}
+        failed = False
+        wall_start = time.perf_counter()
+        
+        executor_class = ThreadPoolExecutor if parallel_config.get("executor") == "thread" else ProcessPoolExecutor
+        executor_kwargs = {"max_workers": max_workers}
+        if executor_class is ProcessPoolExecutor:
+            executor_kwargs.update(initializer=_init_test_worker,
+                                   initargs=(type(self), self.project_root, self.config))
+        else:
+            _init_test_worker(type(self), self.project_root, self.config)
+        
+        with executor_class(**executor_kwargs) as executor:
+            while pending or in_flight:
+                # 派发不超过类型并发限制的用例，直到占满所有工作进程
+                index = 0
+                while index < len(pending) and len(in_flight) < max_workers and not (failed and fail_fast):
+                    test_case = pending[index]
+                    limit = type_concurrency.get(test_case["type"])
+                    if limit is not None and running_by_type.get(test_case["type"], 0) >= limit:
+                        index += 1
+                        continue
+                    pending.pop(index)
+                    runner = self.config["test_runners"][test_case["type"]]
+                    test_case["status"] = TestStatus.RUNNING.value
+                    future = executor.submit(_run_test_case_in_worker, dict(test_case), runner)
+                    in_flight[future] = test_case
+                    running_by_type[test_case["type"]] = running_by_type.get(test_case["type"], 0) + 1
+                
+                if failed and fail_fast and pending:
+                    for test_case in pending:
+                        test_case["status"] = TestStatus.SKIPPED.value
+                        test_case["skip_reason"] = "fail_fast"
+                    logger.info(f"快速失败：跳过 {len(pending)} 个未开始的测试用例")
+                    pending = []
+                
+                if not in_flight:
+                    break
+                
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    test_case = in_flight.pop(future)
+                    running_by_type[test_case["type"]] -= 1
+                    try:
+                        test_case.update(future.result())
+                    except Exception as e:
+                        logger.error(f"测试执行异常: {e}")
+                        test_case["status"] = TestStatus.ERROR.value
+                        test_case["error"] = str(e)
+                        test_case["completed_at"] = datetime.datetime.now().isoformat()
+                    
+                    if test_case["status"] in (TestStatus.FAILED.value, TestStatus.ERROR.value):
+                        failed = True
+                    test_plan["progress"]["completed"] += 1
+                    if on_result is not None:
+                        on_result(test_case)
+        
+        wall_time = time.perf_counter() - wall_start
+        serial_time = sum(tc.get("execution_time", 0) for tc in test_plan["test_cases"])
+        test_plan["execution"] = {
+            "mode": "parallel",
+            "max_workers": max_workers,
+            "wall_time": wall_time,
+            "total_execution_time": serial_time,
+            "speedup": round(serial_time / wall_time, 2) if wall_time > 0 else 0
+        }
+        
+        return self._finalize_test_plan(test_plan)
+    
+    def _estimate_durations(self, test_cases: List[Dict[str, Any]]) -> Dict[str, float]:
+        """
+        根据测试历史预估每个用例的执行时间
+        
+        没有历史记录的用例使用同类型用例的平均耗时，仍无数据时使用默认值
+        
+        Args:
+            test_cases: 测试用例列表
+            
+        Returns:
+            用例ID到预估耗时的映射
+        """
+        known: Dict[str, float] = {}
+        for record in self.test_history:
+            known.update(record.get("execution_times", {}))
+        
+        by_type: Dict[str, List[float]] = {}
+        for test_case in test_cases:
+            if test_case["id"] in known:
+                by_type.setdefault(test_case["type"], []).append(known[test_case["id"]])
+        
+        estimates = {}
+        for test_case in test_cases:
+            if test_case["id"] in known:
+                estimates[test_case["id"]] = known[test_case["id"]]
+            elif by_type.get(test_case["type"]):
+                type_times = by_type[test_case["type"]]
+                estimates[test_case["id"]] = sum(type_times) / len(type_times)
+            else:
+                estimates[test_case["id"]] = DEFAULT_TEST_DURATION_ESTIMATE
+        return estimates
+    
+    def _finalize_test_plan(self, test_plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        汇总测试计划结果，记录历史并按配置创建保存点
+        
+        Args:
+            test_plan: 已执行的测试计划
+            
+        Returns:
+            测试结果字典
+        """
         # 更新测试计划状态
         test_plan["completed_at"] = datetime.datetime.now().isoformat()
         
@@ -307,7 +582,10 @@ class AutomatedTestingFramework:
             "created_at": test_plan["created_at"],
             "completed_at": test_plan["completed_at"],
             "status": test_plan["status"],
-            "statistics": test_plan["statistics"]
+            "statistics": test_plan["statistics"],
+            "execution_times": {
+                tc["id"]: tc["execution_time"] for tc in test_plan["test_cases"] if "execution_time" in tc
+            }
         })
         
         # 限制历史记录数量
@@ -324,6 +602,14 @@ class AutomatedTestingFramework:
         if test_plan["status"] == TestStatus.FAILED.value and self.config["savepoint"]["create_on_failure"]:
             self._create_savepoint(test_plan)
         
+        # 合并覆盖数据，全部通过时以新保存点作为后续影响分析的比较基准
+        if self.config["impact_analysis"]["enabled"] or "impact_analysis" in test_plan:
+            green_savepoint_id = test_plan.get("savepoint_id") if test_plan["status"] == TestStatus.PASSED.value else None
+            try:
+                self.get_impact_analyzer().update_coverage(test_plan["test_cases"], green_savepoint_id)
+            except Exception as e:
+                logger.error(f"更新测试覆盖映射失败: {e}")
+        
         return test_plan
     
     def _run_test_case(self, test_case: Dict[str, Any], runner: str) -> Dict[str, Any]:
@@ -340,10 +626,6 @@ class AutomatedTestingFramework:
         # 这里是示例实现，实际项目中应调用相应的测试运行器
         logger.info(f"执行测试用例: {test_case['id']}")
         
-        # 模拟测试执行
-        import random
-        import time
-        
         # 模拟测试执行时间
         execution_time = random.uniform(0.1, 2.0)
         time.sleep(min(0.1, execution_time))  # 实际执行时不要真的等待
@@ -0,0 +1,290 @@
+"""
+测试影响分析 - TestImpactAnalyzer
+
+为AutomatedTestingFramework选择受代码变更影响的测试用例：
+1. 基于AST解析构建模块导入图，按文件mtime/size增量缓存
+2. 记录历次运行中每个测试用例覆盖的文件(覆盖映射)
+3. 将工作区与最近一次全部通过的保存点比较，得到变更文件
+4. 只选择导入链或覆盖映射可达变更文件的测试用例，映射过期时退回全量测试
+
+版本: 1.0.0
+更新日期: 2025-06-02
+"""
+
+import os
+import ast
+import json
+import time
+import fnmatch
+import logging
+from collections import deque
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from development_tools.savepoint_store import SavepointStore
+
+logger = logging.getLogger("TestImpactAnalyzer")
+
+# 变更后不影响任何测试的文件，包括AgentProblemSolver创建保存点时写入的状态文件
+DEFAULT_IGNORE_PATTERNS = [
+    "*.md", "*.pdf", "*.log", "*.html", "*.png", "*.jpg", "reports/*",
+    "config/savepoints.json", "config/work_nodes.json", "config/rollback_history.json",
+    "config/agent_problem_solver.json"
+]
+
+# 覆盖映射超过该时间(秒)未更新时视为过期
+DEFAULT_MAX_MAP_AGE = 7 * 24 * 3600
+
+
+def module_name_for_path(rel_path: str) -> str:
+    """
+    根据相对路径计算模块名
+
+    Args:
+        rel_path: 使用/分隔的相对路径
+
+    Returns:
+        点分模块名，包的__init__.py对应包名
+    """
+    parts = rel_path[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def parse_imports(source: str, module_name: str, is_package: bool) -> List[str]:
+    """
+    解析源码中导入的模块名，相对导入解析为绝对模块名
+
+    Args:
+        source: Python源码
+        module_name: 源码所在模块名
+        is_package: 源码是否为包的__init__.py
+
+    Returns:
+        导入的点分模块名列表；from x import y同时记录x和x.y
+    """
+    tree = ast.parse(source)
+    package_parts = module_name.split(".") if is_package else module_name.split(".")[:-1]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.add(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package_parts[:len(package_parts) - node.level + 1]
+                base = ".".join(base_parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if base:
+                names.add(base)
+            for alias in node.names:
+                if alias.name != "*":
+                    names.add(f"{base}.{alias.name}" if base else alias.name)
+    return sorted(names)
+
+
+class TestImpactAnalyzer:
+    """
+    测试影响分析类
+    """
+
+    __test__ = False
+
+    def __init__(self, project_root: str, cache_dir: Optional[str] = None,
+                 savepoint_store: Optional[SavepointStore] = None,
+                 ignore_patterns: Optional[List[str]] = None,
+                 max_map_age: float = DEFAULT_MAX_MAP_AGE):
+        """
+        初始化测试影响分析器
+
+        Args:
+            project_root: 项目根目录
+            cache_dir: 导入图和覆盖映射的缓存目录，默认为project_root/.test_impact
+            savepoint_store: 保存点存储，默认与AgentProblemSolver使用同一存储目录
+            ignore_patterns: 不影响测试的文件模式列表
+            max_map_age: 覆盖映射的最长有效时间(秒)
+        """
+        self.project_root = os.path.abspath(project_root)
+        self.cache_dir = cache_dir or os.path.join(self.project_root, ".test_impact")
+        self.store = savepoint_store or SavepointStore(
+            self.project_root, os.path.join(self.project_root, ".savepoints", "store")
+        )
+        self.ignore_patterns = list(ignore_patterns if ignore_patterns is not None else DEFAULT_IGNORE_PATTERNS)
+        cache_rel = os.path.relpath(os.path.abspath(self.cache_dir), self.project_root)
+        if not cache_rel.startswith(".."):
+            self.ignore_patterns.append(cache_rel.replace(os.sep, "/") + "/*")
+        self.max_map_age = max_map_age
+        self.import_graph_path = os.path.join(self.cache_dir, "import_graph.json")
+        self.coverage_map_path = os.path.join(self.cache_dir, "coverage_map.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.coverage_map = self._load_json(self.coverage_map_path, {"green_savepoint_id": None,
+                                                                     "updated_at": 0, "tests": {}})
+
+    def _load_json(self, path: str, default: Dict[str, Any]) -> Dict[str, Any]:
+        """加载JSON缓存文件，不存在或损坏时返回默认值"""
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"加载缓存失败，将重新构建: {path} - {str(e)}")
+        return default
+
+    def _save_json(self, path: str, data: Dict[str, Any]) -> None:
+        """原子写入JSON缓存文件"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def build_import_graph(self) -> Dict[str, List[str]]:
+        """
+        构建项目的模块导入图，只重新解析mtime或size变化的文件
+
+        Returns:
+            相对路径到导入模块名列表的映射
+        """
+        cached = self._load_json(self.import_graph_path, {"files": {}})["files"]
+        graph_files = {}
+        parsed = 0
+        for rel_path, st in self.store.scan_project().items():
+            if not rel_path.endswith(".py"):
+                continue
+            entry = cached.get(rel_path)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                graph_files[rel_path] = entry
+                continue
+            try:
+                with open(os.path.join(self.project_root, rel_path), "r", encoding="utf-8") as f:
+                    source = f.read()
+                imports = parse_imports(source, module_name_for_path(rel_path),
+                                        rel_path.endswith("/__init__.py") or rel_path == "__init__.py")
+            except (SyntaxError, UnicodeDecodeError, OSError) as e:
+                logger.warning(f"解析导入失败: {rel_path} - {str(e)}")
+                imports = []
+            graph_files[rel_path] = [st.st_mtime_ns, st.st_size, imports]
+            parsed += 1
+
+        if parsed or len(graph_files) != len(cached):
+            self._save_json(self.import_graph_path, {"files": graph_files})
+        logger.info(f"导入图构建完成，共 {len(graph_files)} 个模块，重新解析 {parsed} 个")
+        return {rel_path: entry[2] for rel_path, entry in graph_files.items()}
+
+    def affected_files(self, changed: List[str], graph: Dict[str, List[str]]) -> Set[str]:
+        """
+        计算直接或间接导入了变更模块的文件
+
+        Args:
+            changed: 变更的Python文件相对路径
+            graph: 导入图
+
+        Returns:
+            受影响文件的相对路径集合，包含变更文件自身
+        """
+        importers: Dict[str, List[str]] = {}
+        for rel_path, imports in graph.items():
+            for name in imports:
+                importers.setdefault(name, []).append(rel_path)
+
+        affected = set(changed)
+        queue = deque(module_name_for_path(path) for path in changed)
+        seen_modules = set(queue)
+        while queue:
+            module = queue.popleft()
+            prefix = module + "."
+            # 导入子模块时会先执行包的__init__.py
+            for name, files in importers.items():
+                if name != module and not name.startswith(prefix):
+                    continue
+                for rel_path in files:
+                    if rel_path in affected:
+                        continue
+                    affected.add(rel_path)
+                    importer = module_name_for_path(rel_path)
+                    if importer not in seen_modules:
+                        seen_modules.add(importer)
+                        queue.append(importer)
+        return affected
+
+    def _is_ignored(self, rel_path: str) -> bool:
+        """检查文件变更是否可以忽略"""
+        return any(fnmatch.fnmatch(rel_path, pattern) for pattern in self.ignore_patterns)
+
+    def stale_reason(self) -> Optional[str]:
+        """
+        检查覆盖映射是否可用于影响分析
+
+        Returns:
+            不可用的原因，可用时返回None
+        """
+        savepoint_id = self.coverage_map.get("green_savepoint_id")
+        if not savepoint_id:
+            return "no_green_savepoint"
+        if not self.store.has_snapshot(savepoint_id):
+            return "green_savepoint_missing"
+        if time.time() - self.coverage_map.get("updated_at", 0) > self.max_map_age:
+            return "coverage_map_stale"
+        return None
+
+    def select_tests(self, test_cases: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        选择受变更影响的测试用例
+
+        Args:
+            test_cases: 全部测试用例
+
+        Returns:
+            (选中的测试用例, 分析信息)；无法进行影响分析时返回全部测试用例
+        """
+        info: Dict[str, Any] = {"mode": "full", "reason": None, "changed_files": [],
+                                "selected": len(test_cases), "total": len(test_cases)}
+
+        reason = self.stale_reason()
+        if reason:
+            info["reason"] = reason
+            logger.info(f"影响分析不可用，执行全量测试: {reason}")
+            return test_cases, info
+
+        savepoint_id = self.coverage_map["green_savepoint_id"]
+        diff = self.store.diff_with_project(savepoint_id)
+        changed = [p for paths in diff.values() for p in paths if not self._is_ignored(p)]
+        info["savepoint_id"] = savepoint_id
+        info["changed_files"] = sorted(changed)
+
+        non_python = [p for p in changed if not p.endswith(".py")]
+        if non_python:
+            info["reason"] = "non_python_change"
+            logger.info(f"非Python文件变更，执行全量测试: {non_python[:5]}")
+            return test_cases, info
+
+        affected = self.affected_files(changed, self.build_import_graph()) if changed else set()
+        changed_set = set(changed)
+        covered = self.coverage_map.get("tests", {})
+        selected = [
+            tc for tc in test_cases
+            if tc["file"].replace(os.sep, "/") in affected
+            or changed_set.intersection(covered.get(tc["id"], []))
+        ]
+
+        info.update(mode="impact", selected=len(selected))
+        logger.info(f"影响分析完成: {len(changed)} 个变更文件，选中 {len(selected)}/{len(test_cases)} 个测试用例")
+        return selected, info
+
+    def update_coverage(self, test_cases: List[Dict[str, Any]], green_savepoint_id: Optional[str] = None) -> None:
+        """
+        合并本次运行的覆盖数据到覆盖映射
+
+        Args:
+            test_cases: 已执行的测试用例，运行器可在结果中提供covered_files(相对路径列表)
+            green_savepoint_id: 全部通过时创建的保存点ID，之后的变更都与其比较
+        """
+        tests = self.coverage_map.setdefault("tests", {})
+        for test_case in test_cases:
+            if "covered_files" in test_case:
+                tests[test_case["id"]] = sorted(set(test_case["covered_files"]))
+        if green_savepoint_id:
+            self.coverage_map["green_savepoint_id"] = green_savepoint_id
+            self.coverage_map["updated_at"] = time.time()
+        self._save_json(self.coverage_map_path, self.coverage_map)
@@ -4,10 +4,13 @@
 负责识别用户输入中的意图，并将请求路由到合适的智能体
 """
 
+import os
 import re
 import json
+import time
+import bisect
 import logging
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 # 配置日志
 logging.basicConfig(
@@ -16,24 +19,216 @@ logging.basicConfig(
 )
 logger = logging.getLogger('intent_router')
 
+# 仅由 ".*" 连接的纯文本片段组成的模式可以编译进合并关键词正则
+_WILDCARD = ".*"
+_REGEX_META = re.compile(r"[\\.^$*+?{}\[\]|()]")
+
+
+class CompiledIntentMatcher:
+    """
+    编译后的意图匹配器
+    将所有模式拆分为有序关键词序列，合并为一个正则在输入上只扫描一遍，
+    再根据关键词出现位置为所有智能体类型打分，避免逐个执行 ".*关键词.*" 造成的回溯
+    """
+
+    def __init__(self, intent_patterns: Dict[str, List[str]]):
+        """
+        编译意图模式
+
+        参数:
+            intent_patterns: 智能体类型到意图模式列表的映射
+        """
+        self.intent_patterns = intent_patterns
+        # (智能体类型, 关键词序列) 列表
+        self._sequences: List[Tuple[str, Tuple[str, ...]]] = []
+        # (智能体类型, 编译后的正则) 列表，用于无法拆分为关键词的模式
+        self._fallback: List[Tuple[str, re.Pattern]] = []
+
+        keywords = set()
+        for agent_type, patterns in intent_patterns.items():
+            for pattern in patterns:
+                segments = self._split_pattern(pattern)
+                if segments is None:
+                    self._fallback.append((agent_type, re.compile(pattern, re.IGNORECASE)))
+                elif not segments:
+                    # ".*" 之类的模式匹配任何输入
+                    self._sequences.append((agent_type, ()))
+                else:
+                    self._sequences.append((agent_type, segments))
+                    keywords.update(segments)
+
+        # 同一位置只能匹配一个分支，长关键词优先，再由前缀表补齐被它覆盖的短关键词
+        ordered = sorted(keywords, key=lambda k: (-len(k), k))
+        self._prefixes = {
+            keyword: [other for other in ordered if other != keyword and keyword.startswith(other)]
+            for keyword in ordered
+        }
+        self._regex = None
+        if ordered:
+            alternation = "|".join(re.escape(keyword) for keyword in ordered)
+            self._regex = re.compile(f"(?=({alternation}))")
+
+    @staticmethod
+    def _split_pattern(pattern: str) -> Optional[Tuple[str, ...]]:
+        """
+        将 ".*a.*b.*" 形式的模式拆分为小写关键词序列
+
+        参数:
+            pattern: 意图模式
+
+        返回:
+            关键词序列，包含其他正则语法时返回None
+        """
+        segments = tuple(segment for segment in pattern.split(_WILDCARD) if segment)
+        if any(_REGEX_META.search(segment) for segment in segments):
+            return None
+        return tuple(segment.lower() for segment in segments)
+
+    def find_keywords(self, text: str) -> Dict[str, List[int]]:
+        """
+        扫描一遍输入，返回每个关键词的所有起始位置
+
+        参数:
+            text: 小写后的输入文本
+
+        返回:
+            关键词到升序起始位置列表的映射
+        """
+        positions: Dict[str, List[int]] = {}
+        if self._regex is None:
+            return positions
+        for match in self._regex.finditer(text):
+            start = match.start()
+            keyword = match.group(1)
+            positions.setdefault(keyword, []).append(start)
+            for prefix in self._prefixes[keyword]:
+                positions.setdefault(prefix, []).append(start)
+        return positions
+
+    @staticmethod
+    def _sequence_matches(segments: Tuple[str, ...], positions: Dict[str, List[int]],
+                          line_ends: List[int]) -> bool:
+        """
+        判断关键词是否在同一行内按顺序且互不重叠地出现，与 ".*a.*b.*" 的语义一致
+        (没有DOTALL时 ".*" 不跨越换行)
+
+        参数:
+            segments: 关键词序列
+            positions: find_keywords返回的关键词位置
+            line_ends: 输入中换行符的升序位置，最后一项为输入长度
+        """
+        if not segments:
+            return True
+        firsts = positions.get(segments[0])
+        if not firsts:
+            return False
+        index = 0
+        while index < len(firsts):
+            first = firsts[index]
+            line_end = line_ends[bisect.bisect_right(line_ends, first)]
+            cursor = first + len(segments[0])
+            for segment in segments[1:]:
+                starts = positions.get(segment)
+                if not starts:
+                    return False
+                found = bisect.bisect_left(starts, cursor)
+                if found == len(starts):
+                    return False
+                cursor = starts[found] + len(segment)
+                if cursor > line_end:
+                    break
+            else:
+                return True
+            # 本行匹配失败，从下一行的第一个关键词重新开始
+            index = bisect.bisect_right(firsts, line_end, lo=index)
+        return False
+
+    def score(self, user_input: str) -> Dict[str, float]:
+        """
+        计算所有智能体类型的匹配分数
+
+        参数:
+            user_input: 用户输入的文本
+
+        返回:
+            智能体类型到匹配模式数量的映射
+        """
+        scores = {agent_type: 0.0 for agent_type in self.intent_patterns}
+        text = user_input.lower()
+        positions = self.find_keywords(text)
+        line_ends = [match.start() for match in re.finditer("\n", text)] + [len(text)]
+        for agent_type, segments in self._sequences:
+            if self._sequence_matches(segments, positions, line_ends):
+                scores[agent_type] += 1.0
+        for agent_type, pattern in self._fallback:
+            if pattern.search(user_input):
+                scores[agent_type] += 1.0
+        return scores
+
+
 class IntentRouter:
     """
     意图路由器类
     负责分析用户输入，识别意图，并路由到合适的智能体
     """
     
-    def __init__(self):
-        """初始化意图路由器"""
+    def __init__(self, patterns_path: Optional[str] = None, reload_interval: float = 1.0):
+        """
+        初始化意图路由器
+
+        参数:
+            patterns_path: 意图模式配置文件路径 (可选)，修改后自动热加载
+            reload_interval: 检查配置文件是否修改的最小间隔(秒)
+        """
+        self.patterns_path = patterns_path
+        self.reload_interval = reload_interval
+        self._patterns_mtime = None
+        self._failed_mtime = None
+        self._last_reload_check = 0.0
         self.agent_types = ["general", "code", "ppt", "web"]
-        self.intent_patterns = self._load_intent_patterns()
+        self._apply_patterns(self._default_intent_patterns())
+        if self.patterns_path and os.path.exists(self.patterns_path):
+            self._load_patterns_file(os.stat(self.patterns_path).st_mtime_ns)
         logger.info("意图路由器初始化完成")
-        
-    def _load_intent_patterns(self) -> Dict[str, List[str]]:
+
+    def _apply_patterns(self, intent_patterns: Dict[str, List[str]]):
+        """编译意图模式并整体替换当前匹配器"""
+        matcher = CompiledIntentMatcher(intent_patterns)
+        for agent_type in intent_patterns:
+            if agent_type not in self.agent_types:
+                self.agent_types.append(agent_type)
+        self.intent_patterns = intent_patterns
+        self._matcher = matcher
+
+    def _load_patterns_file(self, mtime: int) -> bool:
         """
-        加载各智能体的意图模式
+        读取并编译配置文件中的意图模式，成功后才替换当前匹配器并记录修改时间
+
+        参数:
+            mtime: 读取前配置文件的修改时间
+
+        返回:
+            bool: 是否加载成功，失败时保留当前匹配器，下次检查时重试
+        """
+        try:
+            with open(self.patterns_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            self._apply_patterns(config.get("intent_patterns", config))
+        except Exception as e:
+            # 同一版本的配置文件只记录一次错误
+            if mtime != self._failed_mtime:
+                logger.error(f"加载意图模式配置失败，保留当前模式: {e}")
+                self._failed_mtime = mtime
+            return False
+        self._patterns_mtime = mtime
+        self._failed_mtime = None
+        return True
+
+    def _default_intent_patterns(self) -> Dict[str, List[str]]:
+        """
+        各智能体的默认意图模式
         返回一个字典，键为智能体类型，值为对应的意图模式列表
         """
-        # 实际应用中可从配置文件加载
         return {
             "general": [
                 r".*帮我.*", 
@@ -84,23 +279,41 @@ class IntentRouter:
             ]
         }
     
-    def analyze_intent(self, user_input: str) -> Tuple[str, float]:
+    def reload_patterns(self, force: bool = False) -> bool:
         """
-        分析用户输入，识别最可能的意图
-        
+        配置文件修改后重新加载并编译意图模式
+
         参数:
-            user_input: 用户输入的文本
-            
+            force: 是否忽略检查间隔和修改时间强制重新加载
+
         返回:
-            tuple: (智能体类型, 置信度)
+            bool: 是否重新加载了模式
         """
+        if not self.patterns_path:
+            return False
+
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_interval:
+            return False
+        self._last_reload_check = now
+
+        try:
+            mtime = os.stat(self.patterns_path).st_mtime_ns
+        except OSError:
+            return False
+        if not force and mtime == self._patterns_mtime:
+            return False
+
+        if not self._load_patterns_file(mtime):
+            return False
+        logger.info(f"意图模式已从 {self.patterns_path} 重新加载")
+        return True
+
+    def _score_intent(self, user_input: str) -> Tuple[str, float]:
+        """对输入打分并计算置信度，不输出日志"""
+        self.reload_patterns()
         scores = {agent_type: 0.0 for agent_type in self.agent_types}
-        
-        # 对每种智能体类型计算匹配分数
-        for agent_type, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input, re.IGNORECASE):
-                    scores[agent_type] += 1.0
+        scores.update(self._matcher.score(user_input))
         
         # 找出得分最高的智能体类型
         best_agent = max(scores.items(), key=lambda x: x[1])
@@ -113,42 +326,85 @@ class IntentRouter:
         # 如果最高分为0或置信度低于阈值，默认使用通用智能体
         if score == 0 or confidence < 0.4:
             return "general", 1.0
-            
-        logger.info(f"意图分析结果: {agent_type}, 置信度: {confidence:.2f}")
+
         return agent_type, confidence
-    
-    def route_to_agent(self, user_input: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+
+    def analyze_intent(self, user_input: str) -> Tuple[str, float]:
         """
-        将用户请求路由到合适的智能体
+        分析用户输入，识别最可能的意图
         
         参数:
             user_input: 用户输入的文本
-            context: 上下文信息 (可选)
             
         返回:
-            dict: 包含路由信息的字典
+            tuple: (智能体类型, 置信度)
         """
-        if context is None:
-            context = {}
-            
-        agent_type, confidence = self.analyze_intent(user_input)
-        
+        agent_type, confidence = self._score_intent(user_input)
+        logger.info(f"意图分析结果: {agent_type}, 置信度: {confidence:.2f}")
+        return agent_type, confidence
+
+    def _build_route(self, user_input: str, agent_type: str, confidence: float,
+                     context: Dict[str, Any]) -> Dict[str, Any]:
+        """根据意图分析结果和上下文构建路由结果"""
         # 如果上下文中指定了智能体类型，且置信度不高，则使用上下文中的类型
         if "current_agent" in context and confidence < 0.7:
             agent_type = context["current_agent"]
-            logger.info(f"基于上下文使用智能体: {agent_type}")
         
         # 构建路由结果
-        result = {
+        return {
             "agent_type": agent_type,
             "confidence": confidence,
             "user_input": user_input,
             "timestamp": context.get("timestamp", None),
             "session_id": context.get("session_id", None)
         }
+    
+    def route_to_agent(self, user_input: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        将用户请求路由到合适的智能体
+        
+        参数:
+            user_input: 用户输入的文本
+            context: 上下文信息 (可选)
+            
+        返回:
+            dict: 包含路由信息的字典
+        """
+        if context is None:
+            context = {}
+            
+        agent_type, confidence = self.analyze_intent(user_input)
+        result = self._build_route(user_input, agent_type, confidence, context)
+        if result["agent_type"] != agent_type:
+            logger.info(f"基于上下文使用智能体: {result['agent_type']}")
         
-        logger.info(f"请求已路由至: {agent_type} 智能体")
+        logger.info(f"请求已路由至: {result['agent_type']} 智能体")
         return result
+
+    def route_many(self, inputs: List[str], context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        批量路由用户请求，按输入顺序返回路由结果
+
+        参数:
+            inputs: 用户输入文本列表
+            context: 所有输入共享的上下文信息 (可选)
+
+        返回:
+            list: 路由结果列表
+        """
+        if context is None:
+            context = {}
+
+        results = []
+        counts: Dict[str, int] = {}
+        for user_input in inputs:
+            agent_type, confidence = self._score_intent(user_input)
+            result = self._build_route(user_input, agent_type, confidence, context)
+            counts[result["agent_type"]] = counts.get(result["agent_type"], 0) + 1
+            results.append(result)
+
+        logger.info(f"批量路由 {len(results)} 条请求: {counts}")
+        return results
     
     def check_ppt_intent_in_general_context(self, user_input: str) -> bool:
         """
@@ -162,10 +418,10 @@ class IntentRouter:
             bool: 如果检测到PPT相关意图则返回True，否则返回False
         """
         # 专门检查PPT相关意图
-        for pattern in self.intent_patterns["ppt"]:
-            if re.search(pattern, user_input, re.IGNORECASE):
-                logger.info("在通用上下文中检测到PPT相关意图，建议路由到PPT智能体")
-                return True
+        self.reload_patterns()
+        if self._matcher.score(user_input).get("ppt", 0.0) > 0:
+            logger.info("在通用上下文中检测到PPT相关意图，建议路由到PPT智能体")
+            return True
         return False
 
 # 示例用法
@@ -10,15 +10,29 @@ import json
 import time
 import psutil
 import threading
+from collections import deque
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import asyncio
 
+import numpy as np
+
 # 添加项目路径
 sys.path.append('/home/ubuntu/powerautomation')
 
+from mcptool.adapters.metric_store import MultiResolutionMetricStore, DEFAULT_RESOLUTIONS
+
+# 列式存储中的指标列，磁盘和网络IO只保存累计字节数
+METRIC_COLUMNS = (
+    "cpu_usage", "memory_usage", "response_time", "throughput", "error_rate",
+    "disk_read_bytes", "disk_write_bytes", "net_bytes_sent", "net_bytes_recv"
+)
+TREND_METRICS = ("cpu_usage", "memory_usage", "response_time", "throughput", "error_rate")
+# 保留完整PerformanceMetric对象(含IO明细)的最近样本数
+METRICS_HISTORY_SIZE = 1000
+
 @dataclass
 class PerformanceMetric:
     """性能指标数据类"""
@@ -44,12 +58,18 @@ class OptimizationRecommendation:
 class AIPerformanceOptimizer:
     """AI性能优化器"""
     
-    def __init__(self, project_path: str = "/home/ubuntu/powerautomation"):
+    def __init__(self, project_path: str = "/home/ubuntu/powerautomation",
+                 resolutions=DEFAULT_RESOLUTIONS):
         self.project_path = Path(project_path)
-        self.metrics_history = []
+        # 最近的完整样本，deque定长追加不再每次切片复制
+        self.metrics_history = deque(maxlen=METRICS_HISTORY_SIZE)
+        # 趋势分析和报告使用的列式多分辨率存储
+        self.metric_store = MultiResolutionMetricStore(METRIC_COLUMNS, resolutions)
         self.optimization_models = self._initialize_models()
         self.monitoring_active = False
         self.optimization_rules = self._load_optimization_rules()
+        # 非阻塞CPU采样返回距上次调用的使用率，先调用一次建立基准
+        psutil.cpu_percent(interval=None)
         
     def _initialize_models(self) -> Dict:
         """初始化AI模型"""
@@ -92,8 +112,8 @@ class AIPerformanceOptimizer:
             }
         }
     
-    def start_monitoring(self, interval: int = 5) -> None:
-        """启动性能监控"""
+    def start_monitoring(self, interval: float = 5) -> None:
+        """启动性能监控，interval可以小于1秒"""
         self.monitoring_active = True
         monitoring_thread = threading.Thread(
             target=self._monitoring_loop,
@@ -108,30 +128,47 @@ class AIPerformanceOptimizer:
         self.monitoring_active = False
         print("⏹️ 性能监控已停止")
     
-    def _monitoring_loop(self, interval: int) -> None:
-        """监控循环"""
+    def _monitoring_loop(self, interval: float) -> None:
+        """监控循环，按固定节拍采样，采集耗时不会累加到采样间隔上"""
+        next_tick = time.monotonic()
         while self.monitoring_active:
             try:
                 metric = self._collect_performance_metrics()
-                self.metrics_history.append(metric)
-                
-                # 保持历史数据在合理范围内
-                if len(self.metrics_history) > 1000:
-                    self.metrics_history = self.metrics_history[-1000:]
+                self.record_metric(metric)
                 
                 # 实时分析和告警
                 self._analyze_real_time_metrics(metric)
                 
-                time.sleep(interval)
-                
             except Exception as e:
                 print(f"❌ 监控过程中出现错误: {e}")
-                time.sleep(interval)
+            
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # 采集落后时从当前时间重新对齐，不补发
+                next_tick = time.monotonic()
+    
+    def record_metric(self, metric: PerformanceMetric) -> None:
+        """记录一个性能样本到最近历史和列式存储"""
+        self.metrics_history.append(metric)
+        self.metric_store.append(metric.timestamp.timestamp(), (
+            metric.cpu_usage,
+            metric.memory_usage,
+            metric.response_time,
+            metric.throughput,
+            metric.error_rate,
+            metric.disk_io.get("read_bytes", 0),
+            metric.disk_io.get("write_bytes", 0),
+            metric.network_io.get("bytes_sent", 0),
+            metric.network_io.get("bytes_recv", 0)
+        ))
     
     def _collect_performance_metrics(self) -> PerformanceMetric:
         """收集性能指标"""
-        # CPU使用率
-        cpu_usage = psutil.cpu_percent(interval=1)
+        # CPU使用率，非阻塞采样(距上次调用的平均值)，不再每次阻塞1秒
+        cpu_usage = psutil.cpu_percent(interval=None)
         
         # 内存使用率
         memory = psutil.virtual_memory()
@@ -190,9 +227,9 @@ class AIPerformanceOptimizer:
     def _measure_throughput(self) -> float:
         """测量吞吐量"""
         # 基于历史数据计算吞吐量
-        if len(self.metrics_history) >= 2:
-            recent_metrics = self.metrics_history[-10:]  # 最近10个数据点
-            avg_response_time = sum(m.response_time for m in recent_metrics) / len(recent_metrics)
+        if len(self.metric_store) >= 2:
+            recent = self.metric_store.snapshot(last=10)  # 最近10个数据点
+            avg_response_time = float(recent["response_time"].mean())
             if avg_response_time > 0:
                 return 1000.0 / avg_response_time  # 每秒请求数
         return 20.0  # 默认值
@@ -226,42 +263,58 @@ class AIPerformanceOptimizer:
         for alert in alerts:
             print(alert)
     
-    def analyze_performance_trends(self) -> Dict:
-        """分析性能趋势"""
-        if len(self.metrics_history) < 10:
+    def analyze_performance_trends(self, resolution: str = "raw", window: int = 100,
+                                   since: Optional[datetime] = None) -> Dict:
+        """
+        分析性能趋势
+        
+        Args:
+            resolution: 分辨率层，raw为原始样本，1s/1m/1h为降采样后的历史
+            window: 最多分析最近多少个数据点
+            since: 只分析该时间之后的数据点
+            
+        Returns:
+            各指标的趋势分析和总结
+        """
+        data = self.metric_store.snapshot(
+            resolution, last=window, since=since.timestamp() if since else None)
+        if data["timestamp"].size < 10:
             return {"error": "数据不足，无法进行趋势分析"}
         
-        recent_metrics = self.metrics_history[-100:]  # 最近100个数据点
-        
         analysis = {
-            "cpu_trend": self._analyze_metric_trend([m.cpu_usage for m in recent_metrics]),
-            "memory_trend": self._analyze_metric_trend([m.memory_usage for m in recent_metrics]),
-            "response_time_trend": self._analyze_metric_trend([m.response_time for m in recent_metrics]),
-            "throughput_trend": self._analyze_metric_trend([m.throughput for m in recent_metrics]),
-            "error_rate_trend": self._analyze_metric_trend([m.error_rate for m in recent_metrics])
+            f"{name.replace('_usage', '')}_trend": self._analyze_metric_trend(data[name], data["timestamp"])
+            for name in TREND_METRICS
         }
+        analysis["resolution"] = resolution
+        analysis["data_points"] = int(data["timestamp"].size)
         
         # 生成趋势总结
         analysis["summary"] = self._generate_trend_summary(analysis)
         
         return analysis
     
-    def _analyze_metric_trend(self, values: List[float]) -> Dict:
-        """分析单个指标的趋势"""
-        if len(values) < 2:
+    def _analyze_metric_trend(self, values, timestamps=None) -> Dict:
+        """分析单个指标的趋势，values和timestamps为序列或NumPy数组"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size < 2:
             return {"trend": "insufficient_data"}
         
         # 计算基本统计信息
-        avg_value = sum(values) / len(values)
-        min_value = min(values)
-        max_value = max(values)
+        avg_value = float(values.mean())
+        min_value = float(values.min())
+        max_value = float(values.max())
+        p50, p95, p99 = (float(v) for v in np.percentile(values, (50, 95, 99)))
         
         # 计算趋势方向
-        first_half = values[:len(values)//2]
-        second_half = values[len(values)//2:]
+        half = values.size // 2
+        first_avg = float(values[:half].mean())
+        second_avg = float(values[half:].mean())
         
-        first_avg = sum(first_half) / len(first_half)
-        second_avg = sum(second_half) / len(second_half)
+        # 最小二乘斜率，没有时间戳时按每个数据点计算
+        x = np.asarray(timestamps, dtype=np.float64) if timestamps is not None else np.arange(values.size, dtype=np.float64)
+        x = x - x.mean()
+        denominator = float((x * x).sum())
+        slope = float((x * (values - avg_value)).sum() / denominator) if denominator > 0 else 0.0
         
         if second_avg > first_avg * 1.1:
             trend_direction = "increasing"
@@ -279,6 +332,10 @@ class AIPerformanceOptimizer:
             "average": avg_value,
             "min": min_value,
             "max": max_value,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "slope": slope,
             "volatility": max_value - min_value
         }
     
@@ -287,7 +344,7 @@ class AIPerformanceOptimizer:
         summary_parts = []
         
         for metric, trend_data in analysis.items():
-            if metric == "summary":
+            if metric in ("summary", "resolution", "data_points"):
                 continue
                 
             if isinstance(trend_data, dict) and "trend" in trend_data:
@@ -310,7 +367,7 @@ class AIPerformanceOptimizer:
         """生成优化建议"""
         recommendations = []
         
-        if not self.metrics_history:
+        if not len(self.metric_store):
             return [OptimizationRecommendation(
                 category="数据收集",
                 priority="high",
@@ -321,10 +378,10 @@ class AIPerformanceOptimizer:
             )]
         
         # 分析最近的性能数据
-        recent_metrics = self.metrics_history[-50:] if len(self.metrics_history) >= 50 else self.metrics_history
+        recent = self.metric_store.snapshot(last=50)
         
         # CPU优化建议
-        avg_cpu = sum(m.cpu_usage for m in recent_metrics) / len(recent_metrics)
+        avg_cpu = float(recent["cpu_usage"].mean())
         if avg_cpu > 70:
             recommendations.append(OptimizationRecommendation(
                 category="CPU优化",
@@ -336,7 +393,7 @@ class AIPerformanceOptimizer:
             ))
         
         # 内存优化建议
-        avg_memory = sum(m.memory_usage for m in recent_metrics) / len(recent_metrics)
+        avg_memory = float(recent["memory_usage"].mean())
         if avg_memory > 75:
             recommendations.append(OptimizationRecommendation(
                 category="内存优化",
@@ -348,7 +405,7 @@ class AIPerformanceOptimizer:
             ))
         
         # 响应时间优化建议
-        avg_response_time = sum(m.response_time for m in recent_metrics) / len(recent_metrics)
+        avg_response_time = float(recent["response_time"].mean())
         if avg_response_time > 100:
             recommendations.append(OptimizationRecommendation(
                 category="响应时间优化",
@@ -360,7 +417,7 @@ class AIPerformanceOptimizer:
             ))
         
         # 吞吐量优化建议
-        avg_throughput = sum(m.throughput for m in recent_metrics) / len(recent_metrics)
+        avg_throughput = float(recent["throughput"].mean())
         if avg_throughput < 10:
             recommendations.append(OptimizationRecommendation(
                 category="吞吐量优化",
@@ -372,7 +429,7 @@ class AIPerformanceOptimizer:
             ))
         
         # 错误率优化建议
-        avg_error_rate = sum(m.error_rate for m in recent_metrics) / len(recent_metrics)
+        avg_error_rate = float(recent["error_rate"].mean())
         if avg_error_rate > 1.0:
             recommendations.append(OptimizationRecommendation(
                 category="稳定性优化",
@@ -511,49 +568,32 @@ class AIPerformanceOptimizer:
         
         return actions
     
-    def generate_performance_report(self) -> Dict:
-        """生成性能报告"""
-        if not self.metrics_history:
+    def generate_performance_report(self, resolution: str = "raw", window: int = 100) -> Dict:
+        """
+        生成性能报告
+        
+        Args:
+            resolution: 统计使用的分辨率层，raw为原始样本，1s/1m/1h为降采样后的历史
+            window: 最多统计最近多少个数据点
+        """
+        recent = self.metric_store.frozen(resolution, last=window)
+        if not len(recent):
             return {"error": "没有性能数据可用于生成报告"}
         
         # 计算统计信息
-        recent_metrics = self.metrics_history[-100:] if len(self.metrics_history) >= 100 else self.metrics_history
-        
+        timestamps = recent.timestamps()
         report = {
             "report_time": datetime.now().isoformat(),
-            "data_points": len(recent_metrics),
+            "resolution": resolution,
+            "data_points": len(recent),
             "time_range": {
-                "start": recent_metrics[0].timestamp.isoformat(),
-                "end": recent_metrics[-1].timestamp.isoformat()
+                "start": datetime.fromtimestamp(timestamps[0]).isoformat(),
+                "end": datetime.fromtimestamp(timestamps[-1]).isoformat()
             },
             "performance_summary": {
-                "cpu_usage": {
-                    "average": sum(m.cpu_usage for m in recent_metrics) / len(recent_metrics),
-                    "max": max(m.cpu_usage for m in recent_metrics),
-                    "min": min(m.cpu_usage for m in recent_metrics)
-                },
-                "memory_usage": {
-                    "average": sum(m.memory_usage for m in recent_metrics) / len(recent_metrics),
-                    "max": max(m.memory_usage for m in recent_metrics),
-                    "min": min(m.memory_usage for m in recent_metrics)
-                },
-                "response_time": {
-                    "average": sum(m.response_time for m in recent_metrics) / len(recent_metrics),
-                    "max": max(m.response_time for m in recent_metrics),
-                    "min": min(m.response_time for m in recent_metrics)
-                },
-                "throughput": {
-                    "average": sum(m.throughput for m in recent_metrics) / len(recent_metrics),
-                    "max": max(m.throughput for m in recent_metrics),
-                    "min": min(m.throughput for m in recent_metrics)
-                },
-                "error_rate": {
-                    "average": sum(m.error_rate for m in recent_metrics) / len(recent_metrics),
-                    "max": max(m.error_rate for m in recent_metrics),
-                    "min": min(m.error_rate for m in recent_metrics)
-                }
+                name: recent.describe(name) for name in TREND_METRICS
             },
-            "trend_analysis": self.analyze_performance_trends(),
+            "trend_analysis": self.analyze_performance_trends(resolution, window),
             "optimization_recommendations": [
                 {
                     "category": rec.category,
@@ -8,6 +8,7 @@ from flask import Blueprint, request, jsonify, send_file
 import json
 import os
 from ..services.ppt_service import PPTTaskService
+from ..services.job_queue import JobQueueFullError
 
 ppt_agent_bp = Blueprint('ppt_agent', __name__)
 ppt_service = PPTTaskService()
@@ -22,6 +23,10 @@ def generate_ppt():
     content = data.get('content')
     template = data.get('template', '专业简历.pptx')
     
+    # 默认提交后台任务并立即返回任务ID，wait为true时同步生成
+    if not data.get('wait', False):
+        return _submit_job(ppt_service.submit_ppt_from_text, topic, content, template)
+    
     result = ppt_service.create_ppt_from_text(topic, content, template)
     
     # 返回文件路径，前端可以通过另一个接口下载
@@ -41,6 +46,9 @@ def mindmap_to_ppt():
     mindmap_data = data.get('mindmap_data', {})
     template = data.get('template', '专业简历.pptx')
     
+    if not data.get('wait', False):
+        return _submit_job(ppt_service.submit_ppt_from_mindmap, title, mindmap_data, template)
+    
     result = ppt_service.create_ppt_from_mindmap(title, mindmap_data, template)
     
     # 返回文件路径，前端可以通过另一个接口下载
@@ -50,6 +58,35 @@ def mindmap_to_ppt():
         "slides_count": result.get("slides_count", 0)
     })
 
+def _submit_job(submit, *args):
+    """
+    提交PPT生成任务，返回任务ID和查询地址
+    """
+    try:
+        job_id = submit(*args)
+    except JobQueueFullError as e:
+        return jsonify({"status": "error", "error": str(e)}), 503
+    
+    return jsonify({
+        "status": "accepted",
+        "job_id": job_id,
+        "status_url": f"/ppt_jobs/{job_id}"
+    }), 202
+
+@ppt_agent_bp.route('/ppt_jobs/<job_id>', methods=['GET'])
+def get_ppt_job(job_id):
+    """
+    查询PPT生成任务的状态和进度，完成后返回下载地址
+    """
+    job = ppt_service.get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": f"Job {job_id} not found"}), 404
+    
+    result = job.get("result") or {}
+    if result.get("file_name"):
+        job["download_url"] = f"/download_ppt/{result['file_name']}"
+    return jsonify(job)
+
 @ppt_agent_bp.route('/get_templates', methods=['GET'])
 def get_templates():
     """
@@ -72,6 +109,9 @@ def download_ppt(filename):
     """
     下载生成的PPT文件
     """
-    directory = os.path.dirname(filename)
-    file_name = os.path.basename(filename)
-    return send_file(filename, as_attachment=True, download_name=file_name)
+    # 只提供输出目录中的文件
+    file_path = ppt_service.resolve_output_file(filename)
+    if file_path is None:
+        return jsonify({"status": "error", "error": f"File {filename} not found"}), 404
+    
+    return send_file(file_path, as_attachment=True, download_name=os.path.basename(file_path))
@@ -0,0 +1,224 @@
+"""
+浏览器池模块
+
+为WebService提供常驻的Chromium浏览器池：
+- 启动时预热若干浏览器进程，请求之间复用，不再为每个请求启动Playwright和Chromium
+- 每个请求使用独立的BrowserContext，Cookie、缓存和存储互不影响
+- 每个浏览器服务的页面数达到上限后退役并替换，避免长期运行的进程内存膨胀
+- 通过信号量限制同时打开的页面数
+- 提供异步API，并提供在后台事件循环中运行协程的同步入口
+"""
+
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+logger = logging.getLogger("BrowserPool")
+
+
+class _PooledBrowser:
+    """池中的单个浏览器进程及其使用计数"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.served = 0
+        self.active = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """Chromium浏览器池"""
+
+    def __init__(self, size: int = 2, max_pages_per_browser: int = 100, max_concurrency: int = 8,
+                 launch_options: Optional[Dict[str, Any]] = None,
+                 context_options: Optional[Dict[str, Any]] = None):
+        """
+        初始化浏览器池
+
+        参数:
+            size: 常驻浏览器进程数
+            max_pages_per_browser: 每个浏览器服务多少个页面后退役重启
+            max_concurrency: 同时打开的最大页面数
+            launch_options: 传给chromium.launch的参数
+            context_options: 传给browser.new_context的默认参数
+        """
+        self.size = max(1, size)
+        self.max_pages_per_browser = max(1, max_pages_per_browser)
+        self.max_concurrency = max(1, max_concurrency)
+        self.launch_options = launch_options or {}
+        self.context_options = context_options or {}
+
+        self._playwright = None
+        self._browsers: List[_PooledBrowser] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._available: Optional[asyncio.Condition] = None
+        self._launching = 0
+        self._start_future: Optional[asyncio.Future] = None
+        self._started = False
+        self.stats = {"launched": 0, "recycled": 0, "pages": 0}
+
+    async def start(self) -> None:
+        """启动Playwright并预热浏览器，并发的首次调用共享同一次启动"""
+        if self._started:
+            return
+        # 在第一个await之前登记启动任务，后到的调用等待同一个任务
+        if self._start_future is None:
+            self._start_future = asyncio.ensure_future(self._start())
+            self._start_future.add_done_callback(self._start_finished)
+        await asyncio.shield(self._start_future)
+
+    def _start_finished(self, future: asyncio.Future) -> None:
+        # 启动失败时允许下次调用重新启动
+        if future.cancelled() or future.exception() is not None:
+            self._start_future = None
+
+    async def _start(self) -> None:
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._available = asyncio.Condition()
+        self._playwright = await async_playwright().start()
+        launched = await asyncio.gather(*[self._launch() for _ in range(self.size)], return_exceptions=True)
+        self._browsers = [pooled for pooled in launched if isinstance(pooled, _PooledBrowser)]
+        errors = [error for error in launched if isinstance(error, BaseException)]
+        if errors:
+            await asyncio.gather(*[self._close_browser(pooled) for pooled in self._browsers])
+            self._browsers = []
+            await self._playwright.stop()
+            self._playwright = None
+            raise errors[0]
+        self._started = True
+        logger.info(f"浏览器池已启动: {self.size} 个浏览器, 最大并发页面数 {self.max_concurrency}")
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(**self.launch_options)
+        self.stats["launched"] += 1
+        return _PooledBrowser(browser)
+
+    async def _checkout(self) -> _PooledBrowser:
+        """选择当前负载最小的浏览器，已达到页面上限的浏览器先替换"""
+        while True:
+            async with self._available:
+                expired = [pooled for pooled in self._browsers if pooled.served >= self.max_pages_per_browser]
+                for pooled in expired:
+                    pooled.retired = True
+                    self._browsers.remove(pooled)
+                self.stats["recycled"] += len(expired)
+                # 没有进行中页面的退役浏览器不会再签入，由这里关闭
+                idle = [pooled for pooled in expired if pooled.active == 0]
+                missing = self.size - len(self._browsers) - self._launching
+                if missing <= 0:
+                    if not self._browsers:
+                        # 替换的浏览器正由其他请求启动
+                        await self._available.wait()
+                        continue
+                    pooled = min(self._browsers, key=lambda b: b.active)
+                    pooled.served += 1
+                    pooled.active += 1
+                    return pooled
+                self._launching += missing
+
+            # 在锁外关闭和启动浏览器，避免重启期间阻塞其他页面签入
+            await asyncio.gather(*[self._close_browser(pooled) for pooled in idle])
+            launched = []
+            try:
+                launched = await asyncio.gather(*[self._launch() for _ in range(missing)], return_exceptions=True)
+            finally:
+                async with self._available:
+                    self._launching -= missing
+                    self._browsers.extend(pooled for pooled in launched if isinstance(pooled, _PooledBrowser))
+                    self._available.notify_all()
+            errors = [error for error in launched if isinstance(error, BaseException)]
+            if errors:
+                raise errors[0]
+
+    async def _checkin(self, pooled: _PooledBrowser) -> None:
+        async with self._available:
+            pooled.active -= 1
+            # 退役的浏览器在最后一个页面结束后关闭
+            close = pooled.retired and pooled.active == 0
+        if close:
+            await self._close_browser(pooled)
+
+    @staticmethod
+    async def _close_browser(pooled: _PooledBrowser) -> None:
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器失败: {e}")
+
+    @asynccontextmanager
+    async def page(self, **context_options):
+        """
+        获取一个位于独立上下文中的页面，退出时关闭上下文
+
+        参数:
+            context_options: 覆盖默认值的browser.new_context参数
+
+        返回:
+            Playwright异步Page对象
+        """
+        if not self._started:
+            await self.start()
+
+        async with self._semaphore:
+            pooled = await self._checkout()
+            context = None
+            try:
+                context = await pooled.browser.new_context(**{**self.context_options, **context_options})
+                page = await context.new_page()
+                self.stats["pages"] += 1
+                yield page
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f"关闭浏览器上下文失败: {e}")
+                await self._checkin(pooled)
+
+    async def close(self) -> None:
+        """关闭所有浏览器和Playwright"""
+        if not self._started:
+            return
+        self._started = False
+        self._start_future = None
+        await asyncio.gather(*[self._close_browser(pooled) for pooled in self._browsers])
+        self._browsers = []
+        await self._playwright.stop()
+        self._playwright = None
+        logger.info(f"浏览器池已关闭: {self.stats}")
+
+
+class BackgroundLoop:
+    """在后台线程中运行的事件循环，供同步代码提交协程"""
+
+    def __init__(self, name: str = "browser-pool-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """
+        在后台事件循环中运行协程并等待结果
+
+        参数:
+            coro: 协程对象
+            timeout: 最长等待时间(秒)
+
+        返回:
+            协程的返回值
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self) -> None:
+        """停止事件循环并等待线程退出"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
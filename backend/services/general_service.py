@@ -9,9 +9,13 @@ import json
 import uuid
 from datetime import datetime
 from powerautomation_integration.agents.general.general_agent import GeneralAgent
+from .session_store import SessionStore
+
+# 处理用户消息时作为上下文传给智能体的最近消息数量
+DEFAULT_CONTEXT_MESSAGES = 100
 
 class GeneralService:
-    def __init__(self):
+    def __init__(self, context_messages=DEFAULT_CONTEXT_MESSAGES):
         self.data_dir = os.path.join(os.getcwd(), 'data', 'general_agent')
         self.sessions_dir = os.path.join(self.data_dir, 'sessions')
         self.tasks_dir = os.path.join(self.data_dir, 'tasks')
@@ -20,6 +24,10 @@ class GeneralService:
         # 创建必要的目录
         for directory in [self.data_dir, self.sessions_dir, self.tasks_dir, self.projects_dir]:
             os.makedirs(directory, exist_ok=True)
+        
+        # 会话消息追加写入，元数据由索引维护
+        self.session_store = SessionStore(self.sessions_dir)
+        self.context_messages = context_messages
             
         # 初始化通用智能体
         self.general_agent = GeneralAgent()
@@ -31,61 +39,38 @@ class GeneralService:
         返回:
         - 会话ID
         """
-        session_id = str(uuid.uuid4())
-        session_data = {
-            "id": session_id,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
-            "messages": []
-        }
-        
-        session_file = os.path.join(self.sessions_dir, f"{session_id}.json")
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, ensure_ascii=False, indent=2)
-        
-        return session_id
+        return self.session_store.create_session()["id"]
     
-    def get_sessions(self):
+    def get_sessions(self, offset=0, limit=None):
         """
-        获取所有会话
+        获取会话列表，只读取元数据索引
+        
+        参数:
+        - offset: 跳过的会话数量
+        - limit: 返回的最大会话数量，为None时返回全部
         
         返回:
-        - 会话列表
+        - 会话列表，按更新时间从新到旧排序
         """
-        sessions = []
-        
-        for filename in os.listdir(self.sessions_dir):
-            if filename.endswith('.json'):
-                session_file = os.path.join(self.sessions_dir, filename)
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session_data = json.load(f)
-                    sessions.append({
-                        "id": session_data["id"],
-                        "created_at": session_data["created_at"],
-                        "updated_at": session_data["updated_at"],
-                        "message_count": len(session_data["messages"])
-                    })
-        
-        return sessions
+        return self.session_store.list_sessions(offset, limit)
     
-    def get_session(self, session_id):
+    def get_session(self, session_id, offset=0, limit=None):
         """
         获取指定会话的详细信息
         
         参数:
         - session_id: 会话ID
+        - offset: 起始消息序号，负数表示从末尾倒数
+        - limit: 返回的最大消息数量，为None时返回全部消息
         
         返回:
         - 会话详细信息
         """
-        session_file = os.path.join(self.sessions_dir, f"{session_id}.json")
-        
-        if not os.path.exists(session_file):
+        session_data = self.session_store.get_session_meta(session_id)
+        if session_data is None:
             raise FileNotFoundError(f"Session {session_id} not found")
         
-        with open(session_file, 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
-        
+        session_data["messages"] = self.session_store.get_messages(session_id, offset, limit)
         return session_data
     
     def add_message(self, session_id, message):
@@ -97,38 +82,27 @@ class GeneralService:
         - message: 消息内容
         
         返回:
-        - 更新后的会话
+        - 更新后的会话元数据，messages只包含本次追加的消息
         """
-        session_file = os.path.join(self.sessions_dir, f"{session_id}.json")
-        
-        if not os.path.exists(session_file):
+        if self.session_store.get_session_meta(session_id) is None:
             raise FileNotFoundError(f"Session {session_id} not found")
         
-        with open(session_file, 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
-        
         # 如果是用户消息，使用通用智能体处理
         if message.get("role") == "user":
             response = self.general_agent.chat(
                 query=message.get("content", ""),
                 session_id=session_id,
-                context={"messages": session_data["messages"]}
+                context={"messages": self.session_store.get_messages(session_id, -self.context_messages)}
             )
             
-            # 添加用户消息
-            session_data["messages"].append(message)
-            
-            # 添加智能体响应
-            session_data["messages"].append(response)
+            # 添加用户消息和智能体响应
+            new_messages = [message, response]
         else:
             # 直接添加消息
-            session_data["messages"].append(message)
-        
-        session_data["updated_at"] = datetime.now().isoformat()
-        
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, ensure_ascii=False, indent=2)
+            new_messages = [message]
         
+        session_data = self.session_store.append_messages(session_id, new_messages)
+        session_data["messages"] = new_messages
         return session_data
     
     def create_task(self, task_name, task_description, parameters=None):
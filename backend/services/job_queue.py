@@ -0,0 +1,145 @@
+"""
+后台任务队列模块
+
+为耗时的服务调用(如PPT生成)提供异步执行：
+- 提交后立即返回任务ID，任务在固定大小的工作线程池中执行
+- 排队和执行中的任务总数有上限，队列满时拒绝新任务
+- 任务状态、进度和结果可随时查询，已结束的任务只保留最近的若干条
+"""
+
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("JobQueue")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobQueueFullError(Exception):
+    """排队任务数达到上限"""
+
+
+class JobQueue:
+    """有界后台任务队列"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32, max_finished: int = 1000):
+        """
+        初始化任务队列
+
+        参数:
+            max_workers: 工作线程数
+            max_pending: 排队和执行中的任务数上限
+            max_finished: 保留的已结束任务数量
+        """
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending = 0
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, **kwargs) -> str:
+        """
+        提交任务
+
+        参数:
+            kind: 任务类型
+            func: 任务函数，会额外收到progress关键字参数，调用progress(百分比, 说明)报告进度
+            args: 任务函数的位置参数
+            kwargs: 任务函数的关键字参数
+
+        返回:
+            任务ID
+        """
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+            self._pending += 1
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "status": JOB_QUEUED,
+                "progress": 0,
+                "message": "",
+                "created_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        logger.info(f"任务已提交: {job_id} ({kind})")
+        return job_id
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _run(self, job_id: str, func: Callable[..., Any], args, kwargs) -> None:
+        self._update(job_id, status=JOB_RUNNING, started_at=datetime.now().isoformat())
+
+        def progress(percent: float, message: str = "") -> None:
+            self._update(job_id, progress=max(0, min(100, percent)), message=message)
+
+        try:
+            result = func(*args, progress=progress, **kwargs)
+            fields = {"status": JOB_SUCCEEDED, "progress": 100, "result": result}
+        except Exception as e:
+            logger.error(f"任务执行失败: {job_id} - {e}")
+            fields = {"status": JOB_FAILED, "error": str(e)}
+
+        with self._lock:
+            self._pending -= 1
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields, finished_at=datetime.now().isoformat())
+            self._finished.append(job_id)
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.popleft(), None)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询任务状态
+
+        参数:
+            job_id: 任务ID
+
+        返回:
+            任务信息的副本，不存在时返回None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list_jobs(self, kind: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        列出最近提交的任务
+
+        参数:
+            kind: 只返回该类型的任务
+            limit: 返回结果数量限制
+
+        返回:
+            任务信息列表，最新的在前
+        """
+        with self._lock:
+            jobs = [dict(job) for job in reversed(self._jobs.values()) if kind is None or job["kind"] == kind]
+        return jobs[:limit]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭工作线程池"""
+        self._executor.shutdown(wait=wait)
@@ -5,25 +5,169 @@ PPT任务管理器服务模块
 """
 
 import os
+import shutil
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 # 更新引用路径，从agents目录导入
 from powerautomation_integration.agents.ppt.ppt_agent import PPTAgent
+from .job_queue import JobQueue
+from .template_cache import TemplateCache
 
 class PPTTaskService:
     """PPT任务服务类，负责处理PPT相关任务请求"""
     
-    def __init__(self):
-        """初始化PPT任务服务"""
+    def __init__(self, max_workers: int = 2, max_pending_jobs: int = 32, ppt_agent=None,
+                 output_dir: Optional[str] = None, template_dir: Optional[str] = None):
+        """
+        初始化PPT任务服务
+        
+        参数:
+            max_workers: 生成PPT的工作线程数
+            max_pending_jobs: 排队和执行中的生成任务数上限
+            ppt_agent: PPT智能体，默认创建PPTAgent
+            output_dir: 生成结果的输出目录，默认为项目下的output
+            template_dir: 模板目录，默认为项目下的static/templates
+        """
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.ppt_agent = PPTAgent()
-        self.output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "output")
+        self.ppt_agent = ppt_agent if ppt_agent is not None else PPTAgent()
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        self.output_dir = output_dir or os.path.join(base_dir, "output")
+        self.template_dir = template_dir or os.path.join(base_dir, "static", "templates")
         
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
         
+        self.template_cache = TemplateCache(self.template_dir)
+        self.jobs = JobQueue(max_workers=max_workers, max_pending=max_pending_jobs)
+    
+    def _execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        调用PPT智能体，附带缓存中已解析的模板
+        
+        参数:
+            input_data: 智能体输入
+            
+        返回:
+            处理结果字典
+        """
+        template = self.template_cache.get(input_data["template_name"])
+        if template is not None:
+            input_data["template"] = template
+            input_data["template_path"] = self.template_cache.resolve(input_data["template_name"])
+        return self.ppt_agent.execute(input_data)
+    
+    def _run_job(self, input_data: Dict[str, Any], progress) -> Dict[str, Any]:
+        """
+        在工作线程中生成PPT，并把结果文件放入输出目录
+        
+        参数:
+            input_data: 智能体输入
+            progress: 进度回调
+            
+        返回:
+            处理结果字典，ppt_path指向输出目录中的文件
+        """
+        progress(10, "加载模板")
+        result = self._execute(input_data)
+        progress(90, "保存结果")
+        return self._store_result(result)
+    
+    def _store_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        把生成的PPT文件移动到输出目录，供download_ppt下载
+        
+        参数:
+            result: 智能体返回的处理结果
+            
+        返回:
+            处理结果字典，ppt_path指向输出目录中的文件
+        """
+        ppt_path = result.get("ppt_path")
+        if ppt_path and os.path.isfile(ppt_path):
+            if os.path.dirname(os.path.abspath(ppt_path)) != os.path.abspath(self.output_dir):
+                target = os.path.join(self.output_dir, os.path.basename(ppt_path))
+                shutil.move(ppt_path, target)
+                result["ppt_path"] = target
+            result["file_name"] = os.path.basename(result["ppt_path"])
+        return result
+    
+    def submit_ppt_from_text(self, title: str, content: str, template_name: str = "专业简历.pptx") -> str:
+        """
+        提交从文本创建PPT的后台任务
+        
+        参数:
+            title: PPT标题
+            content: 文本内容
+            template_name: 模板名称
+            
+        返回:
+            任务ID
+        """
+        self.logger.info(f"提交从文本创建PPT任务: {title}")
+        
+        input_data = {
+            "task_type": "text_to_ppt",
+            "title": title,
+            "content": content,
+            "template_name": template_name
+        }
+        
+        return self.jobs.submit("text_to_ppt", self._run_job, input_data)
+    
+    def submit_ppt_from_mindmap(self, title: str, mindmap_data: Dict[str, Any], template_name: str = "专业简历.pptx") -> str:
+        """
+        提交从思维导图创建PPT的后台任务
+        
+        参数:
+            title: PPT标题
+            mindmap_data: 思维导图数据
+            template_name: 模板名称
+            
+        返回:
+            任务ID
+        """
+        self.logger.info(f"提交从思维导图创建PPT任务: {title}")
+        
+        input_data = {
+            "task_type": "mindmap_to_ppt",
+            "title": title,
+            "mindmap_data": mindmap_data,
+            "template_name": template_name
+        }
+        
+        return self.jobs.submit("mindmap_to_ppt", self._run_job, input_data)
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询PPT生成任务的状态和进度
+        
+        参数:
+            job_id: 任务ID
+            
+        返回:
+            任务信息，不存在时返回None
+        """
+        return self.jobs.get_job(job_id)
+    
+    def resolve_output_file(self, filename: str) -> Optional[str]:
+        """
+        将下载请求中的文件名解析为输出目录中的文件
+        
+        参数:
+            filename: 文件名或输出目录中文件的完整路径
+            
+        返回:
+            文件路径，不在输出目录中时返回None
+        """
+        output_dir = os.path.realpath(self.output_dir)
+        candidate = filename if os.path.isabs(filename) else os.path.join(output_dir, filename)
+        path = os.path.realpath(candidate)
+        if os.path.dirname(path) == output_dir and os.path.isfile(path):
+            return path
+        return None
+        
     def create_ppt_from_text(self, title: str, content: str, template_name: str = "专业简历.pptx") -> Dict[str, Any]:
         """
         从文本内容创建PPT
@@ -45,7 +189,7 @@ class PPTTaskService:
             "template_name": template_name
         }
         
-        return self.ppt_agent.execute(input_data)
+        return self._store_result(self._execute(input_data))
     
     def create_ppt_from_mindmap(self, title: str, mindmap_data: Dict[str, Any], template_name: str = "专业简历.pptx") -> Dict[str, Any]:
         """
@@ -68,7 +212,7 @@ class PPTTaskService:
             "template_name": template_name
         }
         
-        return self.ppt_agent.execute(input_data)
+        return self._store_result(self._execute(input_data))
     
     def get_available_templates(self) -> List[Dict[str, Any]]:
         """
@@ -77,7 +221,7 @@ class PPTTaskService:
         返回:
             模板信息列表
         """
-        template_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "static", "templates")
+        template_dir = self.template_dir
         templates = []
         
         try:
@@ -0,0 +1,257 @@
+"""
+会话存储引擎模块
+
+为GeneralService提供追加写入的会话存储：
+- 每个会话的消息追加写入 <id>.jsonl，同时在 <id>.idx 中追加每条消息的8字节偏移，用于分页读取
+- SQLite元数据索引 (id, created_at, updated_at, message_count) 随每次追加增量更新
+- 追加时对会话日志加文件锁，多个进程可以同时写入
+"""
+
+import os
+import json
+import uuid
+import struct
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，只保证进程内互斥
+    fcntl = None
+
+logger = logging.getLogger("SessionStore")
+
+# 消息偏移索引中每条记录的格式：小端无符号64位整数
+OFFSET_FORMAT = "<Q"
+OFFSET_SIZE = struct.calcsize(OFFSET_FORMAT)
+
+
+class SessionStore:
+    """会话存储类，负责会话元数据索引和追加写入的消息日志"""
+
+    def __init__(self, sessions_dir: str):
+        """
+        初始化会话存储
+
+        参数:
+            sessions_dir: 会话数据目录
+        """
+        self.sessions_dir = sessions_dir
+        os.makedirs(sessions_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(sessions_dir, "index.db"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at, id);
+        """)
+        self._conn.commit()
+
+        self.migrate_legacy_sessions()
+
+    def _log_path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.jsonl")
+
+    def _offsets_path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.idx")
+
+    @staticmethod
+    def _row_to_meta(row) -> Dict[str, Any]:
+        return {
+            "id": row[0],
+            "created_at": row[1],
+            "updated_at": row[2],
+            "message_count": row[3]
+        }
+
+    def migrate_legacy_sessions(self) -> int:
+        """
+        将旧格式的 <id>.json 整文件会话导入追加日志，导入后重命名为 .json.migrated
+
+        返回:
+            导入的会话数量
+        """
+        migrated = 0
+        for filename in os.listdir(self.sessions_dir):
+            if not filename.endswith('.json'):
+                continue
+            session_file = os.path.join(self.sessions_dir, filename)
+            try:
+                with open(session_file, 'r', encoding='utf-8') as f:
+                    session_data = json.load(f)
+                session_id = session_data["id"]
+                if self.get_session_meta(session_id) is None:
+                    self.create_session(session_id, session_data["created_at"])
+                    self.append_messages(session_id, session_data["messages"],
+                                         updated_at=session_data["updated_at"])
+                os.replace(session_file, session_file + ".migrated")
+                migrated += 1
+            except Exception as e:
+                logger.error(f"导入旧会话文件失败: {session_file} - {e}")
+        if migrated:
+            logger.info(f"已导入 {migrated} 个旧格式会话")
+        return migrated
+
+    def create_session(self, session_id: Optional[str] = None, created_at: Optional[str] = None) -> Dict[str, Any]:
+        """
+        创建新的会话
+
+        参数:
+            session_id: 会话ID，为None时自动生成
+            created_at: 创建时间，为None时使用当前时间
+
+        返回:
+            会话元数据
+        """
+        session_id = session_id or str(uuid.uuid4())
+        created_at = created_at or datetime.now().isoformat()
+        open(self._log_path(session_id), 'ab').close()
+        open(self._offsets_path(session_id), 'ab').close()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, created_at, updated_at, message_count) VALUES (?, ?, ?, 0)",
+                (session_id, created_at, created_at)
+            )
+            self._conn.commit()
+        return {"id": session_id, "created_at": created_at, "updated_at": created_at, "message_count": 0}
+
+    def get_session_meta(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取会话元数据
+
+        参数:
+            session_id: 会话ID
+
+        返回:
+            会话元数据，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, created_at, updated_at, message_count FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return self._row_to_meta(row) if row else None
+
+    def list_sessions(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        分页列出会话元数据，按更新时间从新到旧排序
+
+        参数:
+            offset: 跳过的会话数量
+            limit: 返回的最大会话数量，为None时返回全部
+
+        返回:
+            会话元数据列表
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, updated_at, message_count FROM sessions "
+                "ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return [self._row_to_meta(row) for row in rows]
+
+    def count_sessions(self) -> int:
+        """返回会话总数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def append_messages(self, session_id: str, messages: List[Dict[str, Any]],
+                        updated_at: Optional[str] = None) -> Dict[str, Any]:
+        """
+        向会话追加消息，只写入新消息和它们的偏移
+
+        参数:
+            session_id: 会话ID
+            messages: 要追加的消息列表
+            updated_at: 更新时间，为None时使用当前时间
+
+        返回:
+            更新后的会话元数据
+        """
+        if self.get_session_meta(session_id) is None:
+            raise FileNotFoundError(f"Session {session_id} not found")
+
+        lines = [(json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8") for message in messages]
+        updated_at = updated_at or datetime.now().isoformat()
+
+        with self._lock, open(self._log_path(session_id), 'ab') as log_file, \
+                open(self._offsets_path(session_id), 'ab') as offsets_file:
+            if fcntl is not None:
+                fcntl.flock(log_file.fileno(), fcntl.LOCK_EX)
+            try:
+                # 加锁后再取文件末尾，其他进程的追加不会交错
+                log_file.seek(0, os.SEEK_END)
+                offset = log_file.tell()
+                offsets = bytearray()
+                for line in lines:
+                    offsets += struct.pack(OFFSET_FORMAT, offset)
+                    offset += len(line)
+                log_file.write(b"".join(lines))
+                log_file.flush()
+                offsets_file.write(offsets)
+                offsets_file.flush()
+
+                self._conn.execute(
+                    "UPDATE sessions SET updated_at = ?, message_count = message_count + ? WHERE id = ?",
+                    (updated_at, len(lines), session_id)
+                )
+                self._conn.commit()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(log_file.fileno(), fcntl.LOCK_UN)
+
+        return self.get_session_meta(session_id)
+
+    def get_messages(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        分页读取会话消息，只读取请求范围内的字节
+
+        参数:
+            session_id: 会话ID
+            offset: 起始消息序号，负数表示从末尾倒数
+            limit: 返回的最大消息数量，为None时读取到末尾
+
+        返回:
+            消息列表
+        """
+        offsets_path = self._offsets_path(session_id)
+        if not os.path.exists(offsets_path):
+            raise FileNotFoundError(f"Session {session_id} not found")
+
+        total = os.path.getsize(offsets_path) // OFFSET_SIZE
+        start = max(0, total + offset) if offset < 0 else min(offset, total)
+        end = total if limit is None else min(total, start + limit)
+        if start >= end:
+            return []
+
+        with open(offsets_path, 'rb') as f:
+            f.seek(start * OFFSET_SIZE)
+            begin = struct.unpack(OFFSET_FORMAT, f.read(OFFSET_SIZE))[0]
+            if end < total:
+                f.seek(end * OFFSET_SIZE)
+                stop = struct.unpack(OFFSET_FORMAT, f.read(OFFSET_SIZE))[0]
+            else:
+                stop = None
+
+        with open(self._log_path(session_id), 'rb') as f:
+            f.seek(begin)
+            data = f.read() if stop is None else f.read(stop - begin)
+
+        lines = data.split(b"\n")
+        # 末尾可能是其他进程写了一半的记录，只返回偏移索引中已登记的消息
+        return [json.loads(line) for line in lines[:end - start]]
+
+    def close(self) -> None:
+        """关闭元数据索引连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,96 @@
+"""
+PPT模板缓存模块
+
+缓存解析后的.pptx模板，同一模板重复生成时不再从磁盘读取和解析：
+- 以(路径, mtime, size)为键，模板文件更新后自动重新解析
+- 按最近使用淘汰，限制缓存的模板数量
+- 每次取用返回解析结果的深拷贝，生成过程对模板的修改互不影响
+"""
+
+import os
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger("TemplateCache")
+
+try:
+    from pptx import Presentation
+    PPTX_AVAILABLE = True
+except ImportError:
+    PPTX_AVAILABLE = False
+
+
+class TemplateCache:
+    """已解析PPT模板的LRU缓存"""
+
+    def __init__(self, template_dir: str, max_entries: int = 16):
+        """
+        初始化模板缓存
+
+        参数:
+            template_dir: 模板目录
+            max_entries: 最多缓存的模板数量
+        """
+        self.template_dir = template_dir
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, template_name: str) -> Optional[str]:
+        """
+        获取模板文件路径
+
+        参数:
+            template_name: 模板文件名
+
+        返回:
+            模板路径，不存在时返回None
+        """
+        path = os.path.join(self.template_dir, os.path.basename(template_name))
+        return path if os.path.isfile(path) else None
+
+    def get(self, template_name: str) -> Optional[Any]:
+        """
+        获取模板的解析结果
+
+        参数:
+            template_name: 模板文件名
+
+        返回:
+            python-pptx Presentation对象的独立副本，模板不存在或python-pptx未安装时返回None
+        """
+        if not PPTX_AVAILABLE:
+            return None
+        path = self.resolve(template_name)
+        if path is None:
+            return None
+
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                # 缓存的对象在多个线程间共享，拷贝时持有锁
+                return copy.deepcopy(entry[1])
+
+        self.misses += 1
+        presentation = Presentation(path)
+        with self._lock:
+            self._entries[path] = (key, presentation)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logger.info(f"已解析并缓存模板: {path}")
+            return copy.deepcopy(presentation)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
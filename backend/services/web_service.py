@@ -7,17 +7,52 @@ Web Agent服务模块
 import os
 import time
 import uuid
+import threading
 from datetime import datetime
-from playwright.sync_api import sync_playwright
 from powerautomation_integration.agents.web.web_agent import WebAgent
+from .browser_pool import BrowserPool, BackgroundLoop
 
 class WebService:
-    def __init__(self):
+    def __init__(self, pool_size=2, max_pages_per_browser=100, max_concurrency=8):
+        """
+        初始化Web服务
+        
+        参数:
+        - pool_size: 常驻浏览器进程数
+        - max_pages_per_browser: 每个浏览器服务多少个页面后重启
+        - max_concurrency: 同时打开的最大页面数
+        """
         self.screenshots_dir = os.path.join(os.getcwd(), 'data', 'screenshots')
         os.makedirs(self.screenshots_dir, exist_ok=True)
         self.web_agent = WebAgent()
+        
+        # 浏览器池在首次使用时启动，同步方法通过后台事件循环调用异步实现
+        self.browser_pool = BrowserPool(
+            size=pool_size,
+            max_pages_per_browser=max_pages_per_browser,
+            max_concurrency=max_concurrency
+        )
+        self._loop = None
+        # 并发的首次请求只能创建一个后台事件循环，浏览器池的同步原语都绑定在这个循环上
+        self._loop_lock = threading.Lock()
     
-    def take_screenshot(self, url, full_page=False):
+    def _run(self, coro):
+        """在后台事件循环中运行异步实现"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = BackgroundLoop()
+            loop = self._loop
+        return loop.run(coro)
+    
+    def close(self):
+        """关闭浏览器池和后台事件循环"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.run(self.browser_pool.close())
+            loop.stop()
+    
+    async def take_screenshot_async(self, url, full_page=False):
         """
         获取指定网页的截图
         
@@ -31,16 +66,17 @@ class WebService:
         screenshot_filename = f"{uuid.uuid4()}.png"
         screenshot_path = os.path.join(self.screenshots_dir, screenshot_filename)
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.goto(url, wait_until="networkidle")
-            page.screenshot(path=screenshot_path, full_page=full_page)
-            browser.close()
+        async with self.browser_pool.page() as page:
+            await page.goto(url, wait_until="networkidle")
+            await page.screenshot(path=screenshot_path, full_page=full_page)
         
         return screenshot_path
     
-    def extract_html_content(self, url):
+    def take_screenshot(self, url, full_page=False):
+        """take_screenshot_async的同步版本"""
+        return self._run(self.take_screenshot_async(url, full_page))
+    
+    async def extract_html_content_async(self, url):
         """
         提取网页HTML内容
         
@@ -50,16 +86,15 @@ class WebService:
         返回:
         - HTML内容
         """
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.goto(url, wait_until="networkidle")
-            html_content = page.content()
-            browser.close()
-        
-        return html_content
+        async with self.browser_pool.page() as page:
+            await page.goto(url, wait_until="networkidle")
+            return await page.content()
     
-    def execute_browser_actions(self, url, actions):
+    def extract_html_content(self, url):
+        """extract_html_content_async的同步版本"""
+        return self._run(self.extract_html_content_async(url))
+    
+    async def execute_browser_actions_async(self, url, actions):
         """
         在浏览器中执行一系列操作
         
@@ -72,10 +107,8 @@ class WebService:
         """
         results = []
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.goto(url, wait_until="networkidle")
+        async with self.browser_pool.page() as page:
+            await page.goto(url, wait_until="networkidle")
             
             for action in actions:
                 action_type = action.get('type')
@@ -84,38 +117,40 @@ class WebService:
                 if action_type == 'click':
                     selector = params.get('selector')
                     if selector:
-                        page.click(selector)
+                        await page.click(selector)
                         results.append(f"点击元素: {selector}")
                 
                 elif action_type == 'fill':
                     selector = params.get('selector')
                     value = params.get('value')
                     if selector and value:
-                        page.fill(selector, value)
+                        await page.fill(selector, value)
                         results.append(f"填写表单: {selector} = {value}")
                 
                 elif action_type == 'navigate':
                     target_url = params.get('url')
                     if target_url:
-                        page.goto(target_url, wait_until="networkidle")
+                        await page.goto(target_url, wait_until="networkidle")
                         results.append(f"导航到: {target_url}")
                 
                 elif action_type == 'wait':
                     timeout = params.get('timeout', 1000)
-                    page.wait_for_timeout(timeout)
+                    await page.wait_for_timeout(timeout)
                     results.append(f"等待: {timeout}ms")
                 
                 elif action_type == 'screenshot':
                     screenshot_filename = f"{uuid.uuid4()}.png"
                     screenshot_path = os.path.join(self.screenshots_dir, screenshot_filename)
-                    page.screenshot(path=screenshot_path)
+                    await page.screenshot(path=screenshot_path)
                     results.append(f"截图: {screenshot_path}")
-            
-            browser.close()
         
         return results
     
-    def extract_structured_data(self, url, selectors):
+    def execute_browser_actions(self, url, actions):
+        """execute_browser_actions_async的同步版本"""
+        return self._run(self.execute_browser_actions_async(url, actions))
+    
+    async def extract_structured_data_async(self, url, selectors):
         """
         从网页中提取结构化数据
         
@@ -128,32 +163,33 @@ class WebService:
         """
         data = []
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.goto(url, wait_until="networkidle")
+        async with self.browser_pool.page() as page:
+            await page.goto(url, wait_until="networkidle")
+            
+            # 每个选择器只查询一次，按序号组合各字段
+            columns = {
+                field: await page.eval_on_selector_all(selector, "elements => elements.map(e => e.innerText)")
+                for field, selector in selectors.items()
+            }
             
             # 获取匹配的元素数量
-            first_selector = list(selectors.values())[0]
-            elements_count = page.eval_on_selector_all(first_selector, "elements => elements.length")
+            first_field = list(selectors.keys())[0]
+            elements_count = len(columns[first_field])
             
-            # 提取每个元素的数据
             for i in range(elements_count):
                 item = {}
-                for field, selector in selectors.items():
-                    elements = page.query_selector_all(selector)
-                    if i < len(elements):
-                        item[field] = elements[i].inner_text()
-                    else:
-                        item[field] = ""
+                for field, values in columns.items():
+                    item[field] = values[i] if i < len(values) else ""
                 
                 if item:
                     data.append(item)
-            
-            browser.close()
         
         return data
     
+    def extract_structured_data(self, url, selectors):
+        """extract_structured_data_async的同步版本"""
+        return self._run(self.extract_structured_data_async(url, selectors))
+    
     def analyze_web_content(self, url, analysis_type="general", analysis_query=""):
         """
         分析网页内容
@@ -8,13 +8,17 @@ import os
 import sys
 import json
 import time
-import hashlib
 import logging
 import datetime
 import subprocess
 import threading
 from typing import Dict, List, Any, Optional, Union
 
+try:
+    from .savepoint_store import SavepointStore
+except ImportError:
+    from savepoint_store import SavepointStore
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -51,6 +55,19 @@ class AgentProblemSolver:
         # 加载配置
         self.config = self._load_config()
         
+        # 内容寻址保存点存储，回滚时不覆盖保存点自身的状态文件
+        config_dir = os.path.relpath(os.path.dirname(self.config_path), project_dir)
+        self.savepoint_store = SavepointStore(
+            project_dir,
+            os.path.join(self.savepoints_dir, "store"),
+            protected_paths=[
+                os.path.join(config_dir, name) for name in (
+                    "agent_problem_solver.json", "savepoints.json",
+                    "work_nodes.json", "rollback_history.json"
+                )
+            ]
+        )
+        
         # 加载保存点
         self.savepoints = self._load_savepoints()
         self.current_savepoint_index = len(self.savepoints) - 1 if self.savepoints else -1
@@ -249,23 +266,19 @@ class AgentProblemSolver:
                 timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
                 savepoint_id = f"sp_{timestamp}"
                 
-                # 创建保存点目录
-                savepoint_dir = os.path.join(self.savepoints_dir, savepoint_id)
-                os.makedirs(savepoint_dir, exist_ok=True)
-                
-                # 复制项目文件到保存点目录
-                self._copy_project_files(savepoint_dir)
-                
-                # 计算项目文件哈希值
-                project_hash = self._calculate_project_hash()
+                # 写入新增的blob和保存点清单，未变化的文件不重新复制和哈希
+                snapshot = self.savepoint_store.create_snapshot(savepoint_id)
                 
                 # 创建保存点信息
                 savepoint = {
                     'id': savepoint_id,
                     'timestamp': timestamp,
                     'description': description,
-                    'project_hash': project_hash,
-                    'path': savepoint_dir,
+                    'project_hash': snapshot['tree_hash'],
+                    'path': self.savepoint_store.manifest_path(savepoint_id),
+                    'storage': 'content_addressed',
+                    'file_count': snapshot['file_count'],
+                    'new_blob_count': snapshot['new_blob_count'],
                     'test_status': 'pending',  # 新增：测试状态
                     'deployment_status': 'pending',  # 新增：部署状态
                     'created_at': datetime.datetime.now().isoformat(),
@@ -291,67 +304,6 @@ class AgentProblemSolver:
                     'status': 'failed'
                 }
     
-    def _copy_project_files(self, target_dir: str) -> None:
-        """
-        复制项目文件到目标目录
-        
-        Args:
-            target_dir: 目标目录
-        """
-        # 检查是否为测试环境
-        if "test" in target_dir:
-            logger.info(f"测试环境，模拟复制项目文件: {target_dir}")
-            return
-            
-        # 排除的目录和文件
-        exclude_patterns = [
-            '.git', '.savepoints', '__pycache__', '*.pyc', '*.pyo',
-            'node_modules', 'venv', '.env', '.venv'
-        ]
-        
-        try:
-            # 尝试使用rsync命令
-            exclude_args = ' '.join([f'--exclude="{pattern}"' for pattern in exclude_patterns])
-            cmd = f'rsync -a {exclude_args} {self.project_dir}/ {target_dir}/'
-            
-            # 执行命令
-            subprocess.run(cmd, shell=True, check=True)
-        except Exception as e:
-            logger.warning(f"rsync命令失败，尝试使用Python复制: {str(e)}")
-            
-            # 使用Python复制文件
-            import shutil
-            
-            def should_exclude(path):
-                """检查路径是否应该被排除"""
-                for pattern in exclude_patterns:
-                    if pattern.startswith('*') and path.endswith(pattern[1:]):
-                        return True
-                    elif pattern.endswith('*') and path.startswith(pattern[:-1]):
-                        return True
-                    elif pattern == os.path.basename(path):
-                        return True
-                return False
-            
-            # 遍历项目目录
-            for root, dirs, files in os.walk(self.project_dir):
-                # 排除目录
-                dirs[:] = [d for d in dirs if not should_exclude(d)]
-                
-                # 计算相对路径
-                rel_path = os.path.relpath(root, self.project_dir)
-                target_root = os.path.join(target_dir, rel_path) if rel_path != '.' else target_dir
-                
-                # 创建目标目录
-                os.makedirs(target_root, exist_ok=True)
-                
-                # 复制文件
-                for file in files:
-                    if not should_exclude(file):
-                        src_file = os.path.join(root, file)
-                        dst_file = os.path.join(target_root, file)
-                        shutil.copy2(src_file, dst_file)
-    
     def _calculate_project_hash(self) -> str:
         """
         计算项目文件哈希值
@@ -362,46 +314,9 @@ class AgentProblemSolver:
         # 检查是否为测试环境
         if "test" in self.project_dir:
             return f"test_hash_{int(time.time())}"
-            
-        hash_md5 = hashlib.md5()
-        
-        # 排除的目录和文件
-        exclude_patterns = [
-            '.git', '.savepoints', '__pycache__', '*.pyc', '*.pyo',
-            'node_modules', 'venv', '.env', '.venv'
-        ]
         
-        # 遍历项目文件
-        for root, dirs, files in os.walk(self.project_dir):
-            # 排除目录
-            dirs[:] = [d for d in dirs if not any(
-                d == pattern or 
-                (pattern.startswith('*') and d.endswith(pattern[1:])) or
-                (pattern.endswith('*') and d.startswith(pattern[:-1]))
-                for pattern in exclude_patterns
-            )]
-            
-            # 处理文件
-            for file in files:
-                # 排除文件
-                if any(
-                    file == pattern or 
-                    (pattern.startswith('*') and file.endswith(pattern[1:])) or
-                    (pattern.endswith('*') and file.startswith(pattern[:-1]))
-                    for pattern in exclude_patterns
-                ):
-                    continue
-                
-                # 计算文件哈希值
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'rb') as f:
-                        for chunk in iter(lambda: f.read(4096), b""):
-                            hash_md5.update(chunk)
-                except Exception as e:
-                    logger.warning(f"计算文件哈希值失败: {file_path} - {str(e)}")
-        
-        return hash_md5.hexdigest()
+        # 状态缓存命中的文件不重新读取，其余文件并行计算哈希
+        return self.savepoint_store.compute_project_hash()
     
     def get_savepoints(self) -> List[Dict[str, Any]]:
         """
@@ -515,8 +430,18 @@ class AgentProblemSolver:
                 # 计算当前项目哈希值
                 before_hash = self._calculate_project_hash()
                 
-                # 复制保存点文件到项目目录
-                self._copy_savepoint_files(target_savepoint['path'])
+                # 内容寻址保存点只写回有差异的文件，旧版目录保存点整体复制
+                diff = None
+                if target_savepoint.get('storage') == 'content_addressed':
+                    rollback_result = self.savepoint_store.rollback(target_savepoint['id'])
+                    diff = rollback_result['diff']
+                    files_changed = rollback_result['files_changed']
+                    if rollback_result['errors']:
+                        raise Exception(f"{len(rollback_result['errors'])}个文件回滚失败: "
+                                        f"{rollback_result['errors'][:3]}")
+                else:
+                    self._copy_savepoint_files(target_savepoint['path'])
+                    files_changed = self._count_changed_files(target_savepoint['path'])
                 
                 # 计算回滚后项目哈希值
                 after_hash = self._calculate_project_hash()
@@ -534,7 +459,7 @@ class AgentProblemSolver:
                     'status': 'success',
                     'before_hash': before_hash,
                     'after_hash': after_hash,
-                    'files_changed': self._count_changed_files(target_savepoint['path']),
+                    'files_changed': files_changed,
                     'created_at': datetime.datetime.now().isoformat()
                 }
                 
@@ -546,12 +471,15 @@ class AgentProblemSolver:
                 self._create_work_node(rollback_id, "回滚", f"回滚到保存点: {target_savepoint['id']}")
                 
                 logger.info(f"回滚成功: {rollback_id}")
-                return {
+                result = {
                     'status': 'success',
                     'rollback_id': rollback_id,
                     'savepoint': target_savepoint,
                     'files_affected': rollback_record['files_changed']
                 }
+                if diff is not None:
+                    result['diff'] = diff
+                return result
             except Exception as e:
                 logger.error(f"回滚失败: {str(e)}")
                 return {
@@ -646,6 +574,47 @@ class AgentProblemSolver:
             logger.warning(f"计算变更文件数量失败: {str(e)}")
             return 0
     
+    def _compare_savepoint_manifests(self, savepoint1: Dict[str, Any],
+                                     savepoint2: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        基于清单比较两个内容寻址保存点，无需读取文件内容
+        
+        Args:
+            savepoint1: 保存点1
+            savepoint2: 保存点2
+            
+        Returns:
+            比较结果
+        """
+        try:
+            diff = self.savepoint_store.diff_snapshots(savepoint1['id'], savepoint2['id'])
+        except Exception as e:
+            logger.error(f"比较保存点失败: {str(e)}")
+            return {
+                'status': 'failed',
+                'error': str(e)
+            }
+        
+        only_in_1 = diff['deleted']
+        only_in_2 = diff['added']
+        differ = diff['modified']
+        
+        return {
+            'status': 'success',
+            'savepoint1': savepoint1,
+            'savepoint2': savepoint2,
+            'only_in_1_count': len(only_in_1),
+            'only_in_2_count': len(only_in_2),
+            'differ_count': len(differ),
+            'total_diff_count': len(only_in_1) + len(only_in_2) + len(differ),
+            'diff_details': {
+                'only_in_1': only_in_1[:10],  # 限制输出数量
+                'only_in_2': only_in_2[:10],
+                'differ': differ[:10]
+            },
+            'diff': diff
+        }
+    
     def get_rollback_history(self) -> List[Dict[str, Any]]:
         """
         获取回滚历史
@@ -728,6 +697,10 @@ class AgentProblemSolver:
                 'error': f"未找到保存点: {savepoint_id2}"
             }
         
+        if (savepoint1.get('storage') == 'content_addressed'
+                and savepoint2.get('storage') == 'content_addressed'):
+            return self._compare_savepoint_manifests(savepoint1, savepoint2)
+        
         try:
             # 使用diff命令比较两个保存点
             cmd = f'diff -r --brief {savepoint1["path"]} {savepoint2["path"]}'
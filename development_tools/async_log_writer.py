@@ -0,0 +1,433 @@
+"""
+异步日志写入器模块 - AsyncLogWriter
+
+为ThoughtActionRecorder提供异步的jsonl日志写入管线，将序列化和磁盘I/O移出Agent的关键路径。
+主要功能：
+1. 记录方只做一次无锁的deque追加，由后台线程批量取出
+2. 按批次分组提交(group commit)，同一文件的一批记录合并为一次写入
+3. 可配置的fsync策略: none(交给操作系统)、interval(按时间间隔)、batch(每批次)
+4. 按文件大小滚动分段: thoughts.jsonl -> thoughts.000001.jsonl
+5. 打开文件时修复崩溃留下的不完整尾行
+
+作者: PowerAutomation AI
+日期: 2025-06-02
+"""
+
+import os
+import re
+import json
+import time
+import glob
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger("AsyncLogWriter")
+
+FSYNC_NONE = "none"
+FSYNC_INTERVAL = "interval"
+FSYNC_BATCH = "batch"
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_INTERVAL, FSYNC_BATCH)
+
+
+def segment_path(log_file: str, segment_no: int) -> str:
+    """
+    获取日志文件第N个已滚动分段的路径
+
+    Args:
+        log_file: 活动日志文件路径，如 thoughts.jsonl
+        segment_no: 分段序号，从1开始
+
+    Returns:
+        分段文件路径，如 thoughts.000001.jsonl
+    """
+    base, ext = os.path.splitext(log_file)
+    return f"{base}.{segment_no:06d}{ext}"
+
+
+def list_log_segments(log_file: str) -> List[str]:
+    """
+    按写入顺序列出日志文件的所有分段，已滚动的分段在前，活动文件在最后
+
+    Args:
+        log_file: 活动日志文件路径
+
+    Returns:
+        存在的分段文件路径列表
+    """
+    base, ext = os.path.splitext(log_file)
+    pattern = re.compile(re.escape(os.path.basename(base)) + r"\.(\d{6})" + re.escape(ext) + "$")
+    segments = []
+    for path in glob.glob(glob.escape(base) + ".*" + ext):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            segments.append((int(match.group(1)), path))
+    result = [path for _, path in sorted(segments)]
+    if os.path.exists(log_file):
+        result.append(log_file)
+    return result
+
+
+def repair_log_tail(log_file: str) -> int:
+    """
+    截断日志文件末尾因崩溃而写了一半的记录
+
+    Args:
+        log_file: 日志文件路径
+
+    Returns:
+        截断的字节数
+    """
+    if not os.path.exists(log_file):
+        return 0
+    size = os.path.getsize(log_file)
+    if size == 0:
+        return 0
+
+    with open(log_file, "rb+") as f:
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+
+        # 向前查找最后一个完整记录的换行符
+        chunk_size = 64 * 1024
+        end = size
+        keep = 0
+        while end > 0:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            chunk = f.read(end - start)
+            pos = chunk.rfind(b"\n")
+            if pos >= 0:
+                keep = start + pos + 1
+                break
+            end = start
+        f.truncate(keep)
+
+    logger.warning(f"Truncated {size - keep} bytes of incomplete record from {log_file}")
+    return size - keep
+
+
+class _LogFile:
+    """
+    后台线程持有的单个日志文件状态
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        repair_log_tail(path)
+        self.handle = open(path, "ab")
+        self.offset = self.handle.tell()
+        self.dirty = False
+
+    def close(self) -> None:
+        try:
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+        finally:
+            self.handle.close()
+
+
+class AsyncLogWriter:
+    """
+    异步日志写入器类，后台线程批量序列化并写入jsonl日志
+    """
+
+    def __init__(self, fsync_policy: str = FSYNC_INTERVAL, fsync_interval: float = 1.0,
+                 flush_interval: float = 0.05, batch_size: int = 4096,
+                 max_segment_bytes: int = 64 * 1024 * 1024,
+                 on_open: Optional[Callable[[str], None]] = None,
+                 on_batch: Optional[Callable[[str, List[Any], int], None]] = None,
+                 on_rotate: Optional[Callable[[str, str], None]] = None):
+        """
+        初始化异步日志写入器
+
+        Args:
+            fsync_policy: fsync策略，none/interval/batch
+            fsync_interval: interval策略下两次fsync的最小间隔(秒)
+            flush_interval: 后台线程无新批次唤醒时的最长等待时间(秒)
+            batch_size: 队列积压达到该数量时立即唤醒后台线程
+            max_segment_bytes: 活动日志文件超过该大小时滚动为新分段，0表示不滚动
+            on_open: 打开日志文件前的回调，参数为文件路径
+            on_batch: 每批写入后的回调，参数为文件路径、(条目, JSON文本)列表和写入后的字节偏移
+            on_rotate: 滚动分段后的回调，参数为原路径和新分段路径
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unsupported fsync policy: {fsync_policy}")
+
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_segment_bytes = max_segment_bytes
+        self.on_open = on_open
+        self.on_batch = on_batch
+        self.on_rotate = on_rotate
+
+        # deque的append/popleft在CPython中是原子操作，记录方无需加锁
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._files: Dict[str, _LogFile] = {}
+        self._files_lock = threading.RLock()
+        self._last_fsync = time.monotonic()
+        self._closed = False
+
+        self.stats = {
+            "records_written": 0,
+            "batches_written": 0,
+            "bytes_written": 0,
+            "fsyncs": 0,
+            "rotations": 0,
+            "errors": 0
+        }
+
+        self._thread = threading.Thread(target=self._run, name="AsyncLogWriter", daemon=True)
+        self._thread.start()
+        logger.info(f"AsyncLogWriter started (fsync: {fsync_policy}, segment: {max_segment_bytes} bytes)")
+
+    def submit(self, log_file: str, entry: Dict[str, Any]) -> None:
+        """
+        提交一条待写入的日志条目，立即返回
+
+        Args:
+            log_file: 目标日志文件路径
+            entry: 日志条目，或已序列化的JSON文本；提交字典时提交后不应再修改，
+                调用方之后仍会修改条目时应提交JSON文本
+        """
+        if self._closed:
+            raise RuntimeError("AsyncLogWriter is closed")
+        queue = self._queue
+        queue.append((log_file, entry))
+        if len(queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待此前提交的所有条目写入文件
+
+        Args:
+            timeout: 最长等待时间(秒)，None表示一直等待
+
+        Returns:
+            是否在超时前完成
+        """
+        if self._closed or not self._thread.is_alive():
+            return not self._queue
+        done = threading.Event()
+        self._queue.append((None, done))
+        self._wakeup.set()
+        return done.wait(timeout)
+
+    def owns(self, log_file: str) -> bool:
+        """
+        判断日志文件当前是否由写入器持有
+
+        Args:
+            log_file: 日志文件路径
+
+        Returns:
+            是否持有
+        """
+        return log_file in self._files
+
+    def close_file(self, log_file: str) -> None:
+        """
+        刷新并关闭指定日志文件，下次写入时重新打开
+
+        Args:
+            log_file: 日志文件路径
+        """
+        self.flush()
+        with self._files_lock:
+            log = self._files.pop(log_file, None)
+            if log is not None:
+                log.close()
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        写完所有积压条目后停止后台线程并关闭文件
+
+        Args:
+            timeout: 等待后台线程退出的最长时间(秒)
+        """
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        with self._files_lock:
+            for log in self._files.values():
+                try:
+                    log.close()
+                except Exception as e:
+                    logger.error(f"Error closing log file {log.path}: {e}")
+            self._files.clear()
+        logger.info(f"AsyncLogWriter closed: {self.stats}")
+
+    def _run(self) -> None:
+        """
+        后台线程主循环
+        """
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error in async log writer: {e}")
+            if self._closed and not self._queue:
+                break
+
+    def _drain(self) -> None:
+        """
+        取出队列中的全部条目，按文件分组批量写入
+        """
+        queue = self._queue
+        while queue:
+            batches: Dict[str, List[Any]] = {}
+            waiters = []
+            try:
+                while True:
+                    log_file, entry = queue.popleft()
+                    if log_file is None:
+                        # flush标记之前的条目必须先写完，遇到标记即结束本批次
+                        waiters.append(entry)
+                        break
+                    batches.setdefault(log_file, []).append(entry)
+            except IndexError:
+                pass
+
+            try:
+                with self._files_lock:
+                    for log_file, entries in batches.items():
+                        self._write_batch(log_file, entries)
+                    self._sync_files(force=self.fsync_policy == FSYNC_BATCH)
+            finally:
+                # 写入或fsync失败时也要唤醒flush，错误已计入stats并记录日志
+                for waiter in waiters:
+                    waiter.set()
+
+    def _get_file(self, log_file: str) -> _LogFile:
+        """
+        获取已打开的日志文件，不存在时打开
+        """
+        log = self._files.get(log_file)
+        if log is None:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            if self.on_open is not None:
+                self.on_open(log_file)
+            log = _LogFile(log_file)
+            self._files[log_file] = log
+        return log
+
+    def _write_batch(self, log_file: str, entries: List[Dict[str, Any]]) -> None:
+        """
+        将同一文件的一批条目合并写入，跨越分段大小上限时在记录边界处滚动
+        """
+        records = []
+        for entry in entries:
+            if isinstance(entry, str):
+                # 提交时已序列化，只有回调需要条目时才解析
+                payload = entry
+                entry = json.loads(payload) if self.on_batch is not None else None
+            else:
+                try:
+                    payload = json.dumps(entry, ensure_ascii=False)
+                except (TypeError, ValueError) as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"Dropping unserializable log entry for {log_file}: {e}")
+                    continue
+            records.append((entry, payload, (payload + "\n").encode("utf-8")))
+        if not records:
+            return
+
+        try:
+            log = self._get_file(log_file)
+            chunk = []
+            chunk_bytes = 0
+            for record in records:
+                size = len(record[2])
+                if (self.max_segment_bytes and log.offset + chunk_bytes + size > self.max_segment_bytes
+                        and (chunk or log.offset > 0)):
+                    if chunk:
+                        self._write_chunk(log, chunk)
+                        chunk = []
+                        chunk_bytes = 0
+                    self._rotate(log)
+                    log = self._get_file(log_file)
+                chunk.append(record)
+                chunk_bytes += size
+            self._write_chunk(log, chunk)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Error writing {len(records)} entries to {log_file}: {e}")
+            # 丢弃失效的文件，下次写入时重新打开
+            log = self._files.pop(log_file, None)
+            if log is not None:
+                try:
+                    log.close()
+                except Exception as close_error:
+                    logger.error(f"Error closing log file {log_file}: {close_error}")
+
+    def _write_chunk(self, log: _LogFile, chunk: List[Any]) -> None:
+        """
+        将一组已序列化的记录一次写入日志文件
+        """
+        data = b"".join(line for _, _, line in chunk)
+        log.handle.write(data)
+        log.handle.flush()
+
+        log.offset += len(data)
+        log.dirty = True
+        self.stats["records_written"] += len(chunk)
+        self.stats["batches_written"] += 1
+        self.stats["bytes_written"] += len(data)
+
+        if self.on_batch is not None:
+            try:
+                self.on_batch(log.path, [(entry, payload) for entry, payload, _ in chunk], log.offset)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error in on_batch callback for {log.path}: {e}")
+
+    def _sync_files(self, force: bool = False) -> None:
+        """
+        按fsync策略将已写入的数据落盘
+        """
+        if self.fsync_policy == FSYNC_NONE:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_fsync < self.fsync_interval:
+            return
+        for log in self._files.values():
+            if log.dirty:
+                os.fsync(log.handle.fileno())
+                log.dirty = False
+                self.stats["fsyncs"] += 1
+        self._last_fsync = now
+
+    def _rotate(self, log: _LogFile) -> None:
+        """
+        将活动日志文件滚动为下一个分段
+        """
+        log.close()
+        del self._files[log.path]
+
+        existing = list_log_segments(log.path)
+        next_no = len(existing)
+        while os.path.exists(segment_path(log.path, next_no)):
+            next_no += 1
+        new_path = segment_path(log.path, next_no)
+        os.replace(log.path, new_path)
+        self.stats["rotations"] += 1
+        logger.info(f"Rotated {log.path} to {new_path}")
+
+        if self.on_rotate is not None:
+            try:
+                self.on_rotate(log.path, new_path)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error in on_rotate callback for {log.path}: {e}")
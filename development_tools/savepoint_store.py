@@ -0,0 +1,574 @@
+"""
+内容寻址保存点存储 - SavepointStore
+
+参考git对象存储，为AgentProblemSolver提供增量保存点：
+1. 文件内容按哈希存储为blob，相同内容只存一份
+2. 每个保存点只保存一份清单(manifest)，记录相对路径到blob哈希的映射
+3. 维护mtime/size状态缓存，未变化的文件无需重新计算哈希
+4. 使用线程池并行计算哈希(blake2b，hashlib在计算时会释放GIL)
+5. 基于清单差异回滚，只写回或删除发生变化的文件
+
+版本: 1.0.0
+更新日期: 2025-06-02
+"""
+
+import os
+import json
+import stat
+import time
+import shutil
+import hashlib
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger("SavepointStore")
+
+# 默认排除的目录和文件
+DEFAULT_EXCLUDE_PATTERNS = [
+    '.git', '.savepoints', '__pycache__', '*.pyc', '*.pyo',
+    'node_modules', 'venv', '.env', '.venv'
+]
+
+HASH_ALGORITHM = "blake2b"
+HASH_DIGEST_SIZE = 20
+READ_CHUNK_SIZE = 1024 * 1024
+
+# mtime距快照时间小于该值(秒)的文件不写入状态缓存，避免同一时间粒度内的修改被漏检
+RACY_MTIME_WINDOW = 2.0
+
+
+def should_exclude(name: str, exclude_patterns: List[str]) -> bool:
+    """
+    检查文件或目录名是否应该被排除
+
+    Args:
+        name: 文件或目录名
+        exclude_patterns: 排除模式列表，支持前缀*和后缀*通配
+
+    Returns:
+        是否排除
+    """
+    for pattern in exclude_patterns:
+        if name == pattern:
+            return True
+        if pattern.startswith('*') and name.endswith(pattern[1:]):
+            return True
+        if pattern.endswith('*') and name.startswith(pattern[:-1]):
+            return True
+    return False
+
+
+def new_hasher():
+    """
+    创建保存点存储使用的哈希对象
+
+    Returns:
+        hashlib哈希对象
+    """
+    return hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+
+
+class SavepointStore:
+    """
+    内容寻址保存点存储类
+    """
+
+    def __init__(self, project_dir: str, store_dir: str,
+                 exclude_patterns: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                 protected_paths: Optional[List[str]] = None):
+        """
+        初始化保存点存储
+
+        Args:
+            project_dir: 项目根目录
+            store_dir: 存储目录，包含objects、manifests和状态缓存
+            exclude_patterns: 排除模式列表，默认为DEFAULT_EXCLUDE_PATTERNS
+            max_workers: 哈希和I/O线程池大小，默认为CPU核数的两倍
+            protected_paths: 回滚时不会被写回或删除的相对路径，如保存点自身的状态文件
+        """
+        self.project_dir = os.path.abspath(project_dir)
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self.manifests_dir = os.path.join(store_dir, "manifests")
+        self.stat_cache_path = os.path.join(store_dir, "stat_cache.json")
+        self.exclude_patterns = exclude_patterns or DEFAULT_EXCLUDE_PATTERNS
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 2)
+        self.protected_paths = set(p.replace(os.sep, '/') for p in (protected_paths or []))
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.stat_cache = self._load_stat_cache()
+
+    def _load_stat_cache(self) -> Dict[str, List[Any]]:
+        """
+        加载状态缓存
+
+        Returns:
+            相对路径到[size, mtime_ns, hash]的映射
+        """
+        if os.path.exists(self.stat_cache_path):
+            try:
+                with open(self.stat_cache_path, "r") as f:
+                    cache = json.load(f)
+                if cache.get("algorithm") == HASH_ALGORITHM:
+                    return cache.get("files", {})
+            except Exception as e:
+                logger.warning(f"加载状态缓存失败，将重新计算哈希: {str(e)}")
+        return {}
+
+    def _save_stat_cache(self) -> None:
+        """保存状态缓存"""
+        tmp_path = self.stat_cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"algorithm": HASH_ALGORITHM, "files": self.stat_cache}, f)
+        os.replace(tmp_path, self.stat_cache_path)
+
+    def object_path(self, digest: str) -> str:
+        """
+        获取blob对象的存储路径
+
+        Args:
+            digest: blob哈希值
+
+        Returns:
+            对象文件路径
+        """
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def manifest_path(self, savepoint_id: str) -> str:
+        """
+        获取保存点清单的存储路径
+
+        Args:
+            savepoint_id: 保存点ID
+
+        Returns:
+            清单文件路径
+        """
+        return os.path.join(self.manifests_dir, f"{savepoint_id}.json")
+
+    def scan_project(self) -> Dict[str, os.stat_result]:
+        """
+        遍历项目目录，获取所有未排除文件的状态
+
+        Returns:
+            相对路径(使用/分隔)到文件状态的映射
+        """
+        files = {}
+        for root, dirs, names in os.walk(self.project_dir):
+            dirs[:] = [d for d in dirs if not should_exclude(d, self.exclude_patterns)]
+            rel_root = os.path.relpath(root, self.project_dir)
+            for name in names:
+                if should_exclude(name, self.exclude_patterns):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.lstat(path)
+                except OSError as e:
+                    logger.warning(f"读取文件状态失败: {path} - {str(e)}")
+                    continue
+                # 只保存普通文件，跳过符号链接、套接字等
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                rel_path = name if rel_root == '.' else os.path.join(rel_root, name)
+                files[rel_path.replace(os.sep, '/')] = st
+        return files
+
+    def _hash_file(self, rel_path: str, store: bool) -> Tuple[str, Optional[str], bool]:
+        """
+        计算文件哈希，需要时在同一次读取中写入blob对象
+
+        Args:
+            rel_path: 相对路径
+            store: 是否写入blob对象
+
+        Returns:
+            (相对路径, 哈希值, 是否新写入了blob)，读取失败时哈希值为None
+        """
+        src = os.path.join(self.project_dir, rel_path)
+        hasher = new_hasher()
+        tmp_path = None
+        try:
+            if store:
+                tmp_path = os.path.join(self.objects_dir, f"tmp_{threading.get_ident()}_{time.time_ns()}")
+                with open(src, "rb") as f, open(tmp_path, "wb") as out:
+                    for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+                        hasher.update(chunk)
+                        out.write(chunk)
+            else:
+                with open(src, "rb") as f:
+                    for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+                        hasher.update(chunk)
+        except Exception as e:
+            logger.warning(f"计算文件哈希值失败: {src} - {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return rel_path, None, False
+
+        digest = hasher.hexdigest()
+        if tmp_path is None:
+            return rel_path, digest, False
+
+        obj_path = self.object_path(digest)
+        if os.path.exists(obj_path):
+            os.remove(tmp_path)
+            return rel_path, digest, False
+        os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+        os.replace(tmp_path, obj_path)
+        return rel_path, digest, True
+
+    def build_tree(self, store: bool = False) -> Dict[str, Any]:
+        """
+        计算当前项目的文件树，未变化的文件直接使用状态缓存中的哈希
+
+        Args:
+            store: 是否将缺失的blob写入对象存储
+
+        Returns:
+            包含files(相对路径到[hash, size, mtime_ns, mode])、hashed_count和new_blob_count的字典
+        """
+        now = time.time()
+        stats = self.scan_project()
+        files: Dict[str, List[Any]] = {}
+        to_hash = []
+
+        with self._lock:
+            for rel_path, st in stats.items():
+                cached = self.stat_cache.get(rel_path)
+                if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                    if not store or os.path.exists(self.object_path(cached[2])):
+                        files[rel_path] = [cached[2], st.st_size, st.st_mtime_ns, st.st_mode & 0o7777]
+                        continue
+                to_hash.append(rel_path)
+
+            new_blobs = 0
+            if to_hash:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    for rel_path, digest, created in executor.map(lambda p: self._hash_file(p, store), to_hash):
+                        if digest is None:
+                            continue
+                        st = stats[rel_path]
+                        files[rel_path] = [digest, st.st_size, st.st_mtime_ns, st.st_mode & 0o7777]
+                        new_blobs += int(created)
+                        if now - st.st_mtime_ns / 1e9 > RACY_MTIME_WINDOW:
+                            self.stat_cache[rel_path] = [st.st_size, st.st_mtime_ns, digest]
+                        else:
+                            self.stat_cache.pop(rel_path, None)
+
+            # 清理已删除文件的缓存
+            for rel_path in list(self.stat_cache):
+                if rel_path not in stats:
+                    del self.stat_cache[rel_path]
+            if to_hash:
+                self._save_stat_cache()
+
+        return {
+            "files": files,
+            "hashed_count": len(to_hash),
+            "new_blob_count": new_blobs
+        }
+
+    @staticmethod
+    def tree_hash(files: Dict[str, List[Any]]) -> str:
+        """
+        根据文件树计算整体哈希值
+
+        Args:
+            files: 相对路径到[hash, ...]的映射
+
+        Returns:
+            树哈希值
+        """
+        hasher = new_hasher()
+        for rel_path in sorted(files):
+            hasher.update(rel_path.encode("utf-8"))
+            hasher.update(b"\0")
+            hasher.update(files[rel_path][0].encode("ascii"))
+            hasher.update(b"\n")
+        return hasher.hexdigest()
+
+    def compute_project_hash(self) -> str:
+        """
+        计算当前项目的树哈希值
+
+        Returns:
+            项目哈希值
+        """
+        return self.tree_hash(self.build_tree(store=False)["files"])
+
+    def create_snapshot(self, savepoint_id: str) -> Dict[str, Any]:
+        """
+        创建保存点快照，只写入新的blob和一份清单
+
+        Args:
+            savepoint_id: 保存点ID
+
+        Returns:
+            清单信息(不含files)
+        """
+        start_time = time.time()
+        tree = self.build_tree(store=True)
+        files = tree["files"]
+
+        manifest = {
+            "id": savepoint_id,
+            "algorithm": HASH_ALGORITHM,
+            "created_at": datetime.datetime.now().isoformat(),
+            "tree_hash": self.tree_hash(files),
+            "file_count": len(files),
+            "total_size": sum(entry[1] for entry in files.values()),
+            "hashed_count": tree["hashed_count"],
+            "new_blob_count": tree["new_blob_count"],
+            "files": files
+        }
+
+        tmp_path = self.manifest_path(savepoint_id) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path(savepoint_id))
+
+        summary = {k: v for k, v in manifest.items() if k != "files"}
+        summary["duration"] = time.time() - start_time
+        logger.info(f"保存点快照创建完成: {savepoint_id}, {len(files)}个文件, "
+                    f"重新哈希{tree['hashed_count']}个, 新增blob {tree['new_blob_count']}个")
+        return summary
+
+    def has_snapshot(self, savepoint_id: str) -> bool:
+        """
+        检查保存点清单是否存在
+
+        Args:
+            savepoint_id: 保存点ID
+
+        Returns:
+            是否存在
+        """
+        return os.path.exists(self.manifest_path(savepoint_id))
+
+    def load_manifest(self, savepoint_id: str) -> Dict[str, Any]:
+        """
+        加载保存点清单
+
+        Args:
+            savepoint_id: 保存点ID
+
+        Returns:
+            清单字典
+        """
+        with open(self.manifest_path(savepoint_id), "r") as f:
+            return json.load(f)
+
+    def restore_file(self, rel_path: str, entry: List[Any]) -> None:
+        """
+        从blob对象恢复单个文件
+
+        Args:
+            rel_path: 相对路径
+            entry: 清单条目[hash, size, mtime_ns, mode]
+        """
+        dst = os.path.join(self.project_dir, rel_path.replace('/', os.sep))
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp_path = f"{dst}.sp_tmp"
+        shutil.copyfile(self.object_path(entry[0]), tmp_path)
+        os.chmod(tmp_path, entry[3])
+        os.replace(tmp_path, dst)
+        # 恢复mtime，使状态缓存在下次快照时仍然命中
+        os.utime(dst, ns=(entry[2], entry[2]))
+        with self._lock:
+            self.stat_cache[rel_path] = [entry[1], entry[2], entry[0]]
+
+    def restore_snapshot(self, savepoint_id: str) -> int:
+        """
+        将保存点中的所有文件写回项目目录
+
+        Args:
+            savepoint_id: 保存点ID
+
+        Returns:
+            写入的文件数量
+        """
+        files = {p: entry for p, entry in self.load_manifest(savepoint_id)["files"].items()
+                 if p not in self.protected_paths}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(lambda item: self.restore_file(*item), files.items()))
+        with self._lock:
+            self._save_stat_cache()
+        return len(files)
+
+    @staticmethod
+    def diff_trees(old_files: Dict[str, List[Any]], new_files: Dict[str, List[Any]]) -> Dict[str, List[str]]:
+        """
+        比较两个文件树
+
+        Args:
+            old_files: 旧文件树，相对路径到[hash, ...]的映射
+            new_files: 新文件树
+
+        Returns:
+            包含added、modified、deleted三个排序路径列表的字典，均相对于旧文件树
+        """
+        added = [p for p in new_files if p not in old_files]
+        deleted = [p for p in old_files if p not in new_files]
+        modified = [p for p, entry in new_files.items()
+                    if p in old_files and old_files[p][0] != entry[0]]
+        return {
+            "added": sorted(added),
+            "modified": sorted(modified),
+            "deleted": sorted(deleted)
+        }
+
+    def diff_snapshots(self, old_id: str, new_id: str) -> Dict[str, List[str]]:
+        """
+        比较两个保存点的清单
+
+        Args:
+            old_id: 旧保存点ID
+            new_id: 新保存点ID
+
+        Returns:
+            新保存点相对于旧保存点的added/modified/deleted
+        """
+        return self.diff_trees(self.load_manifest(old_id)["files"], self.load_manifest(new_id)["files"])
+
+    def diff_with_project(self, savepoint_id: str) -> Dict[str, List[str]]:
+        """
+        计算当前项目相对于保存点的变更，受保护路径不计入
+
+        Args:
+            savepoint_id: 保存点ID
+
+        Returns:
+            当前项目相对于保存点的added/modified/deleted
+        """
+        saved = self.load_manifest(savepoint_id)["files"]
+        current = self.build_tree(store=False)["files"]
+        diff = self.diff_trees(saved, current)
+        if self.protected_paths:
+            diff = {kind: [p for p in paths if p not in self.protected_paths] for kind, paths in diff.items()}
+        return diff
+
+    def _remove_file(self, rel_path: str) -> None:
+        """
+        删除项目中的文件，并清理随之变空的父目录
+
+        Args:
+            rel_path: 相对路径
+        """
+        path = os.path.join(self.project_dir, rel_path.replace('/', os.sep))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.stat_cache.pop(rel_path, None)
+
+        parent = os.path.dirname(path)
+        while parent != self.project_dir and parent.startswith(self.project_dir):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    def rollback(self, savepoint_id: str, delete_added: bool = True) -> Dict[str, Any]:
+        """
+        将项目回滚到保存点，只写回被修改或删除的文件，并删除保存点之后新增的文件
+
+        Args:
+            savepoint_id: 保存点ID
+            delete_added: 是否删除保存点之后新增的文件
+
+        Returns:
+            回滚结果，包含diff(回滚前项目相对于保存点的变更)和各类文件数量
+        """
+        start_time = time.time()
+        saved = self.load_manifest(savepoint_id)["files"]
+        diff = self.diff_with_project(savepoint_id)
+
+        to_restore = diff["modified"] + diff["deleted"]
+        to_remove = diff["added"] if delete_added else []
+
+        errors = []
+
+        def apply(task):
+            action, rel_path = task
+            try:
+                if action == "restore":
+                    self.restore_file(rel_path, saved[rel_path])
+                else:
+                    self._remove_file(rel_path)
+            except Exception as e:
+                errors.append({"path": rel_path, "action": action, "error": str(e)})
+
+        tasks = [("restore", p) for p in to_restore] + [("remove", p) for p in to_remove]
+        if tasks:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(apply, tasks))
+            with self._lock:
+                self._save_stat_cache()
+
+        result = {
+            "savepoint_id": savepoint_id,
+            "diff": diff,
+            "restored_count": len(to_restore) - sum(1 for e in errors if e["action"] == "restore"),
+            "removed_count": len(to_remove) - sum(1 for e in errors if e["action"] == "remove"),
+            "files_changed": len(diff["added"]) + len(diff["modified"]) + len(diff["deleted"]),
+            "errors": errors,
+            "duration": time.time() - start_time
+        }
+        logger.info(f"回滚到保存点 {savepoint_id}: 写回{result['restored_count']}个文件, "
+                    f"删除{result['removed_count']}个文件, 失败{len(errors)}个")
+        return result
+
+    def count_changed_files(self, savepoint_id: str) -> int:
+        """
+        统计当前项目与保存点内容不同的文件数量(不含新增文件)
+
+        Args:
+            savepoint_id: 保存点ID
+
+        Returns:
+            变更文件数量
+        """
+        diff = self.diff_with_project(savepoint_id)
+        return len(diff["modified"]) + len(diff["deleted"])
+
+    def delete_snapshot(self, savepoint_id: str) -> None:
+        """
+        删除保存点清单，blob由collect_garbage回收
+
+        Args:
+            savepoint_id: 保存点ID
+        """
+        if self.has_snapshot(savepoint_id):
+            os.remove(self.manifest_path(savepoint_id))
+
+    def collect_garbage(self) -> int:
+        """
+        删除不再被任何清单引用的blob对象
+
+        Returns:
+            删除的blob数量
+        """
+        referenced = set()
+        for name in os.listdir(self.manifests_dir):
+            if name.endswith(".json"):
+                savepoint_id = name[:-len(".json")]
+                referenced.update(entry[0] for entry in self.load_manifest(savepoint_id)["files"].values())
+
+        removed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if prefix + name not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+                    removed += 1
+        logger.info(f"回收未引用的blob对象: {removed}个")
+        return removed
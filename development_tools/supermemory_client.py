@@ -0,0 +1,556 @@
+"""
+SuperMemory客户端层 - 连接池、批量请求和本地缓存
+版本: 1.0.0
+更新日期: 2025-06-02
+
+为SuperMemoryIntegration提供:
+1. SuperMemoryClient: 基于requests.Session的长连接池，对429/5xx和连接错误自动重试，
+   支持批量创建(服务端不支持批量端点时退化为并发单条请求)
+2. SuperMemoryCache: 本地SQLite缓存，提供读穿透和按任务查询
+3. WriteBehindFlusher: 后台线程将本地待写入的记忆批量同步到服务端，失败后指数退避重试
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("SuperMemoryClient")
+
+# 需要重试的HTTP状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# 服务端不支持批量端点时返回的状态码
+BATCH_UNSUPPORTED_STATUS_CODES = {404, 405, 501}
+
+
+class SuperMemoryClient:
+    """
+    SuperMemory HTTP客户端，复用长连接并支持批量请求
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str], pool_size: int = 10,
+                 timeout: float = 30, max_retries: int = 2, backoff_factor: float = 0.5,
+                 batch_endpoint: str = "/v1/memories/batch"):
+        """
+        初始化客户端
+
+        Args:
+            base_url: API基础URL
+            headers: 请求头，包含认证信息
+            pool_size: 连接池大小，同时也是并发请求的线程数
+            timeout: 单次请求超时时间(秒)
+            max_retries: 429/5xx/连接错误时的最大重试次数
+            backoff_factor: 重试退避基数(秒)，第n次重试等待 backoff_factor * 2^n 加随机抖动
+            batch_endpoint: 批量创建记忆的端点
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.batch_endpoint = batch_endpoint
+        self.pool_size = pool_size
+        # None表示尚未探测，探测到服务端不支持后置为False，不再尝试
+        self.batch_supported: Optional[bool] = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers)
+
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="SuperMemoryClient")
+
+    def _send(self, method: str, endpoint: str, data: Dict = None, params: Dict = None) -> requests.Response:
+        """
+        发送请求，对可重试的错误进行退避重试
+
+        Returns:
+            最后一次请求的响应
+        """
+        url = f"{self.base_url}{endpoint}"
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method=method, url=url, json=data,
+                                                params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                logger.warning(f"API请求返回{response.status_code}，准备重试: {method} {endpoint}")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"API请求失败，准备重试: {method} {endpoint} - {str(e)}")
+
+            time.sleep(self.backoff_factor * (2 ** attempt) * (1 + random.random()))
+            attempt += 1
+
+    def request(self, method: str, endpoint: str, data: Dict = None, params: Dict = None) -> Dict:
+        """
+        发送API请求
+
+        Args:
+            method: 请求方法（GET, POST, PUT, DELETE）
+            endpoint: API端点
+            data: 请求数据
+            params: 查询参数
+
+        Returns:
+            API响应，失败时包含error和status字段
+        """
+        try:
+            response = self._send(method, endpoint, data, params)
+            response.raise_for_status()
+            return response.json() if response.content else {"success": True}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"API请求失败: {str(e)}")
+            return {"error": str(e), "status": "failed"}
+
+    def request_many(self, calls: List[Dict[str, Any]]) -> List[Dict]:
+        """
+        并发发送多个请求，复用连接池中的连接
+
+        Args:
+            calls: 请求列表，每项包含method、endpoint及可选的data、params
+
+        Returns:
+            与请求顺序一致的响应列表
+        """
+        futures = [
+            self._executor.submit(self.request, call["method"], call["endpoint"],
+                                  call.get("data"), call.get("params"))
+            for call in calls
+        ]
+        return [future.result() for future in futures]
+
+    def create_memories(self, memories: List[Dict[str, Any]]) -> List[Dict]:
+        """
+        批量创建记忆，服务端不支持批量端点时退化为并发单条请求
+
+        Args:
+            memories: 记忆请求体列表
+
+        Returns:
+            与输入顺序一致的创建结果列表
+        """
+        if not memories:
+            return []
+
+        if self.batch_supported is not False and len(memories) > 1:
+            try:
+                response = self._send("POST", self.batch_endpoint, {"memories": memories})
+                if response.status_code in BATCH_UNSUPPORTED_STATUS_CODES:
+                    logger.info(f"服务端不支持批量端点{self.batch_endpoint}，改为并发单条请求")
+                    self.batch_supported = False
+                else:
+                    response.raise_for_status()
+                    payload = response.json()
+                    items = payload.get("data", payload.get("memories", []))
+                    if len(items) == len(memories):
+                        self.batch_supported = True
+                        return [{"success": True, "data": item} for item in items]
+                    logger.warning(f"批量创建返回{len(items)}条结果，预期{len(memories)}条，改为单条请求")
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"批量创建记忆失败: {str(e)}")
+                return [{"error": str(e), "status": "failed"} for _ in memories]
+
+        return self.request_many([
+            {"method": "POST", "endpoint": "/v1/memories", "data": memory} for memory in memories
+        ])
+
+    def close(self) -> None:
+        """关闭线程池和连接池"""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+def memory_data_type(memory: Dict[str, Any]) -> Optional[str]:
+    """
+    从记忆的元数据或标签中取出数据类型
+
+    Args:
+        memory: 记忆对象
+
+    Returns:
+        数据类型，无法识别时为None
+    """
+    data_type = (memory.get("metadata") or {}).get("data_type")
+    if data_type:
+        return data_type
+    for tag in memory.get("tags") or []:
+        if tag.startswith("type:"):
+            return tag[len("type:"):]
+    return None
+
+
+class SuperMemoryCache:
+    """
+    SuperMemory本地SQLite缓存，保存已读取和待写入的记忆
+    """
+
+    def __init__(self, db_path: str):
+        """
+        初始化本地缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS memories (
+                    id TEXT PRIMARY KEY,
+                    task_id TEXT,
+                    body TEXT NOT NULL,
+                    synced INTEGER NOT NULL DEFAULT 1,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_memories_task ON memories(task_id);
+                CREATE TABLE IF NOT EXISTS pending_writes (
+                    local_id TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending'
+                );
+                CREATE TABLE IF NOT EXISTS task_snapshots (
+                    task_id TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL
+                );
+            """)
+            self._conn.commit()
+
+    @staticmethod
+    def _task_id(memory: Dict[str, Any]) -> Optional[str]:
+        task_id = (memory.get("metadata") or {}).get("task_id")
+        if task_id:
+            return task_id
+        for tag in memory.get("tags") or []:
+            if tag.startswith("task:"):
+                return tag[len("task:"):]
+        return None
+
+    def put_memories(self, memories: List[Dict[str, Any]], synced: bool = True) -> None:
+        """
+        写入或更新缓存中的记忆
+
+        Args:
+            memories: 包含id的记忆对象列表
+            synced: 是否已与服务端同步
+        """
+        now = time.time()
+        rows = [
+            (memory["id"], self._task_id(memory), json.dumps(memory, ensure_ascii=False), int(synced), now)
+            for memory in memories if memory.get("id")
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO memories (id, task_id, body, synced, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def get_memory(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        """
+        从缓存读取记忆
+
+        Args:
+            memory_id: 记忆ID
+
+        Returns:
+            记忆对象，未缓存时为None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM memories WHERE id = ?", (memory_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_memory(self, memory_id: str) -> None:
+        """
+        从缓存删除记忆，并使其所属任务的完整拉取结果失效
+
+        Args:
+            memory_id: 记忆ID
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT task_id FROM memories WHERE id = ?", (memory_id,)).fetchone()
+            self._conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,))
+            # 任务的完整拉取结果已不准确，下次读取时重新拉取
+            if row and row[0]:
+                self._conn.execute("DELETE FROM task_snapshots WHERE task_id = ?", (row[0],))
+            self._conn.commit()
+
+    def get_task_memories(self, task_id: str) -> List[Dict[str, Any]]:
+        """
+        读取任务的所有缓存记忆(含尚未同步的写入)
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            按写入时间排序的记忆列表
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM memories WHERE task_id = ? ORDER BY updated_at, rowid", (task_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def snapshot_age(self, task_id: str) -> Optional[float]:
+        """
+        获取任务上次完整拉取距今的秒数
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            秒数，从未拉取时为None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM task_snapshots WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return time.time() - row[0] if row else None
+
+    def replace_task_snapshot(self, task_id: str, memories: List[Dict[str, Any]],
+                              fetched_at: Optional[float] = None) -> None:
+        """
+        用服务端完整拉取的结果替换任务的已同步缓存，保留尚未同步的本地写入
+
+        Args:
+            task_id: 任务ID
+            memories: 服务端返回的任务记忆列表
+            fetched_at: 发起拉取请求的时间，此后写入缓存的记录不会被替换
+        """
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM memories WHERE task_id = ? AND synced = 1 AND updated_at < ?",
+                (task_id, fetched_at)
+            )
+            self.put_memories(memories, synced=True)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_snapshots (task_id, fetched_at) VALUES (?, ?)",
+                (task_id, fetched_at)
+            )
+            self._conn.commit()
+
+    def invalidate_task(self, task_id: str) -> None:
+        """
+        使任务的完整拉取结果失效
+
+        Args:
+            task_id: 任务ID
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM task_snapshots WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+
+    def enqueue_write(self, memory: Dict[str, Any]) -> str:
+        """
+        将待创建的记忆写入本地缓存和待同步队列
+
+        Args:
+            memory: 记忆请求体
+
+        Returns:
+            本地记忆ID
+        """
+        local_id = f"local_{uuid.uuid4().hex}"
+        body = dict(memory, id=local_id)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pending_writes (local_id, body, next_attempt_at) VALUES (?, ?, ?)",
+                (local_id, json.dumps(memory, ensure_ascii=False), time.time())
+            )
+            self.put_memories([body], synced=False)
+        return local_id
+
+    def due_writes(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        获取到期需要同步的写入
+
+        Args:
+            limit: 最大数量
+
+        Returns:
+            包含local_id、body和attempts的列表
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT local_id, body, attempts FROM pending_writes "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY rowid LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        return [{"local_id": r[0], "body": json.loads(r[1]), "attempts": r[2]} for r in rows]
+
+    def pending_count(self) -> int:
+        """
+        获取尚未同步的写入数量
+
+        Returns:
+            待同步数量
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM pending_writes WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def complete_write(self, local_id: str, memory: Dict[str, Any]) -> None:
+        """
+        写入同步成功后，用服务端返回的记忆替换本地记录
+
+        Args:
+            local_id: 本地记忆ID
+            memory: 服务端返回的记忆对象
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM pending_writes WHERE local_id = ?", (local_id,))
+            if memory.get("id"):
+                self._conn.execute("DELETE FROM memories WHERE id = ?", (local_id,))
+                self.put_memories([memory], synced=True)
+            else:
+                self._conn.execute("UPDATE memories SET synced = 1 WHERE id = ?", (local_id,))
+            self._conn.commit()
+
+    def fail_write(self, local_id: str, error: str, attempts: int, max_attempts: int,
+                   backoff_factor: float) -> None:
+        """
+        记录一次同步失败，超过最大次数后标记为failed
+
+        Args:
+            local_id: 本地记忆ID
+            error: 错误信息
+            attempts: 已失败次数(含本次)
+            max_attempts: 最大尝试次数
+            backoff_factor: 退避基数(秒)
+        """
+        status = "failed" if attempts >= max_attempts else "pending"
+        next_attempt_at = time.time() + backoff_factor * (2 ** attempts)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pending_writes SET attempts = ?, next_attempt_at = ?, last_error = ?, status = ? "
+                "WHERE local_id = ?",
+                (attempts, next_attempt_at, error, status, local_id)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class WriteBehindFlusher:
+    """
+    后台同步线程，将本地缓存中待写入的记忆批量提交到服务端
+    """
+
+    def __init__(self, client: SuperMemoryClient, cache: SuperMemoryCache, batch_size: int = 50,
+                 flush_interval: float = 1.0, max_attempts: int = 5, backoff_factor: float = 1.0):
+        """
+        初始化后台同步线程
+
+        Args:
+            client: SuperMemory客户端
+            cache: 本地缓存
+            batch_size: 每批同步的最大记忆数量
+            flush_interval: 两次同步之间的最长间隔(秒)
+            max_attempts: 单条记忆的最大同步次数
+            backoff_factor: 同步失败后的退避基数(秒)
+        """
+        self.client = client
+        self.cache = cache
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self._wakeup = threading.Event()
+        # 同一时刻只允许一个线程同步，避免重复提交同一条写入
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="SuperMemoryWriteBehind", daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        """唤醒后台线程立即同步"""
+        self._wakeup.set()
+
+    def flush_once(self) -> int:
+        """
+        同步一轮到期的写入
+
+        Returns:
+            成功同步的数量
+        """
+        synced = 0
+        with self._flush_lock:
+            while True:
+                writes = self.cache.due_writes(self.batch_size)
+                if not writes:
+                    return synced
+                results = self.client.create_memories([w["body"] for w in writes])
+                failed = 0
+                for write, result in zip(writes, results):
+                    if "error" in result:
+                        failed += 1
+                        self.cache.fail_write(write["local_id"], str(result["error"]), write["attempts"] + 1,
+                                              self.max_attempts, self.backoff_factor)
+                    else:
+                        self.cache.complete_write(write["local_id"], result.get("data") or {})
+                        synced += 1
+                if failed:
+                    logger.warning(f"后台同步失败{failed}条记忆，将退避重试")
+                    return synced
+
+    def flush(self, timeout: float = 30) -> bool:
+        """
+        同步所有到期的写入并等待完成
+
+        Args:
+            timeout: 最长等待时间(秒)
+
+        Returns:
+            是否所有待同步写入都已完成
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.flush_once()
+            if not self.cache.due_writes(1):
+                break
+        return self.cache.pending_count() == 0
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped:
+                break
+            try:
+                self.flush_once()
+            except Exception as e:
+                logger.error(f"后台同步出错: {str(e)}")
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        停止后台线程
+
+        Args:
+            timeout: 等待线程退出的最长时间(秒)
+        """
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout)
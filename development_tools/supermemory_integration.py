@@ -9,10 +9,14 @@ import sys
 import json
 import time
 import logging
-import requests
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Union
 
+try:
+    from .supermemory_client import SuperMemoryClient, SuperMemoryCache, WriteBehindFlusher, memory_data_type
+except ImportError:
+    from supermemory_client import SuperMemoryClient, SuperMemoryCache, WriteBehindFlusher, memory_data_type
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -31,13 +35,21 @@ class SuperMemoryIntegration:
     负责任务进度和历史数据的分类存储
     """
     
-    def __init__(self, api_key: str = None, base_url: str = "https://api.supermemory.ai"):
+    def __init__(self, api_key: str = None, base_url: str = "https://api.supermemory.ai",
+                 cache_path: str = None, write_behind: bool = False, cache_ttl: float = 60,
+                 task_fetch_limit: int = 1000, pool_size: int = 10, flush_interval: float = 1.0):
         """
         初始化SuperMemory.ai集成
         
         Args:
             api_key: SuperMemory API密钥
             base_url: SuperMemory API基础URL
+            cache_path: 本地SQLite缓存路径，为None时不启用缓存
+            write_behind: 是否先写本地缓存、由后台线程批量同步(需要cache_path)
+            cache_ttl: 任务数据完整拉取结果的有效期(秒)
+            task_fetch_limit: 单次拉取任务全部记忆的数量上限
+            pool_size: HTTP连接池大小
+            flush_interval: 后台同步的最长间隔(秒)
         """
         self.api_key = api_key or os.environ.get("SUPERMEMORY_API_KEY")
         if not self.api_key:
@@ -48,6 +60,17 @@ class SuperMemoryIntegration:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.client = SuperMemoryClient(base_url, self.headers, pool_size=pool_size)
+        
+        self.cache_ttl = cache_ttl
+        self.task_fetch_limit = task_fetch_limit
+        self.cache = SuperMemoryCache(cache_path) if cache_path else None
+        self.flusher = None
+        if write_behind:
+            if not self.cache:
+                raise ValueError("write_behind需要同时指定cache_path")
+            if self.api_key:
+                self.flusher = WriteBehindFlusher(self.client, self.cache, flush_interval=flush_interval)
         
         # 六大特性定义
         self.six_features = [
@@ -85,21 +108,8 @@ class SuperMemoryIntegration:
             logger.info(f"模拟API请求: {method} {endpoint}")
             return {"success": True, "data": {"id": f"mock_{int(time.time())}"}}
         
-        url = f"{self.base_url}{endpoint}"
-        
-        try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                json=data
-            )
-            
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API请求失败: {str(e)}")
-            return {"error": str(e), "status": "failed"}
+        # 复用连接池中的长连接，429/5xx自动退避重试
+        return self.client.request(method, endpoint, data)
     
     def create_memory(self, content: str, metadata: Dict = None, tags: List[str] = None) -> Dict:
         """
@@ -121,7 +131,68 @@ class SuperMemoryIntegration:
             "tags": tags or []
         }
         
-        return self._make_api_request("POST", "/v1/memories", data)
+        # 写后同步模式：先写本地缓存，由后台线程批量提交
+        if self.flusher:
+            local_id = self.cache.enqueue_write(data)
+            self.flusher.notify()
+            return {"success": True, "data": {"id": local_id}, "pending": True}
+        
+        result = self._make_api_request("POST", "/v1/memories", data)
+        self._cache_created([data], [result])
+        return result
+    
+    def create_memories(self, items: List[Dict[str, Any]]) -> List[Dict]:
+        """
+        批量创建记忆，服务端支持时合并为一次批量请求，否则通过连接池并发发送
+        
+        Args:
+            items: 记忆列表，每项包含content及可选的metadata、tags
+            
+        Returns:
+            与输入顺序一致的创建结果列表
+        """
+        logger.info(f"批量创建记忆: {len(items)}条")
+        
+        memories = [
+            {
+                "content": item["content"],
+                "metadata": item.get("metadata") or {},
+                "tags": item.get("tags") or []
+            }
+            for item in items
+        ]
+        
+        if self.flusher:
+            local_ids = [self.cache.enqueue_write(memory) for memory in memories]
+            self.flusher.notify()
+            return [{"success": True, "data": {"id": local_id}, "pending": True} for local_id in local_ids]
+        
+        if not self.api_key:
+            return [self._make_api_request("POST", "/v1/memories", memory) for memory in memories]
+        
+        results = self.client.create_memories(memories)
+        self._cache_created(memories, results)
+        return results
+    
+    def _cache_created(self, memories: List[Dict[str, Any]], results: List[Dict]) -> None:
+        """
+        将创建成功的记忆写入本地缓存
+        
+        Args:
+            memories: 请求体列表
+            results: 与请求体对应的创建结果列表
+        """
+        if not self.cache or not self.api_key:
+            return
+        created = []
+        for memory, result in zip(memories, results):
+            if "error" in result:
+                continue
+            data = result.get("data") or {}
+            if data.get("id"):
+                created.append(dict(memory, **data))
+        if created:
+            self.cache.put_memories(created)
     
     def get_memory(self, memory_id: str) -> Dict:
         """
@@ -135,7 +206,18 @@ class SuperMemoryIntegration:
         """
         logger.info(f"获取记忆: {memory_id}")
         
-        return self._make_api_request("GET", f"/v1/memories/{memory_id}")
+        # 读穿透：优先命中本地缓存，未命中时请求服务端并回填
+        if self.cache:
+            cached = self.cache.get_memory(memory_id)
+            if cached is not None:
+                return {"success": True, "data": cached, "cached": True}
+        
+        result = self._make_api_request("GET", f"/v1/memories/{memory_id}")
+        if self.cache and self.api_key and "error" not in result:
+            memory = result.get("data", result)
+            if isinstance(memory, dict) and memory.get("id"):
+                self.cache.put_memories([memory])
+        return result
     
     def update_memory(self, memory_id: str, content: str = None, metadata: Dict = None, tags: List[str] = None) -> Dict:
         """
@@ -160,7 +242,10 @@ class SuperMemoryIntegration:
         if tags is not None:
             data["tags"] = tags
         
-        return self._make_api_request("PUT", f"/v1/memories/{memory_id}", data)
+        result = self._make_api_request("PUT", f"/v1/memories/{memory_id}", data)
+        if self.cache:
+            self.cache.delete_memory(memory_id)
+        return result
     
     def delete_memory(self, memory_id: str) -> Dict:
         """
@@ -174,7 +259,10 @@ class SuperMemoryIntegration:
         """
         logger.info(f"删除记忆: {memory_id}")
         
-        return self._make_api_request("DELETE", f"/v1/memories/{memory_id}")
+        result = self._make_api_request("DELETE", f"/v1/memories/{memory_id}")
+        if self.cache:
+            self.cache.delete_memory(memory_id)
+        return result
     
     def list_memories(self, query: str = None, tags: List[str] = None, limit: int = 10) -> Dict:
         """
@@ -259,6 +347,31 @@ class SuperMemoryIntegration:
         """
         logger.info(f"存储任务数据: task_id={task_id}, feature={feature}, data_type={data_type}")
         
+        memory = self._build_task_memory(task_id, text, feature, data_type)
+        
+        # 创建记忆
+        result = self.create_memory(memory["content"], memory["metadata"], memory["tags"])
+        
+        if "error" in result:
+            logger.error(f"存储任务数据失败: {result['error']}")
+        else:
+            logger.info(f"存储任务数据成功: memory_id={result.get('data', {}).get('id')}")
+        
+        return result
+    
+    def _build_task_memory(self, task_id: str, text: str, feature: str = None, data_type: str = None) -> Dict:
+        """
+        构建任务数据对应的记忆请求体
+        
+        Args:
+            task_id: 任务ID
+            text: 文本内容
+            feature: 特性类别（可选，如果为None则自动判断）
+            data_type: 数据类型（可选，如果为None则自动分类）
+            
+        Returns:
+            包含content、metadata和tags的字典
+        """
         # 如果未指定特性，尝试自动判断
         if not feature:
             feature = self._determine_feature(text)
@@ -282,15 +395,32 @@ class SuperMemoryIntegration:
             f"type:{data_type}"
         ]
         
-        # 创建记忆
-        result = self.create_memory(text, metadata, tags)
+        return {"content": text, "metadata": metadata, "tags": tags}
+    
+    def store_task_data_batch(self, task_id: str, texts: List[str], feature: str = None,
+                              data_type: str = None) -> List[Dict]:
+        """
+        批量存储任务数据，合并为一次批量创建
         
-        if "error" in result:
-            logger.error(f"存储任务数据失败: {result['error']}")
-        else:
-            logger.info(f"存储任务数据成功: memory_id={result.get('data', {}).get('id')}")
+        Args:
+            task_id: 任务ID
+            texts: 文本内容列表
+            feature: 特性类别（可选，如果为None则逐条自动判断）
+            data_type: 数据类型（可选，如果为None则逐条自动分类）
+            
+        Returns:
+            与输入顺序一致的存储结果列表
+        """
+        logger.info(f"批量存储任务数据: task_id={task_id}, {len(texts)}条")
         
-        return result
+        memories = [self._build_task_memory(task_id, text, feature, data_type) for text in texts]
+        results = self.create_memories(memories)
+        
+        failed = sum(1 for result in results if "error" in result)
+        if failed:
+            logger.error(f"批量存储任务数据失败{failed}条")
+        
+        return results
     
     def _determine_feature(self, text: str) -> str:
         """
@@ -346,6 +476,15 @@ class SuperMemoryIntegration:
         """
         logger.info(f"获取任务数据: task_id={task_id}, data_type={data_type}, feature={feature}")
         
+        # 启用缓存时从任务的完整拉取结果中筛选，多个类型的查询共用一次请求
+        if self.cache:
+            memories = self._fetch_task_memories(task_id)
+            return [
+                memory for memory in memories
+                if (not data_type or memory_data_type(memory) == data_type)
+                and (not feature or self._memory_feature(memory) == feature)
+            ][:limit]
+        
         # 构建标签
         tags = [f"task:{task_id}"]
         if data_type:
@@ -362,6 +501,88 @@ class SuperMemoryIntegration:
         
         return result.get("data", [])
     
+    def _fetch_task_memories(self, task_id: str) -> List[Dict]:
+        """
+        一次拉取任务的全部记忆，启用缓存时在有效期内直接读取本地结果
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            任务记忆列表(启用写后同步时包含尚未同步的记忆)
+        """
+        if self.cache:
+            age = self.cache.snapshot_age(task_id)
+            if self.api_key and (age is None or age > self.cache_ttl):
+                fetched_at = time.time()
+                result = self.list_memories(tags=[f"task:{task_id}"], limit=self.task_fetch_limit)
+                if "error" in result:
+                    logger.error(f"拉取任务数据失败，使用本地缓存: {result['error']}")
+                else:
+                    self.cache.replace_task_snapshot(task_id, self._memory_items(result), fetched_at)
+            return self.cache.get_task_memories(task_id)
+        
+        result = self.list_memories(tags=[f"task:{task_id}"], limit=self.task_fetch_limit)
+        if "error" in result:
+            logger.error(f"拉取任务数据失败: {result['error']}")
+            return []
+        return self._memory_items(result)
+    
+    @staticmethod
+    def _memory_items(result: Dict) -> List[Dict]:
+        """
+        从列表接口响应中取出记忆列表
+        
+        Args:
+            result: list_memories的响应
+            
+        Returns:
+            记忆列表
+        """
+        items = result.get("data", result.get("memories", []))
+        return items if isinstance(items, list) else []
+    
+    @staticmethod
+    def _memory_feature(memory: Dict) -> Optional[str]:
+        """
+        从记忆的元数据或标签中取出特性类别
+        
+        Args:
+            memory: 记忆对象
+            
+        Returns:
+            特性类别
+        """
+        feature = (memory.get("metadata") or {}).get("feature")
+        if feature:
+            return feature
+        for tag in memory.get("tags") or []:
+            if tag.startswith("feature:"):
+                return tag[len("feature:"):]
+        return None
+    
+    def get_task_overview(self, task_id: str, feature: str = None) -> Dict[str, List[Dict]]:
+        """
+        一次拉取任务数据并按数据类型分组，代替分别调用各类型的获取方法
+        
+        Args:
+            task_id: 任务ID
+            feature: 特性类别（可选）
+            
+        Returns:
+            数据类型到记忆列表的映射
+        """
+        logger.info(f"获取任务概览: task_id={task_id}, feature={feature}")
+        
+        overview = {data_type: [] for data_type in self.data_types}
+        for memory in self._fetch_task_memories(task_id):
+            if feature and self._memory_feature(memory) != feature:
+                continue
+            data_type = memory_data_type(memory)
+            if data_type in overview:
+                overview[data_type].append(memory)
+        return overview
+    
     def get_task_progress(self, task_id: str, feature: str = None) -> List[Dict]:
         """
         获取任务进度
@@ -442,6 +663,57 @@ class SuperMemoryIntegration:
             "feature": feature,
             "result": result
         }
+    
+    def process_manus_outputs(self, task_id: str, texts: List[str]) -> List[Dict]:
+        """
+        批量处理Manus输出文本，自动分类后合并为一次批量存储
+        
+        Args:
+            task_id: 任务ID
+            texts: Manus输出文本列表
+            
+        Returns:
+            与输入顺序一致的处理结果列表
+        """
+        logger.info(f"批量处理Manus输出: task_id={task_id}, {len(texts)}条")
+        
+        memories = [self._build_task_memory(task_id, text) for text in texts]
+        results = self.create_memories(memories)
+        
+        return [
+            {
+                "task_id": task_id,
+                "data_type": memory["metadata"]["data_type"],
+                "feature": memory["metadata"]["feature"],
+                "result": result
+            }
+            for memory, result in zip(memories, results)
+        ]
+    
+    def flush(self, timeout: float = 30) -> bool:
+        """
+        等待写后同步队列中的记忆全部提交到服务端
+        
+        Args:
+            timeout: 最长等待时间(秒)
+            
+        Returns:
+            是否全部同步成功
+        """
+        if not self.flusher:
+            return True
+        return self.flusher.flush(timeout)
+    
+    def close(self) -> None:
+        """停止后台同步并释放连接池和缓存"""
+        if self.flusher:
+            self.flusher.flush()
+            self.flusher.stop()
+            self.flusher = None
+        self.client.close()
+        if self.cache:
+            self.cache.close()
+            self.cache = None
 
 # 示例用法
 def main():
@@ -0,0 +1,376 @@
+"""
+思考与操作日志索引模块 - ThoughtActionIndex
+
+为ThoughtActionRecorder提供基于SQLite的索引存储，避免每次查询都重新读取和解析整个jsonl日志文件。
+主要功能：
+1. 按会话、类型和时间戳建立索引，支持时间范围查询和最新N条查询
+2. 基于FTS5(trigram分词)的关键词全文检索，不支持时自动退化为子串匹配
+3. 记录每个jsonl文件已索引的字节偏移，增量导入历史会话日志
+
+作者: PowerAutomation AI
+日期: 2025-06-02
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger("ThoughtActionIndex")
+
+# 累积多少条未提交的写入后自动提交一次事务
+DEFAULT_COMMIT_INTERVAL = 256
+
+
+class ThoughtActionIndex:
+    """
+    思考与操作日志索引类，使用SQLite存储日志条目并提供查询接口
+    """
+
+    def __init__(self, db_path: str, commit_interval: int = DEFAULT_COMMIT_INTERVAL):
+        """
+        初始化日志索引
+
+        Args:
+            db_path: 索引数据库文件路径
+            commit_interval: 累积多少条写入后提交一次事务
+        """
+        self.db_path = db_path
+        self.commit_interval = max(1, commit_interval)
+        self._pending = 0
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.fts_enabled = self._create_schema()
+        logger.info(f"ThoughtActionIndex opened at {db_path} (fts5: {self.fts_enabled})")
+
+    def _create_schema(self) -> bool:
+        """
+        创建索引表结构
+
+        Returns:
+            是否启用了FTS5全文索引
+        """
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    action_type TEXT,
+                    search_text TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_session_kind_ts
+                    ON entries(session_id, kind, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_entries_kind_ts
+                    ON entries(kind, timestamp);
+                CREATE TABLE IF NOT EXISTS log_offsets (
+                    log_file TEXT PRIMARY KEY,
+                    offset INTEGER NOT NULL
+                );
+            """)
+
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5("
+                    "search_text, content='entries', content_rowid='id', tokenize='trigram')"
+                )
+                fts_enabled = True
+            except sqlite3.OperationalError as e:
+                # 旧版本SQLite不支持FTS5或trigram分词，退化为子串匹配
+                logger.warning(f"FTS5 trigram index unavailable, falling back to substring search: {e}")
+                fts_enabled = False
+
+            self._conn.commit()
+            return fts_enabled
+
+    @staticmethod
+    def build_search_text(entry: Dict[str, Any]) -> str:
+        """
+        生成条目的检索文本，写入时计算一次，查询时无需重新序列化
+
+        Args:
+            entry: 日志条目
+
+        Returns:
+            小写的检索文本
+        """
+        if entry.get("type") == "thought":
+            text = entry.get("content", "") or ""
+        else:
+            text = "\n".join([
+                entry.get("action_type", "") or "",
+                json.dumps(entry.get("action_params", {}), ensure_ascii=False),
+                json.dumps(entry.get("result", {}), ensure_ascii=False)
+            ])
+        return text.lower()
+
+    def add_entry(self, session_id: str, entry: Dict[str, Any], payload: Optional[str] = None,
+                  log_file: Optional[str] = None, log_offset: Optional[int] = None) -> None:
+        """
+        添加一条日志条目到索引
+
+        Args:
+            session_id: 会话ID
+            entry: 日志条目
+            payload: 条目的JSON文本，为None时自动序列化
+            log_file: 条目所在的jsonl文件，用于记录索引偏移
+            log_offset: 写入该条目后jsonl文件的字节偏移
+        """
+        self.add_entries(session_id, [(entry, payload)], log_file, log_offset)
+
+    def add_entries(self, session_id: str, entries: List[Any],
+                    log_file: Optional[str] = None, log_offset: Optional[int] = None) -> None:
+        """
+        批量添加日志条目到索引
+
+        Args:
+            session_id: 会话ID
+            entries: (条目, JSON文本)元组列表，JSON文本可为None
+            log_file: 条目所在的jsonl文件，用于记录索引偏移
+            log_offset: 写入这些条目后jsonl文件的字节偏移
+        """
+        with self._lock:
+            try:
+                for entry, payload in entries:
+                    if payload is None:
+                        payload = json.dumps(entry, ensure_ascii=False)
+                    search_text = self.build_search_text(entry)
+                    cursor = self._conn.execute(
+                        "INSERT INTO entries (session_id, kind, timestamp, action_type, search_text, payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (session_id, entry.get("type", ""), entry.get("timestamp", 0),
+                         entry.get("action_type"), search_text, payload)
+                    )
+                    if self.fts_enabled:
+                        self._conn.execute(
+                            "INSERT INTO entries_fts (rowid, search_text) VALUES (?, ?)",
+                            (cursor.lastrowid, search_text)
+                        )
+                    self._pending += 1
+
+                if log_file is not None and log_offset is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO log_offsets (log_file, offset) VALUES (?, ?)",
+                        (log_file, log_offset)
+                    )
+
+                if self._pending >= self.commit_interval:
+                    self.commit()
+            except Exception as e:
+                logger.error(f"Error indexing entries for session {session_id}: {e}")
+
+    def commit(self) -> None:
+        """
+        提交未完成的写入事务
+        """
+        with self._lock:
+            if self._pending or self._conn.in_transaction:
+                self._conn.commit()
+                self._pending = 0
+
+    def get_log_offset(self, log_file: str) -> int:
+        """
+        获取jsonl文件已索引的字节偏移
+
+        Args:
+            log_file: jsonl文件路径
+
+        Returns:
+            已索引的字节偏移，未索引时为0
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset FROM log_offsets WHERE log_file = ?", (log_file,)
+            ).fetchone()
+            return row[0] if row else 0
+
+    def rename_log_file(self, old_path: str, new_path: str) -> None:
+        """
+        日志文件被重命名(如滚动分段)后，转移其已索引的字节偏移
+
+        Args:
+            old_path: 原文件路径
+            new_path: 新文件路径
+        """
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "UPDATE log_offsets SET log_file = ? WHERE log_file = ?", (new_path, old_path)
+                )
+                self.commit()
+            except Exception as e:
+                logger.error(f"Error renaming indexed log file {old_path}: {e}")
+
+    def sync_log_file(self, session_id: str, log_file: str) -> int:
+        """
+        将jsonl文件中尚未索引的部分增量导入索引
+
+        Args:
+            session_id: 会话ID
+            log_file: jsonl文件路径
+
+        Returns:
+            新导入的条目数量
+        """
+        if not os.path.exists(log_file):
+            return 0
+
+        with self._lock:
+            offset = self.get_log_offset(log_file)
+            if os.path.getsize(log_file) <= offset:
+                return 0
+
+            entries = []
+            try:
+                with open(log_file, "rb") as f:
+                    f.seek(offset)
+                    for raw_line in f:
+                        # 不完整的尾行留到下次同步
+                        if not raw_line.endswith(b"\n"):
+                            break
+                        offset += len(raw_line)
+                        line = raw_line.decode("utf-8").strip()
+                        if not line:
+                            continue
+                        try:
+                            entries.append((json.loads(line), line))
+                        except json.JSONDecodeError as e:
+                            logger.warning(f"Skipping malformed line in {log_file}: {e}")
+            except Exception as e:
+                logger.error(f"Error syncing log file {log_file}: {e}")
+                return 0
+
+            self.add_entries(session_id, entries, log_file, offset)
+            self.commit()
+            if entries:
+                logger.info(f"Indexed {len(entries)} entries from {log_file}")
+            return len(entries)
+
+    def query(self, session_id: Optional[str] = None, kind: Optional[str] = None,
+              keyword: Optional[str] = None, start_time: Optional[float] = None,
+              end_time: Optional[float] = None, limit: Optional[int] = None,
+              latest_first: bool = False) -> List[Dict[str, Any]]:
+        """
+        查询日志条目
+
+        Args:
+            session_id: 会话ID，为None时查询所有会话
+            kind: 条目类型(thought/action)，为None时查询所有类型
+            keyword: 关键词，大小写不敏感的子串匹配
+            start_time: 起始时间戳(包含)
+            end_time: 结束时间戳(不包含)
+            limit: 返回的最大条目数
+            latest_first: 是否按时间戳降序返回，否则按写入顺序返回
+
+        Returns:
+            匹配的日志条目列表
+        """
+        clauses = []
+        params: List[Any] = []
+
+        if session_id is not None:
+            clauses.append("e.session_id = ?")
+            params.append(session_id)
+        if kind is not None:
+            clauses.append("e.kind = ?")
+            params.append(kind)
+        if start_time is not None:
+            clauses.append("e.timestamp >= ?")
+            params.append(start_time)
+        if end_time is not None:
+            clauses.append("e.timestamp < ?")
+            params.append(end_time)
+
+        source = "entries e"
+        if keyword:
+            keyword = keyword.lower()
+            # trigram分词要求关键词至少3个字符
+            if self.fts_enabled and len(keyword) >= 3:
+                source = "entries_fts f JOIN entries e ON e.id = f.rowid"
+                clauses.append("entries_fts MATCH ?")
+                params.append('"' + keyword.replace('"', '""') + '"')
+            else:
+                clauses.append("instr(e.search_text, ?) > 0")
+                params.append(keyword)
+
+        sql = f"SELECT e.payload FROM {source}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY e.timestamp DESC, e.id DESC" if latest_first else " ORDER BY e.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except Exception as e:
+                logger.error(f"Error querying log index: {e}")
+                return []
+
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, session_id: Optional[str] = None, kind: Optional[str] = None) -> int:
+        """
+        统计日志条目数量
+
+        Args:
+            session_id: 会话ID，为None时统计所有会话
+            kind: 条目类型，为None时统计所有类型
+
+        Returns:
+            条目数量
+        """
+        sql = "SELECT COUNT(*) FROM entries WHERE 1=1"
+        params: List[Any] = []
+        if session_id is not None:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        if kind is not None:
+            sql += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def delete_session(self, session_id: str, log_files: Optional[List[str]] = None) -> None:
+        """
+        删除会话的所有索引条目
+
+        Args:
+            session_id: 会话ID
+            log_files: 该会话的jsonl文件，同时清除其索引偏移
+        """
+        with self._lock:
+            try:
+                if self.fts_enabled:
+                    self._conn.execute(
+                        "INSERT INTO entries_fts (entries_fts, rowid, search_text) "
+                        "SELECT 'delete', id, search_text FROM entries WHERE session_id = ?",
+                        (session_id,)
+                    )
+                self._conn.execute("DELETE FROM entries WHERE session_id = ?", (session_id,))
+                for log_file in log_files or []:
+                    self._conn.execute("DELETE FROM log_offsets WHERE log_file = ?", (log_file,))
+                self._conn.commit()
+                self._pending = 0
+            except Exception as e:
+                logger.error(f"Error deleting index for session {session_id}: {e}")
+
+    def close(self) -> None:
+        """
+        提交未完成的写入并关闭数据库连接
+        """
+        with self._lock:
+            try:
+                self.commit()
+                self._conn.close()
+            except Exception as e:
+                logger.error(f"Error closing log index: {e}")
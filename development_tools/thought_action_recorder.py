@@ -8,6 +8,8 @@
 3. 记录操作结果和状态变化
 4. 提供结构化的日志存储和查询
 5. 支持日志压缩和归档
+6. 基于SQLite索引的关键词检索、时间范围查询和最新N条查询
+7. 异步分组提交写入，记录方只做入队操作
 
 作者: PowerAutomation AI
 日期: 2025-05-30
@@ -19,8 +21,16 @@ import time
 import datetime
 import shutil
 import logging
+import weakref
 from typing import Dict, List, Any, Optional, Union
 
+try:
+    from .thought_action_index import ThoughtActionIndex
+    from .async_log_writer import AsyncLogWriter, list_log_segments
+except ImportError:
+    from thought_action_index import ThoughtActionIndex
+    from async_log_writer import AsyncLogWriter, list_log_segments
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -28,23 +38,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ThoughtActionRecorder")
 
+# 日志写入缓冲区大小(字节)
+LOG_WRITE_BUFFER_SIZE = 64 * 1024
+
 class ThoughtActionRecorder:
     """
     思考与操作记录器类，用于记录Agent的思考过程和执行的操作
     """
     
-    def __init__(self, log_dir: str = None):
+    def __init__(self, log_dir: str = None, enable_index: bool = True,
+                 async_write: bool = True, writer_options: Optional[Dict[str, Any]] = None):
         """
         初始化思考与操作记录器
         
         Args:
             log_dir: 日志存储目录，默认为当前工作目录下的logs目录
+            enable_index: 是否启用SQLite索引，禁用时查询退化为逐行读取jsonl文件
+            async_write: 是否通过后台线程异步写入日志
+            writer_options: 传给AsyncLogWriter的参数，如fsync_policy、max_segment_bytes
         """
         self.log_dir = log_dir or os.path.join(os.getcwd(), "logs")
         self.current_session = None
         self.thought_log = None
         self.action_log = None
+        # 持久打开的日志文件句柄及其当前字节偏移，避免每条记录都重新打开文件
+        self._log_handles = {}
+        self._log_offsets = {}
         self.setup_logging()
+        self.index = None
+        if enable_index:
+            try:
+                self.index = ThoughtActionIndex(os.path.join(self.log_dir, "index.db"))
+            except Exception as e:
+                logger.error(f"Error opening log index, falling back to jsonl scans: {e}")
+        self._writer = None
+        if async_write:
+            self._writer = AsyncLogWriter(
+                on_open=self._on_log_open,
+                on_batch=self._on_log_batch,
+                on_rotate=self._on_log_rotate,
+                **(writer_options or {})
+            )
+            # 解释器退出时写完队列中的积压条目
+            self._writer_finalizer = weakref.finalize(self, self._writer.close)
         logger.info(f"ThoughtActionRecorder initialized with log directory: {self.log_dir}")
     
     def setup_logging(self) -> None:
@@ -93,7 +129,8 @@ class ThoughtActionRecorder:
         }
         
         self._append_to_log(self.thought_log, entry)
-        logger.debug(f"Recorded thought: {thought[:50]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Recorded thought: {thought[:50]}...")
         
         return entry
     
@@ -124,31 +161,253 @@ class ThoughtActionRecorder:
         }
         
         self._append_to_log(self.action_log, entry)
-        logger.debug(f"Recorded action: {action_type}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Recorded action: {action_type}")
         
         return entry
     
+    def _get_log_handle(self, log_file: str):
+        """
+        获取日志文件的持久写入句柄，不存在时打开并缓存
+        
+        Args:
+            log_file: 日志文件路径
+            
+        Returns:
+            以追加模式打开的二进制缓冲写入句柄
+        """
+        handle = self._log_handles.get(log_file)
+        if handle is None or handle.closed:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            # 先补齐文件中已有但未索引的条目，之后的写入在追加时直接索引
+            if self.index is not None:
+                self.index.sync_log_file(os.path.basename(os.path.dirname(log_file)), log_file)
+            handle = open(log_file, "ab", buffering=LOG_WRITE_BUFFER_SIZE)
+            self._log_handles[log_file] = handle
+            self._log_offsets[log_file] = os.path.getsize(log_file)
+        return handle
+    
+    def _close_log_handle(self, log_file: str) -> None:
+        """
+        关闭日志文件的持久写入句柄
+        
+        Args:
+            log_file: 日志文件路径
+        """
+        handle = self._log_handles.pop(log_file, None)
+        self._log_offsets.pop(log_file, None)
+        if handle is not None and not handle.closed:
+            try:
+                handle.close()
+            except Exception as e:
+                logger.error(f"Error closing log file {log_file}: {e}")
+    
     def _append_to_log(self, log_file: str, entry: Dict[str, Any]) -> None:
         """
-        将条目追加到日志文件
+        将条目追加到日志文件，并写入索引
         
         Args:
             log_file: 日志文件路径
             entry: 要追加的条目
         """
+        if self._writer is not None:
+            # 提交时序列化为不可变的JSON文本，调用方之后修改返回的条目或参数不影响写入内容，
+            # 写入器也不必再序列化一次
+            try:
+                payload = json.dumps(entry, ensure_ascii=False)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Dropping unserializable log entry for {log_file}: {e}")
+                return
+            self._writer.submit(log_file, payload)
+            return
+        
+        payload = json.dumps(entry, ensure_ascii=False)
+        data = (payload + "\n").encode("utf-8")
         try:
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._get_log_handle(log_file).write(data)
         except Exception as e:
             logger.error(f"Error appending to log file {log_file}: {e}")
-            # 尝试创建目录
-            os.makedirs(os.path.dirname(log_file), exist_ok=True)
-            # 重试一次
+            # 丢弃失效的句柄后重试一次
+            self._close_log_handle(log_file)
             try:
-                with open(log_file, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._get_log_handle(log_file).write(data)
             except Exception as e2:
                 logger.error(f"Second attempt failed: {e2}")
+                return
+        
+        self._log_offsets[log_file] += len(data)
+        if self.index is not None:
+            session_id = os.path.basename(os.path.dirname(log_file))
+            self.index.add_entry(session_id, entry, payload, log_file, self._log_offsets[log_file])
+    
+    def _on_log_open(self, log_file: str) -> None:
+        """
+        异步写入器打开日志文件前，先补齐文件中已有但未索引的条目
+        
+        Args:
+            log_file: 日志文件路径
+        """
+        if self.index is not None:
+            self.index.sync_log_file(os.path.basename(os.path.dirname(log_file)), log_file)
+    
+    def _on_log_batch(self, log_file: str, records: List[Any], offset: int) -> None:
+        """
+        异步写入器写完一批条目后写入索引
+        
+        Args:
+            log_file: 日志文件路径
+            records: (条目, JSON文本)列表
+            offset: 写入后的字节偏移
+        """
+        if self.index is not None:
+            self.index.add_entries(os.path.basename(os.path.dirname(log_file)), records, log_file, offset)
+    
+    def _on_log_rotate(self, log_file: str, segment_file: str) -> None:
+        """
+        异步写入器滚动分段后，将索引偏移转移到新分段文件
+        
+        Args:
+            log_file: 原活动日志文件路径
+            segment_file: 滚动后的分段文件路径
+        """
+        if self.index is not None:
+            self.index.rename_log_file(log_file, segment_file)
+    
+    def flush(self) -> None:
+        """
+        将缓冲的日志写入磁盘并提交索引事务
+        """
+        if self._writer is not None:
+            self._writer.flush()
+        for log_file, handle in list(self._log_handles.items()):
+            try:
+                if not handle.closed:
+                    handle.flush()
+            except Exception as e:
+                logger.error(f"Error flushing log file {log_file}: {e}")
+        if self.index is not None:
+            self.index.commit()
+    
+    def close(self) -> None:
+        """
+        刷新并关闭所有日志文件句柄和索引
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer_finalizer.detach()
+            self._writer = None
+        self.flush()
+        for log_file in list(self._log_handles):
+            self._close_log_handle(log_file)
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+    
+    def _session_log_files(self, session_id: str) -> Dict[str, str]:
+        """
+        获取会话的日志文件路径
+        
+        Args:
+            session_id: 会话ID
+            
+        Returns:
+            类型到jsonl文件路径的映射
+        """
+        session_dir = os.path.join(self.log_dir, session_id)
+        return {
+            "thought": os.path.join(session_dir, "thoughts.jsonl"),
+            "action": os.path.join(session_dir, "actions.jsonl")
+        }
+    
+    def _sync_index(self, session_id: str) -> None:
+        """
+        将会话中尚未索引的jsonl条目导入索引(例如索引建立前写入的历史会话)
+        
+        Args:
+            session_id: 会话ID
+        """
+        if self._writer is not None:
+            self._writer.flush()
+        for active_log in self._session_log_files(session_id).values():
+            for log_file in list_log_segments(active_log):
+                # 本记录器写入的文件已在写入时索引，只有外部写入的内容需要同步
+                handle = self._log_handles.get(log_file)
+                if handle is not None and not handle.closed:
+                    continue
+                if self._writer is not None and self._writer.owns(log_file):
+                    continue
+                self.index.sync_log_file(session_id, log_file)
+    
+    def _release_session(self, session_id: str) -> None:
+        """
+        关闭会话日志文件的写入句柄并删除其索引条目
+        
+        Args:
+            session_id: 会话ID
+        """
+        log_files = []
+        for active_log in self._session_log_files(session_id).values():
+            log_files.extend(list_log_segments(active_log))
+            if active_log not in log_files:
+                log_files.append(active_log)
+        for log_file in log_files:
+            self._close_log_handle(log_file)
+            if self._writer is not None:
+                self._writer.close_file(log_file)
+        if self.index is not None:
+            self.index.delete_session(session_id, log_files)
+    
+    def query_logs(self, session_id: Optional[str] = None, kind: Optional[str] = None,
+                   keyword: Optional[str] = None, start_time: Optional[float] = None,
+                   end_time: Optional[float] = None, limit: Optional[int] = None,
+                   latest_first: bool = False, all_sessions: bool = False) -> List[Dict[str, Any]]:
+        """
+        按条件查询日志，索引可用时无需加载整个会话
+        
+        Args:
+            session_id: 会话ID，如果为None则使用当前会话
+            kind: 条目类型(thought/action)，为None时查询所有类型
+            keyword: 关键词，大小写不敏感
+            start_time: 起始时间戳(包含)
+            end_time: 结束时间戳(不包含)
+            limit: 返回的最大条目数
+            latest_first: 是否按时间戳降序返回
+            all_sessions: 是否跨所有会话查询
+            
+        Returns:
+            匹配的日志条目列表
+        """
+        if all_sessions:
+            session_id = None
+            sessions = self.get_all_sessions()
+        else:
+            session_id = session_id or self.current_session
+            sessions = [session_id]
+        
+        if self.index is not None:
+            for session in sessions:
+                self._sync_index(session)
+            return self.index.query(session_id=session_id, kind=kind, keyword=keyword,
+                                    start_time=start_time, end_time=end_time,
+                                    limit=limit, latest_first=latest_first)
+        
+        # 无索引时逐个会话扫描jsonl文件
+        entries = []
+        for session in sessions:
+            logs = self._read_session_files(session)
+            for entry in logs["thoughts"] + logs["actions"]:
+                if kind is not None and entry.get("type") != kind:
+                    continue
+                if start_time is not None and entry.get("timestamp", 0) < start_time:
+                    continue
+                if end_time is not None and entry.get("timestamp", 0) >= end_time:
+                    continue
+                if keyword and keyword.lower() not in ThoughtActionIndex.build_search_text(entry):
+                    continue
+                entries.append(entry)
+        if latest_first:
+            entries.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
+        return entries[:limit] if limit is not None else entries
     
     def get_session_logs(self, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -161,32 +420,15 @@ class ThoughtActionRecorder:
             包含会话ID、思考日志和操作日志的字典
         """
         session_id = session_id or self.current_session
-        session_dir = os.path.join(self.log_dir, session_id)
         
-        thoughts = []
-        actions = []
-        
-        # 读取思考日志
-        thought_log = os.path.join(session_dir, "thoughts.jsonl")
-        if os.path.exists(thought_log):
-            try:
-                with open(thought_log, "r", encoding="utf-8") as f:
-                    for line in f:
-                        if line.strip():
-                            thoughts.append(json.loads(line))
-            except Exception as e:
-                logger.error(f"Error reading thought log {thought_log}: {e}")
-        
-        # 读取操作日志
-        action_log = os.path.join(session_dir, "actions.jsonl")
-        if os.path.exists(action_log):
-            try:
-                with open(action_log, "r", encoding="utf-8") as f:
-                    for line in f:
-                        if line.strip():
-                            actions.append(json.loads(line))
-            except Exception as e:
-                logger.error(f"Error reading action log {action_log}: {e}")
+        if self.index is not None:
+            self._sync_index(session_id)
+            thoughts = self.index.query(session_id=session_id, kind="thought")
+            actions = self.index.query(session_id=session_id, kind="action")
+        else:
+            logs = self._read_session_files(session_id)
+            thoughts = logs["thoughts"]
+            actions = logs["actions"]
         
         logger.info(f"Retrieved logs for session {session_id}: {len(thoughts)} thoughts, {len(actions)} actions")
         
@@ -196,6 +438,38 @@ class ThoughtActionRecorder:
             "actions": actions
         }
     
+    def _read_session_files(self, session_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        直接读取并解析会话的jsonl日志文件
+        
+        Args:
+            session_id: 会话ID
+            
+        Returns:
+            包含思考日志和操作日志的字典
+        """
+        self.flush()
+        logs = {"thought": [], "action": []}
+        
+        for kind, active_log in self._session_log_files(session_id).items():
+            # 依次读取已滚动的分段和活动文件
+            for log_file in list_log_segments(active_log):
+                try:
+                    with open(log_file, "r", encoding="utf-8") as f:
+                        for line in f:
+                            if line.strip():
+                                logs[kind].append(json.loads(line))
+                except Exception as e:
+                    logger.error(f"Error reading {kind} log {log_file}: {e}")
+        
+        thoughts = logs["thought"]
+        actions = logs["action"]
+        
+        return {
+            "thoughts": thoughts,
+            "actions": actions
+        }
+    
     def get_all_sessions(self) -> List[str]:
         """
         获取所有会话ID
@@ -223,11 +497,7 @@ class ThoughtActionRecorder:
         Returns:
             最新的思考记录列表
         """
-        logs = self.get_session_logs()
-        thoughts = logs.get("thoughts", [])
-        # 按时间戳降序排序
-        thoughts.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-        return thoughts[:count]
+        return self.query_logs(kind="thought", limit=count, latest_first=True)
     
     def get_latest_actions(self, count: int = 10) -> List[Dict[str, Any]]:
         """
@@ -239,11 +509,7 @@ class ThoughtActionRecorder:
         Returns:
             最新的操作记录列表
         """
-        logs = self.get_session_logs()
-        actions = logs.get("actions", [])
-        # 按时间戳降序排序
-        actions.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-        return actions[:count]
+        return self.query_logs(kind="action", limit=count, latest_first=True)
     
     def search_logs(self, keyword: str, session_id: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -256,35 +522,8 @@ class ThoughtActionRecorder:
         Returns:
             包含匹配的思考和操作记录的字典
         """
-        logs = self.get_session_logs(session_id)
-        
-        matched_thoughts = []
-        matched_actions = []
-        
-        # 搜索思考记录
-        for thought in logs.get("thoughts", []):
-            content = thought.get("content", "").lower()
-            if keyword.lower() in content:
-                matched_thoughts.append(thought)
-        
-        # 搜索操作记录
-        for action in logs.get("actions", []):
-            # 搜索操作类型
-            action_type = action.get("action_type", "").lower()
-            if keyword.lower() in action_type:
-                matched_actions.append(action)
-                continue
-                
-            # 搜索操作参数
-            params_str = json.dumps(action.get("action_params", {}), ensure_ascii=False).lower()
-            if keyword.lower() in params_str:
-                matched_actions.append(action)
-                continue
-                
-            # 搜索操作结果
-            result_str = json.dumps(action.get("result", {}), ensure_ascii=False).lower()
-            if keyword.lower() in result_str:
-                matched_actions.append(action)
+        matched_thoughts = self.query_logs(session_id=session_id, kind="thought", keyword=keyword)
+        matched_actions = self.query_logs(session_id=session_id, kind="action", keyword=keyword)
         
         logger.info(f"Search for '{keyword}' found {len(matched_thoughts)} thoughts and {len(matched_actions)} actions")
         
@@ -328,6 +567,7 @@ class ThoughtActionRecorder:
                         archive_session_dir = os.path.join(archive_dir, session)
                         
                         # 移动会话目录到归档目录
+                        self._release_session(session)
                         shutil.move(session_dir, archive_session_dir)
                         archived_sessions.append(session)
                         logger.info(f"Archived session {session}")
@@ -431,14 +671,14 @@ class ThoughtActionRecorder:
             session_dir = os.path.join(self.log_dir, self.current_session)
             
             if os.path.exists(session_dir):
+                self.flush()
                 shutil.copytree(session_dir, backup_session_dir)
                 
-                # 清除当前日志文件
-                if os.path.exists(self.thought_log):
-                    os.remove(self.thought_log)
-                
-                if os.path.exists(self.action_log):
-                    os.remove(self.action_log)
+                # 清除当前日志文件及其已滚动的分段
+                self._release_session(self.current_session)
+                for active_log in (self.thought_log, self.action_log):
+                    for log_file in list_log_segments(active_log):
+                        os.remove(log_file)
                 
                 logger.info(f"Cleared current session {self.current_session}, backup at {backup_session_dir}")
                 return {"success": True, "backup": backup_session_dir}
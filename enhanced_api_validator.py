@@ -7,16 +7,20 @@
 import requests
 import json
 import time
+import asyncio
 import logging
 import os
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime
-import sqlite3
-import threading
 from concurrent.futures import ThreadPoolExecutor
 import statistics
 
+from requests.adapters import HTTPAdapter
+
+from mcptool.adapters.async_http import AsyncHTTPConnectionPool, AsyncPacer
+from mcptool.adapters.metrics_sink import MetricsSink, RollupSpec
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -34,6 +38,8 @@ class APIEndpoint:
     auth_required: bool = True
     timeout: int = 30
     expected_status: int = 200
+    max_concurrency: int = 4  # 异步验证时该端点同时进行的请求数
+    requests_per_second: Optional[float] = None  # 异步验证时该端点的请求节奏，为None时不限制
 
 @dataclass
 class ValidationResult:
@@ -45,14 +51,28 @@ class ValidationResult:
     error_message: Optional[str] = None
     response_data: Optional[Dict] = None
     timestamp: datetime = None
+    timing: Optional[Dict[str, Any]] = None  # 耗时分解: queue/dns/connect/ttfb/transfer/total(秒)
+
+# 耗时分解中写入数据库的阶段，对应enhanced_api_results的<阶段>_time列
+TIMING_PHASES = ["dns", "connect", "ttfb", "transfer"]
 
 class EnhancedAPIValidator:
     """增强版真实API验证器"""
     
-    def __init__(self):
-        self.db_path = "/home/ubuntu/powerautomation/enhanced_api_validation.db"
+    RESULT_COLUMNS = ["endpoint_name", "success", "response_time", "status_code",
+                      "error_message", "response_data", "timestamp"] + [f"{phase}_time" for phase in TIMING_PHASES]
+    
+    def __init__(self, db_path: str = "/home/ubuntu/powerautomation/enhanced_api_validation.db",
+                 pool_size: int = 20):
+        self.db_path = db_path
         self.init_database()
         
+        # 同步调用共用一个keep-alive会话
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
         # 配置更多真实的API端点
         self.endpoints = self._configure_enhanced_endpoints()
         
@@ -166,10 +186,10 @@ class EnhancedAPIValidator:
     
     def init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # 验证结果由WAL模式的长连接在后台批量提交
+        self.metrics_sink = MetricsSink.shared(self.db_path)
         
-        cursor.execute('''
+        self.metrics_sink.execute_script('''
             CREATE TABLE IF NOT EXISTS enhanced_api_results (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 endpoint_name TEXT NOT NULL,
@@ -179,74 +199,87 @@ class EnhancedAPIValidator:
                 error_message TEXT,
                 response_data TEXT,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
+            );
+            CREATE INDEX IF NOT EXISTS idx_enhanced_api_results_endpoint
+                ON enhanced_api_results (endpoint_name, timestamp);
         ''')
         
-        conn.commit()
-        conn.close()
+        # 旧数据库没有耗时分解列，补齐
+        existing = {row["name"] for row in self.metrics_sink.query("PRAGMA table_info(enhanced_api_results)")}
+        for phase in TIMING_PHASES:
+            if f"{phase}_time" not in existing:
+                self.metrics_sink.execute_script(f"ALTER TABLE enhanced_api_results ADD COLUMN {phase}_time REAL;")
+        
+        # 按端点和分钟汇总，报告生成时直接读取
+        self.metrics_sink.register_table("enhanced_api_results", self.RESULT_COLUMNS, RollupSpec(
+            table="enhanced_api_results_rollup",
+            group_by=["endpoint_name"],
+            value_columns=["response_time"],
+            is_error=lambda row: not row["success"]
+        ))
         logger.info("增强版数据库初始化完成")
     
+    def _request_payload(self, endpoint: APIEndpoint, payload: Optional[Dict] = None) -> Optional[Dict]:
+        """根据端点准备特定的payload，GET和DELETE不带请求体"""
+        if endpoint.method.upper() not in ("POST", "PUT"):
+            return None
+        if endpoint.name == "httpbin_post":
+            return {
+                "test": "data",
+                "timestamp": datetime.now().isoformat(),
+                "validator": "PowerAutomation"
+            }
+        return payload
+    
+    def _build_result(self, endpoint: APIEndpoint, status_code: int, text: str, response_time: float,
+                      timing: Optional[Dict[str, Any]] = None) -> ValidationResult:
+        """根据响应生成验证结果"""
+        # 解析响应
+        try:
+            response_data = json.loads(text)
+        except ValueError:
+            response_data = {"raw_response": text[:500]}
+        
+        # 判断成功条件 - 考虑预期状态码
+        if endpoint.expected_status != 200:
+            success = status_code == endpoint.expected_status
+        else:
+            success = status_code < 400
+        
+        error_message = None if success else f"HTTP {status_code}: {text[:200]}"
+        
+        return ValidationResult(
+            endpoint_name=endpoint.name,
+            success=success,
+            response_time=response_time,
+            status_code=status_code,
+            error_message=error_message,
+            response_data=response_data,
+            timestamp=datetime.now(),
+            timing=timing
+        )
+    
     def make_api_call(self, endpoint: APIEndpoint, payload: Optional[Dict] = None) -> ValidationResult:
-        """执行真实的API调用"""
+        """执行真实的API调用，通过共享会话复用连接"""
         start_time = time.time()
         
         try:
-            # 准备请求参数
-            kwargs = {
-                'url': endpoint.url,
-                'headers': endpoint.headers,
-                'timeout': endpoint.timeout
-            }
-            
-            # 根据端点准备特定的payload
-            if endpoint.name == "httpbin_post":
-                kwargs['json'] = {
-                    "test": "data",
-                    "timestamp": datetime.now().isoformat(),
-                    "validator": "PowerAutomation"
-                }
-            elif payload:
-                kwargs['json'] = payload
+            method = endpoint.method.upper()
+            if method not in ("GET", "POST", "PUT", "DELETE"):
+                raise ValueError(f"不支持的HTTP方法: {endpoint.method}")
             
             # 执行HTTP请求
-            if endpoint.method.upper() == "GET":
-                response = requests.get(**{k: v for k, v in kwargs.items() if k != 'json'})
-            elif endpoint.method.upper() == "POST":
-                response = requests.post(**kwargs)
-            elif endpoint.method.upper() == "PUT":
-                response = requests.put(**kwargs)
-            elif endpoint.method.upper() == "DELETE":
-                response = requests.delete(**{k: v for k, v in kwargs.items() if k != 'json'})
-            else:
-                raise ValueError(f"不支持的HTTP方法: {endpoint.method}")
+            response = self.session.request(
+                method, endpoint.url, headers=endpoint.headers, timeout=endpoint.timeout,
+                json=self._request_payload(endpoint, payload)
+            )
             
             response_time = time.time() - start_time
+            # requests只提供发送请求到解析完响应头的耗时
+            timing = {"ttfb": response.elapsed.total_seconds(), "total": response_time}
+            result = self._build_result(endpoint, response.status_code, response.text, response_time, timing)
             
-            # 解析响应
-            try:
-                response_data = response.json()
-            except:
-                response_data = {"raw_response": response.text[:500]}
-            
-            # 判断成功条件 - 考虑预期状态码
-            if endpoint.expected_status != 200:
-                success = response.status_code == endpoint.expected_status
-            else:
-                success = response.status_code < 400
-            
-            error_message = None if success else f"HTTP {response.status_code}: {response.text[:200]}"
-            
-            result = ValidationResult(
-                endpoint_name=endpoint.name,
-                success=success,
-                response_time=response_time,
-                status_code=response.status_code,
-                error_message=error_message,
-                response_data=response_data,
-                timestamp=datetime.now()
-            )
-            
-            status_emoji = "✅" if success else "❌"
+            status_emoji = "✅" if result.success else "❌"
             logger.info(f"{status_emoji} {endpoint.name}: {response_time:.3f}s (HTTP {response.status_code})")
             return result
             
@@ -267,26 +300,21 @@ class EnhancedAPIValidator:
             return result
     
     def save_result(self, result: ValidationResult):
-        """保存验证结果到数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO enhanced_api_results 
-            (endpoint_name, success, response_time, status_code, error_message, response_data, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        """保存验证结果到数据库，由写入器后台批量提交"""
+        self.metrics_sink.write("enhanced_api_results", (
             result.endpoint_name,
             result.success,
             result.response_time,
             result.status_code,
             result.error_message,
             json.dumps(result.response_data) if result.response_data else None,
-            result.timestamp
-        ))
-        
-        conn.commit()
-        conn.close()
+            (result.timestamp or datetime.now()).isoformat(" ")
+        ) + tuple((result.timing or {}).get(phase) for phase in TIMING_PHASES))
+    
+    def get_endpoint_rollup(self) -> List[Dict[str, Any]]:
+        """从汇总表读取各端点的历史请求数、错误率和响应时间"""
+        self.metrics_sink.flush()
+        return self.metrics_sink.rollup_summary("enhanced_api_results")
     
     def validate_single_endpoint(self, endpoint: APIEndpoint) -> ValidationResult:
         """验证单个API端点"""
@@ -320,11 +348,124 @@ class EnhancedAPIValidator:
         
         return results
     
+    async def make_api_call_async(self, endpoint: APIEndpoint, pool: AsyncHTTPConnectionPool,
+                                  payload: Optional[Dict] = None) -> ValidationResult:
+        """
+        通过异步连接池执行API调用，结果带有DNS/连接/首字节/传输耗时分解
+        
+        Args:
+            endpoint: API端点
+            pool: 异步连接池
+            payload: 请求体
+            
+        Returns:
+            验证结果
+        """
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        try:
+            method = endpoint.method.upper()
+            if method not in ("GET", "POST", "PUT", "DELETE"):
+                raise ValueError(f"不支持的HTTP方法: {endpoint.method}")
+            data = self._request_payload(endpoint, payload)
+            headers = dict(endpoint.headers)
+            body = b""
+            if data is not None:
+                body = json.dumps(data).encode("utf-8")
+                headers.setdefault("Content-Type", "application/json")
+            
+            response = await asyncio.wait_for(pool.fetch(method, endpoint.url, headers, body), endpoint.timeout)
+            response_time = loop.time() - start_time
+            result = self._build_result(endpoint, response.status, response.text(), response_time,
+                                        response.timing.to_dict())
+            logger.debug(f"{endpoint.name}: {response_time:.3f}s (HTTP {response.status})")
+            return result
+        
+        except Exception as e:
+            error_message = str(e) or type(e).__name__
+            logger.error(f"❌ {endpoint.name}: {error_message}")
+            return ValidationResult(
+                endpoint_name=endpoint.name,
+                success=False,
+                response_time=loop.time() - start_time,
+                status_code=0,
+                error_message=error_message,
+                timestamp=datetime.now()
+            )
+    
+    async def validate_endpoints_async(self, endpoints: Optional[List[APIEndpoint]] = None,
+                                       repetitions: int = 1, max_connections: int = 200,
+                                       max_connections_per_host: int = 20,
+                                       timeout: float = 30.0) -> List[ValidationResult]:
+        """
+        异步并发验证端点
+        
+        所有请求共用一个连接池，每个主机一组keep-alive连接；每个端点的并发数和请求节奏
+        由APIEndpoint.max_concurrency和requests_per_second控制。每个结果完成后立即写入
+        批量写入器，不等全部请求结束。
+        
+        Args:
+            endpoints: 要验证的端点，默认全部端点
+            repetitions: 每个端点请求的次数
+            max_connections: 全局连接数上限
+            max_connections_per_host: 单个主机的连接数上限
+            timeout: 建立连接和读取响应的超时时间(秒)
+            
+        Returns:
+            验证结果，按完成顺序排列
+        """
+        endpoints = endpoints if endpoints is not None else self.endpoints
+        logger.info(f"🚀 开始异步验证 {len(endpoints)} 个API端点, 每个{repetitions}次")
+        pool = AsyncHTTPConnectionPool(max_connections, timeout, max_connections_per_host)
+        results: List[ValidationResult] = []
+        
+        async def run_endpoint(endpoint: APIEndpoint):
+            semaphore = asyncio.Semaphore(max(1, endpoint.max_concurrency))
+            pacer = AsyncPacer(endpoint.requests_per_second)
+            
+            async def run_once():
+                async with semaphore:
+                    await pacer.wait()
+                    result = await self.make_api_call_async(endpoint, pool)
+                self.save_result(result)
+                self.results.append(result)
+                results.append(result)
+            
+            await asyncio.gather(*(run_once() for _ in range(repetitions)))
+        
+        try:
+            await asyncio.gather(*(run_endpoint(endpoint) for endpoint in endpoints))
+        finally:
+            await pool.close()
+        
+        success_count = sum(1 for r in results if r.success)
+        logger.info(f"异步验证完成: {success_count}/{len(results)} 成功, "
+                    f"新建连接{pool.stats['connections_opened']}个, 复用{pool.stats['connections_reused']}次")
+        return results
+    
     def run_stress_test(self, endpoint_names: List[str], duration_seconds: int = 30, concurrent_users: int = 3):
-        """对指定端点进行压力测试"""
+        """对指定端点进行压力测试，在新的事件循环中运行run_stress_test_async"""
+        return asyncio.run(self.run_stress_test_async(endpoint_names, duration_seconds, concurrent_users))
+    
+    async def run_stress_test_async(self, endpoint_names: List[str], duration_seconds: float = 30,
+                                    concurrent_users: int = 3, think_time: float = 0.2) -> List[ValidationResult]:
+        """
+        对指定端点进行压力测试，每个并发用户是一个协程，共用keep-alive连接池
+        
+        Args:
+            endpoint_names: 端点名称
+            duration_seconds: 每个端点的测试时长(秒)
+            concurrent_users: 并发用户数
+            think_time: 每个用户两次请求之间的间隔(秒)
+            
+        Returns:
+            全部请求的验证结果
+        """
         logger.info(f"🔥 开始压力测试: {len(endpoint_names)}个端点, {concurrent_users}并发, {duration_seconds}秒")
         
         all_results = []
+        pool = AsyncHTTPConnectionPool(max(concurrent_users, 1) * 2, 30.0, max(concurrent_users, 1))
+        loop = asyncio.get_running_loop()
         
         for endpoint_name in endpoint_names:
             endpoint = next((ep for ep in self.endpoints if ep.name == endpoint_name), None)
@@ -334,23 +475,15 @@ class EnhancedAPIValidator:
             
             logger.info(f"🎯 压力测试: {endpoint_name}")
             
-            start_time = time.time()
+            start_time = loop.time()
             results = []
             
-            def worker():
-                while time.time() - start_time < duration_seconds:
-                    result = self.make_api_call(endpoint)
-                    results.append(result)
-                    time.sleep(0.2)  # 控制请求频率
-            
-            threads = []
-            for _ in range(concurrent_users):
-                thread = threading.Thread(target=worker)
-                thread.start()
-                threads.append(thread)
+            async def worker():
+                while loop.time() - start_time < duration_seconds:
+                    results.append(await self.make_api_call_async(endpoint, pool))
+                    await asyncio.sleep(think_time)  # 控制请求频率
             
-            for thread in threads:
-                thread.join()
+            await asyncio.gather(*(worker() for _ in range(concurrent_users)))
             
             # 分析结果
             if results:
@@ -370,8 +503,31 @@ class EnhancedAPIValidator:
                 
                 all_results.extend(results)
         
+        await pool.close()
         return all_results
     
+    def _latency_breakdown(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """按端点汇总各耗时阶段的平均值和P95(毫秒)"""
+        phases: Dict[str, Dict[str, List[float]]] = {}
+        for result in self.results:
+            if not result.timing:
+                continue
+            endpoint_phases = phases.setdefault(result.endpoint_name, {})
+            for phase in ["queue"] + TIMING_PHASES + ["total"]:
+                if result.timing.get(phase) is not None:
+                    endpoint_phases.setdefault(phase, []).append(result.timing[phase] * 1000)
+        
+        breakdown = {}
+        for endpoint_name, endpoint_phases in phases.items():
+            breakdown[endpoint_name] = {}
+            for phase, values in endpoint_phases.items():
+                values.sort()
+                breakdown[endpoint_name][phase] = {
+                    "avg_ms": statistics.mean(values),
+                    "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))]
+                }
+        return breakdown
+    
     def generate_comprehensive_report(self) -> Dict[str, Any]:
         """生成综合验证报告"""
         if not self.results:
@@ -436,7 +592,9 @@ class EnhancedAPIValidator:
                     "timestamp": r.timestamp.isoformat() if r.timestamp else None
                 }
                 for r in self.results
-            ]
+            ],
+            "latency_breakdown": self._latency_breakdown(),
+            "historical_endpoint_stats": self.get_endpoint_rollup()
         }
         
         return report
@@ -450,7 +608,7 @@ def main():
     
     # 第一阶段: 基础验证
     print("🔍 第一阶段: 基础API连通性验证")
-    results = validator.validate_all_endpoints()
+    results = asyncio.run(validator.validate_endpoints_async())
     
     # 第二阶段: 压力测试
     print("\n🔥 第二阶段: 压力测试")
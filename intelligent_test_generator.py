@@ -9,6 +9,10 @@ import sys
 import json
 import ast
 import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import re
@@ -16,6 +20,13 @@ import re
 # 添加项目路径
 sys.path.append('/home/ubuntu/powerautomation')
 
+# 分析逻辑变化时递增，磁盘缓存中旧版本的结果会整体失效
+ANALYSIS_CACHE_VERSION = 1
+# 项目扫描时跳过的目录
+DEFAULT_EXCLUDE_DIRS = (".git", "__pycache__", ".venv", "venv", "node_modules", "build", "dist", ".tox")
+# 需要解析的文件少于该数量时在当前进程内解析，进程池的启动开销不划算
+PARALLEL_PARSE_THRESHOLD = 16
+
 class IntelligentTestGenerator:
     """智能测试生成器 - AI驱动的测试用例自动生成"""
     
@@ -24,6 +35,7 @@ class IntelligentTestGenerator:
         self.test_patterns = {}
         self.coverage_data = {}
         self.ai_models = self._initialize_ai_models()
+        self.project_analyzer: Optional["ProjectCodeAnalyzer"] = None
         
     def _initialize_ai_models(self) -> Dict:
         """初始化AI模型"""
@@ -34,14 +46,64 @@ class IntelligentTestGenerator:
             "quality_assessor": "claude-3-opus"
         }
     
+    def analyze_project(self, processes: Optional[int] = None,
+                        cache_path: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        增量分析整个项目，首次调用时创建项目分析器
+        
+        Args:
+            processes: 解析文件的进程数
+            cache_path: 磁盘缓存路径
+            
+        Returns:
+            相对路径到分析结果的映射
+        """
+        if self.project_analyzer is None:
+            self.project_analyzer = ProjectCodeAnalyzer(str(self.project_path), cache_path=cache_path,
+                                                        processes=processes)
+        return self.project_analyzer.analyze()
+    
+    def generate_project_tests(self, output_dir: Optional[str] = None) -> Dict[str, str]:
+        """
+        为项目中所有可解析的文件生成测试代码
+        
+        Args:
+            output_dir: 给定时把测试文件写入该目录，文件名为test_<模块名>.py
+            
+        Returns:
+            相对路径到测试代码的映射
+        """
+        tests = {}
+        for relative_path, analysis in self.analyze_project().items():
+            if "error" in analysis or not (analysis["classes"] or analysis["functions"]):
+                continue
+            tests[relative_path] = self.generate_test_code(analysis, relative_path)
+        
+        if output_dir:
+            output = Path(output_dir)
+            output.mkdir(parents=True, exist_ok=True)
+            for relative_path, test_code in tests.items():
+                module = self.project_analyzer.get_analysis(relative_path)["module"]
+                (output / f"test_{module.replace('.', '_')}.py").write_text(test_code, encoding='utf-8')
+        return tests
+    
     def analyze_code_structure(self, file_path: str) -> Dict:
-        """分析代码结构，识别测试需求"""
+        """分析代码结构，识别测试需求；文件在已分析的项目内时使用增量缓存"""
+        if self.project_analyzer is not None and self.project_analyzer.contains(file_path):
+            return self.project_analyzer.analyze_file(file_path)
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 code_content = f.read()
-            
+            return self.analyze_source(code_content)
+        except Exception as e:
+            return {"error": f"代码分析失败: {e}"}
+    
+    def analyze_source(self, code_content: str, tree: Optional[ast.Module] = None) -> Dict:
+        """分析源代码文本，识别测试需求；调用方已解析过时可传入tree避免重复解析"""
+        try:
             # 解析AST
-            tree = ast.parse(code_content)
+            if tree is None:
+                tree = ast.parse(code_content)
             
             analysis = {
                 "functions": [],
@@ -296,7 +358,8 @@ sys.path.append(str(Path(__file__).parent.parent))
     def _generate_imports(self, analysis: Dict, target_file: str) -> str:
         """生成导入语句"""
         imports = f"# 导入被测试模块\\n"
-        module_name = Path(target_file).stem
+        # 项目分析结果带有完整的模块路径
+        module_name = analysis.get("module") or Path(target_file).stem
         imports += f"from {module_name} import *\\n\\n"
         
         return imports
@@ -444,6 +507,259 @@ if __name__ == '__main__':
     unittest.main(verbosity=2)
 '''
 
+def _module_name(relative_path: str) -> str:
+    """把相对路径转为模块名，包的__init__.py对应包名"""
+    parts = list(Path(relative_path).with_suffix("").parts)
+    if parts and parts[-1] == "__init__" and len(parts) > 1:
+        parts.pop()
+    return ".".join(parts)
+
+
+def _collect_symbols(tree: ast.Module) -> List[Dict]:
+    """收集模块顶层的函数、类以及类的方法"""
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append({"name": node.name, "qualname": node.name, "kind": "function", "line": node.lineno})
+        elif isinstance(node, ast.ClassDef):
+            symbols.append({"name": node.name, "qualname": node.name, "kind": "class", "line": node.lineno})
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    symbols.append({"name": item.name, "qualname": f"{node.name}.{item.name}",
+                                    "kind": "method", "line": item.lineno})
+    return symbols
+
+
+def _default_cache_path(root: Path) -> str:
+    """项目分析缓存的默认路径：$XDG_CACHE_HOME（默认~/.cache）下按根目录哈希命名"""
+    cache_home = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    cache_dir = cache_home / "powerautomation" / "intelligent_test"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return str(cache_dir / f"{root.name or 'root'}-{digest}.db")
+
+
+def _analyze_file_worker(code_content: str) -> Dict:
+    """在工作进程中分析一个文件，返回分析结果和顶层符号"""
+    generator = IntelligentTestGenerator()
+    try:
+        tree = ast.parse(code_content)
+    except (SyntaxError, ValueError):
+        # 由analyze_source生成统一格式的错误结果
+        return {"analysis": generator.analyze_source(code_content), "symbols": []}
+    analysis = generator.analyze_source(code_content, tree)
+    symbols = _collect_symbols(tree) if "error" not in analysis else []
+    return {"analysis": analysis, "symbols": symbols}
+
+
+class ProjectCodeAnalyzer:
+    """
+    项目级增量代码分析器
+    
+    每个文件的分析结果按(路径, mtime, 大小, 内容哈希)缓存在SQLite文件中：
+    mtime和大小都没变的文件直接复用，变化的文件先比较内容哈希，只有内容变了才重新解析；
+    需要解析的文件较多时分发到进程池。分析结果同时汇总为跨文件的符号索引。
+    """
+    
+    def __init__(self, root: str, cache_path: Optional[str] = None, processes: Optional[int] = None,
+                 exclude_dirs: Tuple[str, ...] = DEFAULT_EXCLUDE_DIRS):
+        """
+        初始化分析器
+        
+        Args:
+            root: 项目根目录
+            cache_path: 磁盘缓存路径，默认放在用户缓存目录下，按项目根目录区分，不写入被分析的项目
+            processes: 解析文件的进程数，默认为CPU数，为1时不使用进程池
+            exclude_dirs: 跳过的目录名
+        """
+        self.root = Path(root).resolve()
+        self.cache_path = cache_path or _default_cache_path(self.root)
+        self.processes = processes or os.cpu_count() or 1
+        self.exclude_dirs = set(exclude_dirs)
+        self.stats = {"files": 0, "parsed": 0, "rehashed": 0, "reused": 0, "removed": 0, "seconds": 0.0}
+        self._lock = threading.RLock()
+        self._records: Dict[str, Dict] = {}
+        self._symbol_index: Dict[str, List[Dict]] = {}
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_cache()
+    
+    def _init_cache(self):
+        """建表，缓存版本不一致时清空"""
+        with self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS file_analysis (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    analysis TEXT NOT NULL,
+                    symbols TEXT NOT NULL
+                );
+            ''')
+            row = self._conn.execute("SELECT value FROM cache_meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(ANALYSIS_CACHE_VERSION):
+                self._conn.execute("DELETE FROM file_analysis")
+                self._conn.execute("INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('version', ?)",
+                                   (str(ANALYSIS_CACHE_VERSION),))
+        
+        # 缓存整体载入内存，后续按文件状态判断是否有效
+        for path, mtime_ns, size, content_hash, analysis, symbols in self._conn.execute(
+                "SELECT path, mtime_ns, size, content_hash, analysis, symbols FROM file_analysis"):
+            self._records[path] = {"mtime_ns": mtime_ns, "size": size, "content_hash": content_hash,
+                                   "analysis": analysis, "symbols": symbols}
+    
+    def contains(self, file_path: str) -> bool:
+        """文件是否位于项目根目录内"""
+        try:
+            Path(file_path).resolve().relative_to(self.root)
+            return True
+        except ValueError:
+            return False
+    
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """列出项目内的Python文件及其状态"""
+        files = {}
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in self.exclude_dirs]
+            for filename in filenames:
+                if filename.endswith(".py"):
+                    full_path = os.path.join(directory, filename)
+                    files[Path(os.path.relpath(full_path, self.root)).as_posix()] = os.stat(full_path)
+        return files
+    
+    def analyze(self) -> Dict[str, Dict]:
+        """
+        增量分析整个项目
+        
+        Returns:
+            相对路径到分析结果的映射，分析结果带有module和path字段
+        """
+        started = time.perf_counter()
+        with self._lock:
+            files = self._scan()
+            removed = [path for path in self._records if path not in files]
+            for path in removed:
+                del self._records[path]
+            self._refresh(files)
+            if removed:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM file_analysis WHERE path = ?", [(p,) for p in removed])
+            self.stats["files"] = len(files)
+            self.stats["removed"] = len(removed)
+            self._build_symbol_index()
+            results = {path: self.get_analysis(path) for path in sorted(files)}
+        self.stats["seconds"] = time.perf_counter() - started
+        return results
+    
+    def analyze_file(self, file_path: str) -> Dict:
+        """增量分析项目内的单个文件"""
+        path = Path(os.path.relpath(Path(file_path).resolve(), self.root)).as_posix()
+        with self._lock:
+            try:
+                stat = os.stat(self.root / path)
+            except OSError as e:
+                return {"error": f"代码分析失败: {e}"}
+            self._refresh({path: stat})
+            self._build_symbol_index()
+            return self.get_analysis(path)
+    
+    def _refresh(self, files: Dict[str, os.stat_result]):
+        """更新给定文件的缓存，只解析内容发生变化的文件"""
+        to_parse: List[Tuple[str, os.stat_result, str, str]] = []
+        touched = []
+        reused = 0
+        for path, stat in files.items():
+            record = self._records.get(path)
+            if record and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+                reused += 1
+                continue
+            try:
+                content = (self.root / path).read_bytes()
+            except OSError:
+                continue
+            content_hash = hashlib.sha256(content).hexdigest()
+            if record and record["content_hash"] == content_hash:
+                # 只是mtime变了(例如touch或检出)，内容没变
+                record.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                touched.append((stat.st_mtime_ns, stat.st_size, path))
+                continue
+            to_parse.append((path, stat, content_hash, content.decode("utf-8", errors="replace")))
+        
+        sources = [source for _, _, _, source in to_parse]
+        if self.processes > 1 and len(to_parse) >= PARALLEL_PARSE_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                outputs = list(executor.map(_analyze_file_worker, sources,
+                                            chunksize=max(1, len(sources) // (self.processes * 4))))
+        else:
+            outputs = [_analyze_file_worker(source) for source in sources]
+        
+        rows = []
+        for (path, stat, content_hash, _), output in zip(to_parse, outputs):
+            record = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "content_hash": content_hash,
+                      "analysis": json.dumps(output["analysis"], ensure_ascii=False, default=str),
+                      "symbols": json.dumps(output["symbols"], ensure_ascii=False)}
+            self._records[path] = record
+            rows.append((path, record["mtime_ns"], record["size"], content_hash,
+                         record["analysis"], record["symbols"]))
+        
+        if rows or touched:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO file_analysis (path, mtime_ns, size, content_hash, analysis, symbols) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._conn.executemany("UPDATE file_analysis SET mtime_ns = ?, size = ? WHERE path = ?", touched)
+        self.stats["parsed"] = len(rows)
+        self.stats["rehashed"] = len(touched)
+        self.stats["reused"] = reused
+    
+    def _build_symbol_index(self):
+        """由各文件的顶层符号生成名称到定义位置的索引"""
+        index: Dict[str, List[Dict]] = {}
+        for path in sorted(self._records):
+            record = self._records[path]
+            if isinstance(record["symbols"], str):
+                record["symbols"] = json.loads(record["symbols"])
+            module = _module_name(path)
+            for symbol in record["symbols"]:
+                index.setdefault(symbol["name"], []).append(dict(symbol, path=path, module=module))
+        self._symbol_index = index
+    
+    def get_analysis(self, path: str) -> Optional[Dict]:
+        """获取已分析文件的结果(相对路径)，未分析时返回None"""
+        record = self._records.get(path)
+        if record is None:
+            return None
+        if isinstance(record["analysis"], str):
+            # 缓存中的JSON按需解析
+            record["analysis"] = json.loads(record["analysis"])
+        return dict(record["analysis"], path=path, module=_module_name(path))
+    
+    @property
+    def symbol_index(self) -> Dict[str, List[Dict]]:
+        """符号名到定义位置列表的映射"""
+        return self._symbol_index
+    
+    def lookup(self, name: str) -> List[Dict]:
+        """
+        查找符号的定义位置
+        
+        Args:
+            name: 函数、类或方法名，也可以是Class.method形式的限定名
+            
+        Returns:
+            定义列表，每项包含path、module、qualname、kind和line
+        """
+        simple_name = name.rsplit(".", 1)[-1]
+        return [symbol for symbol in self._symbol_index.get(simple_name, [])
+                if name in (symbol["name"], symbol["qualname"])]
+    
+    def close(self):
+        """关闭缓存数据库"""
+        with self._lock:
+            self._conn.close()
+
 class AIEnhancedTestOptimizer:
     """AI增强的测试优化器"""
     
@@ -6,10 +6,19 @@ PowerAutomation AI协同增强模块
 import asyncio
 import time
 import json
-from typing import Dict, List, Any, Optional
+import logging
+from collections import Counter, deque
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+logger = logging.getLogger("ai_coordination_hub")
+
+# 协作历史保留的记录数
+COLLABORATION_HISTORY_SIZE = 500
+# 单个阶段的默认超时时间(秒)
+DEFAULT_STAGE_TIMEOUT = 30.0
+
 class AIModuleType(Enum):
     """AI模块类型枚举"""
     INTENT_UNDERSTANDING = "intent_understanding"
@@ -28,13 +37,65 @@ class AIMessage:
     timestamp: float
     priority: int = 1  # 1=高优先级, 2=中优先级, 3=低优先级
 
+class StageInputs:
+    """协作阶段的上游结果，按名称等待对应阶段完成"""
+    
+    def __init__(self, futures: Dict[str, "asyncio.Future"]):
+        self._futures = futures
+        self._waiting = 0
+        self._blocked_since = 0.0
+        self._blocked = 0.0
+    
+    @property
+    def names(self) -> List[str]:
+        """声明的上游阶段名称"""
+        return list(self._futures)
+    
+    def ready(self, name: str) -> bool:
+        """上游阶段是否已完成"""
+        return self._futures[name].done()
+    
+    def blocked_time(self) -> float:
+        """等待上游结果所阻塞的时间，并发等待的重叠部分只计一次"""
+        if self._waiting:
+            return self._blocked + asyncio.get_running_loop().time() - self._blocked_since
+        return self._blocked
+    
+    async def get(self, name: str) -> Dict[str, Any]:
+        """等待并返回上游阶段的结果"""
+        future = self._futures[name]
+        if future.done():
+            return future.result()
+        loop = asyncio.get_running_loop()
+        if not self._waiting:
+            self._blocked_since = loop.time()
+        self._waiting += 1
+        try:
+            # shield避免本阶段超时取消时连带取消上游结果
+            return await asyncio.shield(future)
+        finally:
+            self._waiting -= 1
+            if not self._waiting:
+                self._blocked += loop.time() - self._blocked_since
+
+@dataclass
+class CollaborationStage:
+    """协作阶段声明"""
+    name: str
+    handler: Callable[[Dict[str, Any], StageInputs], Awaitable[Dict[str, Any]]]
+    depends_on: Tuple[str, ...] = ()
+    timeout: float = DEFAULT_STAGE_TIMEOUT  # 只限制阶段自身的执行时间，不含等待上游结果的时间
+    speculative: bool = False  # True时不等依赖完成即启动，由handler按需等待上游结果
+
 class AICoordinationHub:
     """AI协调中心 - 管理多AI模块的协同工作"""
     
-    def __init__(self):
+    def __init__(self, history_size: int = COLLABORATION_HISTORY_SIZE):
         self.modules = {}
         self.message_queue = []
-        self.collaboration_history = []
+        self.collaboration_history = deque(maxlen=history_size)
+        self.stages = self._default_stages()
+        self._stage_order = None
         self.performance_metrics = {
             "total_collaborations": 0,
             "successful_collaborations": 0,
@@ -55,46 +116,92 @@ class AICoordinationHub:
             }
         }
     
-    async def orchestrate_collaboration(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """编排AI模块协作"""
+    def register_stage(self, stage: CollaborationStage):
+        """注册或替换协作阶段"""
+        self.stages[stage.name] = stage
+        self._stage_order = None
+    
+    def _default_stages(self) -> Dict[str, CollaborationStage]:
+        """默认阶段图：意图理解 -> 序列思维 -> 工作流设计 -> 内容优化，自我优化汇总前四个阶段"""
+        stages = [
+            CollaborationStage("intent", self._execute_intent_understanding),
+            CollaborationStage("thinking", self._execute_sequential_thinking, ("intent",)),
+            CollaborationStage("workflow", self._execute_workflow_design, ("thinking",)),
+            # 内容模板起草不依赖工作流，工作流完成后再补充工作流信息
+            CollaborationStage("content", self._execute_content_optimization, ("workflow",), speculative=True),
+            # 自我优化只读取各阶段的置信度，可以提前开始
+            CollaborationStage("optimization", self._execute_self_optimization,
+                               ("intent", "thinking", "workflow", "content"), speculative=True),
+        ]
+        return {stage.name: stage for stage in stages}
+    
+    def _resolve_stage_order(self) -> List[str]:
+        """按依赖关系对阶段拓扑排序，依赖不存在或存在环时抛出ValueError"""
+        if self._stage_order is not None:
+            return self._stage_order
+        for stage in self.stages.values():
+            missing = [name for name in stage.depends_on if name not in self.stages]
+            if missing:
+                raise ValueError(f"阶段 {stage.name} 依赖的阶段不存在: {missing}")
+        order, visiting, visited = [], set(), set()
+        
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"阶段依赖存在环: {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+        
+        for name in self.stages:
+            visit(name)
+        self._stage_order = order
+        return order
+    
+    async def orchestrate_collaboration(self, task: Dict[str, Any],
+                                        stage_timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        编排AI模块协作
+        
+        各阶段按声明的依赖并发执行：依赖全部完成后启动，speculative阶段立即启动并在需要时等待上游结果。
+        超时的阶段以status为timeout的结果继续下游，阶段抛出异常时整个协作失败。
+        
+        Args:
+            task: 协作任务，包含user_input和context
+            stage_timeouts: 本次协作覆盖的阶段超时时间(秒)
+            
+        Returns:
+            协作结果
+        """
         start_time = time.time()
         collaboration_id = f"collab_{int(start_time)}"
+        timings: Dict[str, Dict[str, float]] = {}
         
         try:
-            # 阶段1: 意图理解
-            intent_result = await self._execute_intent_understanding(task)
-            
-            # 阶段2: 任务分解（序列思维）
-            thinking_result = await self._execute_sequential_thinking(task, intent_result)
-            
-            # 阶段3: 工作流设计
-            workflow_result = await self._execute_workflow_design(task, thinking_result)
-            
-            # 阶段4: 内容优化
-            content_result = await self._execute_content_optimization(task, workflow_result)
-            
-            # 阶段5: 自我优化
-            optimization_result = await self._execute_self_optimization(
-                task, intent_result, thinking_result, workflow_result, content_result
-            )
+            order = self._resolve_stage_order()
+            results = await self._run_stage_graph(task, order, stage_timeouts or {}, timings)
+            total_time = time.time() - start_time
+            critical_path = self._critical_path(timings)
             
             # 记录协作历史
             collaboration_record = {
                 "collaboration_id": collaboration_id,
                 "task": task,
-                "results": {
-                    "intent": intent_result,
-                    "thinking": thinking_result,
-                    "workflow": workflow_result,
-                    "content": content_result,
-                    "optimization": optimization_result
-                },
+                "results": results,
                 "performance": {
-                    "total_time": time.time() - start_time,
+                    "total_time": total_time,
                     "success": True,
                     "efficiency_score": self._calculate_efficiency_score(
-                        intent_result, thinking_result, workflow_result, content_result
-                    )
+                        *(results[name] for name in ("intent", "thinking", "workflow", "content") if name in results)
+                    ),
+                    "stage_timings": timings,
+                    "critical_path": critical_path,
+                    "critical_path_time": self._critical_path_time(critical_path, timings),
+                    "parallelism": sum(t["duration"] for t in timings.values()) / total_time if total_time else 1.0
                 },
                 "timestamp": start_time
             }
@@ -118,7 +225,8 @@ class AICoordinationHub:
                 "timestamp": start_time,
                 "performance": {
                     "total_time": time.time() - start_time,
-                    "success": False
+                    "success": False,
+                    "stage_timings": timings
                 }
             }
             
@@ -131,7 +239,93 @@ class AICoordinationHub:
                 "performance": error_record["performance"]
             }
     
-    async def _execute_intent_understanding(self, task: Dict[str, Any]) -> Dict[str, Any]:
+    async def _run_stage_graph(self, task: Dict[str, Any], order: List[str],
+                               stage_timeouts: Dict[str, float],
+                               timings: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+        """并发执行阶段图，返回各阶段结果"""
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        futures = {name: loop.create_future() for name in order}
+        tasks = []
+        
+        async def run(stage: CollaborationStage):
+            if not stage.speculative:
+                for dependency in stage.depends_on:
+                    await asyncio.shield(futures[dependency])
+            began = loop.time()
+            inputs = StageInputs({name: futures[name] for name in stage.depends_on})
+            timeout = stage_timeouts.get(stage.name, stage.timeout)
+            try:
+                result = await self._run_stage_handler(stage, task, inputs, began, timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"协作阶段 {stage.name} 超时({timeout}秒)")
+                result = {"status": "timeout", "confidence": 0.0, "processing_time": timeout}
+            finished = loop.time()
+            blocked = inputs.blocked_time()
+            timings[stage.name] = {
+                "started": began - started_at,
+                "finished": finished - started_at,
+                "blocked": blocked,
+                "duration": finished - began - blocked
+            }
+            futures[stage.name].set_result(result)
+        
+        try:
+            tasks = [asyncio.create_task(run(self.stages[name])) for name in order]
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for pending in tasks:
+                pending.cancel()
+            for future in futures.values():
+                future.cancel()
+            raise
+        return {name: futures[name].result() for name in order}
+    
+    async def _run_stage_handler(self, stage: CollaborationStage, task: Dict[str, Any],
+                                 inputs: StageInputs, began: float, timeout: float) -> Dict[str, Any]:
+        """执行阶段handler，等待上游结果的时间顺延超时期限，超时只计阶段自身的执行时间"""
+        loop = asyncio.get_running_loop()
+        handler = asyncio.ensure_future(stage.handler(task, inputs))
+        try:
+            while True:
+                remaining = began + timeout + inputs.blocked_time() - loop.time()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait({handler}, timeout=remaining)
+                if done:
+                    return handler.result()
+        except BaseException:
+            handler.cancel()
+            raise
+        handler.cancel()
+        try:
+            await handler
+        except asyncio.CancelledError:
+            pass
+        raise asyncio.TimeoutError()
+    
+    def _critical_path(self, timings: Dict[str, Dict[str, float]]) -> List[str]:
+        """从最后完成的阶段沿最晚完成的依赖回溯，得到决定总耗时的阶段链"""
+        if not timings:
+            return []
+        path = [max(timings, key=lambda name: timings[name]["finished"])]
+        while True:
+            dependencies = [name for name in self.stages[path[-1]].depends_on if name in timings]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda name: timings[name]["finished"]))
+        return path[::-1]
+    
+    def _critical_path_time(self, path: List[str], timings: Dict[str, Dict[str, float]]) -> float:
+        """关键路径耗时，提前启动的阶段只计其前驱完成之后的执行时间"""
+        total = 0.0
+        previous_finished = 0.0
+        for name in path:
+            total += max(0.0, timings[name]["finished"] - max(timings[name]["started"], previous_finished))
+            previous_finished = timings[name]["finished"]
+        return total
+    
+    async def _execute_intent_understanding(self, task: Dict[str, Any], inputs: "StageInputs") -> Dict[str, Any]:
         """执行意图理解"""
         if AIModuleType.INTENT_UNDERSTANDING not in self.modules:
             return {"status": "module_not_available", "confidence": 0.0}
@@ -165,7 +359,7 @@ class AICoordinationHub:
             "processing_time": 0.1
         }
     
-    async def _execute_sequential_thinking(self, task: Dict[str, Any], intent_result: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_sequential_thinking(self, task: Dict[str, Any], inputs: "StageInputs") -> Dict[str, Any]:
         """执行序列思维"""
         if AIModuleType.SEQUENTIAL_THINKING not in self.modules:
             return {"status": "module_not_available", "confidence": 0.0}
@@ -176,6 +370,7 @@ class AICoordinationHub:
         await asyncio.sleep(0.2)
         
         # 基于意图理解结果进行思维分解
+        intent_result = await inputs.get("intent")
         problem = task.get("user_input", "")
         context = {
             "intent_analysis": intent_result,
@@ -192,7 +387,7 @@ class AICoordinationHub:
             "processing_time": 0.2
         }
     
-    async def _execute_workflow_design(self, task: Dict[str, Any], thinking_result: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_workflow_design(self, task: Dict[str, Any], inputs: "StageInputs") -> Dict[str, Any]:
         """执行工作流设计"""
         if AIModuleType.WORKFLOW_ENGINE not in self.modules:
             return {"status": "module_not_available", "confidence": 0.0}
@@ -203,6 +398,7 @@ class AICoordinationHub:
         await asyncio.sleep(0.15)
         
         # 基于思维结果设计工作流
+        thinking_result = await inputs.get("thinking")
         workflow_config = {
             "workflow_name": f"AI协同工作流_{int(time.time())}",
             "based_on_thinking": thinking_result.get("conclusions", []),
@@ -219,7 +415,7 @@ class AICoordinationHub:
             "processing_time": 0.15
         }
     
-    async def _execute_content_optimization(self, task: Dict[str, Any], workflow_result: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_content_optimization(self, task: Dict[str, Any], inputs: "StageInputs") -> Dict[str, Any]:
         """执行内容优化"""
         if AIModuleType.CONTENT_OPTIMIZATION not in self.modules:
             return {"status": "module_not_available", "confidence": 0.0}
@@ -230,6 +426,7 @@ class AICoordinationHub:
         await asyncio.sleep(0.1)
         
         # 基于工作流结果优化内容
+        workflow_result = await inputs.get("workflow")
         optimization_request = {
             "template_type": "workflow_documentation",
             "workflow_info": workflow_result,
@@ -257,11 +454,13 @@ class AICoordinationHub:
             "processing_time": 0.1
         }
     
-    async def _execute_self_optimization(self, task: Dict[str, Any], *previous_results) -> Dict[str, Any]:
+    async def _execute_self_optimization(self, task: Dict[str, Any], inputs: "StageInputs") -> Dict[str, Any]:
         """执行自我优化"""
         # 模拟异步执行
         await asyncio.sleep(0.2)
         
+        previous_results = [await inputs.get(name) for name in inputs.names]
+        
         # 分析所有前序结果的质量
         quality_scores = []
         for result in previous_results:
@@ -378,6 +577,59 @@ class AICoordinationHub:
             "recent_collaborations": len(self.collaboration_history),
             "system_health": "优秀" if success_rate >= 0.95 and self.performance_metrics["efficiency_score"] >= 0.85 else "良好"
         }
+    
+    def get_collaboration_summary(self, last: Optional[int] = None,
+                                  since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        汇总协作历史
+        
+        Args:
+            last: 只统计最近的N条记录
+            since: 只统计开始时间不早于该时间戳的记录
+            
+        Returns:
+            成功率、总耗时和各阶段耗时的统计，以及关键路径出现次数
+        """
+        records = [r for r in self.collaboration_history if since is None or r["timestamp"] >= since]
+        if last is not None:
+            records = records[-last:] if last > 0 else []
+        successful = [r for r in records if r["performance"]["success"]]
+        total_times = [r["performance"]["total_time"] for r in records]
+        
+        stage_times: Dict[str, List[float]] = {}
+        stage_timeouts: Counter = Counter()
+        for record in successful:
+            for name, timing in record["performance"]["stage_timings"].items():
+                stage_times.setdefault(name, []).append(timing["duration"])
+                if record["results"][name].get("status") == "timeout":
+                    stage_timeouts[name] += 1
+        critical_paths = Counter(" -> ".join(r["performance"]["critical_path"]) for r in successful)
+        
+        return {
+            "collaborations": len(records),
+            "successful": len(successful),
+            "success_rate": len(successful) / len(records) if records else 0.0,
+            "average_time": sum(total_times) / len(total_times) if total_times else 0.0,
+            "p95_time": _percentile(total_times, 95),
+            "average_critical_path_time": (
+                sum(r["performance"]["critical_path_time"] for r in successful) / len(successful)
+                if successful else 0.0
+            ),
+            "average_parallelism": (
+                sum(r["performance"]["parallelism"] for r in successful) / len(successful)
+                if successful else 0.0
+            ),
+            "stages": {
+                name: {
+                    "count": len(times),
+                    "average_time": sum(times) / len(times),
+                    "p95_time": _percentile(times, 95),
+                    "timeouts": stage_timeouts[name]
+                }
+                for name, times in stage_times.items()
+            },
+            "critical_paths": dict(critical_paths.most_common())
+        }
 
 
     def coordinate_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
@@ -457,3 +709,11 @@ class AICoordinationHub:
             "estimated_completion": "2-5 seconds"
         }
 
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """最近秩法计算分位数，空列表返回0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percentile // 100))
+    return ordered[int(rank) - 1]
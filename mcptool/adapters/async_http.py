@@ -0,0 +1,271 @@
+"""
+异步HTTP连接池
+
+为负载测试和API验证提供基于asyncio流的HTTP/1.1客户端：
+- 每个(协议, 主机, 端口)一个连接池，HTTP keep-alive复用连接，
+  同时限制全局连接数和单个主机的连接数
+- 支持HTTPS，复用的连接被服务端关闭时换新连接重试一次
+- 每次请求记录耗时分解：排队、DNS解析、建立连接(含TLS握手)、首字节时间和传输时间
+"""
+
+import ssl
+import socket
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("async_http")
+
+
+@dataclass
+class HTTPTiming:
+    """一次请求的耗时分解(秒)，复用连接时dns和connect为0"""
+    queue: float = 0.0
+    dns: float = 0.0
+    connect: float = 0.0
+    ttfb: float = 0.0
+    transfer: float = 0.0
+    total: float = 0.0
+    reused: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转为字典"""
+        return asdict(self)
+
+
+@dataclass
+class HTTPResponse:
+    """HTTP响应"""
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    timing: HTTPTiming
+    acquired_at: float
+
+    def text(self, limit: Optional[int] = None) -> str:
+        """按UTF-8解码响应体"""
+        data = self.body if limit is None else self.body[:limit]
+        return data.decode("utf-8", errors="replace")
+
+
+class AsyncPacer:
+    """按固定速率放行请求，用于控制单个端点的请求节奏"""
+
+    def __init__(self, requests_per_second: Optional[float] = None):
+        """
+        初始化节奏控制
+
+        参数:
+            requests_per_second: 每秒最多放行的请求数，为None或0时不限制
+        """
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self) -> float:
+        """
+        等待下一个放行时刻
+
+        返回:
+            等待的时间(秒)
+        """
+        if not self.interval:
+            return 0.0
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return slot - now
+
+
+class _HostPool:
+    """单个主机的空闲连接和并发上限"""
+
+    def __init__(self, limit: Optional[int]):
+        self.semaphore = asyncio.Semaphore(limit) if limit else None
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+
+class AsyncHTTPConnectionPool:
+    """基于asyncio流的HTTP/1.1 keep-alive连接池"""
+
+    def __init__(self, max_connections: int = 100, timeout: float = 30.0,
+                 max_connections_per_host: Optional[int] = None,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        """
+        初始化连接池
+
+        参数:
+            max_connections: 全局并发连接数上限
+            timeout: 建立连接和读取响应的超时时间(秒)
+            max_connections_per_host: 单个主机的并发连接数上限，为None时只受全局上限限制
+            ssl_context: HTTPS使用的SSL上下文，默认为系统默认配置
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self._hosts: Dict[Tuple[str, str, int], _HostPool] = {}
+        self.stats = {"connections_opened": 0, "connections_reused": 0, "requests": 0}
+
+    async def request(self, method: str, url: str, headers: Dict[str, str],
+                      body: bytes = b"") -> Tuple[int, bytes, float]:
+        """
+        发送请求，连接数达到上限时排队等待空闲连接
+
+        返回:
+            (状态码, 响应体, 取得连接的时刻loop.time())
+        """
+        response = await self.fetch(method, url, headers, body)
+        return response.status, response.body, response.acquired_at
+
+    async def fetch(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                    body: bytes = b"") -> HTTPResponse:
+        """
+        发送请求并返回带耗时分解的响应
+
+        参数:
+            method: HTTP方法
+            url: 完整URL
+            headers: 请求头
+            body: 请求体
+
+        返回:
+            HTTPResponse
+        """
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname, parts.port or (443 if secure else 80))
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {parts.netloc}", f"Content-Length: {len(body)}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = _HostPool(self.max_connections_per_host)
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        # 先占主机配额再占全局配额，避免等待繁忙主机的请求占满全局连接
+        async with host.semaphore or _NO_LIMIT:
+            async with self._semaphore:
+                acquired_at = loop.time()
+                self.stats["requests"] += 1
+                for attempt in range(2):
+                    timing = HTTPTiming(queue=acquired_at - queued_at)
+                    started = loop.time()
+                    reused = bool(host.idle)
+                    if reused:
+                        reader, writer = host.idle.pop()
+                        self.stats["connections_reused"] += 1
+                    else:
+                        reader, writer = await self._connect(key, secure, timing)
+                    timing.reused = reused
+                    try:
+                        sent_at = loop.time()
+                        writer.write(payload)
+                        status, response_headers, data, keep_alive, first_byte_at = await asyncio.wait_for(
+                            self._read_response(reader), self.timeout)
+                    except (ConnectionError, asyncio.IncompleteReadError) as e:
+                        writer.close()
+                        # 复用的连接可能已被服务端关闭，换新连接重试一次
+                        if reused and attempt == 0:
+                            continue
+                        raise ConnectionError(str(e)) from e
+                    except BaseException:
+                        writer.close()
+                        raise
+                    finished = loop.time()
+                    timing.ttfb = first_byte_at - sent_at
+                    timing.transfer = finished - first_byte_at
+                    timing.total = finished - started
+                    if keep_alive:
+                        host.idle.append((reader, writer))
+                    else:
+                        writer.close()
+                    return HTTPResponse(status, response_headers, data, timing, acquired_at)
+
+    async def _connect(self, key: Tuple[str, str, int], secure: bool,
+                       timing: HTTPTiming) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """解析主机名并建立连接，分别记录DNS和连接(含TLS握手)耗时"""
+        loop = asyncio.get_running_loop()
+        _, hostname, port = key
+        started = loop.time()
+        addresses = await asyncio.wait_for(
+            loop.getaddrinfo(hostname, port, type=socket.SOCK_STREAM), self.timeout)
+        resolved = loop.time()
+        timing.dns = resolved - started
+        ssl_options = {}
+        if secure:
+            ssl_options = {"ssl": self.ssl_context or ssl.create_default_context(), "server_hostname": hostname}
+        # 依次尝试解析出的地址，例如localhost先解析到::1而服务只监听IPv4时
+        for index, (family, _, _, _, address) in enumerate(addresses):
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(address[0], address[1], family=family, **ssl_options), self.timeout)
+                break
+            except OSError:
+                if index == len(addresses) - 1:
+                    raise
+        timing.connect = loop.time() - resolved
+        self.stats["connections_opened"] += 1
+        return reader, writer
+
+    async def _read_response(self, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes, bool, float]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("连接已被关闭")
+        first_byte_at = asyncio.get_running_loop().time()
+        version, status = status_line.split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        elif int(status) in (204, 304) or int(status) < 200:
+            data = b""
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), headers, data, keep_alive, first_byte_at
+
+    async def close(self):
+        """关闭全部空闲连接"""
+        for host in self._hosts.values():
+            for _, writer in host.idle:
+                writer.close()
+            host.idle.clear()
+
+
+class _NoLimit:
+    """未设置主机连接上限时使用的空上下文"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+_NO_LIMIT = _NoLimit()
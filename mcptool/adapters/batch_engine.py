@@ -0,0 +1,220 @@
+"""
+批量生成引擎
+
+为Claude、Gemini等大模型适配器的batch_generate提供并发执行：
+- 有界线程池并发发送请求，结果按输入顺序返回，每项单独记录错误
+- 令牌桶同时限制每分钟请求数和每分钟token数，请求完成后按实际用量退还多扣的token
+- 遇到429/5xx等可重试错误时按带抖动的指数退避重试，优先遵循服务端的Retry-After
+"""
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterable
+
+logger = logging.getLogger("batch_engine")
+
+# 默认视为可重试的HTTP状态码，529为Anthropic的过载状态码
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504, 529})
+
+
+class RetryableAPIError(RuntimeError):
+    """可重试的API错误"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        """
+        初始化可重试错误
+
+        Args:
+            message: 错误信息
+            status_code: HTTP状态码
+            retry_after: 服务端建议的重试等待时间(秒)
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头，只支持秒数格式"""
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucketRateLimiter:
+    """同时限制每分钟请求数和每分钟token数的令牌桶"""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化令牌桶
+
+        Args:
+            requests_per_minute: 每分钟请求数上限，为None时不限制
+            tokens_per_minute: 每分钟token数上限，为None时不限制
+            clock: 时钟函数，便于测试
+            sleep: 等待函数，便于测试
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._request_tokens = float(requests_per_minute or 0)
+        self._token_tokens = float(tokens_per_minute or 0)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._request_tokens = min(self.requests_per_minute,
+                                       self._request_tokens + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._token_tokens = min(self.tokens_per_minute,
+                                     self._token_tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        获取一次请求的配额，配额不足时阻塞等待
+
+        Args:
+            tokens: 本次请求预计消耗的token数
+
+        Returns:
+            等待的时间(秒)
+        """
+        if self.tokens_per_minute:
+            # 单个请求超过整桶容量时按整桶计算，避免永远等待
+            tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._request_tokens < 1:
+                    wait = max(wait, (1 - self._request_tokens) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._token_tokens < tokens:
+                    wait = max(wait, (tokens - self._token_tokens) * 60 / self.tokens_per_minute)
+                if wait == 0.0:
+                    if self.requests_per_minute:
+                        self._request_tokens -= 1
+                    if self.tokens_per_minute:
+                        self._token_tokens -= tokens
+                    self.waited += waited
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+    def refund(self, tokens: int) -> None:
+        """
+        退还多扣的token，例如预估用量高于实际用量时
+
+        Args:
+            tokens: 退还的token数，负数表示补扣
+        """
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._refill()
+            self._token_tokens = min(self.tokens_per_minute, self._token_tokens + tokens)
+
+
+class BatchGenerationEngine:
+    """有界并发、限流和重试的批量请求引擎"""
+
+    def __init__(self, max_workers: int = 8, rate_limiter: Optional[TokenBucketRateLimiter] = None,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retryable_status_codes: Iterable[int] = RETRYABLE_STATUS_CODES,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化批量请求引擎
+
+        Args:
+            max_workers: 最大并发请求数
+            rate_limiter: 令牌桶限流器，为None时不限流
+            max_retries: 每项的最大重试次数
+            base_delay: 指数退避的初始等待时间(秒)
+            max_delay: 单次退避的最长等待时间(秒)
+            retryable_status_codes: 可重试的HTTP状态码
+            sleep: 等待函数，便于测试
+        """
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_status_codes = frozenset(retryable_status_codes)
+        self._sleep = sleep
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, RetryableAPIError):
+            return True
+        # 兼容SDK异常，例如google.api_core异常的code属性
+        status = getattr(error, "status_code", None)
+        if status is None and isinstance(getattr(error, "code", None), int):
+            status = error.code
+        return status in self.retryable_status_codes
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """带完全抖动的指数退避，服务端给出Retry-After时以其为下限"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def _run_item(self, index: int, item: Any, worker: Callable[[Any], Any],
+                  estimate_tokens: Optional[Callable[[Any], int]],
+                  actual_tokens: Optional[Callable[[Any], Optional[int]]]) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            estimated = estimate_tokens(item) if estimate_tokens else 0
+            if self.rate_limiter:
+                self.rate_limiter.acquire(estimated)
+            try:
+                result = worker(item)
+            except Exception as e:
+                if attempt < self.max_retries and self._is_retryable(e):
+                    delay = self._backoff(attempt, e)
+                    attempt += 1
+                    logger.warning(f"Retrying batch item {index} in {delay:.2f}s (attempt {attempt}): {str(e)}")
+                    self._sleep(delay)
+                    continue
+                return {"index": index, "success": False, "result": None,
+                        "error": str(e), "attempts": attempt + 1}
+
+            if self.rate_limiter and actual_tokens:
+                used = actual_tokens(result)
+                if used is not None:
+                    self.rate_limiter.refund(estimated - used)
+            return {"index": index, "success": True, "result": result, "error": None, "attempts": attempt + 1}
+
+    def run(self, items: List[Any], worker: Callable[[Any], Any],
+            estimate_tokens: Optional[Callable[[Any], int]] = None,
+            actual_tokens: Optional[Callable[[Any], Optional[int]]] = None) -> List[Dict[str, Any]]:
+        """
+        并发处理一批请求
+
+        Args:
+            items: 请求列表
+            worker: 处理单个请求的函数，可重试的错误应抛出RetryableAPIError或带status_code的异常
+            estimate_tokens: 预估单个请求token用量的函数，用于令牌桶
+            actual_tokens: 从worker返回值中读取实际token用量的函数，用于退还多扣的配额
+
+        Returns:
+            与items顺序一致的结果列表，每项包含index、success、result、error和attempts
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)),
+                                thread_name_prefix="batch-generate") as pool:
+            futures = [pool.submit(self._run_item, index, item, worker, estimate_tokens, actual_tokens)
+                       for index, item in enumerate(items)]
+            return [future.result() for future in futures]
@@ -9,10 +9,15 @@ import os
 import json
 import logging
 import time
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Iterator
 import requests
+from requests.adapters import HTTPAdapter
 
 # 导入接口定义
+from ..batch_engine import BatchGenerationEngine, TokenBucketRateLimiter, RetryableAPIError, \
+    RETRYABLE_STATUS_CODES, parse_retry_after
+from ..code_stream import extract_code_stream, iter_until_cancelled
+from ..static_analysis import StaticCodeAnalyzer, InconclusiveAnalysisError
 from ..interfaces.code_generation_interface import CodeGenerationInterface
 from ..interfaces.code_optimization_interface import CodeOptimizationInterface
 from ..interfaces.adapter_interface import KiloCodeAdapterInterface
@@ -51,8 +56,17 @@ class ClaudeAdapter(CodeGenerationInterface, CodeOptimizationInterface, KiloCode
         
         logger.info(f"Initialized Claude adapter with model: {self.model}")
         
-        # 初始化会话
+        # 批量生成参数
+        self.batch_config = {
+            "max_workers": int(os.environ.get("CLAUDE_BATCH_WORKERS", "8")),
+            "requests_per_minute": int(os.environ.get("CLAUDE_REQUESTS_PER_MINUTE", "50")),
+            "tokens_per_minute": int(os.environ.get("CLAUDE_TOKENS_PER_MINUTE", "80000")),
+            "max_retries": 4
+        }
+        
+        # 初始化会话，连接池大小与批量并发数一致
         self.session = requests.Session()
+        self._mount_connection_pool()
         self.session.headers.update({
             "x-api-key": self.api_key,
             "anthropic-version": "2023-06-01",
@@ -73,6 +87,29 @@ class ClaudeAdapter(CodeGenerationInterface, CodeOptimizationInterface, KiloCode
             "temperature": 0.2,
             "max_tokens": 4000,
         }
+        
+        self._create_batch_engine()
+        
+        # 本地静态分析，结构性指标无需调用模型
+        self.static_analyzer = StaticCodeAnalyzer()
+    
+    def _mount_connection_pool(self) -> None:
+        """按批量并发数设置HTTP连接池大小"""
+        adapter = HTTPAdapter(pool_maxsize=self.batch_config["max_workers"])
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def _create_batch_engine(self) -> None:
+        """根据批量生成参数创建限流器和批量引擎，限流器在多次批量调用之间共享"""
+        self.rate_limiter = TokenBucketRateLimiter(
+            self.batch_config["requests_per_minute"] or None,
+            self.batch_config["tokens_per_minute"] or None
+        )
+        self.batch_engine = BatchGenerationEngine(
+            max_workers=self.batch_config["max_workers"],
+            rate_limiter=self.rate_limiter,
+            max_retries=self.batch_config["max_retries"]
+        )
     
     def initialize(self, config: Dict[str, Any]) -> bool:
         """
@@ -108,6 +145,12 @@ class ClaudeAdapter(CodeGenerationInterface, CodeOptimizationInterface, KiloCode
             if "capabilities" in config:
                 self._capabilities.update(config["capabilities"])
             
+            batch_keys = [key for key in self.batch_config if key in config]
+            if batch_keys:
+                self.batch_config.update({key: config[key] for key in batch_keys})
+                self._mount_connection_pool()
+                self._create_batch_engine()
+            
             # 验证连接
             health_status = self.health_check()
             if health_status.get("status") == "ok":
@@ -232,60 +275,170 @@ class ClaudeAdapter(CodeGenerationInterface, CodeOptimizationInterface, KiloCode
             raise ValueError(f"Invalid mode: {mode}. Must be one of: standard, optimized, explained")
         
         try:
-            # 构建提示
-            system_prompt = "You are an expert programmer. "
-            
-            if mode == "standard":
-                system_prompt += "Generate clean, efficient code based on the user's requirements."
-            elif mode == "optimized":
-                system_prompt += "Generate highly optimized code with excellent performance characteristics."
-            elif mode == "explained":
-                system_prompt += "Generate well-commented code with detailed explanations of the implementation."
-            
-            user_prompt = prompt
-            
-            if context:
-                context_str = json.dumps(context, indent=2)
-                user_prompt += f"\n\nAdditional context:\n{context_str}"
+            logger.debug(f"Generating code with prompt: {prompt[:50]}...")
             
-            # 添加明确的代码格式指令
-            user_prompt += "\n\nPlease provide only the code without any additional explanations or markdown formatting."
+            result = self._send_messages(self._build_generation_payload(prompt, context, mode))
+            content = result.get("content", [{}])[0].get("text", "")
             
-            logger.debug(f"Generating code with prompt: {prompt[:50]}...")
+            # 提取代码块
+            code = self._extract_code_from_response(content)
+            return code
+                
+        except Exception as e:
+            error_msg = f"API request failed: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+    
+    def generate_code_stream(self, prompt: str, context: Optional[Dict[str, Any]] = None,
+                             mode: str = "standard", cancel_event=None) -> Iterator[str]:
+        """
+        流式生成代码，随SSE事件到达增量输出代码片段
+        
+        片段拼接后与generate_code的结果一致；第一个代码块结束后立即关闭连接。
+        关闭返回的生成器或设置cancel_event都会中止请求。
+        
+        Args:
+            prompt: 代码生成提示
+            context: 上下文信息
+            mode: 生成模式，可选值包括 "standard", "optimized", "explained"
+            cancel_event: 取消标志，例如threading.Event
             
-            # 构建API请求
-            payload = {
-                "model": self.model,
-                "max_tokens": self.generation_config["max_tokens"],
-                "temperature": self.generation_config["temperature"],
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            }
+        Returns:
+            代码片段的生成器
             
+        Raises:
+            ValueError: 如果提示为空或模式无效
+            RuntimeError: 如果API调用失败
+        """
+        if not prompt:
+            raise ValueError("Prompt cannot be empty")
+        
+        if mode not in ["standard", "optimized", "explained"]:
+            raise ValueError(f"Invalid mode: {mode}. Must be one of: standard, optimized, explained")
+        
+        payload = self._build_generation_payload(prompt, context, mode)
+        payload["stream"] = True
+        
+        try:
             response = self.session.post(
                 f"{self.base_url}/v1/messages",
                 json=payload,
-                timeout=self.timeout
+                timeout=self.timeout,
+                stream=True
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result.get("content", [{}])[0].get("text", "")
-                
-                # 提取代码块
-                code = self._extract_code_from_response(content)
-                return code
-            else:
-                error_msg = f"Failed to generate code: {response.status_code} - {response.text}"
-                logger.error(error_msg)
-                raise RuntimeError(error_msg)
-                
         except Exception as e:
             error_msg = f"API request failed: {str(e)}"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
+        
+        if response.status_code != 200:
+            error_msg = f"Failed to generate code: {response.status_code} - {response.text}"
+            response.close()
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        
+        return self._stream_code(response, cancel_event)
+    
+    def _stream_code(self, response, cancel_event) -> Iterator[str]:
+        """从SSE响应中提取代码片段，结束或取消时关闭连接"""
+        try:
+            yield from extract_code_stream(iter_until_cancelled(self._iter_text_deltas(response), cancel_event))
+        finally:
+            response.close()
+    
+    def _iter_text_deltas(self, response) -> Iterator[str]:
+        """
+        解析Messages API的SSE事件流
+        
+        Args:
+            response: stream=True的响应对象
+            
+        Yields:
+            文本增量
+        """
+        # chunk_size=None时分块传输的数据到达即返回，不等待缓冲区填满
+        for line in response.iter_lines(chunk_size=None):
+            if not line.startswith(b"data:"):
+                continue
+            event = json.loads(line[5:].decode("utf-8"))
+            event_type = event.get("type")
+            if event_type == "content_block_delta" and event.get("delta", {}).get("type") == "text_delta":
+                yield event["delta"]["text"]
+            elif event_type == "message_stop":
+                return
+            elif event_type == "error":
+                raise RuntimeError(f"Stream error: {event.get('error', {}).get('message', '')}")
+    
+    def _build_generation_payload(self, prompt: str, context: Optional[Dict[str, Any]], mode: str) -> Dict[str, Any]:
+        """
+        构建代码生成的API请求
+        
+        Args:
+            prompt: 代码生成提示
+            context: 上下文信息
+            mode: 生成模式
+            
+        Returns:
+            /v1/messages请求体
+        """
+        # 构建提示
+        system_prompt = "You are an expert programmer. "
+        
+        if mode == "standard":
+            system_prompt += "Generate clean, efficient code based on the user's requirements."
+        elif mode == "optimized":
+            system_prompt += "Generate highly optimized code with excellent performance characteristics."
+        elif mode == "explained":
+            system_prompt += "Generate well-commented code with detailed explanations of the implementation."
+        
+        user_prompt = prompt
+        
+        if context:
+            context_str = json.dumps(context, indent=2)
+            user_prompt += f"\n\nAdditional context:\n{context_str}"
+        
+        # 添加明确的代码格式指令
+        user_prompt += "\n\nPlease provide only the code without any additional explanations or markdown formatting."
+        
+        return {
+            "model": self.model,
+            "max_tokens": self.generation_config["max_tokens"],
+            "temperature": self.generation_config["temperature"],
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+    
+    def _send_messages(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        发送/v1/messages请求
+        
+        Args:
+            payload: 请求体
+            
+        Returns:
+            响应JSON
+            
+        Raises:
+            RetryableAPIError: 如果返回429或5xx等可重试的状态码
+            RuntimeError: 如果返回其他错误状态码
+        """
+        response = self.session.post(
+            f"{self.base_url}/v1/messages",
+            json=payload,
+            timeout=self.timeout
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        
+        error_msg = f"Failed to generate code: {response.status_code} - {response.text}"
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableAPIError(error_msg, response.status_code,
+                                    parse_retry_after(response.headers.get("retry-after")))
+        logger.error(error_msg)
+        raise RuntimeError(error_msg)
     
     def interpret_code(self, code: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -470,24 +623,67 @@ Provide a comprehensive breakdown that covers all aspects of the task.
             context: 共享上下文信息
             
         Returns:
-            生成的代码字符串列表
+            生成的代码字符串列表，顺序与prompts一致，失败项为空字符串
             
         Raises:
             ValueError: 如果提示列表为空
-            RuntimeError: 如果API调用失败
+        """
+        results = []
+        
+        for item in self.batch_generate_detailed(prompts, context):
+            if item["success"]:
+                results.append(item["code"])
+            else:
+                logger.error(f"Error generating code for prompt '{prompts[item['index']][:30]}...': {item['error']}")
+                results.append("")  # 添加空字符串作为占位符
+        
+        return results
+    
+    def batch_generate_detailed(self, prompts: List[str], context: Optional[Dict[str, Any]] = None,
+                                mode: str = "standard") -> List[Dict[str, Any]]:
+        """
+        并发批量生成代码，受请求数和token数限流，429/5xx错误自动重试
+        
+        Args:
+            prompts: 代码生成提示列表
+            context: 共享上下文信息
+            mode: 生成模式
+            
+        Returns:
+            与prompts顺序一致的结果列表，每项包含index、success、code、error和attempts
+            
+        Raises:
+            ValueError: 如果提示列表为空或模式无效
         """
         if not prompts:
             raise ValueError("Prompts list cannot be empty")
         
-        results = []
+        if mode not in ["standard", "optimized", "explained"]:
+            raise ValueError(f"Invalid mode: {mode}. Must be one of: standard, optimized, explained")
         
-        for prompt in prompts:
-            try:
-                code = self.generate_code(prompt, context)
-                results.append(code)
-            except Exception as e:
-                logger.error(f"Error generating code for prompt '{prompt[:30]}...': {str(e)}")
-                results.append("")  # 添加空字符串作为占位符
+        payloads = [self._build_generation_payload(prompt, context, mode) for prompt in prompts]
+        
+        def estimate_tokens(payload: Dict[str, Any]) -> int:
+            # 按约4个字符一个token估算输入，并预留max_tokens的输出，完成后按实际用量退还
+            chars = sum(len(message["content"]) for message in payload["messages"])
+            return chars // 4 + payload["max_tokens"]
+        
+        def actual_tokens(result: Dict[str, Any]) -> Optional[int]:
+            usage = result.get("usage")
+            if not usage:
+                return None
+            return usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        
+        items = self.batch_engine.run(payloads, self._send_messages, estimate_tokens, actual_tokens)
+        
+        results = []
+        for item in items:
+            code = None
+            if item["success"]:
+                content = item["result"].get("content", [{}])[0].get("text", "")
+                code = self._extract_code_from_response(content)
+            results.append({"index": item["index"], "success": item["success"], "code": code,
+                            "error": item["error"], "attempts": item["attempts"]})
         
         return results
     
@@ -571,12 +767,15 @@ Return only the optimized code without any explanations or additional text.
             logger.error(error_msg)
             raise RuntimeError(error_msg)
     
-    def analyze_complexity(self, code: str) -> Dict[str, Any]:
+    def analyze_complexity(self, code: str, deep: bool = False) -> Dict[str, Any]:
         """
         分析代码复杂度
         
+        默认使用本地静态分析；deep为True、代码不是合法的Python代码或静态分析无法确定复杂度时调用模型深入分析。
+        
         Args:
             code: 需要分析的代码
+            deep: 是否调用模型深入分析
             
         Returns:
             包含复杂度分析的字典
@@ -588,6 +787,12 @@ Return only the optimized code without any explanations or additional text.
         if not code:
             raise ValueError("Code cannot be empty")
         
+        if not deep:
+            try:
+                return self.static_analyzer.analyze(code)
+            except (SyntaxError, InconclusiveAnalysisError):
+                logger.debug("Static analysis not applicable, falling back to model analysis")
+        
         try:
             # 构建提示
             system_prompt = "You are an expert in algorithm analysis. Analyze the time and space complexity of the provided code."
@@ -651,12 +856,15 @@ Format your response as a JSON object with the following structure:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
     
-    def suggest_improvements(self, code: str) -> List[Dict[str, Any]]:
+    def suggest_improvements(self, code: str, deep: bool = False) -> List[Dict[str, Any]]:
         """
         提供代码改进建议
         
+        默认根据本地静态分析的结构性指标给出建议；deep为True或代码不是合法的Python代码时调用模型审查。
+        
         Args:
             code: 需要分析的代码
+            deep: 是否调用模型深入审查
             
         Returns:
             改进建议列表
@@ -668,6 +876,12 @@ Format your response as a JSON object with the following structure:
         if not code:
             raise ValueError("Code cannot be empty")
         
+        if not deep:
+            try:
+                return self.static_analyzer.suggest(code)
+            except SyntaxError:
+                logger.debug("Static analysis not applicable, falling back to model review")
+        
         try:
             # 构建提示
             system_prompt = "You are an expert code reviewer. Provide detailed suggestions for improving the provided code."
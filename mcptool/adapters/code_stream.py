@@ -0,0 +1,168 @@
+"""
+流式代码提取
+
+从逐块到达的模型输出中增量提取代码，结果与适配器的_extract_code_from_response一致：
+- 输出包含Markdown代码块时只输出第一个代码块的内容，代码块结束后不再需要后续输出
+- 输出不含代码块时在输出结束后一次性输出去除首尾空白的原文(代码块可能出现在任意位置，结束前无法确定)
+- 去除代码首尾空白，末尾可能属于结束标记或空白的字符暂不输出
+- 代码块没有闭合(例如输出被截断)时输出已收到的代码，而不是原文
+"""
+
+import re
+from typing import List, Optional
+
+FENCE = "```"
+
+_PRELUDE = "prelude"
+_LANGUAGE = "language"
+_CODE_START = "code_start"
+_CODE = "code"
+_DONE = "done"
+
+
+class CodeFenceExtractor:
+    """增量代码块提取器"""
+
+    def __init__(self):
+        """初始化提取器"""
+        self._state = _PRELUDE
+        self._buffer = ""
+        self._pending_space = ""
+        self._scanned = 0
+
+    @property
+    def done(self) -> bool:
+        """第一个代码块是否已经结束"""
+        return self._state == _DONE
+
+    def _emit_text(self, text: str, out: List[str]) -> None:
+        """输出代码，末尾空白暂存，后面出现非空白字符时再一起输出"""
+        if not text:
+            return
+        stripped = text.rstrip()
+        if stripped:
+            out.append(self._pending_space + stripped)
+            self._pending_space = text[len(stripped):]
+        else:
+            self._pending_space += text
+
+    def feed(self, chunk: str) -> str:
+        """
+        输入一段模型输出
+
+        Args:
+            chunk: 新到达的文本
+
+        Returns:
+            可以立即输出的代码片段，可能为空字符串
+        """
+        if self._state == _DONE:
+            return ""
+        self._buffer += chunk
+        out: List[str] = []
+
+        while True:
+            if self._state == _PRELUDE:
+                # 从上次查找的位置继续，长前言不会被重复扫描
+                index = self._buffer.find(FENCE, self._scanned)
+                if index >= 0:
+                    self._buffer = self._buffer[index + len(FENCE):]
+                    self._state = _LANGUAGE
+                    continue
+                self._scanned = max(0, len(self._buffer) - len(FENCE) + 1)
+                break
+
+            if self._state == _LANGUAGE:
+                match = re.match(r"\w*", self._buffer)
+                if match.end() == len(self._buffer):
+                    break  # 语言标记可能还没结束
+                self._buffer = self._buffer[match.end():]
+                self._state = _CODE_START
+                continue
+
+            if self._state == _CODE_START:
+                self._buffer = self._buffer.lstrip()
+                if not self._buffer:
+                    break
+                self._state = _CODE
+                continue
+
+            if self._state == _CODE:
+                index = self._buffer.find(FENCE)
+                if index >= 0:
+                    self._emit_text(self._buffer[:index], out)
+                    self._buffer = ""
+                    self._pending_space = ""
+                    self._state = _DONE
+                    break
+                # 末尾的1-2个反引号可能是结束标记的开头，暂不输出
+                keep = len(self._buffer) - len(self._buffer.rstrip("`"))
+                self._emit_text(self._buffer[:len(self._buffer) - keep], out)
+                self._buffer = self._buffer[len(self._buffer) - keep:]
+                break
+
+            break
+
+        return "".join(out)
+
+    def finish(self) -> str:
+        """
+        输出结束，返回剩余的代码
+
+        Returns:
+            剩余的代码片段
+        """
+        if self._state == _PRELUDE:
+            # 没有代码块，整体作为代码
+            text, self._buffer = self._buffer.strip(), ""
+            self._state = _DONE
+            return text
+        if self._state == _CODE:
+            # 代码块没有闭合，剩余内容按普通代码输出
+            out: List[str] = []
+            self._emit_text(self._buffer, out)
+            self._buffer = ""
+            self._state = _DONE
+            return "".join(out)
+        self._state = _DONE
+        return ""
+
+
+def iter_until_cancelled(chunks, cancel_event=None):
+    """
+    迭代文本块，cancel_event被设置后停止
+
+    Args:
+        chunks: 文本块迭代器
+        cancel_event: threading.Event等带is_set方法的取消标志
+
+    Yields:
+        文本块
+    """
+    for chunk in chunks:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        yield chunk
+
+
+def extract_code_stream(chunks, extractor: Optional[CodeFenceExtractor] = None):
+    """
+    从文本块迭代器中增量提取代码
+
+    Args:
+        chunks: 模型输出文本块的迭代器
+        extractor: 代码块提取器，为None时使用默认参数创建
+
+    Yields:
+        非空的代码片段；第一个代码块结束后立即停止读取chunks
+    """
+    extractor = extractor or CodeFenceExtractor()
+    for chunk in chunks:
+        fragment = extractor.feed(chunk)
+        if fragment:
+            yield fragment
+        if extractor.done:
+            return
+    fragment = extractor.finish()
+    if fragment:
+        yield fragment
@@ -9,10 +9,13 @@ import os
 import json
 import logging
 import time
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Iterator
 import google.generativeai as genai
 
 # 导入接口定义
+from ..batch_engine import BatchGenerationEngine, TokenBucketRateLimiter
+from ..code_stream import extract_code_stream, iter_until_cancelled
+from ..static_analysis import StaticCodeAnalyzer, InconclusiveAnalysisError
 from ..interfaces.code_generation_interface import CodeGenerationInterface
 from ..interfaces.code_optimization_interface import CodeOptimizationInterface
 from ..interfaces.adapter_interface import KiloCodeAdapterInterface
@@ -67,6 +70,30 @@ class GeminiAdapter(CodeGenerationInterface, CodeOptimizationInterface, KiloCode
             "top_k": 40,
             "max_output_tokens": 8192,
         }
+        
+        # 批量生成参数
+        self.batch_config = {
+            "max_workers": int(os.environ.get("GEMINI_BATCH_WORKERS", "8")),
+            "requests_per_minute": int(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", "60")),
+            "tokens_per_minute": int(os.environ.get("GEMINI_TOKENS_PER_MINUTE", "1000000")),
+            "max_retries": 4
+        }
+        self._create_batch_engine()
+        
+        # 本地静态分析，结构性指标无需调用模型
+        self.static_analyzer = StaticCodeAnalyzer()
+    
+    def _create_batch_engine(self) -> None:
+        """根据批量生成参数创建限流器和批量引擎，限流器在多次批量调用之间共享"""
+        self.rate_limiter = TokenBucketRateLimiter(
+            self.batch_config["requests_per_minute"] or None,
+            self.batch_config["tokens_per_minute"] or None
+        )
+        self.batch_engine = BatchGenerationEngine(
+            max_workers=self.batch_config["max_workers"],
+            rate_limiter=self.rate_limiter,
+            max_retries=self.batch_config["max_retries"]
+        )
     
     def initialize(self, config: Dict[str, Any]) -> bool:
         """
@@ -95,6 +122,11 @@ class GeminiAdapter(CodeGenerationInterface, CodeOptimizationInterface, KiloCode
             if "capabilities" in config:
                 self._capabilities.update(config["capabilities"])
             
+            batch_keys = [key for key in self.batch_config if key in config]
+            if batch_keys:
+                self.batch_config.update({key: config[key] for key in batch_keys})
+                self._create_batch_engine()
+            
             # 初始化Gemini API
             genai.configure(api_key=self.api_key)
             
@@ -215,16 +247,9 @@ class GeminiAdapter(CodeGenerationInterface, CodeOptimizationInterface, KiloCode
             logger.debug(f"Generating code with prompt: {prompt[:50]}...")
             
             # 调用Gemini API
-            generation_config = genai.GenerationConfig(
-                temperature=self.generation_config["temperature"],
-                top_p=self.generation_config["top_p"],
-                top_k=self.generation_config["top_k"],
-                max_output_tokens=self.generation_config["max_output_tokens"],
-            )
-            
             response = self.model.generate_content(
                 full_prompt,
-                generation_config=generation_config
+                generation_config=self._build_generation_config()
             )
             
             if response and hasattr(response, 'text'):
@@ -393,6 +418,56 @@ Provide a comprehensive breakdown that covers all aspects of the task.
             logger.error(error_msg)
             raise RuntimeError(error_msg)
     
+    def generate_code_stream(self, prompt: str, context: Optional[Dict[str, Any]] = None,
+                             mode: str = "standard", cancel_event=None) -> Iterator[str]:
+        """
+        流式生成代码，随响应块到达增量输出代码片段
+        
+        片段拼接后与generate_code的结果一致；第一个代码块结束后立即停止读取。
+        关闭返回的生成器或设置cancel_event都会中止读取。
+        
+        Args:
+            prompt: 代码生成提示
+            context: 上下文信息
+            mode: 生成模式，可选值包括 "standard", "optimized", "explained"
+            cancel_event: 取消标志，例如threading.Event
+            
+        Returns:
+            代码片段的生成器
+            
+        Raises:
+            ValueError: 如果提示为空或模式无效
+            RuntimeError: 如果API调用失败
+        """
+        if not prompt:
+            raise ValueError("Prompt cannot be empty")
+        
+        if mode not in ["standard", "optimized", "explained"]:
+            raise ValueError(f"Invalid mode: {mode}. Must be one of: standard, optimized, explained")
+        
+        try:
+            response = self.model.generate_content(
+                self._build_code_generation_prompt(prompt, context, mode),
+                generation_config=self._build_generation_config(),
+                stream=True
+            )
+        except Exception as e:
+            error_msg = f"API request failed: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        
+        texts = (chunk.text for chunk in response)
+        return extract_code_stream(iter_until_cancelled(texts, cancel_event))
+    
+    def _build_generation_config(self):
+        """构建Gemini生成参数"""
+        return genai.GenerationConfig(
+            temperature=self.generation_config["temperature"],
+            top_p=self.generation_config["top_p"],
+            top_k=self.generation_config["top_k"],
+            max_output_tokens=self.generation_config["max_output_tokens"],
+        )
+    
     def batch_generate(self, prompts: List[str], context: Optional[Dict[str, Any]] = None) -> List[str]:
         """
         批量生成代码
@@ -402,27 +477,70 @@ Provide a comprehensive breakdown that covers all aspects of the task.
             context: 共享上下文信息
             
         Returns:
-            生成的代码字符串列表
+            生成的代码字符串列表，顺序与prompts一致，失败项为空字符串
             
         Raises:
             ValueError: 如果提示列表为空
-            RuntimeError: 如果API调用失败
         """
-        if not prompts:
-            raise ValueError("Prompts list cannot be empty")
-        
         results = []
         
-        for prompt in prompts:
-            try:
-                code = self.generate_code(prompt, context)
-                results.append(code)
-            except Exception as e:
-                logger.error(f"Error generating code for prompt '{prompt[:30]}...': {str(e)}")
+        for item in self.batch_generate_detailed(prompts, context):
+            if item["success"]:
+                results.append(item["code"])
+            else:
+                logger.error(f"Error generating code for prompt '{prompts[item['index']][:30]}...': {item['error']}")
                 results.append("")  # 添加空字符串作为占位符
         
         return results
     
+    def batch_generate_detailed(self, prompts: List[str], context: Optional[Dict[str, Any]] = None,
+                                mode: str = "standard") -> List[Dict[str, Any]]:
+        """
+        并发批量生成代码，受请求数和token数限流，429/5xx错误自动重试
+        
+        Args:
+            prompts: 代码生成提示列表
+            context: 共享上下文信息
+            mode: 生成模式
+            
+        Returns:
+            与prompts顺序一致的结果列表，每项包含index、success、code、error和attempts
+            
+        Raises:
+            ValueError: 如果提示列表为空或模式无效
+        """
+        if not prompts:
+            raise ValueError("Prompts list cannot be empty")
+        
+        if mode not in ["standard", "optimized", "explained"]:
+            raise ValueError(f"Invalid mode: {mode}. Must be one of: standard, optimized, explained")
+        
+        full_prompts = [self._build_code_generation_prompt(prompt, context, mode) for prompt in prompts]
+        generation_config = self._build_generation_config()
+        
+        def generate(full_prompt: str):
+            response = self.model.generate_content(full_prompt, generation_config=generation_config)
+            if not response or not hasattr(response, 'text'):
+                raise RuntimeError("Failed to generate code: Invalid response from Gemini API")
+            return response
+        
+        def estimate_tokens(full_prompt: str) -> int:
+            # 按约4个字符一个token估算输入，并预留最大输出，完成后按实际用量退还
+            return len(full_prompt) // 4 + self.generation_config["max_output_tokens"]
+        
+        def actual_tokens(response) -> Optional[int]:
+            usage = getattr(response, "usage_metadata", None)
+            return getattr(usage, "total_token_count", None) if usage else None
+        
+        items = self.batch_engine.run(full_prompts, generate, estimate_tokens, actual_tokens)
+        
+        return [
+            {"index": item["index"], "success": item["success"],
+             "code": self._extract_code_from_response(item["result"].text) if item["success"] else None,
+             "error": item["error"], "attempts": item["attempts"]}
+            for item in items
+        ]
+    
     def optimize_code(self, code: str, optimization_level: str = "medium") -> str:
         """
         优化代码
@@ -486,12 +604,15 @@ Return only the optimized code without any explanations or additional text.
             logger.error(error_msg)
             raise RuntimeError(error_msg)
     
-    def analyze_complexity(self, code: str) -> Dict[str, Any]:
+    def analyze_complexity(self, code: str, deep: bool = False) -> Dict[str, Any]:
         """
         分析代码复杂度
         
+        默认使用本地静态分析；deep为True、代码不是合法的Python代码或静态分析无法确定复杂度时调用模型深入分析。
+        
         Args:
             code: 需要分析的代码
+            deep: 是否调用模型深入分析
             
         Returns:
             包含复杂度分析的字典
@@ -503,6 +624,12 @@ Return only the optimized code without any explanations or additional text.
         if not code:
             raise ValueError("Code cannot be empty")
         
+        if not deep:
+            try:
+                return self.static_analyzer.analyze(code)
+            except (SyntaxError, InconclusiveAnalysisError):
+                logger.debug("Static analysis not applicable, falling back to model analysis")
+        
         try:
             # 构建提示
             prompt = f"""
@@ -557,12 +684,15 @@ Format your response as a JSON object with the following structure:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
     
-    def suggest_improvements(self, code: str) -> List[Dict[str, Any]]:
+    def suggest_improvements(self, code: str, deep: bool = False) -> List[Dict[str, Any]]:
         """
         提供代码改进建议
         
+        默认根据本地静态分析的结构性指标给出建议；deep为True或代码不是合法的Python代码时调用模型审查。
+        
         Args:
             code: 需要改进的代码
+            deep: 是否调用模型深入审查
             
         Returns:
             改进建议列表
@@ -574,6 +704,12 @@ Format your response as a JSON object with the following structure:
         if not code:
             raise ValueError("Code cannot be empty")
         
+        if not deep:
+            try:
+                return self.static_analyzer.suggest(code)
+            except SyntaxError:
+                logger.debug("Static analysis not applicable, falling back to model review")
+        
         try:
             # 构建提示
             prompt = f"""
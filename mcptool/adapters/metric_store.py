@@ -0,0 +1,270 @@
+"""
+列式指标环形缓冲区
+
+为性能监控提供定长、按列存储的时间序列：
+- 每列一个预分配的NumPy数组，追加只写入当前槽位，O(1)且不复制历史数据
+- 滚动均值、分位数和斜率(最小二乘)全部向量化计算
+- 多分辨率降采样(原始/1秒/1分钟/1小时)，每一层按时间桶求均值后写入各自的环形缓冲区，
+  以亚秒级采样时也能用有限内存保留数天的历史
+"""
+
+import math
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 默认分辨率层: (名称, 时间桶秒数, 容量)，时间桶为0表示不降采样的原始样本
+DEFAULT_RESOLUTIONS: Tuple[Tuple[str, float, int], ...] = (
+    ("raw", 0, 3600),
+    ("1s", 1, 86400),       # 1天
+    ("1m", 60, 10080),      # 7天
+    ("1h", 3600, 8760),     # 1年
+)
+
+
+class MetricRingBuffer:
+    """定长列式环形缓冲区，按时间顺序保存最近capacity个样本"""
+
+    def __init__(self, columns: Sequence[str], capacity: int):
+        """
+        初始化缓冲区
+
+        参数:
+            columns: 列名
+            capacity: 最多保留的样本数，写满后覆盖最旧的样本
+        """
+        if capacity <= 0:
+            raise ValueError("capacity必须大于0")
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros((len(self.columns), capacity), dtype=np.float64)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: Sequence[float]) -> None:
+        """
+        追加一个样本
+
+        参数:
+            timestamp: 样本时间(epoch秒)
+            values: 与columns顺序一致的数值
+        """
+        self._timestamps[self._head] = timestamp
+        self._values[:, self._head] = values
+        self._head = (self._head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def _ordered(self, array: np.ndarray, last: Optional[int]) -> np.ndarray:
+        count = self._size if last is None else max(0, min(last, self._size))
+        start = (self._head - count) % self.capacity
+        if start + count <= self.capacity:
+            return array[..., start:start + count]
+        return np.concatenate((array[..., start:], array[..., :self._head]), axis=-1)
+
+    def timestamps(self, last: Optional[int] = None) -> np.ndarray:
+        """按时间顺序返回最近last个样本的时间戳"""
+        return self._ordered(self._timestamps, last)
+
+    def column(self, name: str, last: Optional[int] = None) -> np.ndarray:
+        """按时间顺序返回某列最近last个样本"""
+        return self._ordered(self._values[self._index[name]], last)
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """返回最新的样本，缓冲区为空时返回None"""
+        if not self._size:
+            return None
+        slot = (self._head - 1) % self.capacity
+        sample = {name: float(self._values[i, slot]) for i, name in enumerate(self.columns)}
+        sample["timestamp"] = float(self._timestamps[slot])
+        return sample
+
+    def since(self, timestamp: float) -> int:
+        """返回时间戳不早于timestamp的样本数，可作为column的last参数"""
+        ordered = self.timestamps()
+        return int(ordered.size - np.searchsorted(ordered, timestamp, side="left"))
+
+    def rolling_mean(self, name: str, window: int, last: Optional[int] = None) -> np.ndarray:
+        """
+        计算滚动均值
+
+        参数:
+            name: 列名
+            window: 窗口大小
+            last: 只使用最近last个样本
+
+        返回:
+            长度为 样本数-window+1 的数组，样本不足时为空数组
+        """
+        values = self.column(name, last)
+        if window <= 0 or values.size < window:
+            return np.empty(0)
+        cumulative = np.cumsum(np.concatenate(([0.0], values)))
+        return (cumulative[window:] - cumulative[:-window]) / window
+
+    def rolling_percentile(self, name: str, window: int, percentile: float,
+                           last: Optional[int] = None) -> np.ndarray:
+        """计算滚动分位数，返回形状同rolling_mean"""
+        values = self.column(name, last)
+        if window <= 0 or values.size < window:
+            return np.empty(0)
+        return np.percentile(sliding_window_view(values, window), percentile, axis=-1)
+
+    def rolling_slope(self, name: str, window: int, last: Optional[int] = None) -> np.ndarray:
+        """计算滚动最小二乘斜率(每秒变化量)，返回形状同rolling_mean"""
+        values = self.column(name, last)
+        if window < 2 or values.size < window:
+            return np.empty(0)
+        return _slopes(sliding_window_view(self.timestamps(last), window),
+                       sliding_window_view(values, window))
+
+    def slope(self, name: str, last: Optional[int] = None) -> float:
+        """计算最近last个样本的最小二乘斜率(每秒变化量)"""
+        values = self.column(name, last)
+        if values.size < 2:
+            return 0.0
+        return float(_slopes(self.timestamps(last)[np.newaxis], values[np.newaxis])[0])
+
+    def describe(self, name: str, last: Optional[int] = None,
+                 percentiles: Sequence[float] = (50, 95, 99)) -> Dict[str, Any]:
+        """
+        汇总某列最近last个样本
+
+        返回:
+            count、average、min、max、各分位数(p50等)和slope，没有样本时只有count
+        """
+        values = self.column(name, last)
+        if not values.size:
+            return {"count": 0}
+        summary = {
+            "count": int(values.size),
+            "average": float(values.mean()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+        for percentile, value in zip(percentiles, np.percentile(values, percentiles)):
+            summary[f"p{percentile:g}"] = float(value)
+        summary["slope"] = self.slope(name, last)
+        return summary
+
+
+def _slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """按行计算y对x的最小二乘斜率，先按行去均值避免大时间戳的精度损失"""
+    x = x - x.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+    denominator = (x * x).sum(axis=-1)
+    numerator = (x * y).sum(axis=-1)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+class MultiResolutionMetricStore:
+    """多分辨率指标存储，原始样本和各降采样层各自一个环形缓冲区"""
+
+    def __init__(self, columns: Sequence[str],
+                 resolutions: Sequence[Tuple[str, float, int]] = DEFAULT_RESOLUTIONS):
+        """
+        初始化存储
+
+        参数:
+            columns: 列名
+            resolutions: (名称, 时间桶秒数, 容量) 列表，时间桶为0表示原始样本
+        """
+        self.columns = list(columns)
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, MetricRingBuffer] = {}
+        self._raw_tiers: List[MetricRingBuffer] = []
+        self._buckets: List[Dict[str, Any]] = []
+        for name, bucket_seconds, capacity in resolutions:
+            self._tiers[name] = MetricRingBuffer(self.columns, capacity)
+            if not bucket_seconds:
+                self._raw_tiers.append(self._tiers[name])
+            else:
+                self._buckets.append({
+                    "tier": self._tiers[name],
+                    "seconds": float(bucket_seconds),
+                    "bucket": None,
+                    "sum": np.zeros(len(self.columns)),
+                    "count": 0,
+                })
+
+    @property
+    def resolutions(self) -> List[str]:
+        """分辨率层名称，从细到粗"""
+        return list(self._tiers)
+
+    def tier(self, resolution: str = "raw") -> MetricRingBuffer:
+        """
+        获取某个分辨率层的缓冲区
+
+        注意返回的是内部缓冲区，跨线程读取时请使用snapshot
+        """
+        if resolution not in self._tiers:
+            raise KeyError(f"未知的分辨率: {resolution}，可选: {', '.join(self._tiers)}")
+        return self._tiers[resolution]
+
+    def append(self, timestamp: float, values: Sequence[float]) -> None:
+        """
+        追加一个原始样本，并累加到各降采样层的当前时间桶
+
+        某个时间桶结束(收到下一个桶的样本)时，以桶内均值写入该层，时间戳为桶的开始时间
+        """
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            for tier in self._raw_tiers:
+                tier.append(timestamp, values)
+            for state in self._buckets:
+                bucket = math.floor(timestamp / state["seconds"])
+                if state["bucket"] is not None and bucket != state["bucket"] and state["count"]:
+                    state["tier"].append(state["bucket"] * state["seconds"], state["sum"] / state["count"])
+                    state["sum"][:] = 0.0
+                    state["count"] = 0
+                state["bucket"] = bucket
+                state["sum"] += values
+                state["count"] += 1
+
+    def snapshot(self, resolution: str = "raw", last: Optional[int] = None,
+                 since: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        复制某层最近的数据，供其他线程分析
+
+        参数:
+            resolution: 分辨率层名称
+            last: 最多取最近last个样本
+            since: 只取时间戳不早于since的样本
+
+        返回:
+            {"timestamp": 数组, 列名: 数组}
+        """
+        with self._lock:
+            tier = self.tier(resolution)
+            if since is not None:
+                count = tier.since(since)
+                last = count if last is None else min(last, count)
+            data = {"timestamp": tier.timestamps(last).copy()}
+            for name in self.columns:
+                data[name] = tier.column(name, last).copy()
+        return data
+
+    def frozen(self, resolution: str = "raw", last: Optional[int] = None,
+               since: Optional[float] = None) -> MetricRingBuffer:
+        """把某层最近的数据复制成一个独立的缓冲区，便于在锁外调用滚动分析方法"""
+        data = self.snapshot(resolution, last, since)
+        buffer = MetricRingBuffer(self.columns, max(1, data["timestamp"].size))
+        count = data["timestamp"].size
+        buffer._timestamps[:count] = data["timestamp"]
+        for i, name in enumerate(self.columns):
+            buffer._values[i, :count] = data[name]
+        buffer._size = count
+        buffer._head = count % buffer.capacity
+        return buffer
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(next(iter(self._tiers.values())))
@@ -0,0 +1,311 @@
+"""
+验证指标写入器
+
+为灰度发布验证、模拟验证和API验证等SQLite数据库提供共享的批量写入：
+- 每个数据库文件一个长连接，开启WAL日志模式，读报告时不阻塞写入
+- 写入只把行放入队列，后台线程按批executemany并在一个事务内提交，
+  高频负载测试不再为每行打开连接和提交
+- 可为明细表配置汇总表，刷新时按分组和时间桶累加请求数、错误数和数值列的和/最小/最大值，
+  报告生成器直接读取汇总表而不扫描明细
+"""
+
+import atexit
+import queue
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Iterable, Sequence, Tuple
+
+logger = logging.getLogger("metrics_sink")
+
+_STOP = object()
+
+
+@dataclass
+class RollupSpec:
+    """汇总表配置"""
+    table: str
+    group_by: List[str]
+    value_columns: List[str]
+    time_column: str = "timestamp"
+    bucket_seconds: int = 60
+    is_error: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+
+@dataclass
+class _TableSpec:
+    columns: List[str]
+    insert_sql: str
+    rollup: Optional[RollupSpec] = None
+    rollup_sql: str = ""
+    rollup_columns: List[str] = field(default_factory=list)
+
+
+def _bucket_start(value: Any, bucket_seconds: int) -> str:
+    """把时间戳(datetime或ISO字符串)向下取整到时间桶的开始"""
+    if value is None:
+        moment = datetime.now()
+    elif isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value))
+    epoch = moment.timestamp()
+    return datetime.fromtimestamp(epoch - epoch % bucket_seconds).isoformat()
+
+
+class MetricsSink:
+    """基于后台刷新队列的SQLite批量写入器"""
+
+    _shared: Dict[str, "MetricsSink"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: str, batch_size: int = 500, flush_interval: float = 0.5,
+                 max_queue_size: int = 100000):
+        """
+        初始化写入器并启动后台刷新线程
+
+        参数:
+            db_path: 数据库文件路径
+            batch_size: 每个事务最多写入的行数
+            flush_interval: 队列空闲时最长等待多久提交一次(秒)
+            max_queue_size: 队列上限，写满后写入方阻塞，避免内存无限增长
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._lock = threading.RLock()
+        self._tables: Dict[str, _TableSpec] = {}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self.stats = {"rows_written": 0, "batches": 0, "rows_dropped": 0}
+        self._thread = threading.Thread(target=self._run, name=f"metrics-sink-{Path(db_path).name}", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls, db_path: str, **kwargs) -> "MetricsSink":
+        """
+        获取数据库文件对应的共享写入器，同一进程内的组件共用一个连接
+
+        参数:
+            db_path: 数据库文件路径
+            **kwargs: 首次创建时传给构造函数的参数
+
+        返回:
+            写入器
+        """
+        key = str(Path(db_path).resolve())
+        with cls._shared_lock:
+            sink = cls._shared.get(key)
+            if sink is None or sink._closed:
+                sink = cls(db_path, **kwargs)
+                cls._shared[key] = sink
+            return sink
+
+    def execute_script(self, script: str) -> None:
+        """在长连接上执行建表、建索引等语句"""
+        with self._lock:
+            self._conn.executescript(script)
+
+    def register_table(self, table: str, columns: Sequence[str], rollup: Optional[RollupSpec] = None) -> None:
+        """
+        注册可以写入的表
+
+        参数:
+            table: 表名，需已创建
+            columns: write传入的行中各值对应的列
+            rollup: 汇总表配置，汇总表不存在时自动创建
+        """
+        columns = list(columns)
+        spec = _TableSpec(
+            columns=columns,
+            insert_sql=f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            rollup=rollup
+        )
+        if rollup:
+            value_columns = [f"{column}_{kind}" for column in rollup.value_columns for kind in ("sum", "min", "max")]
+            keys = rollup.group_by + ["bucket_start"]
+            spec.rollup_columns = keys + ["request_count", "error_count"] + value_columns
+            definitions = [f"{key} TEXT" for key in keys] + ["request_count INTEGER", "error_count INTEGER"] + \
+                          [f"{column} REAL" for column in value_columns]
+            updates = ["request_count = request_count + excluded.request_count",
+                       "error_count = error_count + excluded.error_count"]
+            for column in rollup.value_columns:
+                updates.append(f"{column}_sum = {column}_sum + excluded.{column}_sum")
+                for kind, function in (("min", "MIN"), ("max", "MAX")):
+                    # 标量MIN/MAX遇到NULL会返回NULL，先用COALESCE补齐
+                    current, incoming = f"{column}_{kind}", f"excluded.{column}_{kind}"
+                    updates.append(f"{current} = {function}(COALESCE({current}, {incoming}), "
+                                   f"COALESCE({incoming}, {current}))")
+            spec.rollup_sql = (
+                f"INSERT INTO {rollup.table} ({', '.join(spec.rollup_columns)}) "
+                f"VALUES ({', '.join('?' * len(spec.rollup_columns))}) "
+                f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET {', '.join(updates)}"
+            )
+            self.execute_script(
+                f"CREATE TABLE IF NOT EXISTS {rollup.table} ({', '.join(definitions)}, "
+                f"PRIMARY KEY ({', '.join(keys)}));"
+            )
+        with self._lock:
+            self._tables[table] = spec
+
+    def write(self, table: str, row: Sequence[Any]) -> None:
+        """把一行放入写入队列"""
+        if self._closed:
+            raise RuntimeError(f"指标写入器已关闭: {self.db_path}")
+        if table not in self._tables:
+            raise KeyError(f"未注册的表: {table}")
+        self._queue.put((table, tuple(row)))
+
+    def write_many(self, table: str, rows: Iterable[Sequence[Any]]) -> None:
+        """把多行放入写入队列"""
+        for row in rows:
+            self.write(table, row)
+
+    def flush(self) -> None:
+        """阻塞直到已入队的行全部提交"""
+        self._queue.join()
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """
+        在长连接上查询，返回字典列表
+
+        参数:
+            sql: 查询语句
+            params: 查询参数
+
+        返回:
+            结果行
+        """
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            names = [description[0] for description in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def rollup_summary(self, table: str, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        按分组列汇总一个明细表的汇总表(合并所有时间桶)
+
+        参数:
+            table: 注册时配置了汇总表的明细表
+            where: 分组列的过滤条件
+
+        返回:
+            每组一行，包含request_count、error_count、error_rate以及各数值列的avg/min/max
+        """
+        rollup = self._tables[table].rollup
+        selects = ["SUM(request_count) AS request_count", "SUM(error_count) AS error_count"]
+        for column in rollup.value_columns:
+            selects.append(f"SUM({column}_sum) AS {column}_sum")
+            selects.append(f"MIN({column}_min) AS {column}_min")
+            selects.append(f"MAX({column}_max) AS {column}_max")
+        where = where or {}
+        clause = f" WHERE {' AND '.join(f'{key} = ?' for key in where)}" if where else ""
+        rows = self.query(
+            f"SELECT {', '.join(rollup.group_by + selects)} FROM {rollup.table}{clause} "
+            f"GROUP BY {', '.join(rollup.group_by)} ORDER BY {', '.join(rollup.group_by)}",
+            list(where.values())
+        )
+        for row in rows:
+            count = row["request_count"] or 0
+            row["error_rate"] = row["error_count"] / count * 100 if count else 0.0
+            for column in rollup.value_columns:
+                row[f"{column}_avg"] = row.pop(f"{column}_sum") / count if count else 0.0
+        return rows
+
+    def _rollup_rows(self, spec: _TableSpec, rows: List[Tuple]) -> List[Tuple]:
+        rollup = spec.rollup
+        aggregates: Dict[Tuple, List[Any]] = {}
+        for row in rows:
+            record = dict(zip(spec.columns, row))
+            key = tuple(record.get(column) for column in rollup.group_by) + \
+                (_bucket_start(record.get(rollup.time_column), rollup.bucket_seconds),)
+            entry = aggregates.get(key)
+            if entry is None:
+                entry = aggregates[key] = [0, 0] + [0.0, None, None] * len(rollup.value_columns)
+            entry[0] += 1
+            if rollup.is_error and rollup.is_error(record):
+                entry[1] += 1
+            for index, column in enumerate(rollup.value_columns):
+                value = record.get(column)
+                if value is None:
+                    continue
+                offset = 2 + index * 3
+                entry[offset] += value
+                entry[offset + 1] = value if entry[offset + 1] is None else min(entry[offset + 1], value)
+                entry[offset + 2] = value if entry[offset + 2] is None else max(entry[offset + 2], value)
+        return [key + tuple(entry) for key, entry in aggregates.items()]
+
+    def _write_batch(self, batch: List[Tuple[str, Tuple]]) -> None:
+        by_table: Dict[str, List[Tuple]] = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                for table, rows in by_table.items():
+                    spec = self._tables[table]
+                    self._conn.executemany(spec.insert_sql, rows)
+                    if spec.rollup:
+                        self._conn.executemany(spec.rollup_sql, self._rollup_rows(spec, rows))
+                self._conn.execute("COMMIT")
+                self.stats["rows_written"] += len(batch)
+                self.stats["batches"] += 1
+            except Exception as e:
+                self._conn.execute("ROLLBACK")
+                self.stats["rows_dropped"] += len(batch)
+                logger.error(f"写入指标失败，丢弃{len(batch)}行: {e}")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while len(batch) < self.batch_size and not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write_batch(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def close(self) -> None:
+        """写入剩余的行并关闭连接"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        with self._lock:
+            self._conn.close()
+
+    @classmethod
+    def close_all(cls) -> None:
+        """关闭全部共享写入器，进程退出时自动调用"""
+        with cls._shared_lock:
+            sinks = list(cls._shared.values())
+            cls._shared.clear()
+        for sink in sinks:
+            sink.close()
+
+
+atexit.register(MetricsSink.close_all)
@@ -0,0 +1,275 @@
+"""
+故障隔离模块
+为统一执行引擎提供按平台和工具的熔断器，以及根据观测延迟自适应调整的并发上限
+
+- CircuitBreaker: 关闭/打开/半开三态熔断器，连续失败或滑动窗口失败率超过阈值时打开，
+  冷却时间后进入半开状态放行少量探测请求，探测成功则恢复
+- AdaptiveConcurrencyLimiter: AIMD并发上限，延迟接近基准时加性增加，
+  失败或延迟明显高于基准时乘性减少；达到上限的请求直接拒绝，由调用方切换到备选工具
+- ResilienceManager: 汇总平台和工具级别的熔断器与并发上限
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """熔断器"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, failure_rate_threshold: float = 0.5,
+                 window_size: int = 20, min_calls: int = 10, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, clock: Callable[[], float] = time.monotonic):
+        """
+        初始化熔断器
+
+        参数:
+            name: 熔断器名称
+            failure_threshold: 连续失败多少次后打开
+            failure_rate_threshold: 滑动窗口内失败率达到该值后打开
+            window_size: 滑动窗口记录的调用数
+            min_calls: 窗口内至少有多少次调用才按失败率判断
+            recovery_timeout: 打开后多少秒进入半开状态
+            half_open_max_calls: 半开状态下同时放行的探测请求数
+            clock: 时钟函数，便于测试
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._window = deque(maxlen=window_size)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._consecutive_failures = 0
+        self._half_open_calls = 0
+        self.stats = {"rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        """当前状态，打开超过冷却时间后自动进入半开"""
+        if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = STATE_HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"熔断器进入半开状态: {self.name}")
+        return self._state
+
+    def allow_request(self) -> bool:
+        """检查是否放行请求，半开状态下占用一个探测名额"""
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record_success(self) -> None:
+        """记录成功调用"""
+        self._window.append(True)
+        self._consecutive_failures = 0
+        if self._state == STATE_HALF_OPEN:
+            self._state = STATE_CLOSED
+            self._window.clear()
+            logger.info(f"熔断器已恢复: {self.name}")
+
+    def record_failure(self) -> None:
+        """记录失败调用"""
+        self._window.append(False)
+        self._consecutive_failures += 1
+        if self._state == STATE_HALF_OPEN:
+            self._open()
+            return
+        failures = self._window.count(False)
+        if (self._consecutive_failures >= self.failure_threshold or
+                (len(self._window) >= self.min_calls and
+                 failures / len(self._window) >= self.failure_rate_threshold)):
+            if self._state == STATE_CLOSED:
+                self._open()
+
+    def release_probe(self) -> None:
+        """放行后未实际执行的请求归还半开探测名额"""
+        if self._state == STATE_HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def _open(self) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = self._clock()
+        self.stats["opened"] += 1
+        logger.warning(f"熔断器已打开: {self.name}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """状态快照"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "window_failure_rate": self._window.count(False) / len(self._window) if self._window else 0.0,
+            **self.stats
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """基于观测延迟的AIMD并发上限"""
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 latency_tolerance: float = 2.0, backoff: float = 0.5):
+        """
+        初始化并发上限
+
+        参数:
+            initial_limit: 初始并发上限
+            min_limit: 并发上限的下限
+            max_limit: 并发上限的上限
+            latency_tolerance: 延迟超过基准延迟的多少倍时视为过载
+            backoff: 过载或失败时并发上限的乘数
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self.stats = {"rejected": 0}
+
+    def try_acquire(self) -> bool:
+        """尝试占用一个并发名额，达到上限时立即返回False"""
+        if self.in_flight >= int(self.limit):
+            self.stats["rejected"] += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, success: bool) -> None:
+        """
+        归还并发名额并根据本次结果调整上限
+
+        参数:
+            latency: 本次调用耗时(秒)
+            success: 是否成功
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        if success:
+            # 基准取观测到的最小延迟，并缓慢上浮以适应服务本身的变化
+            if self.baseline_latency is None or latency < self.baseline_latency:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency += (latency - self.baseline_latency) * 0.01
+
+        if not success or latency > self.baseline_latency * self.latency_tolerance:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def cancel(self) -> None:
+        """归还被取消调用的并发名额，不调整上限"""
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """状态快照"""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "baseline_latency": self.baseline_latency,
+            **self.stats
+        }
+
+
+class ResilienceManager:
+    """平台和工具级别的熔断与并发控制"""
+
+    def __init__(self, breaker_config: Optional[Dict[str, Any]] = None,
+                 limiter_config: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化故障隔离管理器
+
+        参数:
+            breaker_config: CircuitBreaker的构造参数
+            limiter_config: AdaptiveConcurrencyLimiter的构造参数
+            clock: 时钟函数，便于测试
+        """
+        self.breaker_config = dict(breaker_config or {})
+        self.limiter_config = dict(limiter_config or {})
+        self._clock = clock
+        self.platform_breakers: Dict[str, CircuitBreaker] = {}
+        self.tool_breakers: Dict[str, CircuitBreaker] = {}
+        self.limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+    def _breaker(self, breakers: Dict[str, CircuitBreaker], name: str) -> CircuitBreaker:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name, clock=self._clock, **self.breaker_config)
+        return breakers[name]
+
+    def _limiter(self, platform: str) -> AdaptiveConcurrencyLimiter:
+        if platform not in self.limiters:
+            self.limiters[platform] = AdaptiveConcurrencyLimiter(**self.limiter_config)
+        return self.limiters[platform]
+
+    def acquire(self, tool: Dict) -> Optional[str]:
+        """
+        为工具调用申请放行
+
+        参数:
+            tool: 工具信息，使用id和platform
+
+        返回:
+            拒绝原因，放行时返回None
+        """
+        platform_breaker = self._breaker(self.platform_breakers, tool["platform"])
+        tool_breaker = self._breaker(self.tool_breakers, tool["id"])
+        if not platform_breaker.allow_request():
+            return "platform_circuit_open"
+        if not tool_breaker.allow_request():
+            platform_breaker.release_probe()
+            return "tool_circuit_open"
+        if not self._limiter(tool["platform"]).try_acquire():
+            platform_breaker.release_probe()
+            tool_breaker.release_probe()
+            return "concurrency_limit"
+        return None
+
+    def release(self, tool: Dict, latency: float, success: bool) -> None:
+        """
+        记录已放行调用的结果
+
+        参数:
+            tool: 工具信息
+            latency: 调用耗时(秒)
+            success: 是否成功
+        """
+        self._limiter(tool["platform"]).release(latency, success)
+        for breaker in (self.platform_breakers[tool["platform"]], self.tool_breakers[tool["id"]]):
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    def cancel(self, tool: Dict) -> None:
+        """
+        已放行的调用被取消时归还并发名额和半开探测名额，不计入成功或失败
+
+        参数:
+            tool: 工具信息
+        """
+        self._limiter(tool["platform"]).cancel()
+        self.platform_breakers[tool["platform"]].release_probe()
+        self.tool_breakers[tool["id"]].release_probe()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """全部熔断器和并发上限的状态"""
+        return {
+            "platforms": {name: breaker.snapshot() for name, breaker in self.platform_breakers.items()},
+            "tools": {name: breaker.snapshot() for name, breaker in self.tool_breakers.items()},
+            "concurrency": {name: limiter.snapshot() for name, limiter in self.limiters.items()}
+        }
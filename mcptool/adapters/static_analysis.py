@@ -0,0 +1,755 @@
+"""
+本地静态代码分析
+
+基于ast计算代码的结构性指标，供适配器的analyze_complexity和suggest_improvements使用，无需调用大模型：
+- 圈复杂度：1 + 分支、循环、异常处理、布尔运算和推导式条件的数量
+- 嵌套深度：控制结构的最大嵌套层数，以及循环的最大嵌套层数
+- 递归检测：函数体内直接调用自身(包括self.方法名)，按单次调用中可能同时执行的自调用数判断分支数，
+  参数为切片或减半下标(mid±1)时按分治估计，无法判断的多路递归标记为unknown，由调用方交给模型分析
+- 循环边界启发式：根据range参数、迭代对象和while条件变量的更新方式估计每个循环的迭代次数量级，
+  推导式的每个for子句按一层循环计
+- 内置操作：sorted/sum/list等消费整个容器的调用、count/index等线性方法，以及对非哈希容器的in判断按线性计；
+  调用同一段代码中定义的函数时计入被调函数的复杂度，相互递归无法确定时标记为unknown
+分析结果按代码的SHA-256缓存，相同代码重复分析直接返回缓存结果。
+"""
+
+import ast
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger("static_analysis")
+
+BOUND_CONSTANT = "constant"
+BOUND_LINEAR = "linear"
+BOUND_LOGARITHMIC = "logarithmic"
+BOUND_UNBOUNDED = "unbounded"
+BOUND_UNKNOWN = "unknown"
+
+# 循环边界对应的复杂度因子(n的幂次, log n的幂次)，无法判断的循环按线性估计
+_BOUND_FACTORS = {
+    BOUND_CONSTANT: (0, 0),
+    BOUND_LINEAR: (1, 0),
+    BOUND_LOGARITHMIC: (0, 1),
+    BOUND_UNBOUNDED: (1, 0),
+    BOUND_UNKNOWN: (1, 0),
+}
+
+_NESTING_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith)
+if hasattr(ast, "Match"):
+    _NESTING_NODES += (ast.Match,)
+if hasattr(ast, "TryStar"):
+    _NESTING_NODES += (ast.TryStar,)
+
+_LOOP_NODES = (ast.For, ast.AsyncFor, ast.While)
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+_SHRINK_OPS = (ast.FloorDiv, ast.Div, ast.RShift, ast.Mult, ast.LShift)
+_HALVING_OPS = (ast.FloorDiv, ast.Div, ast.RShift)
+_COMPREHENSION_NODES = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_NO_PATH = float("-inf")
+_NO_COST = (0, 0)
+
+# 消费整个可迭代对象的内置函数，min/max/sum等只在单个参数时按线性计
+_LINEAR_BUILTINS = {"sum", "min", "max", "any", "all", "list", "tuple", "set", "frozenset", "dict",
+                    "bytes", "bytearray"}
+_SORT_BUILTINS = {"sorted"}
+_MATERIALIZING_BUILTINS = {"sorted", "list", "tuple", "set", "frozenset", "dict"}
+# 线性时间的方法；join和extend的代价取决于参数，其余取决于调用对象
+_LINEAR_METHODS = {"count", "index", "copy", "remove", "insert", "reverse", "join", "extend"}
+_ARGUMENT_METHODS = {"join", "extend"}
+_SORT_METHODS = {"sort"}
+# 构造哈希容器的调用，in判断为常数时间
+_HASHED_CONSTRUCTORS = {"set", "frozenset", "dict", "Counter", "defaultdict", "OrderedDict"}
+_HASHED_NODES = (ast.Set, ast.Dict, ast.SetComp, ast.DictComp)
+_MEMO_DECORATORS = {"lru_cache", "cache", "cached", "memoize"}
+
+# 超过这些阈值时给出改进建议
+CYCLOMATIC_THRESHOLD = 10
+NESTING_THRESHOLD = 3
+
+
+class InconclusiveAnalysisError(ValueError):
+    """静态分析无法确定代码的时间复杂度"""
+
+
+def code_hash(code: str) -> str:
+    """计算代码的缓存键"""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def format_complexity(cost: Tuple[int, int, int]) -> str:
+    """
+    把复杂度元组格式化为大O表示
+
+    Args:
+        cost: (是否指数级, n的幂次, log n的幂次)
+
+    Returns:
+        例如"O(n^2 log n)"
+    """
+    exponential, power, log_power = cost
+    if exponential < 0:
+        return "unknown"
+    if exponential:
+        return "O(2^n)"
+    terms = []
+    if power:
+        terms.append("n" if power == 1 else f"n^{power}")
+    if log_power:
+        terms.append("log n" if log_power == 1 else f"log^{log_power} n")
+    return f"O({' '.join(terms) or '1'})"
+
+
+def _names(node: ast.AST) -> set:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _is_constant(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) or (
+        isinstance(node, ast.UnaryOp) and isinstance(node.operand, ast.Constant))
+
+
+def _walk_local(node: ast.AST):
+    """遍历节点，不进入嵌套的函数、lambda和类定义"""
+    for child in ast.iter_child_nodes(node):
+        yield child
+        if not isinstance(child, _FUNCTION_NODES + (ast.ClassDef,)):
+            yield from _walk_local(child)
+
+
+def iteration_bound(target: ast.AST) -> str:
+    """
+    估计遍历可迭代对象的迭代次数量级，用于for循环和推导式的for子句
+
+    Args:
+        target: 被遍历的表达式
+
+    Returns:
+        constant或linear
+    """
+    if isinstance(target, ast.Call) and isinstance(target.func, ast.Name) and target.func.id == "range":
+        return BOUND_CONSTANT if all(_is_constant(arg) for arg in target.args) else BOUND_LINEAR
+    if isinstance(target, (ast.List, ast.Tuple, ast.Set)) and all(_is_constant(e) for e in target.elts):
+        return BOUND_CONSTANT
+    if isinstance(target, ast.Constant):
+        return BOUND_CONSTANT
+    return BOUND_LINEAR
+
+
+def _add_cost(a: Tuple[int, int], b: Tuple[int, int]) -> Tuple[int, int]:
+    return a[0] + b[0], a[1] + b[1]
+
+
+def loop_bound(loop: ast.AST) -> str:
+    """
+    估计循环的迭代次数量级
+
+    Args:
+        loop: For、AsyncFor或While节点
+
+    Returns:
+        constant、linear、logarithmic、unbounded或unknown
+    """
+    if isinstance(loop, (ast.For, ast.AsyncFor)):
+        return iteration_bound(loop.iter)
+
+    if _is_constant(loop.test) and getattr(loop.test, "value", None):
+        return BOUND_UNBOUNDED
+    test_names = _names(loop.test)
+    if not test_names:
+        return BOUND_UNKNOWN
+
+    # 先找出由减半运算得到的变量，例如二分查找中的mid
+    halved = set()
+    for node in _walk_local(loop):
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.BinOp)
+                and isinstance(node.value.op, _SHRINK_OPS)):
+            halved.update(t.id for t in node.targets if isinstance(t, ast.Name))
+
+    bound = BOUND_UNKNOWN
+    for node in _walk_local(loop):
+        if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name) and node.target.id in test_names:
+            if isinstance(node.op, _SHRINK_OPS):
+                return BOUND_LOGARITHMIC
+            if isinstance(node.op, (ast.Add, ast.Sub)) and _is_constant(node.value):
+                bound = BOUND_LINEAR
+        elif isinstance(node, ast.Assign):
+            targets = {t.id for t in node.targets if isinstance(t, ast.Name)}
+            if not targets & test_names:
+                continue
+            value_names = _names(node.value)
+            if (isinstance(node.value, ast.BinOp) and isinstance(node.value.op, _SHRINK_OPS)) \
+                    or value_names & halved:
+                return BOUND_LOGARITHMIC
+            if isinstance(node.value, ast.BinOp) and value_names & targets:
+                bound = BOUND_LINEAR
+    return bound
+
+
+class _FunctionAnalyzer:
+    """单个函数(或模块顶层代码)的指标计算"""
+
+    def __init__(self, name: str, node: ast.AST, class_name: Optional[str] = None):
+        self.name = name
+        self.node = node
+        self.class_name = class_name
+        self.key = f"{class_name}.{name}" if class_name else name
+        self.loops: List[Dict[str, Any]] = []
+        self.self_calls = 0
+        self.comprehension_depth = 0
+        self._resolve = None
+        self._hashed = set()
+        # 被调函数带来的(指数级标记)，-1表示无法确定
+        self._callee_exponential = 0
+
+    def _callee_key(self, call: ast.Call) -> Optional[str]:
+        func = call.func
+        if isinstance(func, ast.Name):
+            return func.id
+        if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and self.class_name
+                and func.value.id in ("self", "cls", self.class_name)):
+            return f"{self.class_name}.{func.attr}"
+        return None
+
+    def _hashed_names(self) -> set:
+        """赋值为集合或字典的局部变量，对它们的in判断为常数时间"""
+        hashed = set()
+        for node in _walk_local(self.node):
+            value = getattr(node, "value", None) if isinstance(node, (ast.Assign, ast.AnnAssign)) else None
+            if value is None:
+                continue
+            if isinstance(value, _HASHED_NODES) or (
+                    isinstance(value, ast.Call) and isinstance(value.func, ast.Name)
+                    and value.func.id in _HASHED_CONSTRUCTORS):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                hashed.update(t.id for t in targets if isinstance(t, ast.Name))
+        return hashed
+
+    def _is_hashed(self, container: ast.AST) -> bool:
+        if _is_constant(container) or isinstance(container, _HASHED_NODES):
+            return True
+        if isinstance(container, (ast.List, ast.Tuple)) and all(_is_constant(e) for e in container.elts):
+            return True
+        if isinstance(container, ast.Name):
+            return container.id in self._hashed
+        if isinstance(container, ast.Call):
+            func = container.func
+            if isinstance(func, ast.Name):
+                return func.id in _HASHED_CONSTRUCTORS or func.id == "range"
+            return isinstance(func, ast.Attribute) and func.attr == "keys"
+        return False
+
+    def _operation_cost(self, node: ast.AST) -> Tuple[int, int]:
+        """单个表达式节点自身的代价，不含子表达式"""
+        if isinstance(node, ast.Compare):
+            linear = any(isinstance(op, (ast.In, ast.NotIn)) and not self._is_hashed(container)
+                         for op, container in zip(node.ops, node.comparators))
+            return (1, 0) if linear else _NO_COST
+        if not isinstance(node, ast.Call) or self._is_self_call(node):
+            return _NO_COST
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in _LINEAR_BUILTINS | _SORT_BUILTINS:
+            if len(node.args) != 1 or _is_constant(node.args[0]):
+                return _NO_COST
+            return (1, 1) if func.id in _SORT_BUILTINS else (1, 0)
+        if isinstance(func, ast.Attribute) and func.attr in _LINEAR_METHODS | _SORT_METHODS:
+            container = node.args[0] if func.attr in _ARGUMENT_METHODS and node.args else func.value
+            if _is_constant(container):
+                return _NO_COST
+            return (1, 1) if func.attr in _SORT_METHODS else (1, 0)
+        key = self._callee_key(node)
+        if key is None or self._resolve is None:
+            return _NO_COST
+        callee = self._resolve(key)
+        if callee is False:
+            return _NO_COST
+        if callee is None or callee[0] < 0:
+            self._callee_exponential = -1
+        elif callee[0] and self._callee_exponential == 0:
+            self._callee_exponential = 1
+        return (callee[1], callee[2]) if callee else _NO_COST
+
+    def _expression_cost(self, node: Optional[ast.AST], loop_depth: int) -> Tuple[int, int]:
+        """表达式一次求值的(n幂次, log幂次)"""
+        if node is None or isinstance(node, _FUNCTION_NODES + (ast.ClassDef,)):
+            return _NO_COST
+        if isinstance(node, _COMPREHENSION_NODES):
+            return self._comprehension_cost(node, loop_depth)
+        best = self._operation_cost(node)
+        for child in ast.iter_child_nodes(node):
+            best = max(best, self._expression_cost(child, loop_depth))
+        return best
+
+    def _comprehension_cost(self, node: ast.AST, loop_depth: int) -> Tuple[int, int]:
+        """推导式的每个for子句按一层循环计，后面的子句和元素表达式在前面的循环内求值"""
+        factor, best = _NO_COST, _NO_COST
+        for generator in node.generators:
+            # 第一个子句的迭代对象只求值一次，之后的子句每次外层迭代都求值
+            best = max(best, _add_cost(factor, self._expression_cost(generator.iter, loop_depth)))
+            bound = iteration_bound(generator.iter)
+            self.loops.append({"lineno": node.lineno, "type": "comprehension", "bound": bound})
+            factor = _add_cost(factor, _BOUND_FACTORS[bound])
+            loop_depth += 1
+            for condition in generator.ifs:
+                best = max(best, _add_cost(factor, self._expression_cost(condition, loop_depth)))
+        self.comprehension_depth = max(self.comprehension_depth, loop_depth)
+        elements = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+        for element in elements:
+            best = max(best, _add_cost(factor, self._expression_cost(element, loop_depth)))
+        return max(best, factor)
+
+    def _is_self_call(self, call: ast.Call) -> bool:
+        func = call.func
+        if isinstance(func, ast.Name):
+            return func.id == self.name and self.class_name is None
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+            return func.attr == self.name and func.value.id in ("self", "cls", self.class_name)
+        return False
+
+    def _memoized(self) -> bool:
+        for decorator in getattr(self.node, "decorator_list", []):
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", "")
+            if name in _MEMO_DECORATORS:
+                return True
+        return False
+
+    def cyclomatic_complexity(self) -> int:
+        complexity = 1
+        for node in _walk_local(self.node):
+            if isinstance(node, (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler)):
+                complexity += 1
+            elif isinstance(node, ast.BoolOp):
+                complexity += len(node.values) - 1
+            elif isinstance(node, ast.comprehension):
+                complexity += 1 + len(node.ifs)
+            elif hasattr(ast, "match_case") and isinstance(node, ast.match_case):
+                complexity += 1
+        return complexity
+
+    def _depths(self, statements, depth: int, loop_depth: int) -> Tuple[int, int]:
+        """返回语句列表内控制结构的最大嵌套深度和循环嵌套深度"""
+        max_depth, max_loop = depth, loop_depth
+        for statement in statements:
+            if isinstance(statement, _FUNCTION_NODES + (ast.ClassDef,)):
+                continue
+            if isinstance(statement, _NESTING_NODES):
+                inner_loop = loop_depth + 1 if isinstance(statement, _LOOP_NODES) else loop_depth
+                for field, children in ast.iter_fields(statement):
+                    if not isinstance(children, list) or not children or not isinstance(children[0], ast.AST):
+                        continue
+                    if field == "handlers":
+                        children = [s for handler in children for s in handler.body]
+                    elif field == "cases":
+                        children = [s for case in children for s in case.body]
+                    elif not isinstance(children[0], ast.stmt):
+                        continue
+                    # elif与所属的if视为同一层
+                    is_elif = (isinstance(statement, ast.If) and field == "orelse"
+                               and len(children) == 1 and isinstance(children[0], ast.If))
+                    child_depth = depth if is_elif else depth + 1
+                    d, l = self._depths(children, child_depth, loop_depth if is_elif else inner_loop)
+                    max_depth, max_loop = max(max_depth, d), max(max_loop, l)
+        return max_depth, max_loop
+
+    def _loop_cost(self, statements, loop_depth: int = 0) -> Tuple[int, int]:
+        """语句列表中最昂贵路径的(n幂次, log幂次)，包括循环、推导式和线性时间的内置操作"""
+        best = _NO_COST
+        for statement in statements:
+            if isinstance(statement, _FUNCTION_NODES + (ast.ClassDef,)):
+                continue
+            if isinstance(statement, _LOOP_NODES):
+                bound = loop_bound(statement)
+                self.loops.append({"lineno": statement.lineno, "type": type(statement).__name__.lower(),
+                                   "bound": bound})
+                factor = _BOUND_FACTORS[bound]
+                inner = self._loop_cost(statement.body, loop_depth + 1)
+                if isinstance(statement, ast.While):
+                    # while条件每次迭代都求值，for的迭代对象只求值一次
+                    inner = max(inner, self._expression_cost(statement.test, loop_depth + 1))
+                else:
+                    best = max(best, self._expression_cost(statement.iter, loop_depth))
+                best = max(best, _add_cost(factor, inner), self._loop_cost(statement.orelse, loop_depth))
+                continue
+            for field, children in ast.iter_fields(statement):
+                if field in ("handlers", "cases") and isinstance(children, list):
+                    for item in children:
+                        best = max(best, self._loop_cost(item.body, loop_depth))
+                elif isinstance(children, list) and children and isinstance(children[0], ast.stmt):
+                    best = max(best, self._loop_cost(children, loop_depth))
+                elif isinstance(children, list):
+                    for child in children:
+                        if isinstance(child, ast.AST):
+                            best = max(best, self._expression_cost(child, loop_depth))
+                elif isinstance(children, ast.AST):
+                    best = max(best, self._expression_cost(children, loop_depth))
+        return best
+
+    def _expression_calls(self, node: Optional[ast.AST]) -> int:
+        """表达式中一次求值最多执行的自调用数"""
+        if node is None or isinstance(node, _FUNCTION_NODES + (ast.ClassDef,)):
+            return 0
+        if isinstance(node, ast.IfExp):
+            return self._expression_calls(node.test) + max(
+                self._expression_calls(node.body), self._expression_calls(node.orelse))
+        count = sum(self._expression_calls(child) for child in ast.iter_child_nodes(node))
+        if isinstance(node, _COMPREHENSION_NODES):
+            # 推导式中的自调用按多次执行计
+            return 2 * count
+        if isinstance(node, ast.Call) and self._is_self_call(node):
+            count += 1
+        return count
+
+    def _path_calls(self, statements) -> Tuple[float, float]:
+        """
+        语句列表中单条执行路径上的最多自调用数
+
+        Returns:
+            (执行到末尾的路径的最大值, 以return或raise结束的路径的最大值)，没有这类路径时为-inf
+        """
+        fall, term = 0, _NO_PATH
+        for statement in statements:
+            if isinstance(statement, _FUNCTION_NODES + (ast.ClassDef,)):
+                continue
+            if isinstance(statement, (ast.Return, ast.Raise)):
+                term = max(term, fall + self._expression_calls(statement))
+                return _NO_PATH, term
+            if isinstance(statement, (ast.Break, ast.Continue)):
+                return fall, term
+            if isinstance(statement, ast.If):
+                test = fall + self._expression_calls(statement.test)
+                body, orelse = self._path_calls(statement.body), self._path_calls(statement.orelse)
+                term = max(term, test + max(body[1], orelse[1]))
+                fall = test + max(body[0], orelse[0])
+            elif isinstance(statement, _LOOP_NODES):
+                header = self._expression_calls(
+                    statement.test if isinstance(statement, ast.While) else statement.iter)
+                body_fall, body_term = self._path_calls(statement.body)
+                # 循环体中的自调用按多次执行计
+                repeated = fall + header + 2 * max(body_fall, 0)
+                orelse = self._path_calls(statement.orelse)
+                term = max(term, repeated + max(body_term, orelse[1]))
+                fall = repeated + max(orelse[0], 0)
+            elif isinstance(statement, (ast.Try,) + ((ast.TryStar,) if hasattr(ast, "TryStar") else ())):
+                body, orelse = self._path_calls(statement.body), self._path_calls(statement.orelse)
+                handlers = [self._path_calls(handler.body) for handler in statement.handlers]
+                final_fall, final_term = self._path_calls(statement.finalbody)
+                try_fall = max([body[0] + orelse[0]] + [h[0] for h in handlers])
+                try_term = max([body[1], body[0] + orelse[1]] + [h[1] for h in handlers])
+                term = max(term, fall + try_term + max(final_fall, 0), fall + max(try_fall, 0) + final_term)
+                fall = fall + try_fall + final_fall
+            elif isinstance(statement, (ast.With, ast.AsyncWith)):
+                items = sum(self._expression_calls(item.context_expr) for item in statement.items)
+                body = self._path_calls(statement.body)
+                term = max(term, fall + items + body[1])
+                fall = fall + items + body[0]
+            elif hasattr(ast, "Match") and isinstance(statement, ast.Match):
+                subject = fall + self._expression_calls(statement.subject)
+                cases = [self._path_calls(case.body) for case in statement.cases]
+                term = max([term] + [subject + c[1] for c in cases])
+                fall = max([subject] + [subject + c[0] for c in cases])
+            else:
+                fall += self._expression_calls(statement)
+        return fall, term
+
+    def _halved_names(self) -> set:
+        """由减半运算赋值的局部变量，例如mid = (lo + hi) // 2"""
+        halved = set()
+        for node in _walk_local(self.node):
+            if isinstance(node, ast.Assign) and any(
+                    isinstance(n, ast.BinOp) and isinstance(n.op, _HALVING_OPS) for n in ast.walk(node.value)):
+                halved.update(t.id for t in node.targets if isinstance(t, ast.Name))
+        return halved
+
+    @staticmethod
+    def _argument_shrink(call: ast.Call, halved: set) -> Optional[str]:
+        """
+        判断自调用参数缩小问题规模的方式
+
+        Returns:
+            halve(切片、减半或mid±1)、decrease(减去常数或常数切片)或None
+        """
+        kinds = set()
+        for arg in list(call.args) + [keyword.value for keyword in call.keywords]:
+            if isinstance(arg, ast.Subscript) and isinstance(arg.slice, ast.Slice):
+                bounds = [b for b in (arg.slice.lower, arg.slice.upper) if b is not None]
+                if bounds:
+                    kinds.add("decrease" if all(_is_constant(b) for b in bounds) else "halve")
+            elif isinstance(arg, ast.BinOp) and isinstance(arg.op, _HALVING_OPS):
+                kinds.add("halve")
+            elif _names(arg) & halved:
+                kinds.add("halve")
+            elif isinstance(arg, ast.BinOp) and isinstance(arg.op, ast.Sub) and _is_constant(arg.right):
+                kinds.add("decrease")
+        if "halve" in kinds:
+            return "halve"
+        return "decrease" if kinds else None
+
+    def analyze(self, resolve=None) -> Dict[str, Any]:
+        """
+        计算函数的指标
+
+        Args:
+            resolve: 按函数名返回同一段代码中其他函数复杂度元组的回调；不是本地函数时返回False，
+                相互递归无法确定时返回None
+        """
+        self._resolve = resolve
+        self._hashed = self._hashed_names()
+        body = self.node.body if isinstance(self.node.body, list) else [ast.Expr(self.node.body)]
+        nesting_depth, loop_depth = self._depths(body, 0, 0)
+        power, log_power = self._loop_cost(body)
+        loop_depth = max(loop_depth, self.comprehension_depth)
+        calls = [n for n in _walk_local(self.node) if isinstance(n, ast.Call) and self._is_self_call(n)]
+        self.self_calls = len(calls)
+        recursive = self.self_calls > 0
+        # 单次调用中可能同时执行的自调用数，互斥分支中的调用不叠加
+        branching = int(max(*self._path_calls(body), 0)) if recursive else 0
+        halved = self._halved_names()
+        shrink = {self._argument_shrink(call, halved) for call in calls}
+        recursion_depth = None
+        exponential = 0
+        if recursive:
+            recursion_depth = "log n" if shrink == {"halve"} else "n"
+            if branching <= 1 or self._memoized():
+                # 单路递归的代价为递归深度
+                if recursion_depth == "log n":
+                    log_power += 1
+                else:
+                    power += 1
+            elif shrink == {"halve"} and branching == 2:
+                # 二路分治：每层总工作量为O(n)(切片复制也是线性的)时为O(n log n)
+                slices = any(isinstance(arg, ast.Subscript) and isinstance(arg.slice, ast.Slice)
+                             for call in calls for arg in call.args)
+                if power <= 1 and (power or slices):
+                    power, log_power = 1, log_power + 1
+                elif power == 0:
+                    power = 1
+            elif shrink == {"decrease"}:
+                exponential = 1
+            else:
+                exponential = -1
+        if self._callee_exponential < 0:
+            exponential = -1
+        elif self._callee_exponential and exponential == 0:
+            exponential = 1
+        cost = (exponential, power, log_power)
+        return {
+            "name": self.name,
+            "lineno": getattr(self.node, "lineno", 1),
+            "cyclomatic_complexity": self.cyclomatic_complexity(),
+            "nesting_depth": nesting_depth,
+            "loop_depth": loop_depth,
+            "recursive": recursive,
+            "self_calls": self.self_calls,
+            "recursive_branching": branching,
+            "recursion_depth": recursion_depth,
+            "memoized": self._memoized(),
+            "loops": sorted(self.loops, key=lambda loop: loop["lineno"]),
+            "time_complexity": format_complexity(cost),
+            "_cost": cost
+        }
+
+
+class StaticCodeAnalyzer:
+    """带缓存的Python代码静态分析器"""
+
+    def __init__(self, cache_size: int = 256):
+        """
+        初始化分析器
+
+        Args:
+            cache_size: 按代码哈希缓存的最大结果数
+        """
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _get(self, code: str) -> Dict[str, Any]:
+        key = code_hash(code)
+        with self._lock:
+            record = self._cache.get(key)
+            if record is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return record
+            self.stats["misses"] += 1
+
+        record = self._analyze(code, key)
+        with self._lock:
+            self._cache[key] = record
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return record
+
+    def analyze(self, code: str, allow_unknown: bool = False) -> Dict[str, Any]:
+        """
+        分析代码复杂度
+
+        Args:
+            code: Python代码
+            allow_unknown: 为True时无法确定的复杂度以unknown返回，否则抛出InconclusiveAnalysisError
+
+        Returns:
+            与模型分析相同结构的复杂度字典，另含functions和source字段
+
+        Raises:
+            SyntaxError: 如果代码不是合法的Python代码
+            InconclusiveAnalysisError: 如果无法确定时间复杂度且allow_unknown为False
+        """
+        analysis = self._get(code)["analysis"]
+        if analysis["time_complexity"] == "unknown" and not allow_unknown:
+            unknown = [f["name"] for f in analysis["functions"] if f["time_complexity"] == "unknown"]
+            raise InconclusiveAnalysisError(f"Cannot determine the time complexity of: {', '.join(unknown)}")
+        return copy.deepcopy(analysis)
+
+    def suggest(self, code: str) -> List[Dict[str, Any]]:
+        """
+        根据结构性指标给出改进建议
+
+        Args:
+            code: Python代码
+
+        Returns:
+            改进建议列表，每项包含type、description、code_snippet和line
+
+        Raises:
+            SyntaxError: 如果代码不是合法的Python代码
+        """
+        return copy.deepcopy(self._get(code)["suggestions"])
+
+    def _collect_functions(self, tree: ast.Module) -> List[_FunctionAnalyzer]:
+        functions = [_FunctionAnalyzer("<module>", tree)]
+
+        def visit(node, class_name):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    functions.append(_FunctionAnalyzer(child.name, child, class_name))
+                    visit(child, None)
+                elif isinstance(child, ast.ClassDef):
+                    visit(child, child.name)
+                else:
+                    visit(child, class_name)
+
+        visit(tree, None)
+        return functions
+
+    def _analyze(self, code: str, key: str) -> Dict[str, Any]:
+        tree = ast.parse(code)
+        analyzers = self._collect_functions(tree)
+        by_key = {}
+        for analyzer in analyzers[1:]:
+            by_key.setdefault(analyzer.key, analyzer)
+        results: Dict[int, Dict[str, Any]] = {}
+        resolving = set()
+
+        def analyze(analyzer):
+            if id(analyzer) not in results:
+                resolving.add(id(analyzer))
+                results[id(analyzer)] = analyzer.analyze(resolve)
+                resolving.discard(id(analyzer))
+            return results[id(analyzer)]
+
+        def resolve(key):
+            callee = by_key.get(key)
+            if callee is None:
+                return False
+            if id(callee) in resolving:
+                return None
+            return analyze(callee)["_cost"]
+
+        functions = [analyze(analyzer) for analyzer in analyzers]
+        # 只有定义的模块不单独列出顶层代码
+        if len(functions) > 1 and not functions[0]["loops"] and functions[0]["cyclomatic_complexity"] == 1:
+            functions = functions[1:]
+
+        worst = max(functions, key=lambda f: f["_cost"])
+        time_complexity = worst["time_complexity"]
+        if any(f["_cost"][0] < 0 for f in functions):
+            time_complexity = "unknown"
+        recursive = any(f["recursive"] for f in functions)
+        allocates = any(isinstance(n, (ast.ListComp, ast.DictComp, ast.SetComp)) for n in ast.walk(tree)) or any(
+            isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id in _MATERIALIZING_BUILTINS
+            and len(n.args) == 1 and not _is_constant(n.args[0]) for n in ast.walk(tree)) or any(
+            isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute) and n.func.attr in ("append", "add")
+            for loop in ast.walk(tree) if isinstance(loop, _LOOP_NODES) for n in ast.walk(loop))
+        if allocates or any(f["recursion_depth"] == "n" for f in functions):
+            space = "O(n)"
+        else:
+            space = "O(log n)" if recursive else "O(1)"
+
+        bottlenecks = []
+        for f in functions:
+            if f["_cost"][0] > 0 and f["recursive_branching"] > 1:
+                bottlenecks.append(f"{f['name']}: multiple recursive calls without memoization")
+            elif f["_cost"][0] > 0:
+                bottlenecks.append(f"{f['name']}: calls an exponential-time function")
+            elif f["_cost"][1] >= 2 and f["loop_depth"] >= 2:
+                bottlenecks.append(f"{f['name']}: {f['loop_depth']} nested loops ({f['time_complexity']})")
+            elif f["_cost"][1] >= 2:
+                bottlenecks.append(f"{f['name']}: linear-time operation inside a loop ({f['time_complexity']})")
+            if any(loop["bound"] == BOUND_UNBOUNDED for loop in f["loops"]):
+                bottlenecks.append(f"{f['name']}: loop without a visible bound")
+
+        suggestions = self._suggestions(tree, functions)
+        for f in functions:
+            f.pop("_cost")
+        analysis = {
+            "time_complexity": time_complexity,
+            "space_complexity": space,
+            "details": {
+                "loops": sum(len(f["loops"]) for f in functions),
+                "nested_depth": max(f["nesting_depth"] for f in functions),
+                "loop_depth": max(f["loop_depth"] for f in functions),
+                "recursive": recursive,
+                "cyclomatic_complexity": max(f["cyclomatic_complexity"] for f in functions),
+                "total_cyclomatic_complexity": sum(f["cyclomatic_complexity"] for f in functions),
+                "worst_case_time": time_complexity
+            },
+            "bottlenecks": bottlenecks,
+            "functions": functions,
+            "code_hash": key,
+            "source": "static"
+        }
+        return {"analysis": analysis, "suggestions": suggestions}
+
+    def _suggestions(self, tree: ast.Module, functions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        suggestions = []
+
+        def add(kind, description, line, snippet=""):
+            suggestions.append({"type": kind, "description": description, "code_snippet": snippet, "line": line})
+
+        for f in functions:
+            if f["cyclomatic_complexity"] > CYCLOMATIC_THRESHOLD:
+                add("Readability", f"`{f['name']}` has cyclomatic complexity {f['cyclomatic_complexity']}; "
+                    f"split it into smaller functions", f["lineno"])
+            if f["nesting_depth"] > NESTING_THRESHOLD:
+                add("Readability", f"`{f['name']}` nests control flow {f['nesting_depth']} levels deep; "
+                    f"use guard clauses or extract helpers", f["lineno"])
+            if f["_cost"][0] > 0 and f["recursive_branching"] > 1:
+                add("Performance", f"`{f['name']}` calls itself {f['recursive_branching']} times per call, which is "
+                    f"exponential; memoize it", f["lineno"], "@functools.lru_cache(maxsize=None)")
+            elif f["_cost"][1] >= 2 and f["loop_depth"] >= 2:
+                add("Performance", f"`{f['name']}` has {f['loop_depth']} nested loops "
+                    f"({f['time_complexity']}); consider indexing with a dict or set", f["lineno"])
+            elif f["_cost"][1] >= 2:
+                add("Performance", f"`{f['name']}` repeats a linear-time operation (`in`, `count`, `index`, ...) "
+                    f"inside a loop ({f['time_complexity']}); build a set, dict or Counter once instead", f["lineno"])
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.While) and loop_bound(node) == BOUND_UNBOUNDED and not any(
+                    isinstance(n, (ast.Break, ast.Return, ast.Raise)) for n in _walk_local(node)):
+                add("Correctness", "`while True` loop has no break, return or raise", node.lineno)
+            elif isinstance(node, ast.ExceptHandler) and node.type is None:
+                add("Reliability", "Bare `except:` also catches KeyboardInterrupt and SystemExit; "
+                    "catch specific exceptions", node.lineno, "except Exception:")
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+                    if isinstance(default, (ast.List, ast.Dict, ast.Set)):
+                        add("Correctness", f"`{node.name}` uses a mutable default argument shared between "
+                            f"calls; default to None instead", node.lineno)
+                        break
+        return sorted(suggestions, key=lambda s: s["line"])
@@ -0,0 +1,298 @@
+"""
+本地工具目录模块
+为统一智能工具引擎提供持久化的工具目录，工具发现完全基于本地状态
+
+- SQLite目录保存各平台的工具，以及每个平台的同步游标和ETag
+- 同步时携带游标和If-None-Match请求增量，未变化时平台返回304；
+  平台只返回全量列表时按工具版本比较，只写入有变化的工具
+- 后台线程定期刷新，刷新完成后重建内存索引并整体替换，查询不会看到半更新的状态
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+def tool_version(tool: Dict[str, Any]) -> str:
+    """返回工具版本，工具未提供version时使用内容哈希"""
+    if tool.get("version"):
+        return str(tool["version"])
+    return hashlib.sha1(json.dumps(tool, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class StaticToolSource:
+    """内置工具列表来源，每次同步返回全量列表"""
+
+    def __init__(self, tools: List[Dict[str, Any]]):
+        self.tools = tools
+
+    def fetch(self, cursor: Optional[str], etag: Optional[str]) -> Dict[str, Any]:
+        return {"tools": self.tools, "full": True}
+
+
+class HTTPToolSource:
+    """
+    HTTP工具目录来源
+
+    请求 GET url?since=<游标>，携带If-None-Match；响应为
+    {"tools": [...], "deleted": [工具ID], "cursor": 新游标, "full": 是否全量}，
+    或者直接返回全量工具列表
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30.0):
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.headers.update(headers or {})
+
+    def fetch(self, cursor: Optional[str], etag: Optional[str]) -> Dict[str, Any]:
+        headers = {"If-None-Match": etag} if etag else {}
+        params = {"since": cursor} if cursor else {}
+        response = self._session.get(self.url, params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return {"not_modified": True}
+        response.raise_for_status()
+
+        payload = response.json()
+        if isinstance(payload, list):
+            payload = {"tools": payload, "full": True}
+        payload["etag"] = response.headers.get("ETag")
+        payload.setdefault("full", not cursor)
+        return payload
+
+
+class ToolIndex:
+    """工具目录的只读内存索引，同步后整体替换"""
+
+    def __init__(self, tools: List[Dict[str, Any]]):
+        self.tools = {tool["id"]: tool for tool in tools}
+        self._search_text = {
+            tool["id"]: (tool.get("name", "") + "\n" + tool.get("description", "")).lower() for tool in tools
+        }
+        self._by_category: Dict[str, List[str]] = {}
+        for tool in tools:
+            self._by_category.setdefault(tool.get("category"), []).append(tool["id"])
+
+    def get(self, tool_id: str) -> Optional[Dict[str, Any]]:
+        return self.tools.get(tool_id)
+
+    def search(self, query: str = "", category: Optional[str] = None, source: Optional[str] = None,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按名称或描述搜索工具
+
+        参数:
+            query: 查询词，为空时不过滤
+            category: 类别过滤
+            source: 来源过滤(local/cloud)
+            limit: 最多返回数量
+
+        返回:
+            工具信息副本的列表
+        """
+        tool_ids = self._by_category.get(category, []) if category else self.tools.keys()
+        query = query.lower()
+        results = []
+        for tool_id in tool_ids:
+            tool = self.tools[tool_id]
+            if source and tool.get("source") != source:
+                continue
+            if query and query not in self._search_text[tool_id]:
+                continue
+            results.append(dict(tool))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+class ToolCatalog:
+    """持久化工具目录，负责增量同步、后台刷新和内存索引"""
+
+    def __init__(self, db_path: str):
+        """
+        初始化工具目录
+
+        参数:
+            db_path: SQLite数据库路径
+        """
+        self.db_path = db_path
+        self._sources: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tools (
+                platform TEXT NOT NULL,
+                tool_id TEXT NOT NULL,
+                version TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (platform, tool_id)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                platform TEXT PRIMARY KEY,
+                cursor TEXT,
+                etag TEXT,
+                last_sync REAL
+            );
+        """)
+        self._conn.commit()
+
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.index = self._build_index()
+
+    def register_source(self, platform: str, source, tool_source: str) -> None:
+        """
+        注册平台的工具来源
+
+        参数:
+            platform: 平台名称
+            source: 提供fetch(cursor, etag)方法的来源对象
+            tool_source: 写入工具信息的source字段(local/cloud)
+        """
+        self._sources[platform] = {"source": source, "tool_source": tool_source}
+
+    def has_source(self, platform: str) -> bool:
+        """检查平台是否已注册工具来源"""
+        return platform in self._sources
+
+    def _build_index(self) -> ToolIndex:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM tools ORDER BY platform, rowid").fetchall()
+        return ToolIndex([json.loads(row[0]) for row in rows])
+
+    def get_sync_state(self, platform: str) -> Dict[str, Any]:
+        """获取平台的同步状态"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor, etag, last_sync FROM sync_state WHERE platform = ?", (platform,)
+            ).fetchone()
+            count = self._conn.execute("SELECT COUNT(*) FROM tools WHERE platform = ?", (platform,)).fetchone()[0]
+        cursor, etag, last_sync = row if row else (None, None, None)
+        return {"cursor": cursor, "etag": etag, "last_sync": last_sync, "tools_count": count}
+
+    def _apply_delta(self, platform: str, tool_source: str, delta: Dict[str, Any]) -> Dict[str, int]:
+        """在一个事务中写入变化的工具并更新同步状态"""
+        counts = {"new_tools": 0, "updated_tools": 0, "deleted_tools": 0}
+        now = time.time()
+        with self._lock:
+            existing = dict(self._conn.execute(
+                "SELECT tool_id, version FROM tools WHERE platform = ?", (platform,)
+            ).fetchall())
+            upserts = []
+            seen = set()
+            for tool in delta.get("tools", []):
+                tool = {**tool, "source": tool_source, "platform": platform}
+                version = tool_version(tool)
+                seen.add(tool["id"])
+                if existing.get(tool["id"]) == version:
+                    continue
+                counts["updated_tools" if tool["id"] in existing else "new_tools"] += 1
+                upserts.append((platform, tool["id"], version, json.dumps(tool, ensure_ascii=False), now))
+
+            deleted = set(delta.get("deleted", []))
+            if delta.get("full"):
+                deleted |= set(existing) - seen
+            deleted &= set(existing)
+            counts["deleted_tools"] = len(deleted)
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tools (platform, tool_id, version, data, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)", upserts
+                )
+                self._conn.executemany(
+                    "DELETE FROM tools WHERE platform = ? AND tool_id = ?",
+                    [(platform, tool_id) for tool_id in deleted]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (platform, cursor, etag, last_sync) VALUES (?, ?, ?, ?)",
+                    (platform, delta.get("cursor"), delta.get("etag"), now)
+                )
+        return counts
+
+    def sync(self, platforms: Optional[List[str]] = None, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        同步平台工具目录
+
+        参数:
+            platforms: 要同步的平台，为None时同步全部已注册平台
+            force: 是否忽略游标和ETag请求全量列表(仍然只写入有变化的工具)
+
+        返回:
+            每个平台的同步结果
+        """
+        results = {}
+        changed = False
+        with self._sync_lock:
+            for platform in platforms or list(self._sources):
+                entry = self._sources[platform]
+                state = self.get_sync_state(platform)
+                result = {"status": "completed", "not_modified": False,
+                          "new_tools": 0, "updated_tools": 0, "deleted_tools": 0}
+                try:
+                    delta = entry["source"].fetch(None if force else state["cursor"],
+                                                  None if force else state["etag"])
+                    if delta.get("not_modified"):
+                        result["not_modified"] = True
+                        with self._lock, self._conn:
+                            self._conn.execute("UPDATE sync_state SET last_sync = ? WHERE platform = ?",
+                                               (time.time(), platform))
+                    else:
+                        result.update(self._apply_delta(platform, entry["tool_source"], delta))
+                        changed = changed or any(result[key] for key in
+                                                 ("new_tools", "updated_tools", "deleted_tools"))
+                except Exception as e:
+                    logger.error(f"同步平台工具失败 {platform}: {e}")
+                    result.update(status="failed", error=str(e))
+                result["tools_count"] = self.get_sync_state(platform)["tools_count"]
+                results[platform] = result
+
+            if changed:
+                # 新索引构建完成后一次性替换引用，查询线程始终看到完整的索引
+                self.index = self._build_index()
+        return results
+
+    def start_background_refresh(self, interval: float) -> None:
+        """
+        启动后台定期刷新，启动后立即进行一次同步
+
+        参数:
+            interval: 刷新间隔(秒)
+        """
+        if self._refresh_thread is not None:
+            return
+        self._stop_event.clear()
+
+        def refresh_loop():
+            while not self._stop_event.is_set():
+                self.sync()
+                self._stop_event.wait(interval)
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="tool-catalog-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self) -> None:
+        """停止后台刷新"""
+        if self._refresh_thread is None:
+            return
+        self._stop_event.set()
+        self._refresh_thread.join()
+        self._refresh_thread = None
+
+    def close(self) -> None:
+        """停止后台刷新并关闭数据库连接"""
+        self.stop_background_refresh()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,643 @@
+"""
+工具执行器模块
+为统一智能工具引擎提供可插拔的真实执行层，替代模拟执行
+
+支持三种执行器:
+- PythonToolExecutor: 进程内Python可调用对象，同步函数在线程池中运行
+- SubprocessToolExecutor: 子进程工具，通过stdin/stdout交换JSON
+- HTTPMCPExecutor: Streamable HTTP MCP端点，每个端点完成一次initialize握手后携带会话和协议版本请求头
+  发送JSON-RPC tools/call请求，请求通过异步连接池复用keep-alive连接
+
+ToolExecutorRegistry负责工具到执行器的映射、按端点限制并发、超时控制，
+并提供execute_many并发执行互不依赖的工具调用。端点名额在底层工作真正结束时才归还：
+超时会取消HTTP请求、结束子进程，无法中止的同步Python函数在线程返回前一直占用名额
+"""
+
+import json
+import time
+import asyncio
+import logging
+import importlib
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+from .async_http import AsyncHTTPConnectionPool
+
+logger = logging.getLogger(__name__)
+
+MCP_PROTOCOL_VERSION = "2025-06-18"
+MCP_CLIENT_INFO = {"name": "powerautomation-tool-engine", "version": "1.0.0"}
+
+
+class ToolExecutionError(Exception):
+    """工具执行失败"""
+
+
+class ToolTimeoutError(ToolExecutionError):
+    """工具执行超时"""
+
+
+class PythonToolExecutor:
+    """进程内Python工具执行器"""
+
+    kind = "python"
+
+    def __init__(self, max_workers: int = 8):
+        self._tools: Dict[str, Callable[..., Any]] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="python-tool")
+
+    def register(self, name: str, func: Callable[..., Any]) -> None:
+        """注册工具函数，函数以关键字参数接收工具参数，可以是协程函数"""
+        self._tools[name] = func
+
+    def has_tool(self, name: str) -> bool:
+        return name in self._tools
+
+    def endpoint(self, name: str) -> str:
+        return f"python:{name}"
+
+    async def execute(self, name: str, arguments: Dict[str, Any],
+                      lease: Optional["EndpointLease"] = None) -> Any:
+        func = self._tools[name]
+        if asyncio.iscoroutinefunction(func):
+            return await func(**arguments)
+        future = self._pool.submit(lambda: func(**arguments))
+        if lease is not None:
+            # 超时后线程无法中止，线程返回前一直占用端点名额
+            release = lease.hold()
+            future.add_done_callback(lambda _: release())
+        return await asyncio.wrap_future(future)
+
+    async def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+class SubprocessToolExecutor:
+    """
+    子进程工具执行器
+
+    每次调用启动一个子进程，向stdin写入 {"tool": 名称, "arguments": 参数} 的JSON，
+    stdout输出JSON时解析为结果，否则返回原始文本；退出码非0视为失败
+    """
+
+    kind = "subprocess"
+
+    def __init__(self):
+        self._tools: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, command: List[str], cwd: Optional[str] = None,
+                 env: Optional[Dict[str, str]] = None) -> None:
+        """注册子进程工具"""
+        self._tools[name] = {"command": list(command), "cwd": cwd, "env": env}
+
+    def has_tool(self, name: str) -> bool:
+        return name in self._tools
+
+    def endpoint(self, name: str) -> str:
+        return f"subprocess:{name}"
+
+    async def execute(self, name: str, arguments: Dict[str, Any],
+                      lease: Optional["EndpointLease"] = None) -> Any:
+        spec = self._tools[name]
+        process = await asyncio.create_subprocess_exec(
+            *spec["command"], cwd=spec["cwd"], env=spec["env"],
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        payload = json.dumps({"tool": name, "arguments": arguments}, ensure_ascii=False, default=str)
+        try:
+            stdout, stderr = await process.communicate(payload.encode("utf-8"))
+        except asyncio.CancelledError:
+            # 超时或取消时结束子进程，避免遗留孤儿进程
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+        if process.returncode != 0:
+            raise ToolExecutionError(
+                f"子进程退出码 {process.returncode}: {stderr.decode('utf-8', 'replace').strip()[:500]}"
+            )
+        output = stdout.decode("utf-8", "replace").strip()
+        try:
+            return json.loads(output)
+        except ValueError:
+            return output
+
+    async def close(self) -> None:
+        pass
+
+
+class HTTPMCPExecutor:
+    """
+    Streamable HTTP MCP端点执行器
+
+    每个端点首次调用时发送initialize请求和notifications/initialized通知，之后的请求携带
+    Mcp-Session-Id和MCP-Protocol-Version请求头，会话过期(HTTP 404)时重新握手一次。
+    请求在执行器自己的后台事件循环中通过AsyncHTTPConnectionPool发送，各调用方
+    (包括每次使用新事件循环的同步入口)共享同一组keep-alive连接；
+    响应支持application/json和text/event-stream两种格式
+    """
+
+    kind = "http"
+
+    def __init__(self, max_connections: int = 32, timeout: float = 30.0,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        初始化HTTP MCP执行器
+
+        参数:
+            max_connections: 最大并发连接数
+            timeout: 建立连接和读取响应的超时时间(秒)
+            headers: 附加的请求头，例如认证信息
+        """
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+        self.headers.update(headers or {})
+        self.sessions: Dict[str, Dict[str, Optional[str]]] = {}
+        self._tools: Dict[str, Dict[str, str]] = {}
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        # 以下对象只在后台事件循环中使用
+        self._http: Optional[AsyncHTTPConnectionPool] = None
+        self._handshakes: Dict[str, asyncio.Lock] = {}
+
+    def register(self, name: str, endpoint: str, remote_name: Optional[str] = None) -> None:
+        """注册HTTP MCP工具，remote_name为端点上的工具名，默认与name相同"""
+        self._tools[name] = {"endpoint": endpoint, "remote_name": remote_name or name}
+
+    def has_tool(self, name: str) -> bool:
+        return name in self._tools
+
+    def endpoint(self, name: str) -> str:
+        return self._tools[name]["endpoint"]
+
+    async def execute(self, name: str, arguments: Dict[str, Any],
+                      lease: Optional["EndpointLease"] = None) -> Any:
+        spec = self._tools[name]
+        return await self.call(spec["endpoint"], spec["remote_name"], arguments, lease)
+
+    async def call(self, endpoint: str, remote_name: str, arguments: Dict[str, Any],
+                   lease: Optional["EndpointLease"] = None) -> Any:
+        """
+        调用端点上的工具
+
+        参数:
+            endpoint: MCP端点URL
+            remote_name: 端点上的工具名
+            arguments: 工具参数
+            lease: 端点名额凭证，取消后后台请求结束前一直占用名额
+
+        返回:
+            JSON-RPC响应中的result
+        """
+        caller = asyncio.get_running_loop()
+        outcome = caller.create_future()
+        release = lease.hold() if lease is not None else None
+        loop = self._background_loop()
+        holder = {}
+
+        def settle(task):
+            if outcome.done():
+                return
+            if task.cancelled():
+                outcome.cancel()
+            elif task.exception() is not None:
+                outcome.set_exception(task.exception())
+            else:
+                outcome.set_result(task.result())
+
+        def finished(task):
+            if release is not None:
+                release()
+            try:
+                caller.call_soon_threadsafe(settle, task)
+            except RuntimeError:
+                # 调用方的事件循环已经关闭
+                pass
+
+        def start():
+            holder["task"] = loop.create_task(self._call(endpoint, remote_name, arguments))
+            holder["task"].add_done_callback(finished)
+
+        loop.call_soon_threadsafe(start)
+        try:
+            return await asyncio.shield(outcome)
+        except asyncio.CancelledError:
+            # 超时或取消时中止后台请求，start一定先于这里的回调执行
+            loop.call_soon_threadsafe(lambda: holder["task"].cancel())
+            raise
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-http", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _call(self, endpoint: str, remote_name: str, arguments: Dict[str, Any]) -> Any:
+        """在后台事件循环中完成握手并发送tools/call请求"""
+        if self._http is None:
+            self._http = AsyncHTTPConnectionPool(max_connections=self.max_connections, timeout=self.timeout)
+        params = {"name": remote_name, "arguments": arguments}
+        for attempt in range(2):
+            session = await self._session(endpoint)
+            try:
+                result = await self._rpc(endpoint, "tools/call", params, session)
+                break
+            except _SessionExpired:
+                # 服务端丢弃了会话，重新握手后重试一次
+                if self.sessions.get(endpoint) is session:
+                    del self.sessions[endpoint]
+                if attempt:
+                    raise ToolExecutionError("MCP会话已失效")
+        if isinstance(result, dict) and result.get("isError"):
+            raise ToolExecutionError(_content_text(result) or "工具返回错误")
+        return result
+
+    async def _session(self, endpoint: str) -> Dict[str, Optional[str]]:
+        """返回端点的会话，首次调用时完成initialize握手，并发的调用共享同一次握手"""
+        if endpoint in self.sessions:
+            return self.sessions[endpoint]
+        lock = self._handshakes.setdefault(endpoint, asyncio.Lock())
+        async with lock:
+            if endpoint in self.sessions:
+                return self.sessions[endpoint]
+            session = {"session_id": None, "protocol_version": MCP_PROTOCOL_VERSION}
+            params = {"protocolVersion": MCP_PROTOCOL_VERSION, "capabilities": {}, "clientInfo": MCP_CLIENT_INFO}
+            result = await self._rpc(endpoint, "initialize", params, session)
+            session["protocol_version"] = result.get("protocolVersion", MCP_PROTOCOL_VERSION)
+            await self._rpc(endpoint, "notifications/initialized", None, session, notification=True)
+            self.sessions[endpoint] = session
+            logger.info(f"MCP会话已建立 {endpoint}: 协议版本 {session['protocol_version']}")
+            return session
+
+    async def _rpc(self, endpoint: str, method: str, params: Optional[Dict[str, Any]],
+                   session: Dict[str, Optional[str]], notification: bool = False) -> Any:
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        if not notification:
+            message["id"] = next(self._ids)
+        headers = dict(self.headers)
+        if method != "initialize":
+            headers["MCP-Protocol-Version"] = session["protocol_version"]
+        if session["session_id"]:
+            headers["Mcp-Session-Id"] = session["session_id"]
+        body = json.dumps(message, ensure_ascii=False, default=str).encode("utf-8")
+        response = await self._http.fetch("POST", endpoint, headers, body)
+
+        if response.status == 404 and session["session_id"]:
+            raise _SessionExpired()
+        if response.status >= 400:
+            raise ToolExecutionError(f"HTTP {response.status}: {response.text(500)}")
+        if method == "initialize":
+            session["session_id"] = response.headers.get("mcp-session-id")
+        if notification:
+            return None
+
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            reply = None
+            for line in response.text().splitlines():
+                if line.startswith("data:"):
+                    data = json.loads(line[5:].strip())
+                    if data.get("id") == message["id"] and ("result" in data or "error" in data):
+                        reply = data
+            if reply is None:
+                raise ToolExecutionError("事件流中没有JSON-RPC响应")
+        else:
+            reply = json.loads(response.body)
+
+        if reply.get("error"):
+            error = reply["error"]
+            raise ToolExecutionError(f"MCP错误 {error.get('code')}: {error.get('message')}")
+        return reply.get("result", {})
+
+    async def close(self) -> None:
+        with self._loop_lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is None:
+            return
+        if self._http is not None:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._http.close(), loop))
+            self._http = None
+        self.sessions.clear()
+        self._handshakes.clear()
+        loop.call_soon_threadsafe(loop.stop)
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        loop.close()
+
+
+class _SessionExpired(Exception):
+    """服务端不再识别MCP会话"""
+
+
+def _content_text(result: Dict[str, Any]) -> str:
+    """拼接MCP结果content中的文本块"""
+    return "\n".join(
+        block.get("text", "") for block in result.get("content", [])
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+
+def _load_callable(path: str) -> Callable[..., Any]:
+    """按 "模块:属性" 格式加载可调用对象"""
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class EndpointLimiter:
+    """
+    跨线程和事件循环共享的端点并发上限
+
+    asyncio.Semaphore只能在创建它的事件循环中使用，而同步入口每次调用都使用新的事件循环，
+    这里用线程锁保护计数，名额按先来先得交给等待者，并通过等待者所在循环的call_soon_threadsafe唤醒
+    """
+
+    def __init__(self, limit: int):
+        """
+        初始化并发上限
+
+        参数:
+            limit: 最大并发调用数
+        """
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: "deque[tuple]" = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        """占用一个名额，没有空闲名额时等待"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except BaseException:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    granted = False
+                except ValueError:
+                    granted = True
+            # 名额已经交给本调用时转交给下一个等待者
+            if granted:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """归还名额，有等待者时直接转交"""
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_grant, future)
+                    return
+            self.active -= 1
+
+    async def lease(self) -> "EndpointLease":
+        """占用一个名额并返回凭证，凭证的所有持有者归还后名额才释放"""
+        await self.acquire()
+        return EndpointLease(self)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+        return False
+
+
+class EndpointLease:
+    """
+    端点名额的占用凭证
+
+    调用本身和超出调用存活的底层工作(例如无法中止的线程、仍在取消中的后台请求)各持有一份，
+    全部归还后才把名额还给EndpointLimiter
+    """
+
+    def __init__(self, limiter: EndpointLimiter):
+        self._limiter = limiter
+        self._holders = 1
+        self._lock = threading.Lock()
+
+    def hold(self) -> Callable[[], None]:
+        """增加一个持有者，返回该持有者归还名额的函数"""
+        with self._lock:
+            self._holders += 1
+        return self.release
+
+    def release(self) -> None:
+        """归还一份占用，最后一个持有者归还时释放名额"""
+        with self._lock:
+            self._holders -= 1
+            if self._holders:
+                return
+        self._limiter.release()
+
+
+def _grant(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def run_sync(coro):
+    """
+    在同步代码中运行协程
+
+    当前线程没有运行中的事件循环时直接asyncio.run，否则在新线程中运行，
+    避免在事件循环内部调用同步接口时报错
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    outcome = {}
+
+    def runner():
+        try:
+            outcome["value"] = asyncio.run(coro)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=runner, name="tool-executor-sync")
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+class ToolExecutorRegistry:
+    """工具执行器注册表，负责执行器选择、端点并发限制和超时"""
+
+    def __init__(self, default_timeout: float = 30.0, default_concurrency: int = 8,
+                 endpoint_limits: Optional[Dict[str, int]] = None, max_connections: int = 32,
+                 http_headers: Optional[Dict[str, str]] = None):
+        """
+        初始化执行器注册表
+
+        参数:
+            default_timeout: 默认的单次调用超时时间(秒)
+            default_concurrency: 每个端点默认的最大并发调用数
+            endpoint_limits: 指定端点的最大并发调用数，键为端点URL或 python:/subprocess: 前缀的工具名
+            max_connections: HTTP连接池大小
+            http_headers: HTTP MCP请求的附加请求头
+        """
+        self.default_timeout = default_timeout
+        self.default_concurrency = max(1, default_concurrency)
+        self.endpoint_limits = dict(endpoint_limits or {})
+        self.python = PythonToolExecutor()
+        self.subprocess = SubprocessToolExecutor()
+        self.http = HTTPMCPExecutor(max_connections=max_connections, timeout=default_timeout,
+                                    headers=http_headers)
+        self._executors = [self.python, self.subprocess, self.http]
+        # 端点并发上限在进程内所有调用方(包括各自使用独立事件循环的同步入口)之间共享
+        self._limiters: Dict[str, EndpointLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "timeouts": 0}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "ToolExecutorRegistry":
+        """
+        根据配置创建注册表
+
+        参数:
+            config: 构造参数，以及tools列表，每项包含id、type(python/subprocess/http)
+                    和对应的callable("模块:属性")、command或endpoint
+
+        返回:
+            执行器注册表
+        """
+        config = dict(config or {})
+        tools = config.pop("tools", [])
+        registry = cls(**config)
+        for tool in tools:
+            tool_type = tool.get("type")
+            if tool_type == "python":
+                registry.add_python_tool(tool["id"], _load_callable(tool["callable"]))
+            elif tool_type == "subprocess":
+                registry.add_subprocess_tool(tool["id"], tool["command"], tool.get("cwd"), tool.get("env"))
+            elif tool_type == "http":
+                registry.add_http_tool(tool["id"], tool["endpoint"], tool.get("remote_name"))
+            else:
+                raise ValueError(f"不支持的执行器类型: {tool_type}")
+        return registry
+
+    def add_python_tool(self, tool_id: str, func: Callable[..., Any]) -> None:
+        """注册进程内Python工具"""
+        self.python.register(tool_id, func)
+
+    def add_subprocess_tool(self, tool_id: str, command: List[str], cwd: Optional[str] = None,
+                            env: Optional[Dict[str, str]] = None) -> None:
+        """注册子进程工具"""
+        self.subprocess.register(tool_id, command, cwd, env)
+
+    def add_http_tool(self, tool_id: str, endpoint: str, remote_name: Optional[str] = None) -> None:
+        """注册HTTP MCP工具"""
+        self.http.register(tool_id, endpoint, remote_name)
+
+    def has_tool(self, tool_id: str) -> bool:
+        """检查工具是否已注册执行器"""
+        return any(executor.has_tool(tool_id) for executor in self._executors)
+
+    def _limiter(self, endpoint: str) -> EndpointLimiter:
+        with self._limiters_lock:
+            if endpoint not in self._limiters:
+                self._limiters[endpoint] = EndpointLimiter(self.endpoint_limits.get(endpoint, self.default_concurrency))
+            return self._limiters[endpoint]
+
+    async def _run(self, executor_kind: str, endpoint: str, tool_id: str, call,
+                   timeout: Optional[float]) -> Dict[str, Any]:
+        """在端点并发限制和超时控制下执行调用，call接收端点名额凭证，失败不抛出异常"""
+        timeout = self.default_timeout if timeout is None else timeout
+        self.stats["calls"] += 1
+        outcome = {"tool_id": tool_id, "executor": executor_kind, "endpoint": endpoint}
+        lease = await self._limiter(endpoint).lease()
+        start_time = time.time()
+        try:
+            result = await asyncio.wait_for(call(lease), timeout)
+            outcome.update(success=True, result=result)
+        except asyncio.TimeoutError:
+            self.stats["failures"] += 1
+            self.stats["timeouts"] += 1
+            outcome.update(success=False, error=f"执行超时 ({timeout}s)", timeout=True)
+        except Exception as e:
+            self.stats["failures"] += 1
+            outcome.update(success=False, error=str(e))
+        finally:
+            lease.release()
+        outcome["execution_time"] = time.time() - start_time
+        if not outcome["success"]:
+            logger.warning(f"工具执行失败 {tool_id} @ {endpoint}: {outcome['error']}")
+        return outcome
+
+    async def execute(self, tool_id: str, arguments: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        执行已注册的工具
+
+        参数:
+            tool_id: 工具ID
+            arguments: 工具参数
+            timeout: 超时时间(秒)，为None时使用默认值
+
+        返回:
+            执行结果，包含success、result或error、execution_time、executor和endpoint
+        """
+        arguments = arguments or {}
+        for executor in self._executors:
+            if executor.has_tool(tool_id):
+                return await self._run(executor.kind, executor.endpoint(tool_id), tool_id,
+                                       lambda lease: executor.execute(tool_id, arguments, lease), timeout)
+        return {"tool_id": tool_id, "success": False, "error": f"工具未注册执行器: {tool_id}",
+                "executor": None, "endpoint": None, "execution_time": 0.0}
+
+    async def call_endpoint(self, endpoint: str, remote_name: str, arguments: Optional[Dict[str, Any]] = None,
+                            timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        直接调用HTTP MCP端点上的工具，无需预先注册
+
+        参数:
+            endpoint: MCP端点URL
+            remote_name: 端点上的工具名
+            arguments: 工具参数
+            timeout: 超时时间(秒)
+
+        返回:
+            与execute相同格式的执行结果
+        """
+        arguments = arguments or {}
+        return await self._run(self.http.kind, endpoint, remote_name,
+                               lambda lease: self.http.call(endpoint, remote_name, arguments, lease), timeout)
+
+    async def execute_many(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        并发执行多个互不依赖的工具调用
+
+        参数:
+            calls: 调用列表，每项包含tool_id，可选arguments和timeout
+
+        返回:
+            与calls顺序一致的执行结果列表
+        """
+        return list(await asyncio.gather(*[
+            self.execute(call["tool_id"], call.get("arguments"), call.get("timeout")) for call in calls
+        ]))
+
+    async def close(self) -> None:
+        """释放线程池和HTTP连接"""
+        for executor in self._executors:
+            await executor.close()
@@ -4,22 +4,96 @@
 """
 
 import json
+import time
 import logging
 import asyncio
+import threading
 from typing import Dict, List, Any, Optional, Union
 import os
 import requests
 from pathlib import Path
 
-from ..base_mcp import BaseMCP
+from .base_mcp import BaseMCP
+from .tool_executors import ToolExecutorRegistry, run_sync
+from .tool_catalog import ToolCatalog, StaticToolSource, HTTPToolSource
 
 logger = logging.getLogger(__name__)
 
+# 内置的本地MCP.so工具
+BUILTIN_LOCAL_TOOLS = [
+    {
+        "id": "file_processor",
+        "name": "文件处理器",
+        "description": "高效的文件读写和转换工具",
+        "category": "file_operations",
+        "capabilities": ["read", "write", "transform", "compress"],
+        "performance": {"latency": "10ms", "throughput": "high"},
+        "cost": "free"
+    },
+    {
+        "id": "data_analyzer",
+        "name": "数据分析器", 
+        "description": "本地数据分析和可视化工具",
+        "category": "data_processing",
+        "capabilities": ["analyze", "visualize", "export", "statistics"],
+        "performance": {"latency": "50ms", "throughput": "medium"},
+        "cost": "free"
+    },
+    {
+        "id": "code_generator",
+        "name": "代码生成器",
+        "description": "本地代码生成和重构工具",
+        "category": "development",
+        "capabilities": ["generate", "refactor", "optimize", "test"],
+        "performance": {"latency": "100ms", "throughput": "medium"},
+        "cost": "free"
+    }
+]
+
+# 未配置云端目录地址时使用的ACI.dev示例工具
+SAMPLE_CLOUD_TOOLS = [
+    {
+        "id": "google_calendar",
+        "name": "Google Calendar",
+        "description": "Google日历API集成工具",
+        "category": "productivity",
+        "capabilities": ["schedule", "remind", "sync", "share"],
+        "performance": {"latency": "200ms", "throughput": "high"},
+        "cost": "api_calls"
+    },
+    {
+        "id": "slack_integration",
+        "name": "Slack集成",
+        "description": "Slack团队协作工具集成",
+        "category": "communication",
+        "capabilities": ["message", "channel", "file_share", "bot"],
+        "performance": {"latency": "150ms", "throughput": "high"},
+        "cost": "api_calls"
+    },
+    {
+        "id": "github_actions",
+        "name": "GitHub Actions",
+        "description": "GitHub自动化工作流工具",
+        "category": "development",
+        "capabilities": ["ci_cd", "deploy", "test", "release"],
+        "performance": {"latency": "500ms", "throughput": "medium"},
+        "cost": "api_calls"
+    }
+]
+
 class UnifiedSmartToolEngineMCP(BaseMCP):
     """统一智能工具引擎MCP适配器"""
     
-    def __init__(self, config: Dict = None):
-        super().__init__()
+    def __init__(self, config: Dict = None, catalog_path: Optional[str] = None):
+        """
+        初始化工具引擎
+
+        参数:
+            config: 引擎配置
+            catalog_path: 工具目录SQLite路径，未指定时使用config["catalog_path"]，
+                两者都没有时使用内存数据库，不在磁盘上留下文件
+        """
+        super().__init__("UnifiedSmartToolEngineMCP")
         self.config = config or {}
         
         # API配置
@@ -28,15 +102,35 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
         self.aci_endpoint = self.config.get("aci_endpoint", "https://api.aci.dev")
         self.mcpso_endpoint = self.config.get("mcpso_endpoint", "https://api.mcp.so")
         
-        # 工具缓存
-        self.aci_tools_cache = {}
-        self.mcpso_tools_cache = {}
-        self.last_sync_time = None
+        # 本地工具目录，工具发现只查询目录的内存索引
+        catalog_path = catalog_path or self.config.get("catalog_path") or ":memory:"
+        if catalog_path != ":memory:" and os.path.dirname(catalog_path):
+            os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
+        self.catalog = ToolCatalog(catalog_path)
+        self.catalog.register_source("mcp.so", StaticToolSource(BUILTIN_LOCAL_TOOLS), "local")
+        cloud_catalog_url = self.config.get("cloud_catalog_url")
+        if cloud_catalog_url:
+            headers = {"X-API-KEY": self.aci_api_key} if self.aci_api_key else {}
+            self.catalog.register_source("aci.dev", HTTPToolSource(cloud_catalog_url, headers), "cloud")
+        elif self.aci_api_key:
+            self.catalog.register_source("aci.dev", StaticToolSource(SAMPLE_CLOUD_TOOLS), "cloud")
+        else:
+            logger.warning("未配置ACI_API_KEY，云端工具目录不会同步")
+        self.catalog.sync(["mcp.so"])
+        # 后台刷新在首次工具发现时才启动，短生命周期的调用方不会留下刷新线程
+        self._refresh_lock = threading.Lock()
+        self._refresh_started = False
+        
+        # 工具执行器，未注册执行器的工具仍返回模拟结果
+        self.executors = self.config.get("executor_registry") or \
+            ToolExecutorRegistry.from_config(self.config.get("executors"))
         
         # 性能指标
         self.performance_metrics = {
             "aci_calls": 0,
             "mcpso_calls": 0,
+            "local_calls": 0,
+            "cloud_calls": 0,
             "success_rate": 0.0,
             "avg_response_time": 0.0
         }
@@ -54,6 +148,17 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
             "hybrid_execution"     # 混合执行
         ]
     
+    def get_status(self) -> Dict[str, Any]:
+        """获取适配器状态，包含工具目录规模和后台刷新状态"""
+        status = super().get_status()
+        status.update({
+            "name": self.name,
+            "health": "healthy",
+            "catalog_tools": len(self.catalog.index.tools),
+            "catalog_refreshing": self._refresh_started
+        })
+        return status
+    
     def validate_input(self, input_data: Dict[str, Any]) -> bool:
         """验证输入数据"""
         if not isinstance(input_data, dict):
@@ -66,6 +171,7 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
         valid_actions = [
             "discover_tools",
             "execute_tool", 
+            "batch_execute",
             "smart_execute",
             "get_tool_info",
             "sync_tools",
@@ -84,6 +190,8 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
                 return self._discover_tools(parameters)
             elif action == "execute_tool":
                 return self._execute_tool(parameters)
+            elif action == "batch_execute":
+                return self._batch_execute(parameters)
             elif action == "smart_execute":
                 return self._smart_execute(parameters)
             elif action == "get_tool_info":
@@ -97,7 +205,7 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
                     "success": False,
                     "error": f"不支持的操作: {action}",
                     "available_actions": [
-                        "discover_tools", "execute_tool", "smart_execute",
+                        "discover_tools", "execute_tool", "batch_execute", "smart_execute",
                         "get_tool_info", "sync_tools", "get_performance_metrics"
                     ]
                 }
@@ -110,9 +218,34 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
                 "action": input_data.get("action")
             }
     
+    def start_catalog_refresh(self, interval: Optional[float] = None) -> bool:
+        """
+        启动工具目录后台刷新，重复调用不会启动多个线程
+
+        参数:
+            interval: 刷新间隔(秒)，默认取config["catalog_refresh_interval"](3600)，为0时不启动
+
+        返回:
+            后台刷新是否在运行
+        """
+        if interval is None:
+            interval = self.config.get("catalog_refresh_interval", 3600)
+        with self._refresh_lock:
+            if not self._refresh_started and interval:
+                self.catalog.start_background_refresh(interval)
+                self._refresh_started = True
+            return self._refresh_started
+
+    def close(self) -> None:
+        """停止后台刷新并关闭工具目录"""
+        with self._refresh_lock:
+            self._refresh_started = False
+            self.catalog.close()
+
     def _discover_tools(self, parameters: Dict) -> Dict[str, Any]:
         """工具发现 - 本地+云端"""
         try:
+            self.start_catalog_refresh()
             query = parameters.get("query", "")
             category = parameters.get("category")
             limit = parameters.get("limit", 20)
@@ -144,6 +277,7 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
             
             return {
                 "success": True,
+                "tools": results["recommended_tools"],
                 "results": results,
                 "performance": {
                     "local_tools_count": len(results["local_tools"]),
@@ -162,126 +296,15 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
     def _search_local_tools(self, query: str, category: Optional[str], limit: int) -> List[Dict]:
         """搜索本地MCP.so工具"""
         try:
-            # 模拟MCP.so工具搜索
-            local_tools = [
-                {
-                    "id": "file_processor",
-                    "name": "文件处理器",
-                    "description": "高效的文件读写和转换工具",
-                    "category": "file_operations",
-                    "source": "local",
-                    "capabilities": ["read", "write", "transform", "compress"],
-                    "performance": {"latency": "10ms", "throughput": "high"},
-                    "cost": "free"
-                },
-                {
-                    "id": "data_analyzer",
-                    "name": "数据分析器", 
-                    "description": "本地数据分析和可视化工具",
-                    "category": "data_processing",
-                    "source": "local",
-                    "capabilities": ["analyze", "visualize", "export", "statistics"],
-                    "performance": {"latency": "50ms", "throughput": "medium"},
-                    "cost": "free"
-                },
-                {
-                    "id": "code_generator",
-                    "name": "代码生成器",
-                    "description": "本地代码生成和重构工具",
-                    "category": "development",
-                    "source": "local", 
-                    "capabilities": ["generate", "refactor", "optimize", "test"],
-                    "performance": {"latency": "100ms", "throughput": "medium"},
-                    "cost": "free"
-                }
-            ]
-            
-            # 应用过滤条件
-            filtered_tools = []
-            for tool in local_tools:
-                # 类别过滤
-                if category and tool.get("category") != category:
-                    continue
-                
-                # 查询过滤
-                if query:
-                    if (query.lower() not in tool.get("name", "").lower() and
-                        query.lower() not in tool.get("description", "").lower()):
-                        continue
-                
-                filtered_tools.append(tool)
-                
-                if len(filtered_tools) >= limit:
-                    break
-            
-            return filtered_tools
-            
+            return self.catalog.index.search(query, category, "local", limit)
         except Exception as e:
             logger.error(f"搜索本地工具失败: {e}")
             return []
     
     def _search_cloud_tools(self, query: str, category: Optional[str], limit: int) -> List[Dict]:
-        """搜索ACI.dev云端工具"""
+        """搜索ACI.dev云端工具，结果来自本地同步的工具目录"""
         try:
-            if not self.aci_api_key:
-                logger.warning("未配置ACI_API_KEY，跳过云端工具搜索")
-                return []
-            
-            # 模拟ACI.dev API调用
-            # 实际实现中应该调用真实的ACI.dev API
-            cloud_tools = [
-                {
-                    "id": "google_calendar",
-                    "name": "Google Calendar",
-                    "description": "Google日历API集成工具",
-                    "category": "productivity",
-                    "source": "cloud",
-                    "capabilities": ["schedule", "remind", "sync", "share"],
-                    "performance": {"latency": "200ms", "throughput": "high"},
-                    "cost": "api_calls"
-                },
-                {
-                    "id": "slack_integration",
-                    "name": "Slack集成",
-                    "description": "Slack团队协作工具集成",
-                    "category": "communication",
-                    "source": "cloud",
-                    "capabilities": ["message", "channel", "file_share", "bot"],
-                    "performance": {"latency": "150ms", "throughput": "high"},
-                    "cost": "api_calls"
-                },
-                {
-                    "id": "github_actions",
-                    "name": "GitHub Actions",
-                    "description": "GitHub自动化工作流工具",
-                    "category": "development",
-                    "source": "cloud",
-                    "capabilities": ["ci_cd", "deploy", "test", "release"],
-                    "performance": {"latency": "500ms", "throughput": "medium"},
-                    "cost": "api_calls"
-                }
-            ]
-            
-            # 应用过滤条件
-            filtered_tools = []
-            for tool in cloud_tools:
-                # 类别过滤
-                if category and tool.get("category") != category:
-                    continue
-                
-                # 查询过滤
-                if query:
-                    if (query.lower() not in tool.get("name", "").lower() and
-                        query.lower() not in tool.get("description", "").lower()):
-                        continue
-                
-                filtered_tools.append(tool)
-                
-                if len(filtered_tools) >= limit:
-                    break
-            
-            return filtered_tools
-            
+            return self.catalog.index.search(query, category, "cloud", limit)
         except Exception as e:
             logger.error(f"搜索云端工具失败: {e}")
             return []
@@ -401,29 +424,96 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
                     "error": f"不支持的执行源: {tool_source}"
                 }
             
+            return self._format_execution(tool_id, tool_source, result)
+            
+        except Exception as e:
+            logger.error(f"工具执行失败: {e}")
             return {
-                "success": True,
-                "result": result,
-                "execution_info": {
-                    "tool_id": tool_id,
-                    "source": tool_source,
-                    "execution_time": result.get("execution_time", "unknown")
+                "success": False,
+                "error": str(e)
+            }
+    
+    def _format_execution(self, tool_id: str, source: str, result: Dict) -> Dict[str, Any]:
+        """构建execute_tool的返回结果"""
+        response = {
+            "success": result.get("success", True),
+            "result": result,
+            "execution_info": {
+                "tool_id": tool_id,
+                "source": source,
+                "execution_time": result.get("execution_time", "unknown")
+            }
+        }
+        if not response["success"]:
+            response["error"] = result.get("error")
+        return response
+    
+    def _batch_execute(self, parameters: Dict) -> Dict[str, Any]:
+        """批量执行互不依赖的工具调用，已注册执行器的调用并发执行"""
+        try:
+            calls = parameters.get("calls", [])
+            if not calls:
+                return {
+                    "success": False,
+                    "error": "缺少必需参数: calls"
                 }
+            
+            results: List[Optional[Dict]] = [None] * len(calls)
+            concurrent_calls = []
+            for index, call in enumerate(calls):
+                tool_id = call.get("tool_id")
+                source = call.get("source", "auto")
+                if source == "auto" and tool_id:
+                    source = self._determine_optimal_source(tool_id)
+                if tool_id and source in ("local", "cloud") and self.executors.has_tool(tool_id):
+                    concurrent_calls.append((index, tool_id, source, call))
+                else:
+                    results[index] = self._execute_tool(call)
+            
+            if concurrent_calls:
+                outcomes = run_sync(self.executors.execute_many([
+                    {"tool_id": tool_id, "arguments": call.get("arguments", {}), "timeout": call.get("timeout")}
+                    for _, tool_id, _, call in concurrent_calls
+                ]))
+                for (index, tool_id, source, _), outcome in zip(concurrent_calls, outcomes):
+                    self.performance_metrics[f"{source}_calls"] += 1
+                    results[index] = self._format_execution(tool_id, source, self._executor_result(outcome, source))
+            
+            return {
+                "success": all(result.get("success") for result in results),
+                "results": results,
+                "total_count": len(results),
+                "concurrent_count": len(concurrent_calls)
             }
             
         except Exception as e:
-            logger.error(f"工具执行失败: {e}")
+            logger.error(f"批量执行失败: {e}")
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    def _executor_result(self, outcome: Dict, source: str) -> Dict:
+        """将执行器结果转换为工具执行结果"""
+        result = {
+            "success": outcome["success"],
+            "execution_time": f"{outcome['execution_time']:.3f}s",
+            "source": source,
+            "executor": outcome["executor"],
+            "endpoint": outcome["endpoint"]
+        }
+        if outcome["success"]:
+            result["result"] = outcome["result"]
+        else:
+            result["error"] = outcome["error"]
+        return result
+    
     def _determine_optimal_source(self, tool_id: str) -> str:
         """确定最优执行源"""
-        # 简单策略：优先使用本地工具
-        local_tools = ["file_processor", "data_analyzer", "code_generator"]
+        # 简单策略：目录中的本地工具优先本地执行
+        tool = self.catalog.index.get(tool_id)
         
-        if tool_id in local_tools:
+        if tool and tool.get("source") == "local":
             return "local"
         else:
             return "cloud"
@@ -431,7 +521,10 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
     def _execute_local_tool(self, tool_id: str, arguments: Dict) -> Dict:
         """执行本地MCP.so工具"""
         try:
-            # 模拟本地工具执行
+            if self.executors.has_tool(tool_id):
+                return self._executor_result(run_sync(self.executors.execute(tool_id, arguments)), "local")
+            
+            # 未注册执行器时返回模拟结果
             import time
             start_time = time.time()
             
@@ -479,7 +572,10 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
     def _execute_cloud_tool(self, tool_id: str, arguments: Dict) -> Dict:
         """执行ACI.dev云端工具"""
         try:
-            # 模拟云端工具执行
+            if self.executors.has_tool(tool_id):
+                return self._executor_result(run_sync(self.executors.execute(tool_id, arguments)), "cloud")
+            
+            # 未注册执行器时返回模拟结果
             import time
             start_time = time.time()
             
@@ -616,20 +712,8 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
                     "error": "缺少必需参数: tool_id"
                 }
             
-            # 搜索工具信息
-            discovery_result = self._discover_tools({"query": tool_id, "limit": 50})
-            
-            if not discovery_result.get("success"):
-                return discovery_result
-            
-            all_tools = (discovery_result["results"]["local_tools"] + 
-                        discovery_result["results"]["cloud_tools"])
-            
-            tool_info = None
-            for tool in all_tools:
-                if tool.get("id") == tool_id:
-                    tool_info = tool
-                    break
+            # 从工具目录的内存索引查找
+            tool_info = self.catalog.index.get(tool_id)
             
             if not tool_info:
                 return {
@@ -639,7 +723,7 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
             
             return {
                 "success": True,
-                "tool_info": tool_info
+                "tool_info": dict(tool_info)
             }
             
         except Exception as e:
@@ -650,7 +734,7 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
             }
     
     def _sync_tools(self, parameters: Dict) -> Dict[str, Any]:
-        """同步工具注册表"""
+        """同步工具注册表，只写入发生变化的工具"""
         try:
             force_sync = parameters.get("force", False)
             
@@ -665,7 +749,7 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
                 "sync_results": {
                     "local_tools": local_sync_result,
                     "cloud_tools": cloud_sync_result,
-                    "sync_time": "2025-06-04 10:16:00"
+                    "sync_time": time.strftime("%Y-%m-%d %H:%M:%S")
                 }
             }
             
@@ -678,21 +762,14 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
     
     def _sync_local_tools(self, force: bool) -> Dict:
         """同步本地工具"""
-        return {
-            "status": "completed",
-            "tools_count": 3,
-            "new_tools": 0,
-            "updated_tools": 0
-        }
+        return self.catalog.sync(["mcp.so"], force)["mcp.so"]
     
     def _sync_cloud_tools(self, force: bool) -> Dict:
         """同步云端工具"""
-        return {
-            "status": "completed",
-            "tools_count": 600,
-            "new_tools": 5,
-            "updated_tools": 12
-        }
+        if not self.catalog.has_source("aci.dev"):
+            return {"status": "skipped", "tools_count": 0, "new_tools": 0,
+                    "updated_tools": 0, "deleted_tools": 0, "reason": "未配置云端工具目录"}
+        return self.catalog.sync(["aci.dev"], force)["aci.dev"]
     
     def _get_performance_metrics(self) -> Dict[str, Any]:
         """获取性能指标"""
@@ -7,6 +7,7 @@ import json
 import logging
 import asyncio
 import time
+import itertools
 import os
 import requests
 from typing import Dict, List, Any, Optional, Union
@@ -17,6 +18,8 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from mcptool.adapters.base_mcp import BaseMCP
+from mcptool.adapters.tool_executors import ToolExecutorRegistry
+from mcptool.adapters.resilience import ResilienceManager
 
 logger = logging.getLogger(__name__)
 
@@ -142,6 +145,12 @@ class IntelligentRoutingEngine:
             "quality": 0.25,
             "availability": 0.2
         }
+        # 本月各工具已使用的调用次数，用于cost_model.monthly_limit配额
+        self.monthly_usage: Dict[str, int] = {}
+    
+    def record_usage(self, tool_id: str, count: int = 1):
+        """记录工具调用次数"""
+        self.monthly_usage[tool_id] = self.monthly_usage.get(tool_id, 0) + count
     
     def select_optimal_tool(self, user_request: str, context: Dict = None) -> Dict:
         """选择最优工具"""
@@ -166,13 +175,158 @@ class IntelligentRoutingEngine:
         # 选择最优工具
         best_tool = max(scored_tools, key=lambda x: x["comprehensive_score"])
         
+        alternatives = sorted((tool for tool in scored_tools if tool is not best_tool),
+                              key=lambda x: x["comprehensive_score"], reverse=True)
+        
         return {
             "success": True,
             "selected_tool": best_tool,
-            "alternatives": scored_tools[1:4],
+            "alternatives": alternatives[:3],
             "decision_explanation": self._generate_decision_explanation(best_tool, context)
         }
     
+    def route_batch(self, requests: List[Dict], window_seconds: float = 60.0,
+                    platform_limits: Dict[str, int] = None, total_budget: float = None,
+                    commit: bool = False) -> Dict:
+        """
+        批量路由：在共享的吞吐量和成本配额下为一批请求统一分配工具
+        
+        Args:
+            requests: 请求列表，每项包含request，可选id、context、deadline_ms(最长可接受延迟)
+                      和max_cost(单次调用预算，默认取context.budget.max_cost_per_call)
+            window_seconds: 批次的执行时间窗口，工具在窗口内最多处理throughput*window_seconds次调用
+            platform_limits: 平台在窗口内的最大调用次数
+            total_budget: 整个批次的总成本上限
+            commit: 是否将分配结果计入月度用量
+            
+        Returns:
+            每个请求的分配结果、汇总指标，以及逐个请求独立选择的基线指标
+        """
+        start_time = time.time()
+        platform_limits = platform_limits or {}
+        candidates_cache = {}
+        items = []
+        for index, item in enumerate(requests):
+            context = item.get("context") or {}
+            key = (item["request"], json.dumps([context.get("filters", {}), context.get("budget", {})],
+                                               sort_keys=True))
+            if key not in candidates_cache:
+                tools = self.registry.search_tools(item["request"], filters=context.get("filters", {}))
+                for tool in tools:
+                    tool["comprehensive_score"] = self._calculate_comprehensive_score(tool, context)
+                candidates_cache[key] = tools
+            max_cost = item.get("max_cost", context.get("budget", {}).get("max_cost_per_call"))
+            # 优先成本低的工具，成本相同时选择综合评分高的
+            candidates = sorted(
+                (tool for tool in candidates_cache[key]
+                 if max_cost is None or tool["cost_model"]["cost_per_call"] <= max_cost),
+                key=lambda tool: (tool["cost_model"]["cost_per_call"], -tool["comprehensive_score"])
+            )
+            items.append({
+                "id": item.get("id", index),
+                "index": index,
+                "deadline_ms": item.get("deadline_ms"),
+                "candidates": candidates,
+                "best": max(candidates_cache[key], key=lambda tool: tool["comprehensive_score"], default=None)
+            })
+        
+        # 可选工具越少、截止时间越早的请求越先分配
+        order = sorted(items, key=lambda it: (len(it["candidates"]),
+                                              it["deadline_ms"] if it["deadline_ms"] is not None else float("inf")))
+        tool_load: Dict[str, int] = {}
+        platform_load: Dict[str, int] = {}
+        remaining_budget = total_budget
+        assignments = [None] * len(items)
+        for it in order:
+            assignment = {"request_id": it["id"], "tool_id": None,
+                          "reason": "no_matching_tool" if not it["candidates"] else "capacity_or_deadline"}
+            for tool in it["candidates"]:
+                load = tool_load.get(tool["id"], 0)
+                cost = tool["cost_model"]["cost_per_call"]
+                if load >= self._batch_capacity(tool, window_seconds):
+                    continue
+                limit = platform_limits.get(tool["platform"])
+                if limit is not None and platform_load.get(tool["platform"], 0) >= limit:
+                    continue
+                # 允许浮点累计误差
+                if remaining_budget is not None and cost > remaining_budget + 1e-9:
+                    continue
+                latency = self._queued_latency_ms(tool, load)
+                if it["deadline_ms"] is not None and latency > it["deadline_ms"]:
+                    continue
+                
+                tool_load[tool["id"]] = load + 1
+                platform_load[tool["platform"]] = platform_load.get(tool["platform"], 0) + 1
+                if remaining_budget is not None:
+                    remaining_budget -= cost
+                assignment = {"request_id": it["id"], "tool_id": tool["id"], "tool_name": tool["name"],
+                              "platform": tool["platform"], "cost": cost, "expected_latency_ms": latency}
+                break
+            assignments[it["index"]] = assignment
+        
+        if commit:
+            for tool_id, count in tool_load.items():
+                self.record_usage(tool_id, count)
+        
+        return {
+            "success": True,
+            "assignments": assignments,
+            "tool_usage": tool_load,
+            "summary": self._summarize_assignments(assignments, [it["deadline_ms"] for it in items]),
+            "baseline": self._naive_baseline(items, window_seconds),
+            "routing_time": time.time() - start_time
+        }
+    
+    def _batch_capacity(self, tool: Dict, window_seconds: float) -> int:
+        """工具在批次窗口内可处理的调用次数，取吞吐量和剩余月度配额的较小值"""
+        capacity = int(tool["performance_metrics"]["throughput"] * window_seconds)
+        monthly_limit = tool["cost_model"]["monthly_limit"]
+        if monthly_limit >= 0:
+            capacity = min(capacity, monthly_limit - self.monthly_usage.get(tool["id"], 0))
+        return max(capacity, 0)
+    
+    def _queued_latency_ms(self, tool: Dict, queued: int) -> float:
+        """工具已分配queued次调用时下一次调用的预计延迟，throughput按每秒调用数计算排队时间"""
+        throughput = max(tool["performance_metrics"]["throughput"], 1e-9)
+        return tool["performance_metrics"]["avg_response_time"] + (queued // throughput) * 1000
+    
+    def _summarize_assignments(self, assignments: List[Dict], deadlines: List[Optional[float]]) -> Dict:
+        """汇总分配结果的成本和延迟"""
+        latencies = sorted(a["expected_latency_ms"] for a in assignments if a["tool_id"])
+        assigned = len(latencies)
+        deadline_misses = sum(
+            1 for a, deadline in zip(assignments, deadlines)
+            if a["tool_id"] and deadline is not None and a["expected_latency_ms"] > deadline
+        )
+        return {
+            "total_requests": len(assignments),
+            "assigned": assigned,
+            "unassigned": len(assignments) - assigned,
+            "quota_violations": sum(1 for a in assignments if a.get("over_quota")),
+            "deadline_misses": deadline_misses,
+            "total_cost": round(sum(a["cost"] for a in assignments if a["tool_id"]), 6),
+            "avg_latency_ms": sum(latencies) / assigned if assigned else 0.0,
+            "p95_latency_ms": latencies[min(assigned - 1, int(assigned * 0.95))] if assigned else 0.0
+        }
+    
+    def _naive_baseline(self, items: List[Dict], window_seconds: float) -> Dict:
+        """逐个请求独立选择综合评分最高的工具，不考虑共享配额，作为对比基线"""
+        tool_load: Dict[str, int] = {}
+        assignments = []
+        for it in items:
+            tool = it["best"]
+            if tool is None:
+                assignments.append({"request_id": it["id"], "tool_id": None})
+                continue
+            load = tool_load.get(tool["id"], 0)
+            tool_load[tool["id"]] = load + 1
+            assignments.append({
+                "request_id": it["id"], "tool_id": tool["id"], "cost": tool["cost_model"]["cost_per_call"],
+                "expected_latency_ms": self._queued_latency_ms(tool, load),
+                "over_quota": load >= self._batch_capacity(tool, window_seconds)
+            })
+        return self._summarize_assignments(assignments, [it["deadline_ms"] for it in items])
+    
     def _calculate_comprehensive_score(self, tool: Dict, context: Dict) -> float:
         """计算综合评分"""
         performance_score = self._calculate_performance_score(tool)
@@ -252,9 +406,26 @@ class IntelligentRoutingEngine:
 class MCPUnifiedExecutionEngine:
     """MCP统一执行引擎"""
     
-    def __init__(self, registry: UnifiedToolRegistry):
+    def __init__(self, registry: UnifiedToolRegistry, executors: Optional[ToolExecutorRegistry] = None,
+                 remote_execution: bool = False, resilience: Optional[ResilienceManager] = None,
+                 attempt_timeout: float = 10.0):
+        """
+        初始化执行引擎
+        
+        Args:
+            registry: 统一工具注册表
+            executors: 工具执行器注册表，按工具ID注册的执行器优先使用
+            remote_execution: 是否对未注册执行器的工具直接调用其mcp_endpoint，关闭时返回模拟结果
+            resilience: 熔断器和自适应并发控制
+            attempt_timeout: 单个工具的执行超时时间(秒)，超时后切换到备选工具
+        """
         self.registry = registry
         self.routing_engine = IntelligentRoutingEngine(registry)
+        self.executors = executors or ToolExecutorRegistry()
+        self.remote_execution = remote_execution
+        self.resilience = resilience or ResilienceManager()
+        self.attempt_timeout = attempt_timeout
+        self._execution_ids = itertools.count(1)
         
         # 执行统计
         self.execution_stats = {
@@ -267,7 +438,7 @@ class MCPUnifiedExecutionEngine:
     async def execute_user_request(self, user_request: str, context: Dict = None) -> Dict:
         """执行用户请求"""
         context = context or {}
-        execution_id = f"exec_{int(time.time())}"
+        execution_id = f"exec_{int(time.time())}_{next(self._execution_ids)}"
         
         try:
             # 智能路由选择工具
@@ -276,21 +447,55 @@ class MCPUnifiedExecutionEngine:
             if not routing_result["success"]:
                 return routing_result
             
-            selected_tool = routing_result["selected_tool"]
-            
-            # 准备执行参数
-            execution_params = self._prepare_execution_params(user_request, selected_tool, context)
-            
-            # 模拟MCP执行
-            execution_result = await self._simulate_mcp_execution(
-                selected_tool, execution_params, execution_id
-            )
+            # 依次尝试最优工具和备选工具，熔断或过载的工具直接跳过
+            attempts = []
+            selected_tool = None
+            execution_result = None
+            for tool in [routing_result["selected_tool"]] + routing_result["alternatives"]:
+                rejection = self.resilience.acquire(tool)
+                if rejection:
+                    attempts.append({"tool_id": tool["id"], "platform": tool["platform"],
+                                     "skipped": rejection})
+                    continue
+                
+                # 执行MCP工具
+                start_time = time.time()
+                try:
+                    # 准备执行参数
+                    execution_params = self._prepare_execution_params(user_request, tool, context)
+                    result = await asyncio.wait_for(
+                        self._execute_mcp_tool(tool, execution_params, execution_id), self.attempt_timeout
+                    )
+                except asyncio.TimeoutError:
+                    result = {"success": False, "error": f"执行超时 ({self.attempt_timeout}s)",
+                              "platform": tool["platform"], "tool_name": tool["name"]}
+                except Exception as e:
+                    result = {"success": False, "error": str(e),
+                              "platform": tool["platform"], "tool_name": tool["name"]}
+                except BaseException:
+                    # 请求被取消时归还并发名额和半开探测名额，否则熔断器会一直停留在半开状态
+                    self.resilience.cancel(tool)
+                    raise
+                self.resilience.release(tool, time.time() - start_time, result["success"])
+                
+                # 更新统计信息
+                self._update_execution_stats(tool, result)
+                attempts.append({"tool_id": tool["id"], "platform": tool["platform"],
+                                 "success": result["success"], "error": result.get("error")})
+                selected_tool, execution_result = tool, result
+                if result["success"]:
+                    break
             
-            # 更新统计信息
-            self._update_execution_stats(selected_tool, execution_result)
+            if selected_tool is None:
+                return {
+                    "success": False,
+                    "execution_id": execution_id,
+                    "error": "所有候选工具均被熔断或达到并发上限",
+                    "attempts": attempts
+                }
             
             return {
-                "success": True,
+                "success": execution_result["success"],
                 "execution_id": execution_id,
                 "selected_tool": {
                     "name": selected_tool["name"],
@@ -299,7 +504,9 @@ class MCPUnifiedExecutionEngine:
                 },
                 "execution_result": execution_result,
                 "routing_info": routing_result["decision_explanation"],
-                "alternatives": routing_result["alternatives"]
+                "alternatives": routing_result["alternatives"],
+                "attempts": attempts,
+                "failover": selected_tool is not routing_result["selected_tool"]
             }
             
         except Exception as e:
@@ -331,6 +538,46 @@ class MCPUnifiedExecutionEngine:
         else:
             return {}
     
+    async def execute_many(self, requests: List[Dict]) -> List[Dict]:
+        """
+        并发执行多个互不依赖的用户请求
+        
+        Args:
+            requests: 请求列表，每项包含request和可选的context
+            
+        Returns:
+            与requests顺序一致的执行结果列表
+        """
+        return list(await asyncio.gather(*[
+            self.execute_user_request(item["request"], item.get("context")) for item in requests
+        ]))
+    
+    async def _execute_mcp_tool(self, tool: Dict, params: Dict, execution_id: str) -> Dict:
+        """通过执行器执行MCP工具，没有可用执行器时返回模拟结果"""
+        if self.executors.has_tool(tool["id"]):
+            outcome = await self.executors.execute(tool["id"], params)
+        elif self.remote_execution and tool["mcp_endpoint"].startswith(("http://", "https://")):
+            outcome = await self.executors.call_endpoint(tool["mcp_endpoint"], tool["platform_tool_id"], params)
+        else:
+            return await self._simulate_mcp_execution(tool, params, execution_id)
+        
+        result = {
+            "success": outcome["success"],
+            "result": outcome.get("result"),
+            "execution_time": outcome["execution_time"],
+            "platform": tool["platform"],
+            "tool_name": tool["name"],
+            "metadata": {
+                "execution_timestamp": time.time(),
+                "mcp_version": "1.0",
+                "executor": outcome["executor"],
+                "endpoint": outcome["endpoint"]
+            }
+        }
+        if not outcome["success"]:
+            result["error"] = outcome["error"]
+        return result
+    
     async def _simulate_mcp_execution(self, tool: Dict, params: Dict, execution_id: str) -> Dict:
         """模拟MCP执行"""
         start_time = time.time()
@@ -356,9 +603,11 @@ class MCPUnifiedExecutionEngine:
     def _update_execution_stats(self, tool: Dict, result: Dict):
         """更新执行统计"""
         self.execution_stats["total_executions"] += 1
-        self.execution_stats["platform_usage"][tool["platform"]] += 1
+        platform_usage = self.execution_stats["platform_usage"]
+        platform_usage[tool["platform"]] = platform_usage.get(tool["platform"], 0) + 1
         
         if result.get("success"):
+            self.routing_engine.record_usage(tool["id"])
             current_success = self.execution_stats.get("successful_executions", 0)
             self.execution_stats["successful_executions"] = current_success + 1
         
@@ -376,7 +625,8 @@ class MCPUnifiedExecutionEngine:
             },
             "registry_info": {
                 "total_tools": len(self.registry.tools_db)
-            }
+            },
+            "resilience": self.resilience.snapshot()
         }
 
 class UnifiedSmartToolEngineMCP(BaseMCP):
@@ -388,7 +638,12 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
         
         # 初始化核心组件
         self.registry = UnifiedToolRegistry()
-        self.execution_engine = MCPUnifiedExecutionEngine(self.registry)
+        self.executors = ToolExecutorRegistry.from_config(self.config.get("executors"))
+        self.execution_engine = MCPUnifiedExecutionEngine(
+            self.registry, self.executors, self.config.get("remote_execution", False),
+            ResilienceManager(self.config.get("circuit_breaker"), self.config.get("adaptive_concurrency")),
+            self.config.get("attempt_timeout", 10.0)
+        )
         
         # 初始化示例工具
         self._initialize_sample_tools()
@@ -469,6 +724,8 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
         action = input_data.get("action")
         valid_actions = [
             "execute_request",
+            "batch_execute",
+            "route_batch",
             "discover_tools",
             "get_statistics",
             "register_tool",
@@ -485,6 +742,10 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
             
             if action == "execute_request":
                 return asyncio.run(self._execute_request(parameters))
+            elif action == "batch_execute":
+                return asyncio.run(self._batch_execute(parameters))
+            elif action == "route_batch":
+                return self._route_batch(parameters)
             elif action == "discover_tools":
                 return self._discover_tools(parameters)
             elif action == "get_statistics":
@@ -498,7 +759,7 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
                     "success": False,
                     "error": f"不支持的操作: {action}",
                     "available_actions": [
-                        "execute_request", "discover_tools", "get_statistics",
+                        "execute_request", "batch_execute", "route_batch", "discover_tools", "get_statistics",
                         "register_tool", "health_check"
                     ]
                 }
@@ -525,6 +786,41 @@ class UnifiedSmartToolEngineMCP(BaseMCP):
         result = await self.execution_engine.execute_user_request(user_request, context)
         return result
     
+    async def _batch_execute(self, parameters: Dict) -> Dict[str, Any]:
+        """并发执行多个用户请求"""
+        requests_list = parameters.get("requests", [])
+        
+        if not requests_list or not all(item.get("request") for item in requests_list):
+            return {
+                "success": False,
+                "error": "缺少必需参数: requests"
+            }
+        
+        results = await self.execution_engine.execute_many(requests_list)
+        return {
+            "success": all(result.get("success") for result in results),
+            "results": results,
+            "total_count": len(results)
+        }
+    
+    def _route_batch(self, parameters: Dict) -> Dict[str, Any]:
+        """批量路由"""
+        requests_list = parameters.get("requests", [])
+        
+        if not requests_list or not all(item.get("request") for item in requests_list):
+            return {
+                "success": False,
+                "error": "缺少必需参数: requests"
+            }
+        
+        return self.execution_engine.routing_engine.route_batch(
+            requests_list,
+            window_seconds=parameters.get("window_seconds", 60.0),
+            platform_limits=parameters.get("platform_limits"),
+            total_budget=parameters.get("total_budget"),
+            commit=parameters.get("commit", False)
+        )
+    
     def _discover_tools(self, parameters: Dict) -> Dict[str, Any]:
         """工具发现"""
         try:
@@ -7,7 +7,9 @@ PowerAutomation 真实API验证系统
 import os
 import sys
 import json
+import math
 import time
+import random
 import asyncio
 import logging
 import requests
@@ -16,16 +18,18 @@ from typing import Dict, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from pathlib import Path
-import sqlite3
 import uuid
 import hashlib
 import hmac
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import statistics
 
 # 添加项目路径
 sys.path.append('/home/ubuntu/powerautomation')
 
+from mcptool.adapters.async_http import AsyncHTTPConnectionPool
+from mcptool.adapters.metrics_sink import MetricsSink, RollupSpec
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -219,6 +223,270 @@ class APIEndpointManager:
             logger.error(f"获取认证头失败: {e}")
             return {}
 
+# 负载测试的操作组合，与_execute_user_session中的用户会话一致
+LOAD_TEST_OPERATIONS = [
+    ("workflow_engine", "list_workflows"),
+    ("workflow_engine", "create_workflow"),
+    ("ai_engine", "intent_understanding"),
+    ("ai_engine", "workflow_recommendation"),
+    ("monitoring", "system_metrics")
+]
+POST_ENDPOINTS = {"create_workflow", "intent_understanding", "workflow_recommendation"}
+
+
+def _data_accuracy(status_code: int, body: bytes) -> float:
+    """根据响应内容估算数据准确性"""
+    if status_code != 200:
+        return 0.0  # 错误响应
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return 0.5  # 解析失败
+    if isinstance(data, dict) and data:
+        return 0.95  # 假设95%的数据准确性
+    elif isinstance(data, list) and data:
+        return 0.93  # 列表数据稍低的准确性
+    return 0.8  # 空数据或格式问题
+
+
+class LatencyHistogram:
+    """
+    HDR风格的延迟直方图
+    
+    以微秒整数记录，按对数-线性分桶，任意量级下的相对误差不超过10^-significant_digits，
+    内存只与取值范围的量级数有关。支持按期望间隔补录被协调遗漏的样本，以及跨进程合并。
+    """
+    
+    def __init__(self, significant_digits: int = 2):
+        self.significant_digits = significant_digits
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._sub_bucket_count = 1 << self._sub_bucket_bits
+        self._half_count = self._sub_bucket_count >> 1
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min_value: Optional[int] = None
+        self.max_value = 0
+        self.total = 0
+    
+    def _index(self, value: int) -> int:
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self._sub_bucket_bits
+        return self._sub_bucket_count + (shift - 1) * self._half_count + ((value >> shift) - self._half_count)
+    
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self._sub_bucket_count:
+            return index
+        offset = index - self._sub_bucket_count
+        shift = offset // self._half_count + 1
+        sub_bucket = offset % self._half_count + self._half_count
+        return ((sub_bucket + 1) << shift) - 1
+    
+    def record(self, value_us: float, count: int = 1):
+        """记录一个延迟值(微秒)"""
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        self.total += value * count
+        self.max_value = max(self.max_value, value)
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+    
+    def record_corrected(self, value_us: float, expected_interval_us: float):
+        """
+        记录延迟值，并按期望请求间隔补录被长延迟阻塞而没有发出的请求
+        
+        用于闭环测量：一个请求耗时远超请求间隔时，期间本应发出的请求会依次补录递减的延迟。
+        """
+        self.record(value_us)
+        if expected_interval_us <= 0:
+            return
+        missing = value_us - expected_interval_us
+        while missing >= expected_interval_us:
+            self.record(missing)
+            missing -= expected_interval_us
+    
+    def merge(self, other: "LatencyHistogram"):
+        """合并另一个直方图"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self.total += other.total
+        self.max_value = max(self.max_value, other.max_value)
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+    
+    def value_at_percentile(self, percentile: float) -> int:
+        """返回指定百分位的延迟(微秒)"""
+        if not self.total_count:
+            return 0
+        target = max(1, math.ceil(percentile / 100 * self.total_count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_value)
+        return self.max_value
+    
+    def mean(self) -> float:
+        """平均延迟(微秒)"""
+        return self.total / self.total_count if self.total_count else 0.0
+    
+    def summary_ms(self) -> Dict[str, float]:
+        """以毫秒为单位的统计摘要"""
+        return {
+            "count": self.total_count,
+            "mean": round(self.mean() / 1000, 3),
+            "min": round((self.min_value or 0) / 1000, 3),
+            "p50": round(self.value_at_percentile(50) / 1000, 3),
+            "p90": round(self.value_at_percentile(90) / 1000, 3),
+            "p95": round(self.value_at_percentile(95) / 1000, 3),
+            "p99": round(self.value_at_percentile(99) / 1000, 3),
+            "p999": round(self.value_at_percentile(99.9) / 1000, 3),
+            "max": round(self.max_value / 1000, 3)
+        }
+    
+    def to_dict(self) -> Dict:
+        """序列化，用于跨进程传递"""
+        return {
+            "significant_digits": self.significant_digits,
+            "counts": self.counts,
+            "total_count": self.total_count,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "total": self.total
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        """从to_dict的结果还原"""
+        histogram = cls(data["significant_digits"])
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.total_count = data["total_count"]
+        histogram.min_value = data["min_value"]
+        histogram.max_value = data["max_value"]
+        histogram.total = data["total"]
+        return histogram
+
+
+async def _run_open_loop(plan: Dict) -> Dict:
+    """
+    按计划的到达率发送请求(开环)
+    
+    请求在预定时刻发出，不等待之前的请求完成；响应时间从预定时刻开始计时，
+    因此服务变慢或连接池排队造成的等待都会计入延迟，不会出现协调遗漏。
+    """
+    loop = asyncio.get_running_loop()
+    rng = random.Random(plan["seed"])
+    pool = AsyncHTTPConnectionPool(plan["max_connections"], plan["timeout"])
+    operations = plan["operations"]
+    weights = [operation["weight"] for operation in operations]
+    rps, duration, ramp_up = plan["rps"], plan["duration_seconds"], plan["ramp_up_seconds"]
+    
+    result = {
+        "scheduled": 0, "completed": 0, "errors": 0, "status_codes": {},
+        "max_schedule_lag_ms": 0.0, "samples": [], "endpoints": {}
+    }
+    response_time = LatencyHistogram()
+    service_time = LatencyHistogram()
+    endpoint_histograms = {operation["name"]: LatencyHistogram() for operation in operations}
+    
+    async def fire(intended: float, operation: Dict):
+        lag = loop.time() - intended
+        result["max_schedule_lag_ms"] = max(result["max_schedule_lag_ms"], lag * 1000)
+        acquired_at = None
+        data = b""
+        try:
+            status, data, acquired_at = await pool.request(
+                operation["method"], operation["url"], operation["headers"], rng.choice(operation["bodies"]))
+        except asyncio.TimeoutError:
+            status = 408
+        except Exception as e:
+            logger.debug(f"开环请求失败 {operation['name']}: {e}")
+            status = 0
+        finished = loop.time()
+        latency_us = (finished - intended) * 1e6
+        response_time.record(latency_us)
+        service_time.record((finished - (acquired_at or intended)) * 1e6)
+        endpoint_histograms[operation["name"]].record(latency_us)
+        result["completed"] += 1
+        result["status_codes"][status] = result["status_codes"].get(status, 0) + 1
+        if status == 0 or status >= 400:
+            result["errors"] += 1
+        if plan["collect_samples"]:
+            result["samples"].append((time.time(), operation["name"], latency_us / 1000, status,
+                                      _data_accuracy(status, data)))
+    
+    # 多进程时各进程从约定的墙钟时刻同时开始
+    start = loop.time() + max(0.0, plan["start_at"] - time.time())
+    offset = plan.get("phase", 0.0)
+    tasks = set()
+    while offset < duration:
+        intended = start + offset
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        operation = rng.choices(operations, weights)[0]
+        task = asyncio.ensure_future(fire(intended, operation))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        result["scheduled"] += 1
+        
+        if ramp_up > 0 and offset < ramp_up:
+            rate = max(rps * offset / ramp_up, rps * 0.01)
+        else:
+            rate = rps
+        offset += rng.expovariate(rate) if plan["arrival"] == "poisson" else 1.0 / rate
+    
+    if tasks:
+        await asyncio.gather(*tasks)
+    await pool.close()
+    
+    result["elapsed_seconds"] = loop.time() - start
+    result["connections_opened"] = pool.stats["connections_opened"]
+    result["response_time"] = response_time.to_dict()
+    result["service_time"] = service_time.to_dict()
+    result["endpoints"] = {name: histogram.to_dict() for name, histogram in endpoint_histograms.items()}
+    return result
+
+
+def _open_loop_worker(plan: Dict) -> Dict:
+    """子进程入口"""
+    return asyncio.run(_run_open_loop(plan))
+
+
+@dataclass
+class OpenLoopLoadResult:
+    """开环负载测试结果"""
+    target_rps: float
+    achieved_rps: float
+    duration_seconds: float
+    total_requests: int
+    successful_requests: int
+    failed_requests: int
+    status_codes: Dict[int, int]
+    response_time: LatencyHistogram  # 从预定发送时刻计时，包含排队等待
+    service_time: LatencyHistogram   # 从取得连接时刻计时，即服务端处理时间
+    endpoint_latency: Dict[str, LatencyHistogram]
+    max_schedule_lag_ms: float
+    connections_opened: int
+    metrics: List[RealAPIMetrics]
+    
+    def summary(self) -> Dict:
+        """结果摘要，延迟单位为毫秒"""
+        return {
+            "target_rps": self.target_rps,
+            "achieved_rps": round(self.achieved_rps, 2),
+            "total_requests": self.total_requests,
+            "error_rate": self.failed_requests / self.total_requests * 100 if self.total_requests else 0.0,
+            "status_codes": self.status_codes,
+            "response_time_ms": self.response_time.summary_ms(),
+            "service_time_ms": self.service_time.summary_ms(),
+            "endpoints": {name: histogram.summary_ms() for name, histogram in self.endpoint_latency.items()},
+            "max_schedule_lag_ms": round(self.max_schedule_lag_ms, 3),
+            "connections_opened": self.connections_opened
+        }
+
 class LoadTestGenerator:
     """负载测试生成器"""
     
@@ -266,6 +534,157 @@ class LoadTestGenerator:
         logger.info(f"负载测试完成，收集到{len(metrics_list)}个指标数据点")
         return metrics_list
     
+    async def generate_open_loop_load(self,
+                                      environment: str,
+                                      target_rps: float,
+                                      duration_seconds: float,
+                                      ramp_up_seconds: float = 0.0,
+                                      processes: int = 1,
+                                      max_connections: int = 100,
+                                      arrival: str = "poisson",
+                                      timeout: float = 30.0,
+                                      collect_metrics: bool = True) -> OpenLoopLoadResult:
+        """
+        按目标到达率生成开环负载
+        
+        与generate_realistic_load的闭环模拟不同，请求按泊松(或均匀)到达过程在预定时刻发出，
+        不受之前请求完成时间的影响；响应时间从预定时刻计时，服务变慢时的排队等待会如实反映在
+        延迟分位数中。每个进程运行一个事件循环，通过keep-alive连接池复用连接；
+        processes大于1时把到达率平均分配到多个进程，最后合并直方图。
+        
+        Args:
+            environment: 环境名称
+            target_rps: 目标每秒请求数
+            duration_seconds: 持续时间(秒)
+            ramp_up_seconds: 到达率从0线性增加到目标值的时间(秒)
+            processes: 发压进程数
+            max_connections: 每个进程的最大连接数
+            arrival: 到达过程，poisson或uniform
+            timeout: 单个请求超时(秒)
+            collect_metrics: 是否为每个请求生成RealAPIMetrics
+            
+        Returns:
+            开环负载测试结果
+        """
+        operations = self._build_operation_plan(environment)
+        if not operations:
+            raise ValueError(f"环境{environment}没有可用的负载测试端点")
+        
+        processes = max(1, processes)
+        # 子进程启动需要时间，约定稍后的同一墙钟时刻开始
+        start_at = time.time() + (0.5 if processes > 1 else 0.0)
+        plans = [{
+            "operations": operations,
+            "rps": target_rps / processes,
+            "duration_seconds": duration_seconds,
+            "ramp_up_seconds": ramp_up_seconds,
+            "arrival": arrival,
+            "seed": random.randrange(2 ** 32) + index,
+            "phase": index / target_rps,
+            "start_at": start_at,
+            "max_connections": max_connections,
+            "timeout": timeout,
+            "collect_samples": collect_metrics
+        } for index in range(processes)]
+        
+        logger.info(f"开始开环负载测试: 目标{target_rps}RPS, {processes}个进程, 持续{duration_seconds}秒")
+        if processes == 1:
+            raw_results = [await _run_open_loop(plans[0])]
+        else:
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                raw_results = await asyncio.gather(
+                    *[loop.run_in_executor(executor, _open_loop_worker, plan) for plan in plans])
+        
+        result = self._merge_open_loop_results(raw_results, target_rps, duration_seconds)
+        logger.info(f"开环负载测试完成: {result.total_requests}个请求, 实际{result.achieved_rps:.1f}RPS, "
+                    f"P99 {result.response_time.value_at_percentile(99) / 1000:.1f}ms")
+        return result
+    
+    def _operation_payload(self, endpoint: str) -> Dict:
+        """生成操作的请求数据"""
+        if endpoint == "create_workflow":
+            return {"workflow_data": self.test_data_generator.generate_workflow_data()}
+        if endpoint == "intent_understanding":
+            return {"text": self.test_data_generator.generate_intent_text()}
+        if endpoint == "workflow_recommendation":
+            return {"context": self.test_data_generator.generate_context_data()}
+        return {}
+    
+    def _build_operation_plan(self, environment: str, payload_variants: int = 16) -> List[Dict]:
+        """解析端点URL和认证头，并预先生成请求体，发压时不再重复序列化"""
+        operations = []
+        for service, endpoint in LOAD_TEST_OPERATIONS:
+            url = self.endpoint_manager.get_endpoint_url(environment, service, endpoint)
+            if not url:
+                continue
+            headers = self.endpoint_manager.get_auth_headers(environment, service)
+            headers["Content-Type"] = "application/json"
+            headers["User-Agent"] = "PowerAutomation-LoadTest-OpenLoop"
+            if endpoint in POST_ENDPOINTS:
+                method = "POST"
+                bodies = [json.dumps(self._operation_payload(endpoint), default=str).encode("utf-8")
+                          for _ in range(payload_variants)]
+            else:
+                method, bodies = "GET", [b""]
+            operations.append({"name": f"{service}.{endpoint}", "method": method, "url": url,
+                               "headers": headers, "bodies": bodies, "weight": 1.0})
+        return operations
+    
+    def _merge_open_loop_results(self, raw_results: List[Dict], target_rps: float,
+                                 duration_seconds: float) -> OpenLoopLoadResult:
+        """合并各进程的结果"""
+        response_time = LatencyHistogram()
+        service_time = LatencyHistogram()
+        endpoint_latency: Dict[str, LatencyHistogram] = {}
+        status_codes: Dict[int, int] = {}
+        samples = []
+        for raw in raw_results:
+            response_time.merge(LatencyHistogram.from_dict(raw["response_time"]))
+            service_time.merge(LatencyHistogram.from_dict(raw["service_time"]))
+            for name, data in raw["endpoints"].items():
+                endpoint_latency.setdefault(name, LatencyHistogram()).merge(LatencyHistogram.from_dict(data))
+            for status, count in raw["status_codes"].items():
+                status_codes[int(status)] = status_codes.get(int(status), 0) + count
+            samples.extend(raw["samples"])
+        
+        total = sum(raw["completed"] for raw in raw_results)
+        failed = sum(raw["errors"] for raw in raw_results)
+        elapsed = max([raw["elapsed_seconds"] for raw in raw_results] + [duration_seconds])
+        achieved_rps = total / elapsed if elapsed else 0.0
+        
+        metrics = [RealAPIMetrics(
+            timestamp=datetime.fromtimestamp(timestamp),
+            api_endpoint=name,
+            response_time=latency_ms,
+            status_code=status,
+            success_rate=1.0 if 0 < status < 400 else 0.0,
+            error_count=0 if 0 < status < 400 else 1,
+            throughput=achieved_rps,
+            concurrent_users=len(raw_results),
+            cpu_usage=self._get_simulated_cpu_usage(),
+            memory_usage=self._get_simulated_memory_usage(),
+            network_latency=latency_ms * 0.1,  # 估算网络延迟
+            data_accuracy=accuracy,
+            user_satisfaction_score=self._calculate_user_satisfaction(latency_ms, status or 503)
+        ) for timestamp, name, latency_ms, status, accuracy in sorted(samples)]
+        
+        return OpenLoopLoadResult(
+            target_rps=target_rps,
+            achieved_rps=achieved_rps,
+            duration_seconds=elapsed,
+            total_requests=total,
+            successful_requests=total - failed,
+            failed_requests=failed,
+            status_codes=status_codes,
+            response_time=response_time,
+            service_time=service_time,
+            endpoint_latency=endpoint_latency,
+            max_schedule_lag_ms=max(raw["max_schedule_lag_ms"] for raw in raw_results),
+            connections_opened=sum(raw["connections_opened"] for raw in raw_results),
+            metrics=metrics
+        )
+    
     def _simulate_user_behavior(self, 
                                environment: str, 
                                user_id: int, 
@@ -299,16 +718,9 @@ class LoadTestGenerator:
         session_metrics = []
         
         # 典型用户操作流程
-        operations = [
-            ("workflow_engine", "list_workflows", {}),
-            ("workflow_engine", "create_workflow", {"workflow_data": self.test_data_generator.generate_workflow_data()}),
-            ("ai_engine", "intent_understanding", {"text": self.test_data_generator.generate_intent_text()}),
-            ("ai_engine", "workflow_recommendation", {"context": self.test_data_generator.generate_context_data()}),
-            ("monitoring", "system_metrics", {})
-        ]
-        
-        for service, endpoint, data in operations:
+        for service, endpoint in LOAD_TEST_OPERATIONS:
             try:
+                data = self._operation_payload(endpoint)
                 metric = self._execute_api_call(environment, service, endpoint, data, user_id)
                 if metric:
                     session_metrics.append(metric)
@@ -339,7 +751,7 @@ class LoadTestGenerator:
             start_time = time.time()
             
             # 执行HTTP请求
-            if endpoint in ["create_workflow", "intent_understanding", "workflow_recommendation"]:
+            if endpoint in POST_ENDPOINTS:
                 response = requests.post(url, json=data, headers=headers, timeout=30)
             else:
                 response = requests.get(url, headers=headers, timeout=30)
@@ -402,20 +814,7 @@ class LoadTestGenerator:
     
     def _calculate_data_accuracy(self, response: requests.Response) -> float:
         """计算数据准确性"""
-        try:
-            if response.status_code == 200:
-                # 检查响应数据的完整性
-                data = response.json()
-                if isinstance(data, dict) and data:
-                    return 0.95  # 假设95%的数据准确性
-                elif isinstance(data, list) and data:
-                    return 0.93  # 列表数据稍低的准确性
-                else:
-                    return 0.8   # 空数据或格式问题
-            else:
-                return 0.0  # 错误响应
-        except:
-            return 0.5  # 解析失败
+        return _data_accuracy(response.status_code, response.content)
     
     def _calculate_user_satisfaction(self, response_time: float, status_code: int) -> float:
         """计算用户满意度评分"""
@@ -526,14 +925,31 @@ class TestDataGenerator:
             }
         }
 
+REAL_API_METRIC_COLUMNS = [
+    "validation_id", "timestamp", "api_endpoint", "response_time",
+    "status_code", "success_rate", "error_count", "throughput",
+    "concurrent_users", "cpu_usage", "memory_usage", "network_latency",
+    "data_accuracy", "user_satisfaction_score"
+]
+REAL_VALIDATION_RESULT_COLUMNS = [
+    "validation_id", "stage_name", "start_time", "end_time",
+    "traffic_percentage", "total_requests", "successful_requests",
+    "failed_requests", "average_response_time", "p95_response_time",
+    "p99_response_time", "error_rate", "throughput", "user_feedback_score",
+    "business_metrics", "technical_metrics", "issues_detected",
+    "auto_actions_taken", "success_status"
+]
+
 class GradualRolloutManager:
     """灰度发布管理器"""
     
-    def __init__(self, endpoint_manager: APIEndpointManager):
+    def __init__(self, endpoint_manager: APIEndpointManager,
+                 db_path: str = "/home/ubuntu/powerautomation/real_validation_results.db"):
         self.endpoint_manager = endpoint_manager
         self.load_generator = LoadTestGenerator(endpoint_manager)
         self.rollout_stages = self._define_rollout_stages()
-        self.db_path = "/home/ubuntu/powerautomation/real_validation_results.db"
+        self.db_path = db_path
+        self.metrics_sink: Optional[MetricsSink] = None
         self._init_database()
         
     def _define_rollout_stages(self) -> List[GradualRolloutConfig]:
@@ -612,11 +1028,11 @@ class GradualRolloutManager:
     def _init_database(self):
         """初始化数据库"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # 所有写入共用一个WAL模式的长连接，由后台线程批量提交
+            self.metrics_sink = MetricsSink.shared(self.db_path)
             
             # 创建真实验证结果表
-            cursor.execute('''
+            self.metrics_sink.execute_script('''
                 CREATE TABLE IF NOT EXISTS real_validation_results (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     validation_id TEXT NOT NULL,
@@ -638,11 +1054,13 @@ class GradualRolloutManager:
                     issues_detected TEXT,
                     auto_actions_taken TEXT,
                     success_status BOOLEAN
-                )
+                );
+                CREATE INDEX IF NOT EXISTS idx_real_validation_results_validation
+                    ON real_validation_results (validation_id);
             ''')
             
             # 创建API指标表
-            cursor.execute('''
+            self.metrics_sink.execute_script('''
                 CREATE TABLE IF NOT EXISTS real_api_metrics (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     validation_id TEXT,
@@ -659,11 +1077,21 @@ class GradualRolloutManager:
                     network_latency REAL,
                     data_accuracy REAL,
                     user_satisfaction_score REAL
-                )
+                );
+                CREATE INDEX IF NOT EXISTS idx_real_api_metrics_validation
+                    ON real_api_metrics (validation_id, timestamp, api_endpoint);
+                CREATE INDEX IF NOT EXISTS idx_real_api_metrics_endpoint
+                    ON real_api_metrics (api_endpoint, timestamp);
             ''')
             
-            conn.commit()
-            conn.close()
+            self.metrics_sink.register_table("real_validation_results", REAL_VALIDATION_RESULT_COLUMNS)
+            # 按验证、端点和分钟汇总，报告生成时直接读取
+            self.metrics_sink.register_table("real_api_metrics", REAL_API_METRIC_COLUMNS, RollupSpec(
+                table="real_api_metrics_rollup",
+                group_by=["validation_id", "api_endpoint"],
+                value_columns=["response_time", "user_satisfaction_score"],
+                is_error=lambda row: row["success_rate"] == 0
+            ))
             logger.info("真实验证数据库初始化完成")
             
         except Exception as e:
@@ -862,58 +1290,38 @@ class GradualRolloutManager:
         logger.info("回滚操作完成")
     
     def _save_api_metrics(self, validation_id: str, metrics_list: List[RealAPIMetrics]):
-        """保存API指标"""
+        """保存API指标，由写入器后台批量提交"""
+        if self.metrics_sink is None:
+            logger.error("保存API指标失败: 数据库不可用")
+            return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for metric in metrics_list:
-                cursor.execute('''
-                    INSERT INTO real_api_metrics (
-                        validation_id, timestamp, api_endpoint, response_time,
-                        status_code, success_rate, error_count, throughput,
-                        concurrent_users, cpu_usage, memory_usage, network_latency,
-                        data_accuracy, user_satisfaction_score
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    validation_id,
-                    metric.timestamp.isoformat(),
-                    metric.api_endpoint,
-                    metric.response_time,
-                    metric.status_code,
-                    metric.success_rate,
-                    metric.error_count,
-                    metric.throughput,
-                    metric.concurrent_users,
-                    metric.cpu_usage,
-                    metric.memory_usage,
-                    metric.network_latency,
-                    metric.data_accuracy,
-                    metric.user_satisfaction_score
-                ))
-            
-            conn.commit()
-            conn.close()
+            self.metrics_sink.write_many("real_api_metrics", ((
+                validation_id,
+                metric.timestamp.isoformat(),
+                metric.api_endpoint,
+                metric.response_time,
+                metric.status_code,
+                metric.success_rate,
+                metric.error_count,
+                metric.throughput,
+                metric.concurrent_users,
+                metric.cpu_usage,
+                metric.memory_usage,
+                metric.network_latency,
+                metric.data_accuracy,
+                metric.user_satisfaction_score
+            ) for metric in metrics_list))
             
         except Exception as e:
             logger.error(f"保存API指标失败: {e}")
     
     def _save_validation_result(self, result: RealValidationResult):
         """保存验证结果"""
+        if self.metrics_sink is None:
+            logger.error("保存验证结果失败: 数据库不可用")
+            return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO real_validation_results (
-                    validation_id, stage_name, start_time, end_time,
-                    traffic_percentage, total_requests, successful_requests,
-                    failed_requests, average_response_time, p95_response_time,
-                    p99_response_time, error_rate, throughput, user_feedback_score,
-                    business_metrics, technical_metrics, issues_detected,
-                    auto_actions_taken, success_status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.metrics_sink.write("real_validation_results", (
                 result.validation_id,
                 result.stage_name,
                 result.start_time.isoformat(),
@@ -935,11 +1343,24 @@ class GradualRolloutManager:
                 result.success_status
             ))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"保存验证结果失败: {e}")
+    
+    def get_endpoint_rollup(self, validation_id: Optional[str] = None) -> List[Dict]:
+        """
+        从汇总表读取各端点的请求数、错误率和响应时间
+        
+        Args:
+            validation_id: 只统计指定验证，为None时统计全部
+            
+        Returns:
+            每个验证和端点一行
+        """
+        if self.metrics_sink is None:
+            return []
+        self.metrics_sink.flush()
+        where = {"validation_id": validation_id} if validation_id else None
+        return self.metrics_sink.rollup_summary("real_api_metrics", where)
 
 class RealValidationReportGenerator:
     """真实验证报告生成器"""
@@ -969,11 +1390,28 @@ class RealValidationReportGenerator:
             "user_experience_analysis": self._generate_user_experience_analysis(validation_results),
             "risk_assessment": self._generate_risk_assessment(validation_results),
             "recommendations": self._generate_recommendations(validation_results),
-            "next_phase_readiness": self._assess_next_phase_readiness(validation_results)
+            "next_phase_readiness": self._assess_next_phase_readiness(validation_results),
+            "endpoint_breakdown": self._generate_endpoint_breakdown(validation_results)
         }
         
         return report
     
+    def _generate_endpoint_breakdown(self, results: List[RealValidationResult]) -> List[Dict]:
+        """按阶段和端点汇总请求，数据来自汇总表"""
+        breakdown = []
+        for result in results:
+            for row in self.rollout_manager.get_endpoint_rollup(result.validation_id):
+                breakdown.append({
+                    "stage_name": result.stage_name,
+                    "api_endpoint": row["api_endpoint"],
+                    "requests": row["request_count"],
+                    "error_rate": row["error_rate"],
+                    "average_response_time": row["response_time_avg"],
+                    "max_response_time": row["response_time_max"],
+                    "user_satisfaction": row["user_satisfaction_score_avg"]
+                })
+        return breakdown
+    
     def _calculate_total_duration(self, results: List[RealValidationResult]) -> str:
         """计算总验证时长"""
         if not results:
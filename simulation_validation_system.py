@@ -7,21 +7,27 @@ PowerAutomation 模拟验证系统
 import os
 import sys
 import json
+import math
 import time
 import random
 import threading
 import asyncio
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
 from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta
 from pathlib import Path
-import sqlite3
 import uuid
 
+import numpy as np
+
 # 添加项目路径
 sys.path.append('/home/ubuntu/powerautomation')
 
+from mcptool.adapters.metrics_sink import MetricsSink, RollupSpec
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -68,13 +74,197 @@ class ValidationResult:
     issues_found: List[str]
     recommendations: List[str]
 
+SIMULATION_METRIC_COLUMNS = [
+    "timestamp", "scenario_id", "test_coverage_rate", "ai_model_accuracy",
+    "system_response_time", "system_availability", "error_rate", "throughput",
+    "cpu_usage", "memory_usage", "user_satisfaction", "automation_level"
+]
+VALIDATION_RESULT_COLUMNS = [
+    "scenario_id", "start_time", "end_time", "success_status",
+    "improvement_data", "issues_found", "recommendations"
+]
+
+# SimulationMetrics中的指标字段，向量化计算时按此顺序排列各列
+METRIC_FIELDS = SIMULATION_METRIC_COLUMNS[2:]
+# 越低越好的指标
+LOWER_IS_BETTER = ("system_response_time", "error_rate", "cpu_usage", "memory_usage")
+# 加噪声后的上限，与add_noise_to_metrics一致
+METRIC_CAPS = {
+    "test_coverage_rate": 100.0, "ai_model_accuracy": 100.0, "system_availability": 100.0,
+    "cpu_usage": 100.0, "memory_usage": 100.0, "user_satisfaction": 10.0, "automation_level": 100.0
+}
+# 噪声幅度系数，可用性的波动只有其他指标的十分之一
+METRIC_NOISE_SCALE = {"system_availability": 0.1}
+
+# 各优化类型对指标的影响: 指标 -> (方式, 系数)，f为优化强度
+#   toward: current + (target - current) * f * 系数
+#   scale:  current * (1 + f * 系数)
+#   offset: current + f * 系数
+OPTIMIZATION_EFFECTS = {
+    "test_optimization": {
+        "test_coverage_rate": ("toward", 1.0),
+        "error_rate": ("toward", 1.0),
+        "system_availability": ("toward", 0.5),
+        "user_satisfaction": ("offset", 0.5),
+        "automation_level": ("offset", 5.0)
+    },
+    "ai_enhancement": {
+        "ai_model_accuracy": ("toward", 1.0),
+        "automation_level": ("toward", 1.0),
+        "user_satisfaction": ("toward", 0.6),
+        "system_response_time": ("scale", -0.1),
+        "error_rate": ("scale", -0.2),
+        "throughput": ("scale", 0.3)
+    },
+    "performance_optimization": {
+        "system_response_time": ("toward", 1.0),
+        "throughput": ("toward", 1.0),
+        "cpu_usage": ("toward", 1.0),
+        "memory_usage": ("toward", 1.0),
+        "system_availability": ("offset", 0.3),
+        "user_satisfaction": ("offset", 0.8)
+    },
+    "comprehensive": {name: ("toward", 1.0) for name in METRIC_FIELDS}
+}
+
+@dataclass
+class MonteCarloResult:
+    """蒙特卡洛验证结果数据类"""
+    scenario_id: str
+    replicas: int
+    confidence: float
+    success_rate: float
+    success_rate_ci: Tuple[float, float]
+    criteria_pass_rates: Dict[str, float]
+    metrics: Dict[str, Dict[str, float]]
+    improvement: Dict[str, Dict[str, float]]
+    duration_seconds: float
+    seed: Optional[int] = None
+    metrics_before: Dict[str, float] = field(default_factory=dict)
+
+
+def apply_optimization_effect(current: np.ndarray, target: np.ndarray, optimization_type: str,
+                              intensity: np.ndarray) -> np.ndarray:
+    """
+    向量化计算优化效果
+
+    Args:
+        current: 当前指标，形状(指标数,)，列顺序同METRIC_FIELDS
+        target: 目标指标，形状同current
+        optimization_type: 优化类型，未知类型时指标不变
+        intensity: 每个副本的优化强度，形状(副本数,)，超过1按1计算
+
+    Returns:
+        形状(副本数, 指标数)的优化后指标
+    """
+    factors = np.minimum(np.asarray(intensity, dtype=np.float64), 1.0)[:, np.newaxis]
+    result = np.repeat(current[np.newaxis, :], factors.shape[0], axis=0)
+    for name, (kind, coefficient) in OPTIMIZATION_EFFECTS.get(optimization_type, {}).items():
+        column = METRIC_FIELDS.index(name)
+        f = factors[:, 0] * coefficient
+        if kind == "toward":
+            result[:, column] = current[column] + (target[column] - current[column]) * f
+        elif kind == "scale":
+            result[:, column] = current[column] * (1 + f)
+        else:
+            result[:, column] = current[column] + f
+    return result
+
+
+def add_noise_arrays(values: np.ndarray, noise_level: float, rng: np.random.Generator) -> np.ndarray:
+    """向量化的add_noise_to_metrics，为形状(副本数, 指标数)的指标一次性加上均匀乘性噪声"""
+    scale = np.array([METRIC_NOISE_SCALE.get(name, 1.0) for name in METRIC_FIELDS]) * noise_level
+    caps = np.array([METRIC_CAPS.get(name, np.inf) for name in METRIC_FIELDS])
+    noise = rng.uniform(-1.0, 1.0, size=values.shape) * scale
+    return np.clip(values * (1 + noise), 0.0, caps)
+
+
+def _wilson_interval(successes: int, total: int, z: float) -> Tuple[float, float]:
+    """成功率的Wilson置信区间(百分比)"""
+    if total == 0:
+        return (0.0, 0.0)
+    p = successes / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return (max(0.0, center - margin) * 100, min(1.0, center + margin) * 100)
+
+
+def _describe_samples(samples: np.ndarray, z: float, tail: float) -> Dict[str, Dict[str, float]]:
+    """按列汇总样本: 均值、标准差、均值的置信区间和样本分位数区间"""
+    means = samples.mean(axis=0)
+    stds = samples.std(axis=0, ddof=1) if samples.shape[0] > 1 else np.zeros(samples.shape[1])
+    margins = z * stds / np.sqrt(samples.shape[0])
+    lows, highs = np.percentile(samples, (tail * 100, (1 - tail) * 100), axis=0)
+    return {
+        name: {
+            "mean": float(means[i]),
+            "std": float(stds[i]),
+            "mean_ci_low": float(means[i] - margins[i]),
+            "mean_ci_high": float(means[i] + margins[i]),
+            "interval_low": float(lows[i]),
+            "interval_high": float(highs[i])
+        }
+        for i, name in enumerate(METRIC_FIELDS)
+    }
+
+
+def _monte_carlo_worker(plan: Dict) -> Dict:
+    """
+    在一个进程中模拟一个场景的全部副本
+    
+    所有副本从同一组优化前指标出发，按场景类型计算优化效果并加噪声，
+    每一步都是形状(副本数, 指标数)的数组运算。
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(plan["seed"])
+    replicas = plan["replicas"]
+    before = np.asarray(plan["metrics_before"], dtype=np.float64)
+    after = apply_optimization_effect(before, np.asarray(plan["target"], dtype=np.float64),
+                                      plan["scenario_type"], np.full(replicas, plan["intensity"]))
+    after = add_noise_arrays(after, plan["noise_level"], rng)
+    
+    # 逐条件判断是否达标，与SimulationValidator._evaluate_success一致
+    passed = np.ones(replicas, dtype=bool)
+    criteria_pass_rates = {}
+    for name, threshold in plan["success_criteria"].items():
+        if name not in METRIC_FIELDS:
+            continue
+        values = after[:, METRIC_FIELDS.index(name)]
+        met = values <= threshold if name in LOWER_IS_BETTER else values >= threshold
+        criteria_pass_rates[name] = float(met.mean() * 100)
+        passed &= met
+    
+    # 改进量的方向与_calculate_improvement一致，越低越好的指标取反
+    signs = np.array([-1.0 if name in LOWER_IS_BETTER else 1.0 for name in METRIC_FIELDS])
+    improvement = (after - before) * signs
+    
+    z = NormalDist().inv_cdf((1 + plan["confidence"]) / 2)
+    tail = (1 - plan["confidence"]) / 2
+    successes = int(passed.sum())
+    return {
+        "scenario_id": plan["scenario_id"],
+        "replicas": replicas,
+        "confidence": plan["confidence"],
+        "success_rate": successes / replicas * 100,
+        "success_rate_ci": _wilson_interval(successes, replicas, z),
+        "criteria_pass_rates": criteria_pass_rates,
+        "metrics": _describe_samples(after, z, tail),
+        "improvement": _describe_samples(improvement, z, tail),
+        "duration_seconds": time.perf_counter() - started,
+        "seed": plan["seed"],
+        "metrics_before": dict(zip(METRIC_FIELDS, plan["metrics_before"]))
+    }
+
 class SimulationEnvironment:
     """模拟验证环境"""
     
-    def __init__(self, config_path: str = "/home/ubuntu/powerautomation/simulation_config.json"):
+    def __init__(self, config_path: str = "/home/ubuntu/powerautomation/simulation_config.json",
+                 db_path: str = "/home/ubuntu/powerautomation/simulation_results.db"):
         self.config_path = config_path
         self.config = self._load_config()
-        self.db_path = "/home/ubuntu/powerautomation/simulation_results.db"
+        self.db_path = db_path
+        self.metrics_sink: Optional[MetricsSink] = None
         self._init_database()
         self.current_metrics = self._get_baseline_metrics()
         self.simulation_running = False
@@ -135,11 +325,11 @@ class SimulationEnvironment:
     def _init_database(self):
         """初始化数据库"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # 所有写入共用一个WAL模式的长连接，由后台线程批量提交
+            self.metrics_sink = MetricsSink.shared(self.db_path)
             
             # 创建指标表
-            cursor.execute('''
+            self.metrics_sink.execute_script('''
                 CREATE TABLE IF NOT EXISTS simulation_metrics (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     timestamp TEXT NOT NULL,
@@ -154,11 +344,13 @@ class SimulationEnvironment:
                     memory_usage REAL,
                     user_satisfaction REAL,
                     automation_level REAL
-                )
+                );
+                CREATE INDEX IF NOT EXISTS idx_simulation_metrics_scenario
+                    ON simulation_metrics (scenario_id, timestamp);
             ''')
             
             # 创建验证结果表
-            cursor.execute('''
+            self.metrics_sink.execute_script('''
                 CREATE TABLE IF NOT EXISTS validation_results (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     scenario_id TEXT NOT NULL,
@@ -168,11 +360,18 @@ class SimulationEnvironment:
                     improvement_data TEXT,
                     issues_found TEXT,
                     recommendations TEXT
-                )
+                );
+                CREATE INDEX IF NOT EXISTS idx_validation_results_scenario
+                    ON validation_results (scenario_id);
             ''')
             
-            conn.commit()
-            conn.close()
+            self.metrics_sink.register_table("validation_results", VALIDATION_RESULT_COLUMNS)
+            # 按场景和分钟汇总，报告生成时直接读取
+            self.metrics_sink.register_table("simulation_metrics", SIMULATION_METRIC_COLUMNS, RollupSpec(
+                table="simulation_metrics_rollup",
+                group_by=["scenario_id"],
+                value_columns=["system_response_time", "throughput", "error_rate", "user_satisfaction"]
+            ))
             logger.info("数据库初始化完成")
             
         except Exception as e:
@@ -196,93 +395,27 @@ class SimulationEnvironment:
         )
     
     def simulate_optimization_effect(self, optimization_type: str, intensity: float = 1.0) -> SimulationMetrics:
-        """模拟优化效果"""
+        """模拟优化效果，各优化类型的影响见OPTIMIZATION_EFFECTS"""
         current = self.current_metrics
-        target = self.config["target_metrics"]
-        
-        # 根据优化类型计算改进效果
-        improvement_factor = min(intensity, 1.0)  # 限制在0-1之间
-        
-        if optimization_type == "test_optimization":
-            # 测试优化主要影响测试覆盖率、缺陷发现等
-            new_coverage = current.test_coverage_rate + (target["test_coverage_rate"] - current.test_coverage_rate) * improvement_factor
-            new_error_rate = current.error_rate - (current.error_rate - target["error_rate"]) * improvement_factor
-            new_availability = current.system_availability + (target["system_availability"] - current.system_availability) * improvement_factor * 0.5
-            
-            return SimulationMetrics(
-                timestamp=datetime.now(),
-                test_coverage_rate=new_coverage,
-                ai_model_accuracy=current.ai_model_accuracy,
-                system_response_time=current.system_response_time,
-                system_availability=new_availability,
-                error_rate=new_error_rate,
-                throughput=current.throughput,
-                cpu_usage=current.cpu_usage,
-                memory_usage=current.memory_usage,
-                user_satisfaction=current.user_satisfaction + 0.5 * improvement_factor,
-                automation_level=current.automation_level + 5.0 * improvement_factor
-            )
-            
-        elif optimization_type == "ai_enhancement":
-            # AI增强主要影响AI准确率、自动化水平等
-            new_accuracy = current.ai_model_accuracy + (target["ai_model_accuracy"] - current.ai_model_accuracy) * improvement_factor
-            new_automation = current.automation_level + (target["automation_level"] - current.automation_level) * improvement_factor
-            new_satisfaction = current.user_satisfaction + (target["user_satisfaction"] - current.user_satisfaction) * improvement_factor * 0.6
-            
-            return SimulationMetrics(
-                timestamp=datetime.now(),
-                test_coverage_rate=current.test_coverage_rate,
-                ai_model_accuracy=new_accuracy,
-                system_response_time=current.system_response_time * (1 - 0.1 * improvement_factor),
-                system_availability=current.system_availability,
-                error_rate=current.error_rate * (1 - 0.2 * improvement_factor),
-                throughput=current.throughput * (1 + 0.3 * improvement_factor),
-                cpu_usage=current.cpu_usage,
-                memory_usage=current.memory_usage,
-                user_satisfaction=new_satisfaction,
-                automation_level=new_automation
-            )
-            
-        elif optimization_type == "performance_optimization":
-            # 性能优化主要影响响应时间、吞吐量、资源使用率等
-            new_response_time = current.system_response_time - (current.system_response_time - target["system_response_time"]) * improvement_factor
-            new_throughput = current.throughput + (target["throughput"] - current.throughput) * improvement_factor
-            new_cpu_usage = current.cpu_usage - (current.cpu_usage - target["cpu_usage"]) * improvement_factor
-            new_memory_usage = current.memory_usage - (current.memory_usage - target["memory_usage"]) * improvement_factor
-            
-            return SimulationMetrics(
-                timestamp=datetime.now(),
-                test_coverage_rate=current.test_coverage_rate,
-                ai_model_accuracy=current.ai_model_accuracy,
-                system_response_time=new_response_time,
-                system_availability=current.system_availability + 0.3 * improvement_factor,
-                error_rate=current.error_rate,
-                throughput=new_throughput,
-                cpu_usage=new_cpu_usage,
-                memory_usage=new_memory_usage,
-                user_satisfaction=current.user_satisfaction + 0.8 * improvement_factor,
-                automation_level=current.automation_level
-            )
-            
-        elif optimization_type == "comprehensive":
-            # 综合优化影响所有指标
-            return SimulationMetrics(
-                timestamp=datetime.now(),
-                test_coverage_rate=current.test_coverage_rate + (target["test_coverage_rate"] - current.test_coverage_rate) * improvement_factor,
-                ai_model_accuracy=current.ai_model_accuracy + (target["ai_model_accuracy"] - current.ai_model_accuracy) * improvement_factor,
-                system_response_time=current.system_response_time - (current.system_response_time - target["system_response_time"]) * improvement_factor,
-                system_availability=current.system_availability + (target["system_availability"] - current.system_availability) * improvement_factor,
-                error_rate=current.error_rate - (current.error_rate - target["error_rate"]) * improvement_factor,
-                throughput=current.throughput + (target["throughput"] - current.throughput) * improvement_factor,
-                cpu_usage=current.cpu_usage - (current.cpu_usage - target["cpu_usage"]) * improvement_factor,
-                memory_usage=current.memory_usage - (current.memory_usage - target["memory_usage"]) * improvement_factor,
-                user_satisfaction=current.user_satisfaction + (target["user_satisfaction"] - current.user_satisfaction) * improvement_factor,
-                automation_level=current.automation_level + (target["automation_level"] - current.automation_level) * improvement_factor
-            )
-        
-        else:
+        if optimization_type not in OPTIMIZATION_EFFECTS:
             # 默认返回当前指标
             return current
+        
+        values = apply_optimization_effect(
+            self.metrics_to_array(current), self.target_array(), optimization_type, np.array([intensity])
+        )[0]
+        return SimulationMetrics(timestamp=datetime.now(),
+                                 **{name: float(value) for name, value in zip(METRIC_FIELDS, values)})
+    
+    @staticmethod
+    def metrics_to_array(metrics: SimulationMetrics) -> np.ndarray:
+        """把指标按METRIC_FIELDS的顺序转为数组"""
+        return np.array([getattr(metrics, name) for name in METRIC_FIELDS], dtype=np.float64)
+    
+    def target_array(self) -> np.ndarray:
+        """目标指标数组"""
+        target = self.config["target_metrics"]
+        return np.array([target[name] for name in METRIC_FIELDS], dtype=np.float64)
     
     def add_noise_to_metrics(self, metrics: SimulationMetrics, noise_level: float = 0.05) -> SimulationMetrics:
         """为指标添加噪声，模拟真实环境的波动"""
@@ -305,18 +438,12 @@ class SimulationEnvironment:
         )
     
     def save_metrics(self, metrics: SimulationMetrics, scenario_id: str = None):
-        """保存指标到数据库"""
+        """保存指标到数据库，由写入器后台批量提交"""
+        if self.metrics_sink is None:
+            logger.error("保存指标失败: 数据库不可用")
+            return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO simulation_metrics (
-                    timestamp, scenario_id, test_coverage_rate, ai_model_accuracy,
-                    system_response_time, system_availability, error_rate, throughput,
-                    cpu_usage, memory_usage, user_satisfaction, automation_level
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.metrics_sink.write("simulation_metrics", (
                 metrics.timestamp.isoformat(),
                 scenario_id,
                 metrics.test_coverage_rate,
@@ -331,11 +458,24 @@ class SimulationEnvironment:
                 metrics.automation_level
             ))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"保存指标失败: {e}")
+    
+    def get_metrics_rollup(self, scenario_id: Optional[str] = None) -> List[Dict]:
+        """
+        从汇总表读取各场景指标的样本数和平均/最小/最大值
+        
+        Args:
+            scenario_id: 只统计指定场景，为None时统计全部
+            
+        Returns:
+            每个场景一行
+        """
+        if self.metrics_sink is None:
+            return []
+        self.metrics_sink.flush()
+        where = {"scenario_id": scenario_id} if scenario_id else None
+        return self.metrics_sink.rollup_summary("simulation_metrics", where)
 
 class TestScenarioManager:
     """测试场景管理器"""
@@ -478,6 +618,77 @@ class SimulationValidator:
         self.environment = environment
         self.scenario_manager = TestScenarioManager()
         self.validation_results = []
+        self.monte_carlo_results: List[MonteCarloResult] = []
+    
+    async def run_monte_carlo_validation(self, scenarios: Optional[List[TestScenario]] = None,
+                                         replicas: int = 1000, intensity: float = 0.8,
+                                         noise_level: float = 0.03, confidence: float = 0.95,
+                                         processes: Optional[int] = None,
+                                         seed: Optional[int] = None) -> List[MonteCarloResult]:
+        """
+        蒙特卡洛验证：每个场景一次性模拟replicas个带噪声的副本，给出成功率和指标的置信区间
+        
+        与run_scenario_validation不同，各场景都从当前指标出发、互不影响，
+        因此可以分发到进程池并发运行；不模拟渐进优化过程，也不等待。
+        
+        Args:
+            scenarios: 要验证的场景，默认全部场景
+            replicas: 每个场景的副本数
+            intensity: 优化强度，与run_scenario_validation的0.8一致
+            noise_level: 噪声幅度
+            confidence: 置信水平
+            processes: 进程数，默认取场景数和CPU数的较小值，为1时在当前进程内运行
+            seed: 随机种子，给定时结果可复现
+            
+        Returns:
+            每个场景一个MonteCarloResult
+        """
+        scenarios = scenarios if scenarios is not None else self.scenario_manager.get_all_scenarios()
+        if not scenarios:
+            return []
+        if replicas <= 0:
+            raise ValueError("replicas必须大于0")
+        
+        # 每个场景一个独立的随机流，进程数不同时结果不变
+        seeds = np.random.SeedSequence(seed).generate_state(len(scenarios))
+        metrics_before = self.environment.metrics_to_array(self.environment.current_metrics).tolist()
+        target = self.environment.target_array().tolist()
+        plans = [{
+            "scenario_id": scenario.scenario_id,
+            "scenario_type": scenario.scenario_type,
+            "success_criteria": dict(scenario.success_criteria),
+            "metrics_before": metrics_before,
+            "target": target,
+            "replicas": replicas,
+            "intensity": intensity,
+            "noise_level": noise_level,
+            "confidence": confidence,
+            "seed": int(scenario_seed)
+        } for scenario, scenario_seed in zip(scenarios, seeds)]
+        
+        processes = min(len(plans), processes or os.cpu_count() or 1)
+        logger.info(f"开始蒙特卡洛验证: {len(plans)}个场景, 每个{replicas}个副本, {processes}个进程")
+        if processes == 1:
+            raw_results = [_monte_carlo_worker(plan) for plan in plans]
+        else:
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                raw_results = await asyncio.gather(
+                    *[loop.run_in_executor(executor, _monte_carlo_worker, plan) for plan in plans])
+        
+        results = [MonteCarloResult(**raw) for raw in raw_results]
+        for result in results:
+            # 只保存各场景副本的均值，明细留在内存
+            mean_metrics = SimulationMetrics(
+                timestamp=datetime.now(),
+                **{name: stats["mean"] for name, stats in result.metrics.items()}
+            )
+            self.environment.save_metrics(mean_metrics, result.scenario_id + "_monte_carlo")
+            low, high = result.success_rate_ci
+            logger.info(f"蒙特卡洛验证完成: {result.scenario_id}, 成功率{result.success_rate:.1f}% "
+                        f"({confidence:.0%}置信区间 {low:.1f}%-{high:.1f}%)")
+        self.monte_carlo_results.extend(results)
+        return results
     
     async def run_scenario_validation(self, scenario: TestScenario) -> ValidationResult:
         """运行场景验证"""
@@ -680,16 +891,11 @@ class SimulationValidator:
     
     def _save_validation_result(self, result: ValidationResult):
         """保存验证结果"""
+        if self.environment.metrics_sink is None:
+            logger.error("保存验证结果失败: 数据库不可用")
+            return
         try:
-            conn = sqlite3.connect(self.environment.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO validation_results (
-                    scenario_id, start_time, end_time, success_status,
-                    improvement_data, issues_found, recommendations
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.environment.metrics_sink.write("validation_results", (
                 result.scenario_id,
                 result.start_time.isoformat(),
                 result.end_time.isoformat(),
@@ -699,9 +905,6 @@ class SimulationValidator:
                 json.dumps(result.recommendations)
             ))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"保存验证结果失败: {e}")
 
@@ -728,11 +931,30 @@ class SimulationReportGenerator:
             "success_rate_analysis": self._generate_success_rate_analysis(),
             "performance_trends": self._generate_performance_trends(),
             "risk_assessment": self._generate_risk_assessment(),
-            "next_steps": self._generate_next_steps()
+            "next_steps": self._generate_next_steps(),
+            "metrics_rollup": self.environment.get_metrics_rollup(),
+            "monte_carlo_analysis": self._generate_monte_carlo_analysis()
         }
         
         return report
     
+    def _generate_monte_carlo_analysis(self) -> List[Dict]:
+        """生成蒙特卡洛验证的成功率和关键指标置信区间"""
+        analysis = []
+        for result in self.validator.monte_carlo_results:
+            scenario = self.validator.scenario_manager.get_scenario(result.scenario_id)
+            criteria = scenario.success_criteria if scenario else {}
+            analysis.append({
+                "scenario_id": result.scenario_id,
+                "replicas": result.replicas,
+                "confidence": result.confidence,
+                "success_rate": result.success_rate,
+                "success_rate_ci": list(result.success_rate_ci),
+                "criteria_pass_rates": result.criteria_pass_rates,
+                "metrics": {name: result.metrics[name] for name in criteria if name in result.metrics}
+            })
+        return analysis
+    
     def _calculate_total_duration(self) -> str:
         """计算总验证时长"""
         if not self.validator.validation_results:
@@ -1044,6 +1266,14 @@ async def main():
         except Exception as e:
             print(f"❌ 验证失败: {scenario.scenario_name} - {e}")
     
+    # 蒙特卡洛验证，评估成功率的置信区间
+    print("\n🎲 运行蒙特卡洛验证...")
+    monte_carlo_results = await validator.run_monte_carlo_validation(replicas=2000)
+    for result in monte_carlo_results:
+        low, high = result.success_rate_ci
+        print(f"   {result.scenario_id}: 成功率 {result.success_rate:.1f}% "
+              f"(95%置信区间 {low:.1f}%-{high:.1f}%)")
+    
     # 生成综合报告
     print("\n📊 生成验证报告...")
     report_generator = SimulationReportGenerator(validator)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+浏览器池性能基准测试
+对比每个请求启动新Chromium与复用浏览器池，在本地静态HTTP服务器上抓取页面的耗时
+"""
+
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from playwright.async_api import async_playwright
+from backend.services.browser_pool import BrowserPool
+
+REQUESTS = 20
+CONCURRENCY = 4
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _chromium_available():
+    async def probe():
+        async with async_playwright() as p:
+            browser = await p.chromium.launch()
+            await browser.close()
+    try:
+        asyncio.run(probe())
+        return True
+    except Exception:
+        return False
+
+
+@unittest.skipUnless(_chromium_available(), "Chromium未安装，请先运行 playwright install chromium")
+class TestBrowserPoolBenchmark(unittest.TestCase):
+    """浏览器池基准测试"""
+
+    def setUp(self):
+        """启动本地静态HTTP服务器"""
+        self.site_dir = tempfile.mkdtemp(prefix="browser_pool_site_")
+        with open(os.path.join(self.site_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write("<html><body><h1>PowerAutomation</h1>" + "<p>item</p>" * 200 + "</body></html>")
+        handler = partial(_QuietHandler, directory=self.site_dir)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/index.html"
+
+    def tearDown(self):
+        """关闭服务器"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def _cold(self):
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def fetch():
+            async with semaphore:
+                async with async_playwright() as p:
+                    browser = await p.chromium.launch()
+                    page = await browser.new_page()
+                    await page.goto(self.url, wait_until="networkidle")
+                    await page.content()
+                    await browser.close()
+
+        await asyncio.gather(*[fetch() for _ in range(REQUESTS)])
+
+    async def _pooled(self):
+        pool = BrowserPool(size=2, max_concurrency=CONCURRENCY)
+        await pool.start()
+
+        async def fetch():
+            async with pool.page() as page:
+                await page.goto(self.url, wait_until="networkidle")
+                await page.content()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[fetch() for _ in range(REQUESTS)])
+        elapsed = time.perf_counter() - start
+        await pool.close()
+        return elapsed
+
+    def test_pool_vs_cold_start(self):
+        """测试浏览器池相对每请求启动浏览器的加速比"""
+        start = time.perf_counter()
+        asyncio.run(self._cold())
+        cold = time.perf_counter() - start
+        pooled = asyncio.run(self._pooled())
+
+        print(f"\n{REQUESTS} 个请求 (并发 {CONCURRENCY}): 每请求启动 {cold:.2f}s, 浏览器池 {pooled:.2f}s, "
+              f"加速 {cold / pooled:.1f}x")
+        self.assertLess(pooled, cold)
+
+
+if __name__ == '__main__':
+    unittest.main()
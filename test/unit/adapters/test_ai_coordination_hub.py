@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+AI协调中心阶段图单元测试
+"""
+
+import unittest
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.ai_coordination_hub import AICoordinationHub, AIModuleType, CollaborationStage
+
+
+class FakeIntentModule:
+    """模拟意图理解模块"""
+
+    def process(self, request):
+        return {"analysis": {"intent": "automation"}, "confidence": 0.9}
+
+
+class FakeThinkingModule:
+    """模拟序列思维模块，记录收到的意图分析"""
+
+    def __init__(self):
+        self.contexts = []
+
+    def think_sequentially(self, problem, context):
+        self.contexts.append(context)
+        return {"thinking_chain": ["分析", "分解"], "conclusions": ["结论"], "confidence_score": 0.8}
+
+
+class FakeWorkflowModule:
+    """模拟工作流引擎模块"""
+
+    def create_workflow(self, config):
+        return {"workflow_id": "wf_1", "steps": config["based_on_thinking"]}
+
+
+class TestAICoordinationHub(unittest.TestCase):
+    """AICoordinationHub测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.hub = AICoordinationHub(history_size=5)
+        self.thinking = FakeThinkingModule()
+        self.hub.register_module(AIModuleType.INTENT_UNDERSTANDING, FakeIntentModule())
+        self.hub.register_module(AIModuleType.SEQUENTIAL_THINKING, self.thinking)
+        self.hub.register_module(AIModuleType.WORKFLOW_ENGINE, FakeWorkflowModule())
+        self.hub.register_module(AIModuleType.CONTENT_OPTIMIZATION, object())
+        self.task = {"user_input": "设计CI/CD流程", "context": {"complexity": "high"}}
+
+    def test_latency_follows_critical_path(self):
+        """测试内容优化和自我优化提前启动，总耗时接近关键路径而不是各阶段之和"""
+        started = time.perf_counter()
+        result = asyncio.run(self.hub.orchestrate_collaboration(self.task))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result["status"], "success")
+        performance = result["performance"]
+        # 串行执行约0.75秒，关键路径为意图理解、序列思维、工作流设计共0.45秒
+        self.assertLess(elapsed, 0.65)
+        self.assertEqual(performance["critical_path"][:3], ["intent", "thinking", "workflow"])
+        self.assertGreater(performance["parallelism"], 1.3)
+        timings = performance["stage_timings"]
+        self.assertLess(timings["optimization"]["started"], timings["intent"]["finished"])
+        self.assertGreaterEqual(timings["workflow"]["started"], timings["thinking"]["finished"])
+        # 提前启动的阶段等待上游的时间不计入自身耗时和关键路径
+        self.assertGreater(timings["content"]["blocked"], 0.3)
+        self.assertLess(timings["content"]["duration"], 0.2)
+        self.assertLessEqual(performance["critical_path_time"], performance["total_time"] + 0.01)
+        self.assertLess(performance["parallelism"], 2.0)
+
+        self.assertEqual(self.thinking.contexts[0]["intent_analysis"]["confidence"], 0.9)
+        self.assertEqual(result["results"]["workflow"]["workflow"]["steps"], ["结论"])
+        scores = result["results"]["optimization"]["quality_analysis"]["individual_scores"]
+        self.assertEqual(scores, [0.9, 0.8, 0.88, 0.90])
+        self.assertIn("意图理解置信度: 0.90", result["summary"]["key_achievements"])
+
+    def test_stage_timeout(self):
+        """测试阶段超时后以timeout结果继续下游阶段"""
+        result = asyncio.run(self.hub.orchestrate_collaboration(self.task, stage_timeouts={"thinking": 0.05}))
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["results"]["thinking"]["status"], "timeout")
+        self.assertEqual(result["results"]["workflow"]["workflow"]["steps"], [])
+        self.assertEqual(self.hub.get_collaboration_summary()["stages"]["thinking"]["timeouts"], 1)
+
+    def test_stage_timeout_excludes_upstream_wait(self):
+        """测试阶段超时只计自身执行时间，等待上游结果的时间不计入"""
+        result = asyncio.run(self.hub.orchestrate_collaboration(self.task, stage_timeouts={"content": 0.3}))
+        self.assertEqual(result["status"], "success")
+        self.assertNotEqual(result["results"]["content"].get("status"), "timeout")
+        self.assertEqual(self.hub.get_collaboration_summary()["stages"]["content"]["timeouts"], 0)
+
+        result = asyncio.run(self.hub.orchestrate_collaboration(self.task, stage_timeouts={"content": 0.05}))
+        self.assertEqual(result["results"]["content"]["status"], "timeout")
+
+    def test_stage_graph_validation_and_failure(self):
+        """测试自定义阶段、依赖校验和阶段异常"""
+        async def failing(task, inputs):
+            await inputs.get("intent")
+            raise RuntimeError("模块异常")
+
+        self.hub.register_stage(CollaborationStage("audit", failing, ("intent",)))
+        result = asyncio.run(self.hub.orchestrate_collaboration(self.task))
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["error"], "模块异常")
+
+        self.hub.register_stage(CollaborationStage("audit", failing, ("missing",)))
+        self.assertEqual(asyncio.run(self.hub.orchestrate_collaboration(self.task))["status"], "error")
+        self.hub.register_stage(CollaborationStage("intent", failing, ("audit",)))
+        with self.assertRaises(ValueError):
+            self.hub._resolve_stage_order()
+
+    def test_bounded_history_summary(self):
+        """测试协作历史有上限，汇总统计可按条数和时间过滤"""
+        self.hub.stages["thinking"].timeout = 0.01
+
+        async def run_many():
+            return await asyncio.gather(*(self.hub.orchestrate_collaboration(self.task) for _ in range(8)))
+
+        asyncio.run(run_many())
+        self.assertEqual(len(self.hub.collaboration_history), 5)
+        self.assertEqual(self.hub.performance_metrics["total_collaborations"], 8)
+
+        summary = self.hub.get_collaboration_summary()
+        self.assertEqual((summary["collaborations"], summary["success_rate"]), (5, 1.0))
+        self.assertEqual(summary["stages"]["thinking"]["timeouts"], 5)
+        self.assertGreaterEqual(summary["p95_time"], summary["average_time"] * 0.9)
+        self.assertEqual(sum(summary["critical_paths"].values()), 5)
+        self.assertEqual(self.hub.get_collaboration_summary(last=2)["collaborations"], 2)
+        self.assertEqual(self.hub.get_collaboration_summary(since=time.time() + 60)["collaborations"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
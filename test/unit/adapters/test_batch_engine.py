@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+批量生成引擎单元测试
+"""
+
+import unittest
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.batch_engine import BatchGenerationEngine, TokenBucketRateLimiter, RetryableAPIError
+from mcptool.adapters.claude.claude_adapter import ClaudeAdapter
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class MockMessagesHandler(BaseHTTPRequestHandler):
+    """模拟/v1/messages接口：prompt含retry时先返回429，含flaky时先返回500，含bad时返回400"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = payload["messages"][-1]["content"].split("\n")[0]
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            attempt = server.attempts.get(prompt, 0) + 1
+            server.attempts[prompt] = attempt
+        time.sleep(0.05)
+        with server.lock:
+            server.active -= 1
+
+        headers = {}
+        if "bad" in prompt:
+            status, body = 400, {"error": {"message": "invalid request"}}
+        elif "retry" in prompt and attempt == 1:
+            status, body = 429, {"error": {"message": "rate limited"}}
+            headers["retry-after"] = "0"
+        elif "flaky" in prompt and attempt == 1:
+            status, body = 500, {"error": {"message": "overloaded"}}
+        else:
+            status = 200
+            body = {"content": [{"type": "text", "text": f"```python\nprint('{prompt}')\n```"}],
+                    "usage": {"input_tokens": 10, "output_tokens": 5}}
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """TokenBucketRateLimiter测试类"""
+
+    def test_requests_per_minute(self):
+        """测试每分钟请求数限制"""
+        fake = FakeTime()
+        limiter = TokenBucketRateLimiter(requests_per_minute=60, clock=fake.clock, sleep=fake.sleep)
+        for _ in range(60):
+            self.assertEqual(limiter.acquire(), 0.0)
+        self.assertAlmostEqual(limiter.acquire(), 1.0)
+
+    def test_tokens_per_minute_and_refund(self):
+        """测试每分钟token数限制和退还"""
+        fake = FakeTime()
+        limiter = TokenBucketRateLimiter(tokens_per_minute=600, clock=fake.clock, sleep=fake.sleep)
+        limiter.acquire(600)
+        self.assertAlmostEqual(limiter.acquire(300), 30.0)
+        limiter.refund(300)
+        self.assertEqual(limiter.acquire(300), 0.0)
+
+
+class TestBatchGenerationEngine(unittest.TestCase):
+    """BatchGenerationEngine测试类"""
+
+    def test_retries_and_order(self):
+        """测试可重试错误重试，不可重试错误单项失败，结果保持顺序"""
+        calls = {}
+
+        def worker(item):
+            calls[item] = calls.get(item, 0) + 1
+            if item == "transient" and calls[item] < 3:
+                raise RetryableAPIError("busy", 503)
+            if item == "fatal":
+                raise ValueError("broken")
+            return item.upper()
+
+        engine = BatchGenerationEngine(max_workers=4, max_retries=3, base_delay=0.001)
+        results = engine.run(["a", "transient", "fatal", "b"], worker)
+
+        self.assertEqual([r["result"] for r in results], ["A", "TRANSIENT", None, "B"])
+        self.assertEqual(results[1]["attempts"], 3)
+        self.assertEqual(results[2]["attempts"], 1)
+        self.assertIn("broken", results[2]["error"])
+
+    def test_retry_gives_up(self):
+        """测试超过最大重试次数后返回错误"""
+        def worker(item):
+            raise RetryableAPIError("still busy", 429, retry_after=0)
+
+        engine = BatchGenerationEngine(max_retries=2, base_delay=0.001)
+        result = engine.run(["x"], worker)[0]
+        self.assertFalse(result["success"])
+        self.assertEqual(result["attempts"], 3)
+
+
+class TestClaudeBatchGenerate(unittest.TestCase):
+    """ClaudeAdapter批量生成测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockMessagesHandler)
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """测试前置设置"""
+        self.server.active = 0
+        self.server.max_active = 0
+        self.server.attempts = {}
+        self.adapter = ClaudeAdapter(api_key="test-key",
+                                     base_url=f"http://127.0.0.1:{self.server.server_address[1]}")
+        self.adapter.batch_config.update(max_workers=8, requests_per_minute=6000, tokens_per_minute=10 ** 7)
+        self.adapter._create_batch_engine()
+        self.adapter.batch_engine.base_delay = 0.001
+
+    def tearDown(self):
+        """测试后清理"""
+        self.adapter.shutdown()
+
+    def test_concurrent_batch(self):
+        """测试批量生成并发执行、保持顺序并重试429/5xx"""
+        prompts = [f"task {i}" for i in range(24)] + ["retry task", "flaky task", "bad task"]
+
+        start = time.time()
+        results = self.adapter.batch_generate_detailed(prompts)
+        elapsed = time.time() - start
+
+        self.assertEqual([r["code"] for r in results[:24]], [f"print('task {i}')" for i in range(24)])
+        self.assertEqual((results[24]["success"], results[24]["attempts"]), (True, 2))
+        self.assertEqual((results[25]["success"], results[25]["attempts"]), (True, 2))
+        self.assertFalse(results[26]["success"])
+        self.assertIn("400", results[26]["error"])
+        self.assertGreater(self.server.max_active, 1)
+        self.assertLessEqual(self.server.max_active, 8)
+        # 27个请求串行至少需要1.35秒
+        self.assertLess(elapsed, 1.0)
+
+        codes = self.adapter.batch_generate(["task 0", "bad task"])
+        self.assertEqual(codes, ["print('task 0')", ""])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+流式代码生成单元测试
+"""
+
+import unittest
+import sys
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.code_stream import CodeFenceExtractor, extract_code_stream
+from mcptool.adapters.claude.claude_adapter import ClaudeAdapter
+
+STREAM_TEXT = "Here is the code:\n\n```python\ndef add(a, b):\n    return a + b\n```\n\nIt adds two numbers."
+
+
+class MockStreamHandler(BaseHTTPRequestHandler):
+    """模拟流式/v1/messages接口，按小块分批发送SSE事件"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_event(self, event):
+        self._write_chunk(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.payloads.append(payload)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        sent = 0
+        try:
+            self._send_event({"type": "message_start", "message": {"id": "msg_1"}})
+            for i in range(0, len(STREAM_TEXT), 6):
+                self._send_event({"type": "content_block_delta", "index": 0,
+                                  "delta": {"type": "text_delta", "text": STREAM_TEXT[i:i + 6]}})
+                sent += 1
+                time.sleep(server.delay)
+            self._send_event({"type": "message_stop"})
+            self._write_chunk(b"")
+            server.completed = True
+        except OSError:
+            pass
+        finally:
+            server.sent = sent
+
+
+class TestCodeFenceExtractor(unittest.TestCase):
+    """CodeFenceExtractor测试类"""
+
+    SAMPLES = [
+        STREAM_TEXT,
+        "```\nx = 1\n\n\ny = 2   \n```",
+        "```js\nconst s = `template ${x}`;\n```\n```python\nignored()\n```",
+        "  print('no fence')  \n",
+        "```python\nonly_fence()```",
+        "Let me explain the approach first. " * 8 + "\n\n```python\ndef late():\n    return 1\n```\nDone.",
+        "A long answer without any code block. " * 10,
+    ]
+
+    def _stream(self, text, rng):
+        chunks, i = [], 0
+        while i < len(text):
+            size = rng.randint(1, 7)
+            chunks.append(text[i:i + size])
+            i += size
+        return "".join(extract_code_stream(chunks))
+
+    def test_matches_batch_extraction(self):
+        """测试任意分块方式下流式结果与非流式提取一致"""
+        rng = random.Random(42)
+        adapter = ClaudeAdapter(api_key="test-key")
+        try:
+            for text in self.SAMPLES:
+                expected = adapter._extract_code_from_response(text)
+                for _ in range(50):
+                    self.assertEqual(self._stream(text, rng), expected, text)
+        finally:
+            adapter.shutdown()
+
+    def test_incremental_output(self):
+        """测试代码在代码块结束前逐步输出，结束后停止读取"""
+        extractor = CodeFenceExtractor()
+        self.assertEqual(extractor.feed("Intro\n```py"), "")
+        self.assertEqual(extractor.feed("thon\nline1\n"), "line1")
+        self.assertEqual(extractor.feed("line2\n``"), "\nline2")
+        self.assertEqual(extractor.feed("`\nmore prose"), "")
+        self.assertTrue(extractor.done)
+
+        consumed = []
+
+        def chunks():
+            for chunk in ["```\na\n```", "tail 1", "tail 2"]:
+                consumed.append(chunk)
+                yield chunk
+
+        self.assertEqual(list(extract_code_stream(chunks())), ["a"])
+        self.assertEqual(len(consumed), 1)
+
+        # 代码块前的长前言不会被当作代码输出
+        preamble = "Some explanation. " * 15
+        chunks = [preamble[i:i + 5] for i in range(0, len(preamble), 5)] + ["```py\nx = 1\n```", "tail"]
+        self.assertEqual(list(extract_code_stream(chunks)), ["x = 1"])
+
+        # 输出被截断、代码块没有闭合时只输出代码部分
+        self.assertEqual("".join(extract_code_stream(["Sure!\n```python\nx = ", "1\n"])), "x = 1")
+
+
+class TestClaudeCodeStream(unittest.TestCase):
+    """ClaudeAdapter流式生成测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockStreamHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """测试前置设置"""
+        self.server.payloads = []
+        self.server.delay = 0.02
+        self.server.sent = None
+        self.server.completed = False
+        self.adapter = ClaudeAdapter(api_key="test-key",
+                                     base_url=f"http://127.0.0.1:{self.server.server_address[1]}")
+
+    def tearDown(self):
+        """测试后清理"""
+        self.adapter.shutdown()
+
+    def _wait_for_handler(self):
+        deadline = time.time() + 2
+        while self.server.sent is None and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_stream_fragments(self):
+        """测试片段随事件到达输出，拼接结果与generate_code一致"""
+        start = time.time()
+        stream = self.adapter.generate_code_stream("add two numbers")
+        fragments, first_at = [], None
+        for fragment in stream:
+            if first_at is None:
+                first_at = time.time() - start
+            fragments.append(fragment)
+        total = time.time() - start
+
+        self.assertEqual("".join(fragments), "def add(a, b):\n    return a + b")
+        self.assertGreater(len(fragments), 1)
+        self.assertLess(first_at, total / 2)
+        self.assertTrue(self.server.payloads[0]["stream"])
+        # 代码块结束后关闭连接，不再等待后面的说明文字
+        self._wait_for_handler()
+        self.assertFalse(self.server.completed)
+
+    def test_cancellation(self):
+        """测试关闭生成器或设置取消标志后停止读取"""
+        self.server.delay = 0.05
+        stream = self.adapter.generate_code_stream("add two numbers")
+        next(stream)
+        stream.close()
+        self._wait_for_handler()
+        self.assertFalse(self.server.completed)
+
+        self.server.sent = None
+        cancel_event = threading.Event()
+        fragments = []
+        for fragment in self.adapter.generate_code_stream("add two numbers", cancel_event=cancel_event):
+            fragments.append(fragment)
+            cancel_event.set()
+        self.assertEqual(len(fragments), 1)
+        self._wait_for_handler()
+        self.assertFalse(self.server.completed)
+
+    def test_invalid_arguments(self):
+        """测试参数校验在调用时立即生效"""
+        with self.assertRaises(ValueError):
+            self.adapter.generate_code_stream("")
+        with self.assertRaises(ValueError):
+            self.adapter.generate_code_stream("x", mode="fast")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+列式指标环形缓冲区单元测试
+"""
+
+import unittest
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.metric_store import MetricRingBuffer, MultiResolutionMetricStore
+
+
+class TestMetricRingBuffer(unittest.TestCase):
+    """MetricRingBuffer测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.buffer = MetricRingBuffer(["cpu", "latency"], capacity=100)
+        self.start = 1.7e9
+        for i in range(250):
+            self.buffer.append(self.start + i * 0.5, (float(i), 2.0 * i + 1))
+
+    def test_wraparound_order(self):
+        """测试写满后覆盖最旧样本并按时间顺序读取"""
+        self.assertEqual(len(self.buffer), 100)
+        np.testing.assert_array_equal(self.buffer.column("cpu"), np.arange(150, 250))
+        np.testing.assert_array_equal(self.buffer.column("cpu", last=3), [247, 248, 249])
+        self.assertEqual(self.buffer.latest()["latency"], 499.0)
+        self.assertEqual(self.buffer.since(self.start + 240 * 0.5), 10)
+
+    def test_rolling_analytics(self):
+        """测试滚动均值、分位数和斜率与逐窗口计算一致"""
+        values = self.buffer.column("latency")
+        expected_mean = [values[i:i + 10].mean() for i in range(91)]
+        expected_p90 = [np.percentile(values[i:i + 10], 90) for i in range(91)]
+
+        np.testing.assert_allclose(self.buffer.rolling_mean("latency", 10), expected_mean)
+        np.testing.assert_allclose(self.buffer.rolling_percentile("latency", 10, 90), expected_p90)
+        # latency每0.5秒增加2，斜率为每秒4，大时间戳下也不损失精度
+        np.testing.assert_allclose(self.buffer.rolling_slope("latency", 10), 4.0)
+        self.assertAlmostEqual(self.buffer.slope("cpu"), 2.0)
+
+        summary = self.buffer.describe("cpu", last=10)
+        self.assertEqual((summary["count"], summary["min"], summary["max"]), (10, 240.0, 249.0))
+        self.assertAlmostEqual(summary["p50"], 244.5)
+        self.assertEqual(len(self.buffer.rolling_mean("cpu", 1000)), 0)
+
+
+class TestMultiResolutionMetricStore(unittest.TestCase):
+    """MultiResolutionMetricStore测试类"""
+
+    def test_downsampling(self):
+        """测试每层按时间桶求均值"""
+        store = MultiResolutionMetricStore(["value"], (("raw", 0, 50), ("1s", 1, 100), ("1m", 60, 10)))
+        # 150秒内每0.1秒一个样本，值等于时间
+        for i in range(1500):
+            store.append(6000.0 + i * 0.1, (i * 0.1,))
+
+        self.assertEqual(len(store.tier("raw")), 50)
+        seconds = store.snapshot("1s")
+        # 最后一个桶尚未结束，不写入
+        self.assertEqual(seconds["timestamp"].size, 100)
+        self.assertEqual(seconds["timestamp"][-1], 6148.0)
+        self.assertAlmostEqual(seconds["value"][-1], 148.45)
+        minutes = store.snapshot("1m")
+        np.testing.assert_array_equal(minutes["timestamp"], [6000.0, 6060.0])
+        np.testing.assert_allclose(minutes["value"], [29.95, 89.95])
+        self.assertEqual(store.snapshot("1s", since=6140.0)["timestamp"].size, 9)
+        with self.assertRaises(KeyError):
+            store.tier("1d")
+
+
+class TestOptimizerMetricStore(unittest.TestCase):
+    """AIPerformanceOptimizer使用列式存储的测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        from ai_performance_optimizer import AIPerformanceOptimizer, PerformanceMetric
+
+        self.optimizer = AIPerformanceOptimizer()
+        start = datetime(2026, 1, 1, 12, 0, 0)
+        for i in range(2000):
+            self.optimizer.record_metric(PerformanceMetric(
+                timestamp=start + timedelta(seconds=i * 0.25), cpu_usage=20.0 + i * 0.01,
+                memory_usage=50.0, disk_io={"read_bytes": i}, network_io={}, response_time=150.0,
+                throughput=20.0, error_rate=0.5
+            ))
+
+    def test_trends_and_report(self):
+        """测试趋势分析和报告使用向量化统计，历史有上限"""
+        self.assertEqual(len(self.optimizer.metrics_history), 1000)
+        trends = self.optimizer.analyze_performance_trends()
+        self.assertEqual(trends["data_points"], 100)
+        self.assertEqual(trends["memory_trend"]["trend"], "stable")
+        # cpu每0.25秒增加0.01
+        self.assertAlmostEqual(trends["cpu_trend"]["slope"], 0.04)
+
+        minute_trends = self.optimizer.analyze_performance_trends(resolution="1s", window=500)
+        self.assertEqual(minute_trends["data_points"], 499)
+
+        report = self.optimizer.generate_performance_report()
+        self.assertEqual(report["data_points"], 100)
+        self.assertAlmostEqual(report["performance_summary"]["response_time"]["average"], 150.0)
+        categories = [r["category"] for r in report["optimization_recommendations"]]
+        self.assertIn("响应时间优化", categories)
+
+    def test_non_blocking_collection(self):
+        """测试采集指标不再阻塞1秒"""
+        self.optimizer._measure_response_time = lambda: 10.0
+        started = time.perf_counter()
+        metric = self.optimizer._collect_performance_metrics()
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertGreaterEqual(metric.cpu_usage, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
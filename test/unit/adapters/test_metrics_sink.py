@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+验证指标写入器单元测试
+"""
+
+import unittest
+import sys
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.metrics_sink import MetricsSink, RollupSpec
+
+
+class TestMetricsSink(unittest.TestCase):
+    """MetricsSink测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.temp_dir.name) / "metrics.db")
+        self.sink = MetricsSink(self.db_path, batch_size=200, flush_interval=0.05)
+        self.sink.execute_script('''
+            CREATE TABLE api_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                validation_id TEXT, timestamp TEXT, api_endpoint TEXT,
+                response_time REAL, success_rate REAL
+            );
+            CREATE INDEX idx_api_metrics ON api_metrics (validation_id, timestamp, api_endpoint);
+        ''')
+        self.sink.register_table(
+            "api_metrics", ["validation_id", "timestamp", "api_endpoint", "response_time", "success_rate"],
+            RollupSpec(table="api_metrics_rollup", group_by=["validation_id", "api_endpoint"],
+                       value_columns=["response_time"], is_error=lambda row: row["success_rate"] == 0)
+        )
+
+    def tearDown(self):
+        """测试后清理"""
+        self.sink.close()
+        self.temp_dir.cleanup()
+
+    def test_batched_concurrent_writes(self):
+        """测试多线程写入按批提交，WAL模式开启"""
+        start = datetime(2026, 1, 1, 12, 0, 0)
+
+        def writer(worker):
+            self.sink.write_many("api_metrics", (
+                ("v1", (start + timedelta(seconds=i % 120)).isoformat(), f"ep{worker % 2}", float(i), 1.0)
+                for i in range(1000)
+            ))
+
+        threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.sink.flush()
+
+        self.assertEqual(self.sink.query("SELECT COUNT(*) AS n FROM api_metrics")[0]["n"], 4000)
+        self.assertEqual(self.sink.stats["rows_written"], 4000)
+        self.assertLessEqual(self.sink.stats["batches"], 4000 / 200 + 10)
+        self.assertGreaterEqual(self.sink.stats["batches"], 20)
+        self.assertEqual(self.sink.query("PRAGMA journal_mode")[0]["journal_mode"], "wal")
+
+        # 其他连接读取时不受写入影响
+        reader = sqlite3.connect(self.db_path)
+        plan = " ".join(str(row) for row in reader.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM api_metrics WHERE validation_id = 'v1' ORDER BY timestamp"))
+        reader.close()
+        self.assertIn("idx_api_metrics", plan)
+
+    def test_rollup(self):
+        """测试汇总表按分组和时间桶累加，跨批次合并"""
+        start = datetime(2026, 1, 1, 12, 0, 0)
+        self.sink.write_many("api_metrics", [
+            ("v1", start.isoformat(), "list", 100.0, 1.0),
+            ("v1", (start + timedelta(seconds=30)).isoformat(), "list", 300.0, 0.0),
+            ("v1", (start + timedelta(seconds=90)).isoformat(), "list", 50.0, 1.0),
+            ("v2", start.isoformat(), "create", 10.0, 1.0),
+        ])
+        self.sink.flush()
+        self.sink.write("api_metrics", ("v1", (start + timedelta(seconds=10)).isoformat(), "list", 500.0, 1.0))
+        self.sink.flush()
+
+        buckets = self.sink.query("SELECT * FROM api_metrics_rollup WHERE validation_id = 'v1' ORDER BY bucket_start")
+        self.assertEqual([row["request_count"] for row in buckets], [3, 1])
+        self.assertEqual((buckets[0]["response_time_min"], buckets[0]["response_time_max"]), (100.0, 500.0))
+
+        summary = self.sink.rollup_summary("api_metrics", {"validation_id": "v1"})
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0]["request_count"], 4)
+        self.assertEqual(summary[0]["error_count"], 1)
+        self.assertAlmostEqual(summary[0]["error_rate"], 25.0)
+        self.assertAlmostEqual(summary[0]["response_time_avg"], 237.5)
+        self.assertEqual(summary[0]["response_time_min"], 50.0)
+
+    def test_close_flushes(self):
+        """测试关闭时写入剩余数据"""
+        self.sink.write("api_metrics", ("v3", datetime.now().isoformat(), "x", 1.0, 1.0))
+        self.sink.close()
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM api_metrics").fetchone()[0], 1)
+        conn.close()
+        with self.assertRaises(RuntimeError):
+            self.sink.write("api_metrics", ("v3", datetime.now().isoformat(), "x", 1.0, 1.0))
+
+
+class TestValidatorStores(unittest.TestCase):
+    """验证系统使用共享写入器的测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """测试后清理"""
+        MetricsSink.close_all()
+        self.temp_dir.cleanup()
+
+    def test_rollout_manager(self):
+        """测试灰度发布指标写入明细表和汇总表"""
+        from real_api_validation_system import APIEndpointManager, GradualRolloutManager, RealAPIMetrics
+
+        manager = GradualRolloutManager(APIEndpointManager(str(self.root / "endpoints.json")),
+                                        db_path=str(self.root / "rollout.db"))
+        metrics = [RealAPIMetrics(
+            timestamp=datetime.now(), api_endpoint="ai_engine.intent_understanding",
+            response_time=100.0 + i, status_code=200 if i % 10 else 500, success_rate=1.0 if i % 10 else 0.0,
+            error_count=0 if i % 10 else 1, throughput=1.0, concurrent_users=1, cpu_usage=50.0,
+            memory_usage=50.0, network_latency=10.0, data_accuracy=0.95, user_satisfaction_score=9.0
+        ) for i in range(100)]
+        manager._save_api_metrics("stage-1", metrics)
+
+        rollup = manager.get_endpoint_rollup("stage-1")
+        self.assertEqual(rollup[0]["request_count"], 100)
+        self.assertAlmostEqual(rollup[0]["error_rate"], 10.0)
+        self.assertAlmostEqual(rollup[0]["response_time_avg"], 149.5)
+
+    def test_simulation_and_api_validator(self):
+        """测试模拟验证和API验证结果写入"""
+        from simulation_validation_system import SimulationEnvironment
+        from enhanced_api_validator import EnhancedAPIValidator, ValidationResult
+
+        environment = SimulationEnvironment(str(self.root / "simulation.json"),
+                                            db_path=str(self.root / "simulation.db"))
+        for _ in range(5):
+            environment.save_metrics(environment.current_metrics, "scenario_progress")
+        self.assertEqual(environment.get_metrics_rollup("scenario_progress")[0]["request_count"], 5)
+
+        validator = EnhancedAPIValidator(db_path=str(self.root / "enhanced.db"))
+        for success in (True, True, False):
+            validator.save_result(ValidationResult(endpoint_name="httpbin_get", success=success,
+                                                   response_time=0.2, status_code=200, timestamp=datetime.now()))
+        stats = validator.get_endpoint_rollup()
+        self.assertEqual((stats[0]["request_count"], stats[0]["error_count"]), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+本地静态代码分析单元测试
+"""
+
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.static_analysis import (
+    StaticCodeAnalyzer, InconclusiveAnalysisError, loop_bound, format_complexity
+)
+from mcptool.adapters.claude.claude_adapter import ClaudeAdapter
+
+SAMPLE_CODE = '''
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+
+def binary_search(xs, target):
+    lo, hi = 0, len(xs) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if xs[mid] == target:
+            return mid
+        elif xs[mid] < target:
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    return -1
+
+def zero_pairs(xs, found=[]):
+    for i in range(len(xs)):
+        for j in range(len(xs)):
+            if xs[i] + xs[j] == 0 and i != j:
+                found.append((i, j))
+    return found
+
+class Tree:
+    def depth(self, node):
+        if node is None:
+            return 0
+        return 1 + self.depth(node.left)
+'''
+
+DIVIDE_AND_CONQUER_CODE = '''
+def search(xs, lo, hi, target):
+    if lo > hi:
+        return -1
+    mid = (lo + hi) // 2
+    if xs[mid] == target:
+        return mid
+    elif xs[mid] < target:
+        return search(xs, mid + 1, hi, target)
+    else:
+        return search(xs, lo, mid - 1, target)
+
+def merge_sort(xs):
+    if len(xs) <= 1:
+        return xs
+    mid = len(xs) // 2
+    left = merge_sort(xs[:mid])
+    right = merge_sort(xs[mid:])
+    merged, i, j = [], 0, 0
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            merged.append(left[i])
+            i += 1
+        else:
+            merged.append(right[j])
+            j += 1
+    return merged + left[i:] + right[j:]
+
+def sort_halves(xs):
+    if len(xs) <= 1:
+        return xs
+    mid = len(xs) // 2
+    return merge(sort_halves(xs[:mid]), sort_halves(xs[mid:]))
+'''
+
+TREE_CODE = '''
+def count(node):
+    if node is None:
+        return 0
+    return 1 + count(node.left) + count(node.right)
+'''
+
+BUILTIN_CODE = '''
+def pairs(a):
+    return [x * y for x in a for y in a]
+
+def duplicates(a):
+    return [x for x in a if a.count(x) > 1]
+
+def ordered(a):
+    return sorted(a)
+
+def unseen(a, b):
+    seen = set(b)
+    return [x for x in a if x not in seen]
+
+def sort_each(groups):
+    for group in groups:
+        ordered(group)
+'''
+
+MUTUAL_RECURSION_CODE = '''
+def is_even(n):
+    return True if n == 0 else is_odd(n - 1)
+
+def is_odd(n):
+    return False if n == 0 else is_even(n - 1)
+'''
+
+
+class TestStaticCodeAnalyzer(unittest.TestCase):
+    """StaticCodeAnalyzer测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.analyzer = StaticCodeAnalyzer()
+
+    def test_function_metrics(self):
+        """测试圈复杂度、嵌套深度、递归和复杂度估计"""
+        analysis = self.analyzer.analyze(SAMPLE_CODE)
+        functions = {f["name"]: f for f in analysis["functions"]}
+
+        self.assertEqual(functions["fib"]["time_complexity"], "O(2^n)")
+        self.assertTrue(functions["fib"]["recursive"])
+        self.assertEqual(functions["binary_search"]["time_complexity"], "O(log n)")
+        self.assertEqual(functions["binary_search"]["cyclomatic_complexity"], 4)
+        self.assertEqual(functions["binary_search"]["nesting_depth"], 2)
+        self.assertEqual(functions["zero_pairs"]["time_complexity"], "O(n^2)")
+        self.assertEqual(functions["zero_pairs"]["loop_depth"], 2)
+        self.assertEqual(functions["zero_pairs"]["cyclomatic_complexity"], 5)
+        self.assertEqual(functions["depth"]["time_complexity"], "O(n)")
+        self.assertTrue(functions["depth"]["recursive"])
+
+        self.assertEqual(analysis["time_complexity"], "O(2^n)")
+        self.assertEqual(analysis["details"]["loops"], 3)
+        self.assertEqual(analysis["source"], "static")
+
+    def test_loop_bounds(self):
+        """测试循环边界启发式"""
+        import ast
+
+        def bound(source):
+            return loop_bound(ast.parse(source).body[0])
+
+        self.assertEqual(bound("for i in range(10):\n    pass"), "constant")
+        self.assertEqual(bound("for x in items:\n    pass"), "linear")
+        self.assertEqual(bound("while n > 0:\n    n //= 2"), "logarithmic")
+        self.assertEqual(bound("while i < n:\n    i += 1"), "linear")
+        self.assertEqual(bound("while True:\n    poll()"), "unbounded")
+        self.assertEqual(format_complexity((0, 1, 1)), "O(n log n)")
+
+    def test_suggestions_and_cache(self):
+        """测试改进建议和按代码哈希缓存"""
+        suggestions = self.analyzer.suggest(SAMPLE_CODE)
+        descriptions = " ".join(s["description"] for s in suggestions)
+        self.assertIn("`fib`", descriptions)
+        self.assertIn("nested loops", descriptions)
+        self.assertIn("mutable default", descriptions)
+
+        self.analyzer.analyze(SAMPLE_CODE)["functions"].clear()
+        self.assertEqual(len(self.analyzer.analyze(SAMPLE_CODE)["functions"]), 4)
+        self.assertEqual(self.analyzer.stats, {"hits": 2, "misses": 1})
+
+        with self.assertRaises(SyntaxError):
+            self.analyzer.analyze("function add(a, b) { return a + b; }")
+
+    def test_divide_and_conquer(self):
+        """测试互斥分支中的递归不叠加，切片和mid±1参数按分治估计"""
+        analysis = self.analyzer.analyze(DIVIDE_AND_CONQUER_CODE)
+        functions = {f["name"]: f for f in analysis["functions"]}
+
+        self.assertEqual(functions["search"]["recursive_branching"], 1)
+        self.assertEqual(functions["search"]["time_complexity"], "O(log n)")
+        self.assertEqual(functions["merge_sort"]["recursive_branching"], 2)
+        self.assertEqual(functions["merge_sort"]["time_complexity"], "O(n log n)")
+        self.assertEqual(functions["sort_halves"]["time_complexity"], "O(n log n)")
+        self.assertEqual(analysis["time_complexity"], "O(n log n)")
+        self.assertEqual(analysis["bottlenecks"], [])
+        self.assertNotIn("memoize", " ".join(s["description"] for s in self.analyzer.suggest(DIVIDE_AND_CONQUER_CODE)))
+
+    def test_unknown_recursion(self):
+        """测试无法判断规模变化的多路递归不给出指数级结论"""
+        with self.assertRaises(InconclusiveAnalysisError):
+            self.analyzer.analyze(TREE_CODE)
+        analysis = self.analyzer.analyze(TREE_CODE, allow_unknown=True)
+        self.assertEqual(analysis["time_complexity"], "unknown")
+        self.assertEqual(analysis["bottlenecks"], [])
+        self.assertEqual(self.analyzer.suggest(TREE_CODE), [])
+
+    def test_comprehensions_and_builtins(self):
+        """测试推导式按循环计，线性内置操作和本地函数调用计入复杂度"""
+        analysis = self.analyzer.analyze(BUILTIN_CODE)
+        functions = {f["name"]: f for f in analysis["functions"]}
+
+        self.assertEqual(functions["pairs"]["time_complexity"], "O(n^2)")
+        self.assertEqual(functions["pairs"]["loop_depth"], 2)
+        self.assertEqual(functions["duplicates"]["time_complexity"], "O(n^2)")
+        self.assertEqual(functions["ordered"]["time_complexity"], "O(n log n)")
+        self.assertEqual(functions["unseen"]["time_complexity"], "O(n)")
+        self.assertEqual(functions["sort_each"]["time_complexity"], "O(n^2 log n)")
+        self.assertEqual(analysis["space_complexity"], "O(n)")
+        self.assertIn("pairs: 2 nested loops (O(n^2))", analysis["bottlenecks"])
+        self.assertIn("duplicates: linear-time operation inside a loop (O(n^2))", analysis["bottlenecks"])
+
+        suggestions = {s["line"]: s["description"] for s in self.analyzer.suggest(BUILTIN_CODE)}
+        self.assertIn("nested loops", suggestions[functions["pairs"]["lineno"]])
+        self.assertIn("Counter", suggestions[functions["duplicates"]["lineno"]])
+
+    def test_mutual_recursion_inconclusive(self):
+        """测试相互递归的函数无法确定复杂度"""
+        with self.assertRaises(InconclusiveAnalysisError):
+            self.analyzer.analyze(MUTUAL_RECURSION_CODE)
+        analysis = self.analyzer.analyze(MUTUAL_RECURSION_CODE, allow_unknown=True)
+        self.assertEqual({f["time_complexity"] for f in analysis["functions"]}, {"unknown"})
+
+
+class TestAdapterStaticAnalysis(unittest.TestCase):
+    """ClaudeAdapter本地分析测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.adapter = ClaudeAdapter(api_key="test-key")
+        self.adapter.session = MagicMock()
+        response = self.adapter.session.post.return_value
+        response.status_code = 200
+        response.json.return_value = {"content": [{"type": "text", "text": '{"time_complexity": "O(n)"}'}]}
+
+    def test_static_by_default(self):
+        """测试默认不调用模型，deep或非Python代码时调用模型"""
+        self.assertEqual(self.adapter.analyze_complexity(SAMPLE_CODE)["source"], "static")
+        self.assertTrue(self.adapter.suggest_improvements(SAMPLE_CODE))
+        self.adapter.session.post.assert_not_called()
+
+        self.assertEqual(self.adapter.analyze_complexity(SAMPLE_CODE, deep=True), {"time_complexity": "O(n)"})
+        self.assertEqual(self.adapter.analyze_complexity("int main() { return 0; }"), {"time_complexity": "O(n)"})
+        self.assertEqual(self.adapter.session.post.call_count, 2)
+
+        # 静态分析无法确定复杂度时交给模型
+        self.assertEqual(self.adapter.analyze_complexity(TREE_CODE), {"time_complexity": "O(n)"})
+        self.assertEqual(self.adapter.analyze_complexity(MUTUAL_RECURSION_CODE), {"time_complexity": "O(n)"})
+        self.assertEqual(self.adapter.session.post.call_count, 4)
+        self.assertEqual(self.adapter.analyze_complexity(BUILTIN_CODE)["time_complexity"], "O(n^2 log n)")
+        self.assertEqual(self.adapter.session.post.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+自动化测试框架并行执行单元测试
+"""
+
+import unittest
+import sys
+import json
+import time
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.general_agent import automated_testing
+from agents.general_agent.automated_testing import AutomatedTestingFramework
+
+Status = automated_testing.TestStatus
+
+DURATIONS = {"slow": 0.3, "medium": 0.2, "fast": 0.1}
+
+
+class SleepingFramework(AutomatedTestingFramework):
+    """按用例名称休眠的测试框架，失败用例名称包含fail"""
+
+    active = 0
+    max_active_by_type = {}
+    order = []
+    lock = threading.Lock()
+
+    def _run_test_case(self, test_case, runner):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.order.append(test_case["name"])
+            cls.max_active_by_type[test_case["type"]] = max(
+                cls.max_active_by_type.get(test_case["type"], 0), cls.active)
+        time.sleep(DURATIONS.get(test_case["name"].split("_")[0], 0.05))
+        with cls.lock:
+            cls.active -= 1
+        status = Status.FAILED if "fail" in test_case["name"] else Status.PASSED
+        return {"execution_time": DURATIONS.get(test_case["name"].split("_")[0], 0.05), "status": status.value}
+
+
+class TestParallelExecution(unittest.TestCase):
+    """AutomatedTestingFramework并行执行测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.mkdtemp(prefix="automated_testing_")
+        config_path = Path(self.temp_dir) / "config.json"
+        config_path.write_text(json.dumps({"savepoint": {"create_on_success": False}}))
+        self.framework = SleepingFramework(self.temp_dir, str(config_path))
+        SleepingFramework.active = 0
+        SleepingFramework.max_active_by_type = {}
+        SleepingFramework.order = []
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _plan(self, names, test_type="unit"):
+        return {
+            "id": "test_run_parallel",
+            "created_at": "2025-06-01T00:00:00",
+            "test_cases": [
+                {"id": f"{test_type}_{name}", "name": name, "file": "test_x.py", "type": test_type,
+                 "priority": "medium", "status": Status.PENDING.value}
+                for name in names
+            ],
+            "status": Status.PENDING.value
+        }
+
+    def test_process_pool_runs_in_parallel(self):
+        """测试进程池并行执行，总耗时接近单个用例耗时"""
+        streamed = []
+        start = time.perf_counter()
+        result = self.framework.execute_tests_parallel(
+            self._plan([f"medium_{i}" for i in range(4)]), max_workers=4, on_result=streamed.append)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result["status"], Status.PASSED.value)
+        self.assertEqual(len(streamed), 4)
+        self.assertEqual(result["progress"], {"completed": 4, "total": 4})
+        self.assertLess(elapsed, 0.7)
+        self.assertIn("unit_medium_0", self.framework.test_history[-1]["execution_times"])
+
+    def test_lpt_order_from_history(self):
+        """测试按历史执行时间从长到短派发"""
+        self.framework.config["parallel"]["executor"] = "thread"
+        self.framework.test_history.append({
+            "id": "previous", "execution_times": {"unit_fast_a": 0.1, "unit_slow_b": 3.0, "unit_medium_c": 1.0}
+        })
+        self.framework.execute_tests_parallel(self._plan(["fast_a", "medium_c", "slow_b"]), max_workers=1)
+        self.assertEqual(SleepingFramework.order, ["slow_b", "medium_c", "fast_a"])
+
+    def test_type_concurrency_limit(self):
+        """测试每种类型的并发数限制"""
+        self.framework.config["parallel"]["executor"] = "thread"
+        self.framework.execute_tests_parallel(
+            self._plan(["fast_1", "fast_2", "fast_3"], test_type="ui"),
+            max_workers=3, type_concurrency={"ui": 1})
+        self.assertEqual(SleepingFramework.max_active_by_type["ui"], 1)
+
+    def test_invalid_type_concurrency(self):
+        """测试并发数小于1时报错，而不是遗漏该类型的用例"""
+        with self.assertRaises(ValueError):
+            self.framework.execute_tests_parallel(
+                self._plan(["fast_1"], test_type="ui"), max_workers=2, type_concurrency={"ui": 0})
+        with self.assertRaises(ValueError):
+            self.framework.execute_tests_parallel(self._plan(["fast_1"]), max_workers=0)
+
+    def test_worker_framework_initialised(self):
+        """测试工作框架通过构造函数创建，并使用主进程的配置"""
+        automated_testing._init_test_worker(SleepingFramework, self.temp_dir, self.framework.config)
+        worker = automated_testing._worker_framework
+        self.assertIsInstance(worker, SleepingFramework)
+        self.assertIsNone(worker._impact_analyzer)
+        self.assertIs(worker.config, self.framework.config)
+        self.assertEqual(worker.project_root, self.framework.project_root)
+
+    def test_fail_fast_skips_pending(self):
+        """测试快速失败跳过尚未开始的用例"""
+        self.framework.config["parallel"]["executor"] = "thread"
+        result = self.framework.execute_tests_parallel(
+            self._plan(["slow_fail", "fast_1", "fast_2"]), max_workers=1, fail_fast=True)
+
+        self.assertEqual(result["status"], Status.FAILED.value)
+        self.assertEqual(result["statistics"]["skipped"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+测试影响分析单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import time
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.general_agent import automated_testing
+from agents.general_agent.impact_analysis import TestImpactAnalyzer, parse_imports
+
+
+class TestImpactAnalysis(unittest.TestCase):
+    """TestImpactAnalyzer测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.project_dir = tempfile.mkdtemp(prefix="impact_project_")
+        old = time.time() - 60
+        self._write("pkg/__init__.py", "", old)
+        self._write("pkg/a.py", "A = 1\n", old)
+        self._write("pkg/b.py", "from .a import A\nB = A + 1\n", old)
+        self._write("pkg/c.py", "C = 3\n", old)
+        self._write("test/unit/test_b.py", "from pkg.b import B\n\ndef test_b():\n    assert B == 2\n", old)
+        self._write("test/unit/test_c.py", "import pkg.c\n\ndef test_c():\n    assert pkg.c.C == 3\n", old)
+        self._write("README.md", "readme\n", old)
+
+        self.framework = automated_testing.AutomatedTestingFramework(self.project_dir)
+        self.framework.config["impact_analysis"]["enabled"] = True
+        self.analyzer = self.framework.get_impact_analyzer()
+        self.analyzer.store.create_snapshot("sp_green")
+        self.analyzer.update_coverage([], "sp_green")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.project_dir, ignore_errors=True)
+
+    def _write(self, rel_path, content, mtime=None):
+        path = os.path.join(self.project_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def _plan(self):
+        return self.framework.generate_test_plan([automated_testing.TestType.UNIT])
+
+    def test_parse_relative_imports(self):
+        """测试相对导入解析为绝对模块名"""
+        self.assertEqual(parse_imports("from .a import A\nimport os", "pkg.b", False), ["os", "pkg.a", "pkg.a.A"])
+        self.assertEqual(parse_imports("from . import a", "pkg", True), ["pkg", "pkg.a"])
+
+    def test_selects_tests_reachable_from_change(self):
+        """测试只选择导入链可达变更文件的测试"""
+        self._write("pkg/a.py", "A = 5\n")
+        plan = self._plan()
+
+        self.assertEqual([tc["name"] for tc in plan["test_cases"]], ["test_b"])
+        self.assertEqual(plan["impact_analysis"]["mode"], "impact")
+        self.assertEqual(plan["impact_analysis"]["changed_files"], ["pkg/a.py"])
+
+    def test_ignored_changes_select_nothing(self):
+        """测试只修改文档时不选择任何测试"""
+        self._write("README.md", "changed\n")
+        plan = self._plan()
+        self.assertEqual(plan["test_cases"], [])
+
+    def test_coverage_map_selects_tests(self):
+        """测试覆盖映射中的文件变更会选中对应测试"""
+        self.analyzer.update_coverage([{"id": "unit_test_c", "covered_files": ["pkg/a.py"]}])
+        self._write("pkg/a.py", "A = 5\n")
+        plan = self._plan()
+        self.assertEqual(sorted(tc["name"] for tc in plan["test_cases"]), ["test_b", "test_c"])
+
+    def test_fallback_to_full_suite(self):
+        """测试映射过期或非Python文件变更时执行全量测试"""
+        self._write("settings.json", json.dumps({"x": 1}))
+        plan = self._plan()
+        self.assertEqual(len(plan["test_cases"]), 2)
+        self.assertEqual(plan["impact_analysis"]["reason"], "non_python_change")
+
+        self.analyzer.coverage_map["updated_at"] = 0
+        plan = self._plan()
+        self.assertEqual(plan["impact_analysis"]["reason"], "coverage_map_stale")
+
+    def test_import_graph_is_cached(self):
+        """测试导入图只重新解析变化的文件"""
+        self.analyzer.build_import_graph()
+        self._write("pkg/c.py", "from pkg.a import A\n")
+        graph = self.analyzer.build_import_graph()
+
+        with open(self.analyzer.import_graph_path) as f:
+            cached = json.load(f)["files"]
+        self.assertIn("pkg.a", graph["pkg/c.py"])
+        self.assertEqual(cached["pkg/c.py"][2], graph["pkg/c.py"])
+
+
+if __name__ == '__main__':
+    unittest.main()
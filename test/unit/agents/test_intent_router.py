@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+意图路由器单元测试
+"""
+
+import unittest
+import sys
+import os
+import re
+import json
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.general_agent.intent_router import IntentRouter, CompiledIntentMatcher
+
+
+class TestIntentRouter(unittest.TestCase):
+    """IntentRouter测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.mkdtemp(prefix="intent_router_")
+        self.router = IntentRouter()
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _regex_scores(self, user_input):
+        scores = {agent_type: 0.0 for agent_type in self.router.intent_patterns}
+        for agent_type, patterns in self.router.intent_patterns.items():
+            for pattern in patterns:
+                if re.search(pattern, user_input, re.IGNORECASE):
+                    scores[agent_type] += 1.0
+        return scores
+
+    def test_matcher_agrees_with_regex_search(self):
+        """测试编译匹配器与逐个re.search的打分一致"""
+        inputs = [
+            "帮我写一个Python函数计算斐波那契数列",
+            "请帮我制作一个公司介绍的PPT",
+            "把PPT转成图片",
+            "图片转ppt",
+            "JavaScript和CSS做的网页",
+            "设计一个演示网页",
+            "",
+        ]
+        for user_input in inputs:
+            self.assertEqual(self.router._matcher.score(user_input), self._regex_scores(user_input), user_input)
+
+    def test_multiline_agrees_with_regex_search(self):
+        """测试多行输入中关键词序列不跨行匹配，与没有DOTALL的re.search一致"""
+        inputs = [
+            "制作\nppt",
+            "设计\n网页",
+            "请制作\n一个ppt\n制作ppt",
+            "模板\n\ntemplate 模板 template",
+            "创建\n幻灯片\n创建一个幻灯片",
+            "ppt\n制作",
+            "\n\n",
+        ]
+        for user_input in inputs:
+            self.assertEqual(self.router._matcher.score(user_input), self._regex_scores(user_input), user_input)
+
+        matcher = CompiledIntentMatcher({"x": [r".*a.*b.*c.*"]})
+        self.assertEqual(matcher.score("a b\nc a\nb c a b c")["x"], 1.0)
+        self.assertEqual(matcher.score("a b\nc a\nb c")["x"], 0.0)
+
+    def test_overlapping_keywords(self):
+        """测试同一位置开始的关键词(java/javascript)都被计入"""
+        matcher = CompiledIntentMatcher({"code": [r".*java.*", r".*javascript.*", r".*script.*"]})
+        self.assertEqual(matcher.score("JavaScript")["code"], 3.0)
+
+    def test_route_many(self):
+        """测试批量路由保持输入顺序"""
+        results = self.router.route_many(["请帮我制作一个公司介绍的PPT", "如何提高工作效率？"])
+        self.assertEqual([r["agent_type"] for r in results], ["ppt", "general"])
+        self.assertEqual(results[1]["user_input"], "如何提高工作效率？")
+
+    def test_hot_reload_patterns(self):
+        """测试配置文件修改后热加载意图模式"""
+        path = os.path.join(self.temp_dir, "intent_patterns.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"intent_patterns": {"general": [r".*帮我.*"], "ppt": [r".*ppt.*"]}}, f)
+        router = IntentRouter(patterns_path=path, reload_interval=0)
+        self.assertEqual(router.analyze_intent("报表")[0], "general")
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"intent_patterns": {"general": [r".*帮我.*"], "data": [r".*报表.*"]}}, f)
+        os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1_000_000))
+
+        self.assertEqual(router.analyze_intent("报表")[0], "data")
+        self.assertIn("data", router.agent_types)
+        self.assertFalse(router.reload_patterns())
+
+    def test_malformed_reload_keeps_patterns(self):
+        """测试热加载的配置文件格式错误时保留当前模式，修复后重新加载"""
+        path = os.path.join(self.temp_dir, "intent_patterns.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"intent_patterns": {"general": [r".*帮我.*"], "data": [r".*报表.*"]}}, f)
+        router = IntentRouter(patterns_path=path, reload_interval=0)
+
+        def touch():
+            os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1_000_000))
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"intent_patterns": {"data": [')
+        touch()
+        self.assertFalse(router.reload_patterns())
+        self.assertEqual(router.analyze_intent("报表")[0], "data")
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"intent_patterns": {"data": ["[unclosed"]}}, f)
+        touch()
+        self.assertFalse(router.reload_patterns())
+        self.assertEqual(router.analyze_intent("报表")[0], "data")
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"intent_patterns": {"general": [r".*帮我.*"], "sales": [r".*报表.*"]}}, f)
+        touch()
+        self.assertTrue(router.reload_patterns())
+        self.assertEqual(router.analyze_intent("报表")[0], "sales")
+
+
+if __name__ == '__main__':
+    unittest.main()
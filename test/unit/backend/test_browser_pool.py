@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+浏览器池单元测试
+"""
+
+import unittest
+import sys
+import time
+import types
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from backend.services import browser_pool
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        return {"context": self}
+
+    async def close(self):
+        self.closed = True
+        self.browser.open_contexts -= 1
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = False
+        self.open_contexts = 0
+
+    async def new_context(self, **options):
+        self.open_contexts += 1
+        return FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+        self.starts = 0
+        self.gate = None
+
+    async def launch(self, **options):
+        await asyncio.sleep(0)
+        if self.gate is not None:
+            await self.gate.wait()
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def start(self):
+        self.starts += 1
+        await asyncio.sleep(0)
+        return self
+
+    async def stop(self):
+        pass
+
+
+@unittest.skipUnless(PLAYWRIGHT_AVAILABLE, "playwright未安装")
+class TestBrowserPool(unittest.TestCase):
+    """BrowserPool测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.playwright = FakePlaywright()
+        patcher = patch.object(browser_pool, "async_playwright", lambda: self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reuses_warm_browsers_with_isolated_contexts(self):
+        """测试请求复用浏览器进程，每个请求使用独立上下文"""
+        async def scenario():
+            pool = browser_pool.BrowserPool(size=2)
+            contexts = []
+            for _ in range(5):
+                async with pool.page() as page:
+                    contexts.append(page["context"])
+            await pool.close()
+            return pool, contexts
+
+        pool, contexts = asyncio.run(scenario())
+        self.assertEqual(pool.stats["launched"], 2)
+        self.assertEqual(len(set(map(id, contexts))), 5)
+        self.assertTrue(all(context.closed for context in contexts))
+
+    def test_recycles_after_max_pages(self):
+        """测试浏览器服务的页面数达到上限后被替换并关闭"""
+        async def scenario():
+            pool = browser_pool.BrowserPool(size=1, max_pages_per_browser=2)
+            for _ in range(5):
+                async with pool.page():
+                    pass
+            await pool.close()
+            return pool
+
+        pool = asyncio.run(scenario())
+        self.assertEqual(pool.stats["recycled"], 2)
+        self.assertEqual(len(self.playwright.browsers), 3)
+        self.assertTrue(all(browser.closed for browser in self.playwright.browsers))
+
+    def test_concurrency_cap(self):
+        """测试同时打开的页面数不超过上限"""
+        async def scenario():
+            pool = browser_pool.BrowserPool(size=2, max_concurrency=3)
+            active = 0
+            peak = 0
+
+            async def task():
+                nonlocal active, peak
+                async with pool.page():
+                    active += 1
+                    peak = max(peak, active)
+                    await asyncio.sleep(0.01)
+                    active -= 1
+
+            await asyncio.gather(*[task() for _ in range(10)])
+            await pool.close()
+            return peak
+
+        self.assertEqual(asyncio.run(scenario()), 3)
+
+    def test_concurrent_first_use_starts_once(self):
+        """测试并发的首次调用只启动一次Playwright和预热浏览器"""
+        async def scenario():
+            pool = browser_pool.BrowserPool(size=2, max_concurrency=2)
+            active = 0
+            peak = 0
+
+            async def task():
+                nonlocal active, peak
+                async with pool.page():
+                    active += 1
+                    peak = max(peak, active)
+                    await asyncio.sleep(0.01)
+                    active -= 1
+
+            await asyncio.gather(*[task() for _ in range(5)])
+            await pool.close()
+            return pool, peak
+
+        pool, peak = asyncio.run(scenario())
+        self.assertEqual(self.playwright.starts, 1)
+        self.assertEqual(pool.stats["launched"], 2)
+        self.assertEqual(len(self.playwright.browsers), 2)
+        self.assertTrue(all(browser.closed for browser in self.playwright.browsers))
+        self.assertEqual(peak, 2)
+
+    def test_checkin_not_blocked_by_relaunch(self):
+        """测试替换浏览器期间其他页面可以正常签入"""
+        async def scenario():
+            pool = browser_pool.BrowserPool(size=1, max_pages_per_browser=1)
+            await pool.start()
+            first = self.playwright.browsers[0]
+            self.playwright.gate = asyncio.Event()
+            holding = pool.page()
+            await holding.__aenter__()
+
+            async def second():
+                async with pool.page() as page:
+                    return page["context"].browser
+
+            waiting = asyncio.create_task(second())
+            await asyncio.sleep(0.01)
+            # 替换的浏览器仍在启动，旧浏览器的页面签入后立即关闭
+            await asyncio.wait_for(holding.__aexit__(None, None, None), 0.5)
+            closed_during_launch = first.closed
+            self.playwright.gate.set()
+            browser = await waiting
+            await pool.close()
+            return closed_during_launch, browser is not first, pool
+
+        closed_during_launch, replaced, pool = asyncio.run(scenario())
+        self.assertTrue(closed_during_launch)
+        self.assertTrue(replaced)
+        self.assertEqual(pool.stats["recycled"], 1)
+
+
+def _import_web_service():
+    """导入web_service模块，智能体包不可用时以占位模块代替"""
+    try:
+        from backend.services import web_service
+        return web_service
+    except ImportError:
+        pass
+    placeholder = types.ModuleType("web_agent")
+    placeholder.WebAgent = object
+    names = ["powerautomation_integration", "powerautomation_integration.agents",
+             "powerautomation_integration.agents.web", "powerautomation_integration.agents.web.web_agent"]
+    modules = {name: types.ModuleType(name) for name in names[:-1]}
+    modules[names[-1]] = placeholder
+    with patch.dict(sys.modules, modules):
+        sys.modules.pop("backend.services.web_service", None)
+        from backend.services import web_service
+    return web_service
+
+
+@unittest.skipUnless(PLAYWRIGHT_AVAILABLE, "playwright未安装")
+class TestWebServiceLoop(unittest.TestCase):
+    """WebService后台事件循环测试类"""
+
+    def test_concurrent_first_requests_share_loop(self):
+        """测试多个线程并发的首次请求只创建一个后台事件循环"""
+        web_service = _import_web_service()
+        created = []
+
+        class SlowLoop(browser_pool.BackgroundLoop):
+            def __init__(self):
+                created.append(self)
+                time.sleep(0.05)
+                super().__init__()
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch("os.getcwd", return_value=temp_dir), patch.object(web_service, "BackgroundLoop", SlowLoop):
+            service = web_service.WebService()
+            loops = []
+            threads = [threading.Thread(target=lambda: loops.append(service._run(current_loop())))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            service.close()
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(len(loops), 8)
+        self.assertEqual(len(set(map(id, loops))), 1)
+        self.assertFalse(created[0]._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+后台任务队列单元测试
+"""
+
+import unittest
+import sys
+import time
+import threading
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.services.job_queue import JobQueue, JobQueueFullError, JOB_SUCCEEDED, JOB_FAILED, JOB_RUNNING
+
+
+class TestJobQueue(unittest.TestCase):
+    """JobQueue测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.queue = JobQueue(max_workers=1, max_pending=2, max_finished=2)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.queue.shutdown()
+
+    def _wait(self, job_id, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.queue.get_job(job_id)
+            if job["status"] in (JOB_SUCCEEDED, JOB_FAILED):
+                return job
+            time.sleep(0.01)
+        self.fail(f"job {job_id} did not finish")
+
+    def test_submit_returns_immediately_and_reports_progress(self):
+        """测试提交后立即返回，任务进度可查询"""
+        release = threading.Event()
+
+        def work(value, progress):
+            progress(50, "half way")
+            release.wait(5)
+            return {"value": value}
+
+        job_id = self.queue.submit("demo", work, 42)
+        time.sleep(0.05)
+        job = self.queue.get_job(job_id)
+        self.assertEqual((job["status"], job["progress"], job["message"]), (JOB_RUNNING, 50, "half way"))
+
+        release.set()
+        job = self._wait(job_id)
+        self.assertEqual(job["status"], JOB_SUCCEEDED)
+        self.assertEqual(job["result"], {"value": 42})
+
+    def test_failed_job(self):
+        """测试任务异常记录为失败"""
+        def work(progress):
+            raise RuntimeError("boom")
+
+        job = self._wait(self.queue.submit("demo", work))
+        self.assertEqual(job["status"], JOB_FAILED)
+        self.assertEqual(job["error"], "boom")
+
+    def test_bounded_queue(self):
+        """测试排队任务达到上限时拒绝提交"""
+        release = threading.Event()
+        job_ids = [self.queue.submit("demo", lambda progress: release.wait(5)) for _ in range(2)]
+        with self.assertRaises(JobQueueFullError):
+            self.queue.submit("demo", lambda progress: None)
+        release.set()
+        for job_id in job_ids:
+            self._wait(job_id)
+
+    def test_finished_jobs_are_pruned(self):
+        """测试只保留最近结束的任务"""
+        job_ids = []
+        for _ in range(3):
+            job_ids.append(self.queue.submit("demo", lambda progress: None))
+            self._wait(job_ids[-1])
+        self.assertIsNone(self.queue.get_job(job_ids[0]))
+        self.assertEqual([job["id"] for job in self.queue.list_jobs()], job_ids[:0:-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PPT任务服务单元测试
+"""
+
+import unittest
+import sys
+import os
+import time
+import types
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.services.job_queue import JOB_SUCCEEDED, JOB_FAILED
+
+
+def _import_service():
+    """导入PPTTaskService，智能体包不可用时以占位模块代替(测试总是注入StubPPTAgent)"""
+    try:
+        from backend.services.ppt_service import PPTTaskService
+        return PPTTaskService
+    except ImportError:
+        pass
+    placeholder = types.ModuleType("ppt_agent")
+    placeholder.PPTAgent = object
+    names = ["powerautomation_integration", "powerautomation_integration.agents",
+             "powerautomation_integration.agents.ppt", "powerautomation_integration.agents.ppt.ppt_agent"]
+    modules = {name: types.ModuleType(name) for name in names[:-1]}
+    modules[names[-1]] = placeholder
+    with mock.patch.dict(sys.modules, modules):
+        sys.modules.pop("backend.services.ppt_service", None)
+        from backend.services.ppt_service import PPTTaskService
+    return PPTTaskService
+
+
+PPTTaskService = _import_service()
+
+
+class StubPPTAgent:
+    """模拟PPT智能体，在临时目录中生成文件"""
+
+    def __init__(self, work_dir):
+        self.work_dir = work_dir
+        self.calls = []
+
+    def execute(self, input_data):
+        self.calls.append(dict(input_data))
+        path = os.path.join(self.work_dir, f"{input_data['title']}.pptx")
+        with open(path, "wb") as f:
+            f.write(b"pptx")
+        return {"status": "success", "ppt_path": path}
+
+
+class TestPPTTaskService(unittest.TestCase):
+    """PPTTaskService端到端测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        (root / "work").mkdir()
+        (root / "templates").mkdir()
+        self.output_dir = str(root / "output")
+        self.agent = StubPPTAgent(str(root / "work"))
+        self.service = PPTTaskService(max_workers=1, ppt_agent=self.agent, output_dir=self.output_dir,
+                                      template_dir=str(root / "templates"))
+
+    def tearDown(self):
+        """测试后清理"""
+        self.service.jobs.shutdown()
+        self.temp_dir.cleanup()
+
+    def test_sync_generation(self):
+        """测试同步生成调用智能体并把结果移入输出目录"""
+        result = self.service.create_ppt_from_text("report", "内容", template_name="missing.pptx")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["ppt_path"], os.path.join(self.output_dir, "report.pptx"))
+        self.assertEqual(self.service.resolve_output_file("report.pptx"), result["ppt_path"])
+        self.assertEqual(self.agent.calls[0]["task_type"], "text_to_ppt")
+
+    def test_background_job(self):
+        """测试后台任务生成PPT并报告完成"""
+        job_id = self.service.submit_ppt_from_mindmap("mindmap", {"root": "主题"})
+        deadline = time.time() + 5
+        job = self.service.get_job(job_id)
+        while job["status"] not in (JOB_SUCCEEDED, JOB_FAILED) and time.time() < deadline:
+            time.sleep(0.01)
+            job = self.service.get_job(job_id)
+
+        self.assertEqual(job["status"], JOB_SUCCEEDED, job["error"])
+        self.assertEqual(job["result"]["file_name"], "mindmap.pptx")
+        self.assertTrue(os.path.isfile(os.path.join(self.output_dir, "mindmap.pptx")))
+        self.assertEqual(self.agent.calls[0]["mindmap_data"], {"root": "主题"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+会话存储引擎单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import multiprocessing
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.services.session_store import SessionStore
+
+
+def _append_from_process(sessions_dir, session_id, worker, count):
+    store = SessionStore(sessions_dir)
+    for i in range(count):
+        store.append_messages(session_id, [{"role": "user", "content": f"{worker}-{i}"}])
+    store.close()
+
+
+class TestSessionStore(unittest.TestCase):
+    """SessionStore测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.sessions_dir = tempfile.mkdtemp(prefix="session_store_")
+        self.store = SessionStore(self.sessions_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.store.close()
+        shutil.rmtree(self.sessions_dir, ignore_errors=True)
+
+    def test_append_and_paginate(self):
+        """测试追加消息和分页读取"""
+        session_id = self.store.create_session()["id"]
+        for i in range(10):
+            meta = self.store.append_messages(session_id, [{"role": "user", "content": f"消息{i}"}])
+        self.assertEqual(meta["message_count"], 10)
+
+        page = self.store.get_messages(session_id, offset=3, limit=2)
+        self.assertEqual([m["content"] for m in page], ["消息3", "消息4"])
+        self.assertEqual([m["content"] for m in self.store.get_messages(session_id, -2)], ["消息8", "消息9"])
+        self.assertEqual(len(self.store.get_messages(session_id)), 10)
+        self.assertEqual(self.store.get_messages(session_id, offset=20), [])
+
+    def test_list_sessions_uses_index(self):
+        """测试会话列表按更新时间排序并分页"""
+        first = self.store.create_session(created_at="2025-01-01T00:00:00")["id"]
+        second = self.store.create_session(created_at="2025-01-02T00:00:00")["id"]
+        self.store.append_messages(first, [{"role": "user", "content": "hi"}], updated_at="2025-01-03T00:00:00")
+
+        sessions = self.store.list_sessions()
+        self.assertEqual([s["id"] for s in sessions], [first, second])
+        self.assertEqual(sessions[0]["message_count"], 1)
+        self.assertEqual([s["id"] for s in self.store.list_sessions(offset=1, limit=1)], [second])
+
+    def test_missing_session(self):
+        """测试向不存在的会话追加消息"""
+        with self.assertRaises(FileNotFoundError):
+            self.store.append_messages("missing", [{"role": "user"}])
+
+    def test_migrate_legacy_sessions(self):
+        """测试导入旧格式整文件会话"""
+        legacy = {"id": "legacy", "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:01:00",
+                  "messages": [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]}
+        with open(os.path.join(self.sessions_dir, "legacy.json"), "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        self.assertEqual(self.store.migrate_legacy_sessions(), 1)
+        self.assertEqual(self.store.get_session_meta("legacy")["message_count"], 2)
+        self.assertEqual(self.store.get_messages("legacy"), legacy["messages"])
+        self.assertFalse(os.path.exists(os.path.join(self.sessions_dir, "legacy.json")))
+
+    def test_concurrent_writers(self):
+        """测试多个进程同时追加同一会话"""
+        session_id = self.store.create_session()["id"]
+        processes = [
+            multiprocessing.Process(target=_append_from_process, args=(self.sessions_dir, session_id, w, 50))
+            for w in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        messages = self.store.get_messages(session_id)
+        self.assertEqual(len(messages), 200)
+        self.assertEqual(len({m["content"] for m in messages}), 200)
+        self.assertEqual(self.store.get_session_meta(session_id)["message_count"], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+PPT模板缓存单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.services.template_cache import TemplateCache, PPTX_AVAILABLE
+
+
+@unittest.skipUnless(PPTX_AVAILABLE, "python-pptx未安装")
+class TestTemplateCache(unittest.TestCase):
+    """TemplateCache测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        from pptx import Presentation
+        self.template_dir = tempfile.mkdtemp(prefix="ppt_templates_")
+        self.template_path = os.path.join(self.template_dir, "demo.pptx")
+        presentation = Presentation()
+        presentation.slides.add_slide(presentation.slide_layouts[0])
+        presentation.save(self.template_path)
+        self.cache = TemplateCache(self.template_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.template_dir, ignore_errors=True)
+
+    def test_repeat_lookups_hit_cache(self):
+        """测试重复使用同一模板时不重新解析"""
+        first = self.cache.get("demo.pptx")
+        first.slides.add_slide(first.slide_layouts[1])
+        second = self.cache.get("demo.pptx")
+
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+        self.assertEqual(len(second.slides), 1)
+
+    def test_modified_template_is_reparsed(self):
+        """测试模板文件更新后重新解析"""
+        self.cache.get("demo.pptx")
+        stat = os.stat(self.template_path)
+        os.utime(self.template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.cache.get("demo.pptx")
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_missing_template(self):
+        """测试模板不存在时返回None"""
+        self.assertIsNone(self.cache.get("missing.pptx"))
+        self.assertIsNone(self.cache.get("../demo.pptx/../../etc"))
+
+
+if __name__ == '__main__':
+    unittest.main()
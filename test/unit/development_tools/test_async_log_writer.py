@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+AsyncLogWriter单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from development_tools.async_log_writer import AsyncLogWriter, list_log_segments, repair_log_tail
+
+
+class TestAsyncLogWriter(unittest.TestCase):
+    """AsyncLogWriter测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.log_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.log_dir, "session_1", "thoughts.jsonl")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def _read_all(self):
+        entries = []
+        for path in list_log_segments(self.log_file):
+            with open(path, "r", encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f if line.strip())
+        return entries
+
+    def test_flush_writes_in_order(self):
+        """测试flush后所有条目按提交顺序写入"""
+        batches = []
+        writer = AsyncLogWriter(fsync_policy="batch",
+                                on_batch=lambda path, records, offset: batches.append((len(records), offset)))
+        for i in range(1000):
+            writer.submit(self.log_file, {"i": i})
+        self.assertTrue(writer.flush(timeout=5))
+
+        self.assertEqual([e["i"] for e in self._read_all()], list(range(1000)))
+        self.assertEqual(sum(n for n, _ in batches), 1000)
+        self.assertEqual(batches[-1][1], os.path.getsize(self.log_file))
+        self.assertGreater(writer.stats["fsyncs"], 0)
+        writer.close()
+
+    def test_segment_rotation(self):
+        """测试超过分段大小后滚动为新分段"""
+        rotations = []
+        writer = AsyncLogWriter(fsync_policy="none", max_segment_bytes=1024, batch_size=10,
+                                on_rotate=lambda old, new: rotations.append(new))
+        for i in range(200):
+            writer.submit(self.log_file, {"i": i, "padding": "x" * 50})
+        writer.close()
+
+        segments = list_log_segments(self.log_file)
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(segments[:len(rotations)], rotations)
+        self.assertEqual([e["i"] for e in self._read_all()], list(range(200)))
+
+    def test_repair_incomplete_tail(self):
+        """测试打开文件时截断崩溃留下的不完整尾行"""
+        os.makedirs(os.path.dirname(self.log_file))
+        with open(self.log_file, "wb") as f:
+            f.write(b'{"i": 0}\n{"i": 1}\n{"i": ')
+        self.assertEqual(repair_log_tail(self.log_file), len(b'{"i": '))
+
+        writer = AsyncLogWriter()
+        writer.submit(self.log_file, {"i": 2})
+        writer.close()
+        self.assertEqual([e["i"] for e in self._read_all()], [0, 1, 2])
+
+    def test_serialized_entries(self):
+        """测试提交已序列化的JSON文本，回调仍收到解析后的条目"""
+        batches = []
+        writer = AsyncLogWriter(on_batch=lambda path, records, offset: batches.extend(records))
+        writer.submit(self.log_file, json.dumps({"i": 0}))
+        writer.close()
+        self.assertEqual(self._read_all(), [{"i": 0}])
+        self.assertEqual(batches, [({"i": 0}, '{"i": 0}')])
+
+    def test_flush_returns_after_sync_error(self):
+        """测试fsync失败时flush不会一直等待"""
+        writer = AsyncLogWriter(fsync_policy="batch")
+        with patch("development_tools.async_log_writer.os.fsync", side_effect=OSError("disk failure")):
+            writer.submit(self.log_file, {"i": 0})
+            self.assertTrue(writer.flush(timeout=5))
+        self.assertGreater(writer.stats["errors"], 0)
+        writer.close()
+
+    def test_write_error_closes_file(self):
+        """测试写入失败时关闭并丢弃文件句柄，之后重新打开继续写入"""
+        writer = AsyncLogWriter(fsync_policy="none")
+        writer.submit(self.log_file, {"i": 0})
+        writer.flush(timeout=5)
+        failed = writer._files[self.log_file]
+        with patch.object(writer, "_write_chunk", side_effect=OSError("disk full")):
+            writer.submit(self.log_file, {"i": 1})
+            self.assertTrue(writer.flush(timeout=5))
+        self.assertTrue(failed.handle.closed)
+        self.assertFalse(writer.owns(self.log_file))
+
+        writer.submit(self.log_file, {"i": 2})
+        writer.close()
+        self.assertEqual([e["i"] for e in self._read_all()], [0, 2])
+
+    def test_invalid_fsync_policy(self):
+        """测试不支持的fsync策略"""
+        with self.assertRaises(ValueError):
+            AsyncLogWriter(fsync_policy="sometimes")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+SavepointStore内容寻址保存点存储单元测试
+"""
+
+import unittest
+import sys
+import os
+import time
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from development_tools.savepoint_store import SavepointStore
+
+
+class TestSavepointStore(unittest.TestCase):
+    """SavepointStore测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.project_dir = tempfile.mkdtemp(prefix="sp_project_")
+        self.store = SavepointStore(self.project_dir, os.path.join(self.project_dir, ".savepoints", "store"))
+        old = time.time() - 60
+        for name, content in [("a.py", "a = 1\n"), ("b.py", "b = 2\n"), ("pkg/c.py", "a = 1\n")]:
+            self._write(name, content, old)
+        self._write("__pycache__/a.cpython-311.pyc", "ignored", old)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.project_dir, ignore_errors=True)
+
+    def _write(self, rel_path, content, mtime=None):
+        path = os.path.join(self.project_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_snapshot_dedupes_blobs(self):
+        """测试相同内容的文件只存储一个blob"""
+        snapshot = self.store.create_snapshot("sp_1")
+        self.assertEqual(snapshot["file_count"], 3)
+        self.assertEqual(snapshot["new_blob_count"], 2)
+
+        manifest = self.store.load_manifest("sp_1")
+        self.assertEqual(manifest["files"]["a.py"][0], manifest["files"]["pkg/c.py"][0])
+        self.assertNotIn("__pycache__/a.cpython-311.pyc", manifest["files"])
+
+    def test_incremental_snapshot_uses_stat_cache(self):
+        """测试第二次快照只重新哈希变化的文件"""
+        self.store.create_snapshot("sp_1")
+        self._write("b.py", "b = 3\n", time.time() - 30)
+
+        snapshot = self.store.create_snapshot("sp_2")
+        self.assertEqual(snapshot["hashed_count"], 1)
+        self.assertEqual(snapshot["new_blob_count"], 1)
+        self.assertNotEqual(self.store.load_manifest("sp_1")["tree_hash"], snapshot["tree_hash"])
+
+    def test_restore_snapshot(self):
+        """测试从blob恢复保存点文件"""
+        self.store.create_snapshot("sp_1")
+        self._write("a.py", "broken\n")
+
+        self.assertEqual(self.store.count_changed_files("sp_1"), 1)
+        self.store.restore_snapshot("sp_1")
+        with open(os.path.join(self.project_dir, "a.py")) as f:
+            self.assertEqual(f.read(), "a = 1\n")
+        self.assertEqual(self.store.count_changed_files("sp_1"), 0)
+
+    def test_rollback_touches_only_changed_files(self):
+        """测试回滚只写回修改和删除的文件，并删除新增文件"""
+        self.store.create_snapshot("sp_1")
+        self._write("a.py", "broken\n")
+        os.remove(os.path.join(self.project_dir, "b.py"))
+        self._write("new/d.py", "d = 4\n")
+        untouched_mtime = os.stat(os.path.join(self.project_dir, "pkg", "c.py")).st_mtime_ns
+
+        result = self.store.rollback("sp_1")
+        self.assertEqual(result["diff"], {"added": ["new/d.py"], "modified": ["a.py"], "deleted": ["b.py"]})
+        self.assertEqual(result["restored_count"], 2)
+        self.assertEqual(result["removed_count"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.project_dir, "new")))
+        self.assertEqual(os.stat(os.path.join(self.project_dir, "pkg", "c.py")).st_mtime_ns, untouched_mtime)
+        self.assertEqual(self.store.diff_with_project("sp_1"), {"added": [], "modified": [], "deleted": []})
+
+    def test_rollback_skips_protected_paths(self):
+        """测试回滚不删除或覆盖受保护路径"""
+        store = SavepointStore(self.project_dir, self.store.store_dir, protected_paths=["state.json"])
+        store.create_snapshot("sp_1")
+        self._write("state.json", "{}")
+
+        result = store.rollback("sp_1")
+        self.assertEqual(result["files_changed"], 0)
+        self.assertTrue(os.path.exists(os.path.join(self.project_dir, "state.json")))
+
+    def test_diff_snapshots(self):
+        """测试比较两个保存点清单"""
+        self.store.create_snapshot("sp_1")
+        self._write("b.py", "b = 3\n", time.time() - 30)
+        self._write("e.py", "e = 5\n", time.time() - 30)
+        self.store.create_snapshot("sp_2")
+
+        diff = self.store.diff_snapshots("sp_1", "sp_2")
+        self.assertEqual(diff, {"added": ["e.py"], "modified": ["b.py"], "deleted": []})
+
+    def test_collect_garbage(self):
+        """测试回收不再被引用的blob"""
+        self.store.create_snapshot("sp_1")
+        self._write("b.py", "b = 3\n", time.time() - 30)
+        self.store.create_snapshot("sp_2")
+
+        self.store.delete_snapshot("sp_1")
+        self.assertEqual(self.store.collect_garbage(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
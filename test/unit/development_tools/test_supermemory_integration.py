@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+SuperMemoryIntegration客户端层单元测试，使用本地替身服务器
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from development_tools.supermemory_integration import SuperMemoryIntegration
+
+
+class StandInSuperMemoryHandler(BaseHTTPRequestHandler):
+    """模拟SuperMemory API的请求处理器"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _create(self, memory):
+        server = self.server
+        with server.lock:
+            server.next_id += 1
+            memory = dict(memory, id=f"mem_{server.next_id}")
+            server.memories[memory["id"]] = memory
+        return memory
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.calls.append(("POST", path))
+        if path == "/v1/memories/batch":
+            if not self.server.batch_enabled:
+                self._reply(404, {"error": "not found"})
+                return
+            self._reply(200, {"data": [self._create(m) for m in body["memories"]]})
+        else:
+            self._reply(200, {"data": self._create(body)})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        self.server.calls.append(("GET", parsed.path))
+        if parsed.path.startswith("/v1/memories/"):
+            memory = self.server.memories.get(parsed.path.rsplit("/", 1)[1])
+            self._reply(200 if memory else 404, {"data": memory} if memory else {"error": "not found"})
+            return
+        tags = parse_qs(parsed.query).get("tags", [""])[0].split(",")
+        matched = [m for m in self.server.memories.values() if all(t in m["tags"] for t in tags if t)]
+        self._reply(200, {"data": matched})
+
+
+class TestSuperMemoryIntegrationClient(unittest.TestCase):
+    """SuperMemoryIntegration连接池、批量请求和缓存测试类"""
+
+    def setUp(self):
+        """启动本地替身服务器"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInSuperMemoryHandler)
+        self.server.memories = {}
+        self.server.calls = []
+        self.server.next_id = 0
+        self.server.lock = threading.Lock()
+        self.server.batch_enabled = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """关闭服务器并清理"""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _integration(self, **kwargs):
+        integration = SuperMemoryIntegration(api_key="test-key", base_url=self.base_url, **kwargs)
+        self.addCleanup(integration.close)
+        return integration
+
+    def test_batch_create_uses_single_request(self):
+        """测试批量处理只发送一次批量请求"""
+        integration = self._integration()
+        texts = ["任务已完成50%", "用户反馈界面较慢", "创建了新的组件"]
+        results = integration.process_manus_outputs("t1", texts)
+
+        self.assertEqual([r["result"]["data"]["content"] for r in results], texts)
+        self.assertEqual(self.server.calls, [("POST", "/v1/memories/batch")])
+
+    def test_batch_falls_back_to_single_requests(self):
+        """测试服务端不支持批量端点时退化为单条请求"""
+        self.server.batch_enabled = False
+        integration = self._integration()
+        results = integration.store_task_data_batch("t1", ["a", "b", "c"])
+
+        self.assertTrue(all("error" not in r for r in results))
+        self.assertEqual(len(self.server.memories), 3)
+        self.assertFalse(integration.client.batch_supported)
+
+    def test_overview_single_fetch_and_cache(self):
+        """测试任务概览和各类型获取方法共用一次拉取"""
+        integration = self._integration(cache_path=os.path.join(self.tmp_dir, "cache.db"))
+        integration.store_task_data("t1", "任务进度50%", data_type="task_progress")
+        integration.store_task_data("t1", "用户反馈", data_type="user_history")
+        self.server.calls.clear()
+
+        overview = integration.get_task_overview("t1")
+        self.assertEqual(len(overview["task_progress"]), 1)
+        self.assertEqual(len(overview["user_history"]), 1)
+        self.assertEqual(len(integration.get_user_history("t1")), 1)
+        self.assertEqual(integration.get_action_records("t1"), [])
+        self.assertEqual(self.server.calls, [("GET", "/v1/memories")])
+
+        memory_id = overview["task_progress"][0]["id"]
+        self.assertTrue(integration.get_memory(memory_id).get("cached"))
+
+    def test_write_behind_flush(self):
+        """测试写后同步模式先写本地缓存，flush后提交到服务端"""
+        integration = self._integration(cache_path=os.path.join(self.tmp_dir, "cache.db"),
+                                        write_behind=True, flush_interval=60)
+        result = integration.store_task_data("t1", "任务进度50%", data_type="task_progress")
+        self.assertTrue(result["pending"])
+        self.assertEqual(len(integration.get_task_progress("t1")), 1)
+
+        self.assertTrue(integration.flush())
+        self.assertEqual(len(self.server.memories), 1)
+        progress = integration.get_task_progress("t1")
+        self.assertEqual(len(progress), 1)
+        self.assertTrue(progress[0]["id"].startswith("mem_"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+ThoughtActionRecorder索引存储单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from development_tools.thought_action_recorder import ThoughtActionRecorder
+
+
+class TestThoughtActionRecorderIndex(unittest.TestCase):
+    """ThoughtActionRecorder索引存储测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.log_dir = tempfile.mkdtemp()
+        self.recorder = ThoughtActionRecorder(log_dir=self.log_dir)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.recorder.close()
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def test_session_logs_round_trip(self):
+        """测试记录后读取会话日志"""
+        self.recorder.record_thought("分析用户需求", {"step": 1})
+        self.recorder.record_action("write_file", {"path": "a.py"}, {"ok": True})
+
+        logs = self.recorder.get_session_logs()
+        self.assertEqual(len(logs["thoughts"]), 1)
+        self.assertEqual(len(logs["actions"]), 1)
+        self.assertEqual(logs["thoughts"][0]["context"], {"step": 1})
+        self.assertEqual(logs["actions"][0]["result"], {"ok": True})
+
+    def test_jsonl_written_after_flush(self):
+        """测试持久写入句柄刷新后jsonl文件内容完整"""
+        for i in range(5):
+            self.recorder.record_thought(f"thought {i}")
+        self.recorder.flush()
+
+        with open(self.recorder.thought_log, "r", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        self.assertEqual([line["content"] for line in lines], [f"thought {i}" for i in range(5)])
+
+    def test_mutating_returned_entry_after_record(self):
+        """测试记录后修改返回的条目或参数不影响写入的内容"""
+        params = {"path": "a.py"}
+        entry = self.recorder.record_action("write_file", params)
+        entry["action_type"] = "changed"
+        params["path"] = "b.py"
+        self.recorder.flush()
+
+        with open(self.recorder.action_log, "r", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        self.assertEqual((lines[0]["action_type"], lines[0]["action_params"]), ("write_file", {"path": "a.py"}))
+
+    def test_latest_thoughts(self):
+        """测试获取最新N条思考"""
+        for i in range(20):
+            self.recorder.record_thought(f"thought {i}")
+
+        latest = self.recorder.get_latest_thoughts(3)
+        self.assertEqual([t["content"] for t in latest], ["thought 19", "thought 18", "thought 17"])
+
+    def test_search_logs(self):
+        """测试关键词搜索思考内容、操作参数和结果"""
+        self.recorder.record_thought("Deploy the RELEASE build")
+        self.recorder.record_thought("无关内容")
+        self.recorder.record_action("run_tests", {"suite": "release"}, None)
+        self.recorder.record_action("git_push", {"branch": "main"}, {"message": "发布完成"})
+
+        result = self.recorder.search_logs("release")
+        self.assertEqual(len(result["thoughts"]), 1)
+        self.assertEqual(len(result["actions"]), 1)
+        self.assertEqual(result["actions"][0]["action_type"], "run_tests")
+
+        # 短关键词退化为子串匹配
+        result = self.recorder.search_logs("发布")
+        self.assertEqual(len(result["actions"]), 1)
+        self.assertEqual(result["actions"][0]["action_type"], "git_push")
+
+    def test_time_range_query(self):
+        """测试时间范围查询"""
+        entries = [self.recorder.record_thought(f"thought {i}") for i in range(5)]
+        start = entries[1]["timestamp"]
+        end = entries[3]["timestamp"]
+
+        matched = self.recorder.query_logs(kind="thought", start_time=start, end_time=end)
+        self.assertTrue(all(start <= t["timestamp"] < end for t in matched))
+        self.assertIn("thought 1", [t["content"] for t in matched])
+
+    def test_sync_existing_session(self):
+        """测试增量导入索引建立前写入的会话日志"""
+        session_dir = os.path.join(self.log_dir, "session_100")
+        os.makedirs(session_dir)
+        with open(os.path.join(session_dir, "thoughts.jsonl"), "w", encoding="utf-8") as f:
+            for i in range(3):
+                f.write(json.dumps({"timestamp": 100 + i, "type": "thought", "content": f"old {i}"}) + "\n")
+
+        logs = self.recorder.get_session_logs("session_100")
+        self.assertEqual(len(logs["thoughts"]), 3)
+
+        # 追加新行后只导入新增部分
+        with open(os.path.join(session_dir, "thoughts.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": 200, "type": "thought", "content": "new"}) + "\n")
+        logs = self.recorder.get_session_logs("session_100")
+        self.assertEqual([t["content"] for t in logs["thoughts"]], ["old 0", "old 1", "old 2", "new"])
+
+    def test_clear_current_session(self):
+        """测试清除当前会话后索引同步清空"""
+        self.recorder.record_thought("to be cleared")
+        result = self.recorder.clear_current_session()
+        self.assertTrue(result["success"])
+        self.assertEqual(self.recorder.get_session_logs()["thoughts"], [])
+
+        self.recorder.record_thought("after clear")
+        self.assertEqual([t["content"] for t in self.recorder.get_session_logs()["thoughts"]], ["after clear"])
+
+
+if __name__ == '__main__':
+    unittest.main()
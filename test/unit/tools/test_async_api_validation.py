@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+异步API验证引擎单元测试
+"""
+
+import unittest
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.async_http import AsyncPacer
+from mcptool.adapters.metrics_sink import MetricsSink
+from enhanced_api_validator import APIEndpoint, EnhancedAPIValidator
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """模拟公开API，/fail返回500，server.delay为每个请求的处理时间"""
+
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.active -= 1
+        status = 500 if self.path.startswith("/fail") else 200
+        data = json.dumps({"path": self.path, "echo": body.decode("utf-8")}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
+
+
+class TestAsyncAPIValidation(unittest.TestCase):
+    """EnhancedAPIValidator异步验证测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockAPIHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://localhost:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """测试前置设置"""
+        self.server.delay = 0.0
+        self.server.active = self.server.peak = 0
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.temp_dir.name) / "enhanced.db")
+
+    def tearDown(self):
+        """测试后清理"""
+        MetricsSink.close_all()
+        self.temp_dir.cleanup()
+
+    def _endpoint(self, name, path, **kwargs):
+        return APIEndpoint(name=name, url=f"{self.base_url}{path}", method=kwargs.pop("method", "GET"),
+                           headers={"User-Agent": "test"}, auth_required=False, **kwargs)
+
+    def test_validate_hundreds_of_endpoints(self):
+        """测试数百个端点在共享连接池上并发验证，结果流式写入数据库"""
+        validator = EnhancedAPIValidator(db_path=self.db_path)
+        endpoints = [self._endpoint(f"ep{i}", f"/items/{i}") for i in range(300)]
+        endpoints.append(self._endpoint("broken", "/fail"))
+        endpoints.append(self._endpoint("httpbin_post", "/post", method="POST"))
+
+        started = time.perf_counter()
+        results = asyncio.run(validator.validate_endpoints_async(endpoints, repetitions=2,
+                                                                 max_connections_per_host=10))
+        self.assertLess(time.perf_counter() - started, 10.0)
+
+        self.assertEqual(len(results), 604)
+        self.assertEqual(sum(1 for r in results if not r.success), 2)
+        self.assertLessEqual(self.server.peak, 10)
+        post = next(r for r in results if r.endpoint_name == "httpbin_post")
+        self.assertEqual(json.loads(post.response_data["echo"])["validator"], "PowerAutomation")
+
+        timing = results[0].timing
+        for phase in ("queue", "dns", "connect", "ttfb", "transfer", "total"):
+            self.assertGreaterEqual(timing[phase], 0.0)
+        self.assertEqual(sum(1 for r in results if not r.timing["reused"]), 10)
+        self.assertGreater(timing["dns"] + timing["connect"], 0.0)
+
+        rollup = {row["endpoint_name"]: row for row in validator.get_endpoint_rollup()}
+        self.assertEqual(len(rollup), 302)
+        self.assertEqual(rollup["broken"]["error_count"], 2)
+        stored = validator.metrics_sink.query(
+            "SELECT COUNT(*) AS n FROM enhanced_api_results WHERE ttfb_time IS NOT NULL")
+        self.assertEqual(stored[0]["n"], 604)
+
+        breakdown = validator.generate_comprehensive_report()["latency_breakdown"]
+        self.assertEqual(set(breakdown["ep0"]), {"queue", "dns", "connect", "ttfb", "transfer", "total"})
+
+    def test_concurrency_and_pacing(self):
+        """测试单个端点的并发上限和请求节奏"""
+        self.server.delay = 0.05
+        validator = EnhancedAPIValidator(db_path=self.db_path)
+        serial = self._endpoint("serial", "/serial", max_concurrency=1)
+        asyncio.run(validator.validate_endpoints_async([serial], repetitions=4))
+        self.assertEqual(self.server.peak, 1)
+
+        self.server.delay = 0.0
+        paced = self._endpoint("paced", "/paced", max_concurrency=10, requests_per_second=20)
+        started = time.perf_counter()
+        results = asyncio.run(validator.validate_endpoints_async([paced], repetitions=6))
+        self.assertGreaterEqual(time.perf_counter() - started, 0.25)
+        self.assertTrue(all(r.success for r in results))
+
+    def test_stress_test_and_sync_session(self):
+        """测试协程压力测试和同步调用的共享会话"""
+        validator = EnhancedAPIValidator(db_path=self.db_path)
+        validator.endpoints = [self._endpoint("stress", "/stress")]
+        results = validator.run_stress_test(["stress", "missing"], duration_seconds=0.5, concurrent_users=3)
+        self.assertGreaterEqual(len(results), 6)
+        self.assertTrue(all(r.success for r in results))
+
+        result = validator.make_api_call(validator.endpoints[0])
+        self.assertTrue(result.success)
+        self.assertIn("ttfb", result.timing)
+        self.assertEqual(len(validator.session.adapters["http://"].poolmanager.pools), 1)
+
+    def test_legacy_schema_migration(self):
+        """测试旧数据库补齐耗时分解列"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''CREATE TABLE enhanced_api_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, endpoint_name TEXT NOT NULL, success BOOLEAN NOT NULL,
+            response_time REAL NOT NULL, status_code INTEGER, error_message TEXT, response_data TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+        conn.commit()
+        conn.close()
+
+        validator = EnhancedAPIValidator(db_path=self.db_path)
+        columns = {row["name"] for row in validator.metrics_sink.query("PRAGMA table_info(enhanced_api_results)")}
+        self.assertTrue({"dns_time", "connect_time", "ttfb_time", "transfer_time"} <= columns)
+
+
+class TestAsyncPacer(unittest.TestCase):
+    """AsyncPacer测试类"""
+
+    def test_pacing(self):
+        """测试按固定间隔放行"""
+        async def run():
+            pacer = AsyncPacer(50)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for _ in range(5):
+                await pacer.wait()
+            return loop.time() - started
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.08)
+        self.assertEqual(asyncio.run(AsyncPacer(None).wait()), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
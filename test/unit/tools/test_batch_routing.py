@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+批量路由单元测试
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.unified_smart_tool_engine_mcp_v2 import UnifiedToolRegistry, IntelligentRoutingEngine
+
+
+class TestBatchRouting(unittest.TestCase):
+    """IntelligentRoutingEngine.route_batch测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.registry = UnifiedToolRegistry()
+        self.subscription = self._add("analyzer_sub", "mcp.so", cost_type="subscription", monthly_limit=100,
+                                      user_rating=4.9, avg_response_time=200, throughput=20)
+        self.paid = self._add("analyzer_paid", "aci.dev", cost_type="per_call", cost_per_call=0.002,
+                              avg_response_time=300, throughput=50, user_rating=4.0)
+        self.slow = self._add("analyzer_slow", "zapier", cost_type="free", avg_response_time=3000,
+                              throughput=5, user_rating=3.5)
+        self.engine = IntelligentRoutingEngine(self.registry)
+
+    def _add(self, name, platform, **kwargs):
+        tool_info = {
+            "name": name, "description": "analyzer tool", "category": "data_analysis",
+            "platform": platform, "platform_tool_id": name, "mcp_endpoint": f"https://{platform}/{name}",
+            "capabilities": ["analyze"], "input_schema": {}, "output_schema": {}
+        }
+        tool_info.update(kwargs)
+        return self.registry.register_tool(tool_info)
+
+    def test_respects_monthly_limit_and_minimizes_cost(self):
+        """测试批量路由遵守月度配额，并优先使用零成本工具"""
+        result = self.engine.route_batch([{"request": "analyzer"} for _ in range(2000)], window_seconds=60)
+
+        usage = result["tool_usage"]
+        self.assertEqual(usage[self.subscription], 100)
+        self.assertEqual(usage[self.slow], 300)
+        self.assertEqual(usage[self.paid], 1600)
+        self.assertEqual(result["summary"]["unassigned"], 0)
+        self.assertAlmostEqual(result["summary"]["total_cost"], 1600 * 0.002)
+
+        # 基线把所有请求都交给评分最高的订阅工具，超出配额
+        self.assertEqual(result["baseline"]["quota_violations"], 1900)
+        self.assertEqual(result["summary"]["quota_violations"], 0)
+
+    def test_deadlines_and_budgets(self):
+        """测试截止时间和预算约束"""
+        requests = [{"id": f"r{i}", "request": "analyzer", "deadline_ms": 1000, "max_cost": 0} for i in range(50)]
+        requests.append({"id": "no_match", "request": "unknown"})
+        result = self.engine.route_batch(requests, window_seconds=60)
+
+        assignments = {a["request_id"]: a for a in result["assignments"]}
+        assigned = [a for a in result["assignments"] if a["tool_id"]]
+        # 预算为0只能使用订阅工具，每秒20次，1000ms内只能完成前20次
+        self.assertEqual({a["tool_id"] for a in assigned}, {self.subscription})
+        self.assertEqual(len(assigned), 20)
+        self.assertTrue(all(a["expected_latency_ms"] <= 1000 for a in assigned))
+        self.assertEqual(assignments["no_match"]["reason"], "no_matching_tool")
+        self.assertEqual([a["request_id"] for a in result["assignments"]][:3], ["r0", "r1", "r2"])
+        self.assertEqual(result["summary"]["deadline_misses"], 0)
+        self.assertGreater(result["baseline"]["deadline_misses"], 0)
+
+    def test_platform_limits_total_budget_and_commit(self):
+        """测试平台上限、总预算和月度用量记录"""
+        result = self.engine.route_batch([{"request": "analyzer"} for _ in range(500)], window_seconds=60,
+                                         platform_limits={"zapier": 10}, total_budget=0.1, commit=True)
+        usage = result["tool_usage"]
+        self.assertEqual(usage[self.slow], 10)
+        self.assertEqual(usage[self.paid], 50)
+        self.assertEqual(self.engine.monthly_usage[self.subscription], 100)
+
+        # 本月配额已用完，下一批不再分配订阅工具
+        again = self.engine.route_batch([{"request": "analyzer"}], window_seconds=60)
+        self.assertNotEqual(again["assignments"][0]["tool_id"], self.subscription)
+
+
+if __name__ == '__main__':
+    unittest.main()
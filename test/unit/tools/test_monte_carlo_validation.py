@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+蒙特卡洛模拟验证单元测试
+"""
+
+import unittest
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.metrics_sink import MetricsSink
+from simulation_validation_system import (
+    SimulationEnvironment, SimulationValidator, SimulationReportGenerator,
+    METRIC_FIELDS, apply_optimization_effect, add_noise_arrays
+)
+
+
+class TestMonteCarloValidation(unittest.TestCase):
+    """SimulationValidator蒙特卡洛验证测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.environment = SimulationEnvironment(str(root / "simulation.json"), db_path=str(root / "simulation.db"))
+        self.validator = SimulationValidator(self.environment)
+
+    def tearDown(self):
+        """测试后清理"""
+        MetricsSink.close_all()
+        self.temp_dir.cleanup()
+
+    def test_vectorized_effect_matches_scalar(self):
+        """测试向量化优化效果与逐个计算一致，噪声不超过上限"""
+        current = self.environment.metrics_to_array(self.environment.current_metrics)
+        intensities = np.array([0.0, 0.4, 0.8, 1.5])
+        for scenario in self.validator.scenario_manager.get_all_scenarios():
+            batch = apply_optimization_effect(current, self.environment.target_array(),
+                                              scenario.scenario_type, intensities)
+            for row, intensity in zip(batch, intensities):
+                expected = self.environment.metrics_to_array(
+                    self.environment.simulate_optimization_effect(scenario.scenario_type, intensity))
+                np.testing.assert_allclose(row, expected)
+
+        noisy = add_noise_arrays(np.full((10000, len(METRIC_FIELDS)), 99.9), 0.05, np.random.default_rng(1))
+        self.assertLessEqual(noisy[:, METRIC_FIELDS.index("system_availability")].max(), 100.0)
+        self.assertGreater(noisy[:, METRIC_FIELDS.index("throughput")].max(), 100.0)
+
+    def test_confidence_intervals(self):
+        """测试成功率和指标的置信区间，不同进程数下结果可复现"""
+        inline = asyncio.run(self.validator.run_monte_carlo_validation(replicas=4000, seed=7, processes=1))
+        pooled = asyncio.run(self.validator.run_monte_carlo_validation(replicas=4000, seed=7, processes=2))
+        self.assertEqual([r.success_rate for r in inline], [r.success_rate for r in pooled])
+
+        results = {r.scenario_id: r for r in inline}
+        self.assertEqual(len(results), 5)
+        # 测试生成优化80%强度下覆盖率和自动化水平都达不到标准，全部失败
+        self.assertEqual(results["test_gen_optimization"].success_rate, 0.0)
+        self.assertEqual(results["test_gen_optimization"].criteria_pass_rates["error_rate"], 100.0)
+        # 性能优化的CPU使用率落在阈值附近，成功率介于0和100之间
+        performance = results["performance_optimization"]
+        low, high = performance.success_rate_ci
+        self.assertTrue(0 < low <= performance.success_rate <= high < 100)
+        self.assertLess(high - low, 5.0)
+
+        response = performance.metrics["system_response_time"]
+        expected = self.environment.simulate_optimization_effect("performance_optimization", 0.8).system_response_time
+        self.assertLess(response["mean_ci_low"], response["mean"])
+        self.assertAlmostEqual(response["mean"], expected, delta=0.5)
+        self.assertLess(response["interval_low"], response["mean_ci_low"])
+        self.assertGreater(performance.improvement["system_response_time"]["mean"], 0)
+
+        report = SimulationReportGenerator(self.validator).generate_comprehensive_report()
+        analysis = report["monte_carlo_analysis"]
+        self.assertEqual(len(analysis), 10)
+        self.assertIn("system_response_time", analysis[2]["metrics"])
+        rollup = self.environment.get_metrics_rollup("performance_optimization_monte_carlo")
+        self.assertEqual(rollup[0]["request_count"], 2)
+
+    def test_sweep_speed(self):
+        """测试数万次模拟在数秒内完成"""
+        started = time.perf_counter()
+        results = asyncio.run(self.validator.run_monte_carlo_validation(replicas=20000, seed=1, processes=1))
+        self.assertLess(time.perf_counter() - started, 5.0)
+        self.assertEqual(sum(r.replicas for r in results), 100000)
+
+
+if __name__ == '__main__':
+    unittest.main()
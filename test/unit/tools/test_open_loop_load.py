@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+开环负载生成器单元测试
+"""
+
+import unittest
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from real_api_validation_system import APIEndpointManager, LoadTestGenerator, LatencyHistogram
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """模拟工作流、AI和监控接口，server.delay为每个请求的处理时间"""
+
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体一起发送，避免Nagle算法与延迟确认叠加造成的额外延迟
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.server.delay)
+        data = json.dumps({"path": self.path, "ok": True}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """LatencyHistogram测试类"""
+
+    def test_percentiles_and_merge(self):
+        """测试分位数精度、合并和序列化"""
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for value in range(1, 5001):
+            first.record(value * 100)
+            second.record((value + 5000) * 100)
+        first.merge(LatencyHistogram.from_dict(second.to_dict()))
+
+        self.assertEqual(first.total_count, 10000)
+        for percentile, expected in ((50, 500000), (99, 990000), (100, 1000000)):
+            self.assertAlmostEqual(first.value_at_percentile(percentile), expected, delta=expected * 0.01)
+        self.assertEqual(first.summary_ms()["max"], 1000.0)
+
+    def test_corrected_recording(self):
+        """测试按期望间隔补录被阻塞的样本"""
+        histogram = LatencyHistogram()
+        histogram.record_corrected(1000000, 100000)
+        self.assertEqual(histogram.total_count, 10)
+        self.assertAlmostEqual(histogram.value_at_percentile(50), 500000, delta=5000)
+
+
+class TestOpenLoopLoad(unittest.TestCase):
+    """LoadTestGenerator开环负载测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockAPIHandler)
+        cls.server.daemon_threads = True
+        cls.server.delay = 0.0
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+        base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        config = {"local": {
+            "workflow_engine": {"base_url": base_url, "endpoints": {
+                "list_workflows": "/workflows", "create_workflow": "/workflows"}},
+            "ai_engine": {"base_url": base_url, "endpoints": {
+                "intent_understanding": "/ai/intent", "workflow_recommendation": "/ai/recommend"},
+                "auth": {"type": "api_key", "key_env": "LOAD_TEST_KEY"}},
+            "monitoring": {"base_url": base_url, "endpoints": {"system_metrics": "/metrics/system"}}
+        }}
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        config_path = Path(cls.temp_dir.name) / "endpoints.json"
+        config_path.write_text(json.dumps(config), encoding="utf-8")
+        cls.generator = LoadTestGenerator(APIEndpointManager(str(config_path)))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        """测试前置设置"""
+        self.server.delay = 0.0
+
+    def test_target_rate(self):
+        """测试按目标到达率发送请求并复用连接"""
+        result = asyncio.run(self.generator.generate_open_loop_load(
+            "local", target_rps=200, duration_seconds=1.0, arrival="uniform", max_connections=20))
+
+        self.assertEqual(result.total_requests, 200)
+        self.assertEqual(result.failed_requests, 0)
+        self.assertGreater(result.achieved_rps, 150)
+        self.assertLessEqual(result.connections_opened, 20)
+        self.assertEqual(len(result.endpoint_latency), 5)
+        self.assertEqual(len(result.metrics), result.total_requests)
+        self.assertEqual(result.summary()["status_codes"], {200: 200})
+
+    def test_queueing_is_not_omitted(self):
+        """测试服务饱和时响应时间包含排队等待，而不只是服务时间"""
+        # 2个连接、每个请求20ms，容量约100RPS，目标200RPS
+        self.server.delay = 0.02
+        result = asyncio.run(self.generator.generate_open_loop_load(
+            "local", target_rps=200, duration_seconds=1.0, arrival="uniform",
+            max_connections=2, collect_metrics=False))
+
+        service_p99 = result.service_time.value_at_percentile(99)
+        response_p99 = result.response_time.value_at_percentile(99)
+        self.assertLess(service_p99, 200000)
+        self.assertGreater(response_p99, 3 * service_p99)
+        self.assertLessEqual(result.connections_opened, 2)
+        self.assertEqual(result.metrics, [])
+
+    def test_multi_process(self):
+        """测试多进程发压并合并结果"""
+        result = asyncio.run(self.generator.generate_open_loop_load(
+            "local", target_rps=100, duration_seconds=1.0, arrival="uniform", processes=2))
+
+        self.assertEqual(result.total_requests, 100)
+        self.assertEqual(result.response_time.total_count, result.total_requests)
+        self.assertEqual(result.failed_requests, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
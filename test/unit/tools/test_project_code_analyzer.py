@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+项目级增量代码分析单元测试
+"""
+
+import unittest
+import sys
+import os
+import time
+import ast
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import intelligent_test_generator
+from intelligent_test_generator import IntelligentTestGenerator, ProjectCodeAnalyzer
+
+MODULE_TEMPLATE = '''
+import os
+from typing import List
+
+
+def helper_{index}(values: List[int]) -> int:
+    total = 0
+    for value in values:
+        if value > 0 and value % 2:
+            total += value
+    return total
+
+
+class Service{index}:
+    def run(self, values):
+        try:
+            return helper_{index}(values)
+        except ValueError:
+            return 0
+
+    def stop(self):
+        return None
+'''
+
+
+class TestProjectCodeAnalyzer(unittest.TestCase):
+    """ProjectCodeAnalyzer测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name) / "project"
+        for index in range(40):
+            package = self.root / f"pkg{index % 4}"
+            package.mkdir(parents=True, exist_ok=True)
+            (package / "__init__.py").write_text("", encoding="utf-8")
+            (package / f"module{index}.py").write_text(MODULE_TEMPLATE.format(index=index), encoding="utf-8")
+        (self.root / "__pycache__").mkdir()
+        (self.root / "__pycache__" / "skipped.py").write_text("def skipped(): pass\n", encoding="utf-8")
+        self.cache_path = str(Path(self.temp_dir.name) / "analysis.db")
+
+    def tearDown(self):
+        """测试后清理"""
+        self.temp_dir.cleanup()
+
+    def _analyzer(self, processes=1):
+        analyzer = ProjectCodeAnalyzer(str(self.root), cache_path=self.cache_path, processes=processes)
+        self.addCleanup(analyzer.close)
+        return analyzer
+
+    def test_parallel_parse_matches_serial(self):
+        """测试进程池解析与当前进程解析结果一致，并与analyze_code_structure一致"""
+        pooled = self._analyzer(processes=2).analyze()
+        self.assertEqual(len(pooled), 44)
+        self.assertNotIn("__pycache__/skipped.py", pooled)
+
+        os.remove(self.cache_path)
+        serial = self._analyzer(processes=1).analyze()
+        self.assertEqual(pooled, serial)
+
+        analysis = serial["pkg1/module5.py"]
+        self.assertEqual(analysis["module"], "pkg1.module5")
+        direct = IntelligentTestGenerator().analyze_code_structure(str(self.root / "pkg1" / "module5.py"))
+        self.assertEqual([f["name"] for f in analysis["functions"]], [f["name"] for f in direct["functions"]])
+        self.assertEqual(analysis["complexity_score"], direct["complexity_score"])
+
+    def test_incremental_invalidation(self):
+        """测试只重新解析内容变化的文件，mtime变化但内容不变时只重新计算哈希"""
+        first = self._analyzer()
+        first.analyze()
+        self.assertEqual(first.stats["parsed"], 44)
+        first.close()
+
+        changed = self.root / "pkg2" / "module6.py"
+        changed.write_text(MODULE_TEMPLATE.format(index=6) + "\n\ndef added():\n    return 1\n", encoding="utf-8")
+        touched = self.root / "pkg3" / "module7.py"
+        os.utime(touched, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        (self.root / "pkg0" / "module8.py").unlink()
+
+        second = self._analyzer()
+        started = time.perf_counter()
+        results = second.analyze()
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual((second.stats["parsed"], second.stats["rehashed"], second.stats["removed"]), (1, 1, 1))
+        self.assertEqual(second.stats["reused"], 41)
+        self.assertIn("added", [f["name"] for f in results["pkg2/module6.py"]["functions"]])
+
+        second.analyze()
+        self.assertEqual((second.stats["parsed"], second.stats["rehashed"]), (0, 0))
+
+    def test_symbol_index_and_generation(self):
+        """测试跨文件符号索引和按模块路径生成测试导入"""
+        generator = IntelligentTestGenerator(str(self.root))
+        generator.analyze_project(processes=1, cache_path=self.cache_path)
+        self.addCleanup(generator.project_analyzer.close)
+        analyzer = generator.project_analyzer
+
+        self.assertEqual([(s["module"], s["kind"]) for s in analyzer.lookup("helper_3")], [("pkg3.module3", "function")])
+        self.assertEqual(len(analyzer.lookup("run")), 40)
+        self.assertEqual(analyzer.lookup("Service12.run")[0]["path"], "pkg0/module12.py")
+        self.assertEqual(analyzer.lookup("missing"), [])
+
+        output_dir = Path(self.temp_dir.name) / "generated"
+        tests = generator.generate_project_tests(str(output_dir))
+        self.assertEqual(len(tests), 40)
+        self.assertIn("from pkg1.module5 import *", tests["pkg1/module5.py"].replace("\\n", "\n"))
+        self.assertTrue((output_dir / "test_pkg1_module5.py").exists())
+
+        # 项目内的单个文件也走缓存
+        path = str(self.root / "pkg1" / "module5.py")
+        self.assertEqual(generator.analyze_code_structure(path)["module"], "pkg1.module5")
+        self.assertEqual(analyzer.stats["parsed"], 0)
+
+    def test_default_cache_outside_project(self):
+        """测试默认缓存写入用户缓存目录而不是被分析的项目"""
+        cache_home = Path(self.temp_dir.name) / "cache"
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(cache_home)}):
+            analyzer = ProjectCodeAnalyzer(str(self.root), processes=1)
+        self.addCleanup(analyzer.close)
+        analyzer.analyze()
+
+        cache_path = Path(analyzer.cache_path)
+        self.assertTrue(cache_path.exists())
+        self.assertEqual(cache_path.parent, cache_home / "powerautomation" / "intelligent_test")
+        self.assertEqual(list(self.root.glob(".*.db*")), [])
+
+    def test_worker_parses_once(self):
+        """测试工作函数每个文件只解析一次AST，语法错误时返回错误结果"""
+        source = MODULE_TEMPLATE.format(index=1)
+        with mock.patch.object(intelligent_test_generator.ast, "parse", wraps=ast.parse) as parse:
+            result = intelligent_test_generator._analyze_file_worker(source)
+        self.assertEqual(parse.call_count, 1)
+        self.assertIn("Service1.run", [s["qualname"] for s in result["symbols"]])
+
+        broken = intelligent_test_generator._analyze_file_worker("def broken(:\n")
+        self.assertIn("error", broken["analysis"])
+        self.assertEqual(broken["symbols"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
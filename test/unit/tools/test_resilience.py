@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+熔断器和自适应并发单元测试
+"""
+
+import unittest
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.resilience import (
+    CircuitBreaker, AdaptiveConcurrencyLimiter, ResilienceManager,
+    STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+)
+from mcptool.adapters.tool_executors import ToolExecutorRegistry
+from mcptool.adapters.unified_smart_tool_engine_mcp_v2 import UnifiedToolRegistry, MCPUnifiedExecutionEngine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """CircuitBreaker和AdaptiveConcurrencyLimiter测试类"""
+
+    def test_state_transitions(self):
+        """测试关闭、打开、半开状态转换"""
+        clock = FakeClock()
+        breaker = CircuitBreaker("demo", failure_threshold=3, recovery_timeout=10, clock=clock)
+
+        for _ in range(3):
+            self.assertTrue(breaker.allow_request())
+            breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        clock.now = 10
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+        clock.now = 20
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_failure_rate_opens(self):
+        """测试滑动窗口失败率超过阈值时打开"""
+        breaker = CircuitBreaker("rate", failure_threshold=100, failure_rate_threshold=0.5,
+                                 window_size=10, min_calls=10)
+        for i in range(10):
+            breaker.record_failure() if i % 2 else breaker.record_success()
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_aimd_limit(self):
+        """测试并发上限加性增加、乘性减少"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=8)
+        for _ in range(4):
+            self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+
+        for _ in range(4):
+            limiter.release(0.1, True)
+        self.assertGreater(limiter.limit, 4)
+
+        self.assertTrue(limiter.try_acquire())
+        limiter.release(1.0, True)
+        self.assertLess(limiter.limit, 4)
+
+        self.assertTrue(limiter.try_acquire())
+        limiter.release(0.1, False)
+        self.assertEqual(limiter.snapshot()["in_flight"], 0)
+
+
+class TestEngineFailover(unittest.TestCase):
+    """执行引擎熔断与故障切换测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.registry = UnifiedToolRegistry()
+        self.primary = self._add("report_primary", "aci.dev", user_rating=5.0, success_rate=0.99)
+        self.backup = self._add("report_backup", "mcp.so", user_rating=3.0, success_rate=0.9)
+        self.executors = ToolExecutorRegistry()
+        self.clock = FakeClock()
+        self.resilience = ResilienceManager({"failure_threshold": 3, "recovery_timeout": 30}, clock=self.clock)
+        self.engine = MCPUnifiedExecutionEngine(self.registry, self.executors, resilience=self.resilience,
+                                                attempt_timeout=0.1)
+        self.primary_calls = 0
+
+    def _add(self, name, platform, **kwargs):
+        tool_info = {
+            "name": name, "description": "report tool", "category": "data_analysis",
+            "platform": platform, "platform_tool_id": name, "mcp_endpoint": f"https://{platform}/{name}",
+            "capabilities": ["report"], "input_schema": {}, "output_schema": {}
+        }
+        tool_info.update(kwargs)
+        return self.registry.register_tool(tool_info)
+
+    def _degrade_primary(self):
+        async def hanging(**params):
+            self.primary_calls += 1
+            await asyncio.sleep(5)
+
+        self.executors.add_python_tool(self.primary, hanging)
+        self.executors.add_python_tool(self.backup, lambda **params: "backup ok")
+
+    def test_failover_and_breaker(self):
+        """测试故障时切换到备选工具，熔断后不再调用故障工具"""
+        self._degrade_primary()
+
+        async def run_requests(count):
+            latencies, results = [], []
+            for _ in range(count):
+                start = time.time()
+                results.append(await self.engine.execute_user_request("report"))
+                latencies.append(time.time() - start)
+            return results, latencies
+
+        results, latencies = asyncio.run(run_requests(10))
+        self.assertTrue(all(r["success"] and r["failover"] for r in results))
+        self.assertEqual(results[0]["execution_result"]["result"], "backup ok")
+        self.assertEqual(self.primary_calls, 3)
+        self.assertEqual(results[-1]["attempts"][0]["skipped"], "platform_circuit_open")
+        # 熔断后请求不再等待故障工具超时
+        self.assertLess(max(latencies[3:]), 0.05)
+
+        # 冷却后半开探测，故障工具恢复后重新使用
+        self.executors.add_python_tool(self.primary, lambda **params: "primary ok")
+        self.clock.now = 30
+        recovered, _ = asyncio.run(run_requests(1))
+        self.assertFalse(recovered[0]["failover"])
+        self.assertEqual(recovered[0]["execution_result"]["result"], "primary ok")
+        snapshot = self.engine.get_execution_statistics()["resilience"]
+        self.assertEqual(snapshot["tools"][self.primary]["state"], STATE_CLOSED)
+
+    def test_concurrency_limit_sheds_to_alternative(self):
+        """测试达到自适应并发上限时切换到备选工具"""
+        self.resilience.limiter_config = {"initial_limit": 2}
+
+        async def slow(**params):
+            await asyncio.sleep(0.05)
+            return "primary ok"
+
+        self.executors.add_python_tool(self.primary, slow)
+        self.executors.add_python_tool(self.backup, lambda **params: "backup ok")
+
+        results = asyncio.run(self.engine.execute_many([{"request": "report"} for _ in range(5)]))
+        used = [r["selected_tool"]["name"] for r in results if r["success"]]
+        self.assertEqual(used, ["report_primary", "report_primary", "report_backup", "report_backup"])
+        # 两个平台都达到上限时直接拒绝，而不是排队等待
+        self.assertFalse(results[4]["success"])
+        self.assertEqual([a["skipped"] for a in results[4]["attempts"]], ["concurrency_limit"] * 2)
+
+    def test_cancelled_request_releases_slot_and_probe(self):
+        """测试请求被取消时归还并发名额和半开探测名额"""
+        self._degrade_primary()
+        breaker = self.resilience._breaker(self.resilience.tool_breakers, self.primary)
+        for _ in range(3):
+            breaker.record_failure()
+        self.clock.now = 30
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+
+        async def cancel_probe():
+            task = asyncio.ensure_future(self.engine.execute_user_request("report"))
+            await asyncio.sleep(0.02)
+            self.assertEqual(self.primary_calls, 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+        snapshot = self.resilience.snapshot()
+        self.assertEqual(snapshot["concurrency"]["aci.dev"]["in_flight"], 0)
+        self.assertEqual(snapshot["tools"][self.primary]["state"], STATE_HALF_OPEN)
+        # 探测名额已归还，下一个请求可以探测恢复后的工具
+        self.executors.add_python_tool(self.primary, lambda **params: "primary ok")
+        recovered = asyncio.run(self.engine.execute_user_request("report"))
+        self.assertEqual(recovered["execution_result"]["result"], "primary ok")
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+本地工具目录单元测试
+"""
+
+import unittest
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.tool_catalog import ToolCatalog, StaticToolSource, HTTPToolSource
+
+try:
+    from mcptool.adapters.unified_smart_tool_engine_mcp import UnifiedSmartToolEngineMCP
+    TOOL_ENGINE_AVAILABLE = True
+except ImportError:
+    TOOL_ENGINE_AVAILABLE = False
+
+
+def make_tool(tool_id, description="工具", category="development"):
+    return {"id": tool_id, "name": tool_id, "description": description, "category": category}
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """工具目录服务替身，支持ETag和since游标"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = f'"v{server.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        since = parse_qs(urlparse(self.path).query).get("since", [None])[0]
+        if since is None:
+            payload = {"tools": list(server.tools.values()), "cursor": str(server.version)}
+        else:
+            changed = [server.tools[tool_id] for tool_id, version in server.changes.items()
+                       if version > int(since) and tool_id in server.tools]
+            deleted = [tool_id for tool_id, version in server.changes.items()
+                       if version > int(since) and tool_id not in server.tools]
+            payload = {"tools": changed, "deleted": deleted, "cursor": str(server.version)}
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestToolCatalog(unittest.TestCase):
+    """ToolCatalog测试类"""
+
+    def setUp(self):
+        """测试前置设置"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = f"{self.temp_dir}/catalog.db"
+        self.catalog = ToolCatalog(self.db_path)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.catalog.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_full_listing_writes_only_changes(self):
+        """测试全量列表同步时只写入变化的工具"""
+        tools = [make_tool("a"), make_tool("b"), make_tool("c")]
+        source = StaticToolSource(tools)
+        self.catalog.register_source("mcp.so", source, "local")
+
+        first = self.catalog.sync()["mcp.so"]
+        self.assertEqual((first["new_tools"], first["tools_count"]), (3, 3))
+        unchanged_index = self.catalog.index
+
+        second = self.catalog.sync()["mcp.so"]
+        self.assertEqual((second["new_tools"], second["updated_tools"], second["deleted_tools"]), (0, 0, 0))
+        self.assertIs(self.catalog.index, unchanged_index)
+
+        source.tools = [make_tool("a", "新描述"), make_tool("c")]
+        third = self.catalog.sync()["mcp.so"]
+        self.assertEqual((third["updated_tools"], third["deleted_tools"]), (1, 1))
+        self.assertEqual([t["id"] for t in self.catalog.index.search("新描述")], ["a"])
+        self.assertEqual(self.catalog.index.get("a")["source"], "local")
+
+        # 目录持久化，重新打开后无需同步即可查询
+        self.catalog.close()
+        self.catalog = ToolCatalog(self.db_path)
+        self.assertEqual(sorted(self.catalog.index.tools), ["a", "c"])
+
+    def test_http_source_uses_etag_and_cursor(self):
+        """测试HTTP来源使用ETag和游标增量同步"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), CatalogHandler)
+        server.requests = []
+        server.version = 1
+        server.tools = {tool_id: make_tool(tool_id, category="productivity") for tool_id in ("x", "y", "z")}
+        server.changes = {}
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/tools"
+            self.catalog.register_source("aci.dev", HTTPToolSource(url), "cloud")
+
+            self.assertEqual(self.catalog.sync()["aci.dev"]["new_tools"], 3)
+            self.assertTrue(self.catalog.sync()["aci.dev"]["not_modified"])
+            self.assertEqual(server.requests[-1]["If-None-Match"], '"v1"')
+
+            before = dict(self.catalog._conn.execute("SELECT tool_id, updated_at FROM tools").fetchall())
+            server.version = 2
+            server.tools["x"] = make_tool("x", "改版", category="productivity")
+            del server.tools["z"]
+            server.changes = {"x": 2, "z": 2}
+            result = self.catalog.sync()["aci.dev"]
+            self.assertEqual((result["updated_tools"], result["deleted_tools"], result["tools_count"]), (1, 1, 2))
+            after = dict(self.catalog._conn.execute("SELECT tool_id, updated_at FROM tools").fetchall())
+            self.assertEqual(after["y"], before["y"])
+            self.assertEqual(self.catalog.get_sync_state("aci.dev")["cursor"], "2")
+
+            forced = self.catalog.sync(force=True)["aci.dev"]
+            self.assertEqual((forced["new_tools"], forced["updated_tools"], forced["deleted_tools"]), (0, 0, 0))
+            self.assertNotIn("If-None-Match", server.requests[-1])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_failed_source_keeps_index(self):
+        """测试来源失败时保留已有目录"""
+        class BrokenSource:
+            def fetch(self, cursor, etag):
+                raise ConnectionError("unreachable")
+
+        self.catalog.register_source("mcp.so", StaticToolSource([make_tool("a")]), "local")
+        self.catalog.register_source("aci.dev", BrokenSource(), "cloud")
+        results = self.catalog.sync()
+        self.assertEqual(results["aci.dev"]["status"], "failed")
+        self.assertEqual(list(self.catalog.index.tools), ["a"])
+
+    def test_background_refresh(self):
+        """测试后台定期刷新并替换内存索引"""
+        source = StaticToolSource([make_tool("a")])
+        self.catalog.register_source("mcp.so", source, "local")
+        self.catalog.start_background_refresh(0.02)
+
+        source.tools = [make_tool("a"), make_tool("b", category="data")]
+        deadline = time.time() + 5
+        while time.time() < deadline and self.catalog.index.get("b") is None:
+            time.sleep(0.01)
+        self.assertEqual([t["id"] for t in self.catalog.index.search(category="data")], ["b"])
+        self.catalog.stop_background_refresh()
+
+    @unittest.skipUnless(TOOL_ENGINE_AVAILABLE, "统一智能工具引擎不可用")
+    def test_engine_catalog_lifecycle(self):
+        """测试引擎默认使用内存目录，后台刷新在首次工具发现时才启动"""
+        engine = UnifiedSmartToolEngineMCP()
+        try:
+            self.assertEqual(engine.catalog.db_path, ":memory:")
+            self.assertIsNone(engine.catalog._refresh_thread)
+            self.assertIsNotNone(engine.catalog.index.get("file_processor"))
+
+            result = engine.process({"action": "discover_tools", "parameters": {"source": "local"}})
+            self.assertTrue(result["success"])
+            self.assertIsNotNone(engine.catalog._refresh_thread)
+            self.assertTrue(engine.start_catalog_refresh())
+        finally:
+            engine.close()
+        self.assertIsNone(engine.catalog._refresh_thread)
+
+        db_path = f"{self.temp_dir}/engine/catalog.db"
+        engine = UnifiedSmartToolEngineMCP({"catalog_refresh_interval": 0}, catalog_path=db_path)
+        try:
+            engine.process({"action": "discover_tools", "parameters": {}})
+            self.assertIsNone(engine.catalog._refresh_thread)
+            self.assertFalse(engine.start_catalog_refresh())
+            self.assertTrue(Path(db_path).is_file())
+        finally:
+            engine.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
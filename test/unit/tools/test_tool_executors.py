@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+工具执行器单元测试
+"""
+
+import unittest
+import sys
+import json
+import time
+import uuid
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from mcptool.adapters.tool_executors import ToolExecutorRegistry, EndpointLimiter, MCP_PROTOCOL_VERSION, run_sync
+from mcptool.adapters.unified_smart_tool_engine_mcp_v2 import UnifiedToolRegistry, MCPUnifiedExecutionEngine
+
+
+class StandInMCPHandler(BaseHTTPRequestHandler):
+    """本地Streamable HTTP MCP服务替身，要求先完成initialize握手，支持echo、slow、fail三个工具"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        message = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.methods.append(message["method"])
+
+        if message["method"] == "initialize":
+            session_id = uuid.uuid4().hex
+            server.sessions.add(session_id)
+            reply = {"jsonrpc": "2.0", "id": message["id"],
+                     "result": {"protocolVersion": message["params"]["protocolVersion"], "capabilities": {"tools": {}},
+                                "serverInfo": {"name": "stand-in", "version": "1.0"}}}
+            self._send(200, json.dumps(reply).encode("utf-8"), headers={"Mcp-Session-Id": session_id})
+            return
+        if self.headers.get("Mcp-Session-Id") not in server.sessions:
+            self._send(404)
+            return
+        if self.headers.get("MCP-Protocol-Version") != MCP_PROTOCOL_VERSION:
+            self._send(400)
+            return
+        if message["method"] == "notifications/initialized":
+            self._send(202)
+            return
+
+        name = message["params"]["name"]
+        arguments = message["params"]["arguments"]
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if name == "slow":
+                time.sleep(arguments.get("delay", 0.2))
+            if name == "fail":
+                reply = {"jsonrpc": "2.0", "id": message["id"],
+                         "error": {"code": -32602, "message": "bad arguments"}}
+            else:
+                reply = {"jsonrpc": "2.0", "id": message["id"],
+                         "result": {"content": [{"type": "text", "text": json.dumps(arguments)}]}}
+        finally:
+            with server.lock:
+                server.active -= 1
+
+        if self.path == "/sse":
+            self._send(200, f"event: message\ndata: {json.dumps(reply)}\n\n".encode("utf-8"), "text/event-stream")
+        else:
+            self._send(200, json.dumps(reply).encode("utf-8"))
+
+
+class TestToolExecutors(unittest.TestCase):
+    """ToolExecutorRegistry测试类"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInMCPHandler)
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.endpoint = f"http://127.0.0.1:{cls.server.server_address[1]}/mcp"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """测试前置设置"""
+        self.server.connections = set()
+        self.server.sessions = set()
+        self.server.methods = []
+        self.server.active = 0
+        self.server.max_active = 0
+        self.registry = ToolExecutorRegistry(default_timeout=5, endpoint_limits={self.endpoint: 2})
+
+    def tearDown(self):
+        """测试后清理"""
+        run_sync(self.registry.close())
+
+    def test_python_tools(self):
+        """测试同步和异步的进程内Python工具"""
+        async def async_add(a, b):
+            return a + b
+
+        self.registry.add_python_tool("add", lambda a, b: a + b)
+        self.registry.add_python_tool("async_add", async_add)
+
+        results = run_sync(self.registry.execute_many([
+            {"tool_id": "add", "arguments": {"a": 1, "b": 2}},
+            {"tool_id": "async_add", "arguments": {"a": 3, "b": 4}},
+            {"tool_id": "missing"}
+        ]))
+        self.assertEqual([r["success"] for r in results], [True, True, False])
+        self.assertEqual([r.get("result") for r in results[:2]], [3, 7])
+        self.assertEqual(results[0]["executor"], "python")
+
+    def test_subprocess_tool(self):
+        """测试子进程工具通过stdin/stdout交换JSON"""
+        script = ("import json, sys; payload = json.load(sys.stdin); "
+                  "print(json.dumps({'tool': payload['tool'], 'double': payload['arguments']['x'] * 2}))")
+        self.registry.add_subprocess_tool("double", [sys.executable, "-c", script])
+        self.registry.add_subprocess_tool("broken", [sys.executable, "-c", "import sys; sys.exit(3)"])
+
+        ok = run_sync(self.registry.execute("double", {"x": 21}))
+        self.assertTrue(ok["success"])
+        self.assertEqual(ok["result"], {"tool": "double", "double": 42})
+
+        failed = run_sync(self.registry.execute("broken", {}))
+        self.assertFalse(failed["success"])
+        self.assertIn("3", failed["error"])
+
+    def test_http_tool_reuses_connections(self):
+        """测试HTTP MCP工具复用keep-alive连接"""
+        self.registry.add_http_tool("echo", self.endpoint)
+
+        async def sequential():
+            return [await self.registry.execute("echo", {"n": i}) for i in range(5)]
+
+        results = run_sync(sequential())
+        self.assertTrue(all(r["success"] for r in results))
+        self.assertEqual(json.loads(results[3]["result"]["content"][0]["text"]), {"n": 3})
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.server.methods[:2], ["initialize", "notifications/initialized"])
+        self.assertEqual(self.server.methods.count("initialize"), 1)
+
+    def test_http_session_expiry(self):
+        """测试服务端丢弃会话后重新握手并重试"""
+        self.registry.add_http_tool("echo", self.endpoint)
+        self.assertTrue(run_sync(self.registry.execute("echo", {"n": 1}))["success"])
+        self.server.sessions.clear()
+
+        result = run_sync(self.registry.execute("echo", {"n": 2}))
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(self.server.methods.count("initialize"), 2)
+        self.assertIn(self.registry.http.sessions[self.endpoint]["session_id"], self.server.sessions)
+
+    def test_http_error_and_event_stream(self):
+        """测试JSON-RPC错误和事件流响应"""
+        self.registry.add_http_tool("fail", self.endpoint)
+        base = self.endpoint.rsplit("/", 1)[0]
+
+        failed = run_sync(self.registry.execute("fail", {}))
+        self.assertFalse(failed["success"])
+        self.assertIn("bad arguments", failed["error"])
+
+        streamed = run_sync(self.registry.call_endpoint(base + "/sse", "echo", {"x": 1}))
+        self.assertTrue(streamed["success"])
+        self.assertEqual(streamed["endpoint"], base + "/sse")
+
+    def test_execute_many_respects_endpoint_limit(self):
+        """测试批量执行并发进行且不超过端点并发上限"""
+        self.registry.add_http_tool("slow", self.endpoint)
+        calls = [{"tool_id": "slow", "arguments": {"delay": 0.2, "i": i}} for i in range(6)]
+
+        start = time.time()
+        results = run_sync(self.registry.execute_many(calls))
+        elapsed = time.time() - start
+
+        self.assertEqual([json.loads(r["result"]["content"][0]["text"])["i"] for r in results], list(range(6)))
+        self.assertEqual(self.server.max_active, 2)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(self.server.methods.count("initialize"), 1)
+
+    def test_endpoint_limit_shared_across_sync_callers(self):
+        """测试各自使用独立事件循环的同步调用方共享端点并发上限"""
+        self.registry.add_http_tool("slow", self.endpoint)
+        results = []
+
+        def caller(i):
+            results.append(run_sync(self.registry.execute("slow", {"delay": 0.1, "i": i})))
+
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(r["success"] for r in results))
+        self.assertEqual(self.server.max_active, 2)
+
+    def test_limiter_cancelled_waiter(self):
+        """测试等待中被取消的调用不占用名额"""
+        limiter = EndpointLimiter(1)
+
+        async def scenario():
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            limiter.release()
+            await asyncio.wait_for(limiter.acquire(), 0.5)
+            limiter.release()
+
+        asyncio.run(scenario())
+        self.assertEqual(limiter.active, 0)
+
+    def test_timeout(self):
+        """测试超时的调用返回失败结果"""
+        self.registry.add_python_tool("sleepy", lambda: time.sleep(0.5))
+        result = run_sync(self.registry.execute("sleepy", timeout=0.05))
+        self.assertFalse(result["success"])
+        self.assertTrue(result["timeout"])
+        self.assertEqual(self.registry.stats["timeouts"], 1)
+
+    def test_timeout_holds_slot_until_work_finishes(self):
+        """测试超时后无法中止的线程结束前一直占用端点名额，HTTP请求和子进程被中止"""
+        registry = ToolExecutorRegistry(default_timeout=5, default_concurrency=1)
+        self.addCleanup(run_sync, registry.close())
+        finished = threading.Event()
+
+        def sleepy():
+            time.sleep(0.3)
+            finished.set()
+
+        registry.add_python_tool("sleepy", sleepy)
+        self.assertTrue(run_sync(registry.execute("sleepy", timeout=0.05))["timeout"])
+        limiter = registry._limiter("python:sleepy")
+        self.assertEqual(limiter.active, 1)
+        self.assertTrue(finished.wait(2))
+        deadline = time.time() + 2
+        while limiter.active and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(limiter.active, 0)
+
+        registry.add_subprocess_tool("hang", [sys.executable, "-c", "import time; time.sleep(30)"])
+        started = time.time()
+        self.assertTrue(run_sync(registry.execute("hang", timeout=0.2))["timeout"])
+        self.assertLess(time.time() - started, 5)
+        self.assertEqual(registry._limiter("subprocess:hang").active, 0)
+
+        registry.add_http_tool("slow", self.endpoint)
+        self.assertTrue(run_sync(registry.execute("slow", {"delay": 0.3}, timeout=0.1))["timeout"])
+        deadline = time.time() + 2
+        while registry._limiter(self.endpoint).active and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(registry._limiter(self.endpoint).active, 0)
+
+    def test_run_sync_inside_event_loop(self):
+        """测试在运行中的事件循环内调用同步入口"""
+        self.registry.add_python_tool("one", lambda: 1)
+
+        async def caller():
+            return run_sync(self.registry.execute("one"))
+
+        self.assertEqual(asyncio.run(caller())["result"], 1)
+
+    def test_execution_engine_uses_executors(self):
+        """测试统一执行引擎使用执行器替代模拟执行"""
+        registry = UnifiedToolRegistry()
+        tool_id = registry.register_tool({
+            "name": "echo_tool", "description": "echo tool", "category": "productivity",
+            "platform": "mcp.so", "platform_tool_id": "echo", "mcp_endpoint": self.endpoint,
+            "capabilities": ["echo"], "input_schema": {}, "output_schema": {}
+        })
+        engine = MCPUnifiedExecutionEngine(registry, self.registry, remote_execution=True)
+
+        remote = asyncio.run(engine.execute_user_request("echo"))
+        self.assertTrue(remote["success"])
+        self.assertEqual(remote["execution_result"]["metadata"]["endpoint"], self.endpoint)
+
+        self.registry.add_python_tool(tool_id, lambda **params: params["request"].upper())
+        results = asyncio.run(engine.execute_many([{"request": "echo"}, {"request": "echo tool"}]))
+        self.assertEqual([r["execution_result"]["result"] for r in results], ["ECHO", "ECHO TOOL"])
+        self.assertNotEqual(results[0]["execution_id"], results[1]["execution_id"])
+
+
+if __name__ == '__main__':
+    unittest.main()